@@ -180,6 +180,21 @@ DATABASES = {
 if os.environ.get("DATABASE_URL") is not None:
     DATABASES = {"default": dj_database_url.config()}
 
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+# Shared by the web and worker processes, so the worker can invalidate cached results
+
+REDIS_URL = os.getenv("REDIS_TLS_URL", os.getenv("REDIS_URL", "redis://localhost:6379"))
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "okr",
+        "OPTIONS": {"ssl_cert_reqs": None} if REDIS_URL.startswith("rediss") else {},
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
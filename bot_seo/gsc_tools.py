@@ -0,0 +1,39 @@
+import datetime as dt
+
+from django.db.models import F, Sum
+from django.db.models.query import QuerySet
+from loguru import logger
+
+from okr.models.pages import Page
+from okr.models.rollups import PageRollupGSC, Period
+
+
+def pages_with_gsc_totals(date: dt.date) -> QuerySet[Page]:
+    """Pages with GSC data on a date, annotated with their ``impressions_all`` and
+    ``clicks_all`` over all devices.
+
+    The totals are read from the daily :class:`~okr.models.rollups.PageRollupGSC`
+    rows. If there are none for the date, e.g. before ``refresh_rollups`` was run or
+    after a failed refresh, they are summed up from the per-device data instead.
+
+    Args:
+        date (dt.date): Date of the GSC data.
+
+    Returns:
+        QuerySet[Page]: Pages with GSC data on the date.
+    """
+    if PageRollupGSC.objects.filter(period=Period.DAY, start_date=date).exists():
+        return (
+            Page.objects.filter(
+                rollups_gsc__period=Period.DAY, rollups_gsc__start_date=date
+            )
+            .annotate(impressions_all=F("rollups_gsc__impressions"))
+            .annotate(clicks_all=F("rollups_gsc__clicks"))
+        )
+
+    logger.warning("No daily GSC rollups for {}, summing up page data", date)
+    return (
+        Page.objects.filter(data_gsc__date=date)
+        .annotate(impressions_all=Sum("data_gsc__impressions"))
+        .annotate(clicks_all=Sum("data_gsc__clicks"))
+    )
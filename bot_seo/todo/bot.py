@@ -3,7 +3,7 @@
 import datetime as dt
 import os
 
-from django.db.models import F, Sum
+from django.db.models import F
 from django.db.models.query import QuerySet
 from loguru import logger
 
@@ -17,6 +17,7 @@ from okr.scrapers.common.utils import (
     local_today,
 )
 from .teams_message import _generate_adaptive_card
+from ..gsc_tools import pages_with_gsc_totals
 from ..teams_tools import generate_teams_payload, send_to_teams
 
 WEBHOOK_URL = os.environ.get("TEAMS_WEBHOOK_SEO_BOT")
@@ -26,9 +27,7 @@ WEBHOOK_URL_SECONDARY = os.environ.get("TEAMS_WEBHOOK_SEO_BOT_DIGITALE_NEWS")
 def _get_pages(impressions_min: int = 10000, date: dt.date = None) -> QuerySet[Page]:
     # Get all pages that had a certain number of impressions on a certain date.
     gsc_date = (
-        Page.objects.filter(data_gsc__date=date)
-        .annotate(impressions_all=Sum("data_gsc__impressions"))
-        .annotate(clicks_all=Sum("data_gsc__clicks"))
+        pages_with_gsc_totals(date)
         .filter(
             impressions_all__gt=impressions_min,
         )
@@ -4,7 +4,7 @@ import datetime as dt
 import os
 from typing import List
 
-from django.db.models import F, Sum
+from django.db.models import F
 from loguru import logger
 
 from okr.models.pages import (
@@ -17,6 +17,7 @@ from okr.scrapers.common.utils import (
     local_yesterday,
 )
 from .teams_message import _generate_adaptive_card
+from ..gsc_tools import pages_with_gsc_totals
 from ..teams_tools import generate_teams_payload, send_to_teams
 
 WEBHOOK_URL = os.environ.get("TEAMS_WEBHOOK_SEO_BOT")
@@ -28,11 +29,8 @@ ARTICLE_THRESHOLD = int(os.environ.get("SEO_BOT_TOP_ARTICLES_THRESHOLD", 10000))
 def _get_top_articles(number_of_articles: int = 5, date: dt.date = None) -> List[Page]:
     # Get a number of pages that had the highest number of clicks on a certain date.
     logger.debug("Requesting top articles from DB")
-    gsc_top_articles = (
-        Page.objects.filter(data_gsc__date=date)
-        .annotate(impressions_all=Sum("data_gsc__impressions"))
-        .annotate(clicks_all=Sum("data_gsc__clicks"))
-        .order_by(F("clicks_all").desc(nulls_last=True))
+    gsc_top_articles = pages_with_gsc_totals(date).order_by(
+        F("clicks_all").desc(nulls_last=True)
     )
 
     top_articles = list(gsc_top_articles[0:number_of_articles])
@@ -90,8 +88,7 @@ def _get_top_articles(number_of_articles: int = 5, date: dt.date = None) -> List
 def _get_articles_above_threshold(clicks_min: int = 10000, date: dt.date = None) -> int:
     # Get the amount of pages that were above clicks_min on date.
     gsc_clicks_above_min = (
-        Page.objects.filter(data_gsc__date=date)
-        .annotate(clicks_all=Sum("data_gsc__clicks"))
+        pages_with_gsc_totals(date)
         .filter(
             clicks_all__gte=clicks_min,
         )
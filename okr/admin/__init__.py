@@ -12,6 +12,9 @@ from . import pages
 from . import snapchat_shows
 from . import tiktok
 from . import custom
+from . import jobs
+from . import rollups
+from . import auth
 
 admin.site.site_header = "STAGING | Django WDR OKR"
 admin.site.site_title = "STAGING | Django WDR OKR"
@@ -0,0 +1,17 @@
+"""Forms for managing the API tokens of scripts and BI tools."""
+
+from django.contrib import admin
+
+from ..models import ApiToken
+
+
+class ApiTokenAdmin(admin.ModelAdmin):
+    """List of API tokens. The key is generated when a token is created."""
+
+    list_display = ["name", "user", "created", "last_used"]
+    list_filter = ["user"]
+    search_fields = ["name", "user__username"]
+    readonly_fields = ["key", "created", "last_used"]
+
+
+admin.site.register(ApiToken, ApiTokenAdmin)
@@ -0,0 +1,309 @@
+"""Cache the date hierarchy and list filter choices of admin change lists.
+
+On every page load, Django computes the links of the date hierarchy with a
+``MIN``/``MAX`` query and a ``DISTINCT`` query over the dates of the whole (filtered)
+table, and the choices of some list filters with ``DISTINCT`` queries or a query of
+all related objects. For the tables of :class:`~okr.admin.mixins.LargeTableMixin`,
+the results are stored in the Django cache, which is shared by the web and worker
+processes through Redis.
+
+The cached results of a model are invalidated by changing its version:
+
+* when the scrapers write rows with a date that this process hasn't written since the
+  last invalidation (see :func:`okr.scrapers.common.upsert.bulk_upsert`)
+* when the DB cleanup deletes rows of the model
+* when related objects used as list filter choices are written, e.g. a new podcast
+* at the latest after :data:`TIMEOUT`, for rows that are written in other ways
+"""
+
+import datetime as dt
+import hashlib
+import threading
+import uuid
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Type
+
+from django.contrib.admin.filters import (
+    AllValuesFieldListFilter,
+    FieldListFilter,
+    RelatedFieldListFilter,
+)
+from django.contrib.admin.templatetags.admin_list import (
+    date_hierarchy as _date_hierarchy,
+)
+from django.contrib.admin.utils import get_fields_from_path
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.db.models import Field, Model, QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from loguru import logger
+from redis.exceptions import RedisError
+from sentry_sdk import capture_exception
+
+from ..models.base import rows_deleted
+from ..scrapers.common.upsert import rows_upserted
+
+# Seconds until cached results expire, even if they weren't invalidated
+TIMEOUT = 6 * 60 * 60
+
+# Date fields of the date hierarchies, by model
+_date_fields: Dict[Type[Model], Field] = {}
+
+# Related models whose objects are cached as list filter choices
+_choice_models: Set[Type[Model]] = set()
+
+# Dates per model written by this process since its cache was last invalidated
+_written: Dict[Type[Model], Set[dt.date]] = {}
+_written_lock = threading.Lock()
+
+
+def _version_key(model: Type[Model]) -> str:
+    return f"admin:version:{model._meta.label_lower}"
+
+
+def _key(model: Type[Model], kind: str, *parts: Any) -> str:
+    """Key of a cached result of a model, which changes with the model's version."""
+    version = cache.get_or_set(
+        _version_key(model), lambda: uuid.uuid4().hex, timeout=None
+    )
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f"admin:{kind}:{model._meta.label_lower}:{version}:{digest}"
+
+
+def _cached(compute: Callable[[], Any], model: Type[Model], kind: str, *parts) -> Any:
+    """Get a result from the cache, or compute and store it.
+
+    If the cache isn't available, the result is computed every time.
+    """
+    try:
+        key = _key(model, kind, *parts)
+        result = cache.get(key)
+    except RedisError as e:
+        capture_exception(e)
+        logger.warning("Admin cache not available")
+        return compute()
+
+    if result is None:
+        result = compute()
+        try:
+            cache.set(key, result, timeout=TIMEOUT)
+        except RedisError as e:
+            capture_exception(e)
+            logger.warning("Admin cache not available")
+
+    return result
+
+
+def _query(queryset: QuerySet) -> Optional[tuple]:
+    """SQL and parameters of a queryset, or None if it can't match any rows."""
+    try:
+        return queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return None
+
+
+def invalidate(model: Type[Model]):
+    """Discard all cached date hierarchies and filter choices of a model.
+
+    Args:
+        model (Type[Model]): The model that was changed.
+    """
+    with _written_lock:
+        _written.pop(model, None)
+
+    try:
+        cache.set(_version_key(model), uuid.uuid4().hex, timeout=None)
+    except RedisError as e:
+        capture_exception(e)
+        logger.warning("Failed to invalidate admin cache of {}", model.__name__)
+
+
+def watch(model: Type[Model], date_hierarchy: Optional[str], list_filter: Iterable):
+    """Invalidate the cache of an admin's model when it or its filter choices change.
+
+    Args:
+        model (Type[Model]): The model of the admin.
+        date_hierarchy (Optional[str]): The ``date_hierarchy`` of the admin.
+        list_filter (Iterable): The ``list_filter`` of the admin.
+    """
+    if date_hierarchy and "__" not in date_hierarchy:
+        _date_fields[model] = model._meta.get_field(date_hierarchy)
+
+    for item in list_filter:
+        if not isinstance(item, str):
+            continue
+
+        field = get_fields_from_path(model, item)[-1]
+        if field.is_relation and field.related_model not in _choice_models:
+            _choice_models.add(field.related_model)
+            post_save.connect(_related_changed, sender=field.related_model)
+            post_delete.connect(_related_changed, sender=field.related_model)
+
+
+def _related_changed(sender: Type[Model], **kwargs):
+    invalidate(sender)
+
+
+def _day(value: Any) -> Optional[dt.date]:
+    if isinstance(value, dt.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    return value
+
+
+@receiver(rows_upserted)
+def _rows_upserted(sender: Type[Model], objs: List[Model], **kwargs):
+    if sender in _choice_models:
+        invalidate(sender)
+
+    field = _date_fields.get(sender)
+    if field is None:
+        return
+
+    dates = {_day(getattr(obj, field.attname)) for obj in objs} - {None}
+
+    with _written_lock:
+        new = dates - _written.get(sender, set())
+
+    if new:
+        logger.debug("New dates in {}, invalidating admin cache", sender.__name__)
+        invalidate(sender)
+
+        with _written_lock:
+            _written.setdefault(sender, set()).update(dates)
+
+
+@receiver(rows_deleted)
+def _rows_deleted(sender: Type[Model], **kwargs):
+    invalidate(sender)
+
+
+class _CachedDates:
+    """Stands in for the queryset of a change list in Django's date hierarchy."""
+
+    def __init__(self, queryset: QuerySet):
+        self.queryset = queryset
+        self.query = _query(queryset)
+
+    def _cached(self, compute: Callable[[], Any], *parts) -> Any:
+        if self.query is None:
+            return compute()
+        return _cached(compute, self.queryset.model, "dates", self.query, *parts)
+
+    def aggregate(self, **kwargs) -> Dict[str, Any]:
+        return self._cached(
+            partial(self.queryset.aggregate, **kwargs),
+            sorted((name, repr(aggregate)) for name, aggregate in kwargs.items()),
+        )
+
+    def dates(self, field_name: str, kind: str) -> List[dt.date]:
+        return self._cached(
+            lambda: list(self.queryset.dates(field_name, kind)),
+            "dates",
+            field_name,
+            kind,
+        )
+
+    def datetimes(self, field_name: str, kind: str) -> List[dt.datetime]:
+        return self._cached(
+            lambda: list(self.queryset.datetimes(field_name, kind)),
+            "datetimes",
+            field_name,
+            kind,
+            timezone.get_current_timezone_name(),
+        )
+
+
+class _CachedDatesChangeList:
+    """A change list whose date hierarchy is read from the cache."""
+
+    def __init__(self, cl):
+        self._cl = cl
+        self.queryset = _CachedDates(cl.queryset)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cl, name)
+
+
+def date_hierarchy(cl) -> Optional[dict]:
+    """Links of the date hierarchy of a change list, like Django's ``date_hierarchy``
+    template tag, but with cached dates.
+
+    Args:
+        cl (ChangeList): The change list.
+
+    Returns:
+        Optional[dict]: Context of the ``admin/date_hierarchy.html`` template, or
+        None if the change list has no date hierarchy.
+    """
+    return _date_hierarchy(_CachedDatesChangeList(cl))
+
+
+class CachedRelatedFieldListFilter(RelatedFieldListFilter):
+    """Filter by related objects, which are read from the cache."""
+
+    def field_choices(self, field, request, model_admin):
+        return _cached(
+            partial(super().field_choices, field, request, model_admin),
+            field.related_model,
+            "choices",
+            field.model._meta.label_lower,
+            field.name,
+            self.field_admin_ordering(field, request, model_admin),
+        )
+
+
+class CachedAllValuesFieldListFilter(AllValuesFieldListFilter):
+    """Filter by the distinct values of a field, which are read from the cache."""
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+        query = _query(self.lookup_choices)
+        if query is not None:
+            self.lookup_choices = _cached(
+                partial(list, self.lookup_choices), model, "values", query
+            )
+
+
+# Django's default filters that are replaced by cached ones
+_CACHED_FILTERS = {
+    RelatedFieldListFilter: CachedRelatedFieldListFilter,
+    AllValuesFieldListFilter: CachedAllValuesFieldListFilter,
+}
+
+
+def cached_list_filter(model: Type[Model], list_filter: Iterable) -> List:
+    """Use cached filters for the fields in a ``list_filter`` whose default filters
+    query the choices.
+
+    Args:
+        model (Type[Model]): The model of the admin.
+        list_filter (Iterable): The ``list_filter`` of the admin.
+
+    Returns:
+        List: The ``list_filter`` with field names replaced by ``(name, filter)``.
+    """
+    result = []
+
+    for item in list_filter:
+        if isinstance(item, str):
+            try:
+                field = get_fields_from_path(model, item)[-1]
+            except FieldDoesNotExist:
+                result.append(item)
+                continue
+
+            # Same order as FieldListFilter.create
+            for test, filter_class in FieldListFilter._field_list_filters:
+                if test(field):
+                    if filter_class in _CACHED_FILTERS:
+                        item = (item, _CACHED_FILTERS[filter_class])
+                    break
+
+        result.append(item)
+
+    return result
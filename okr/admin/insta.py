@@ -15,9 +15,10 @@ from ..models import (
     InstaHourlyFollowers,
 )
 from .base import QuintlyAdmin
+from .mixins import LargeTableMixin
 
 
-class InsightAdmin(admin.ModelAdmin):
+class InsightAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing insight data to edit."""
 
     list_display = [
@@ -53,7 +54,7 @@ class PostAdmin(admin.ModelAdmin):
     date_hierarchy = "created_at"
 
 
-class InstaVideoDataAdmin(admin.ModelAdmin):
+class InstaVideoDataAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing video data to edit."""
 
     list_display = [
@@ -69,7 +70,7 @@ class InstaVideoDataAdmin(admin.ModelAdmin):
     search_fields = ["post__external_id"]
 
 
-class InstaReelDataAdmin(admin.ModelAdmin):
+class InstaReelDataAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing reel data to edit."""
 
     list_display = [
@@ -123,7 +124,7 @@ class IGTVAdmin(admin.ModelAdmin):
     date_hierarchy = "created_at"
 
 
-class IGTVDataAdmin(admin.ModelAdmin):
+class IGTVDataAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing IGTV data to edit."""
 
     list_display = [
@@ -156,7 +157,7 @@ class CommentAdmin(admin.ModelAdmin):
     search_fields = ["post", "username", "external_post_id", "external_id"]
 
 
-class DemographicsAdmin(admin.ModelAdmin):
+class DemographicsAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing Instagram demographics data to edit."""
 
     list_display = [
@@ -173,7 +174,7 @@ class DemographicsAdmin(admin.ModelAdmin):
     search_fields = ["insta"]
 
 
-class HourlyFollowersAdmin(admin.ModelAdmin):
+class HourlyFollowersAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing Instagram hourly followers data to edit."""
 
     list_display = [
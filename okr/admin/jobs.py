@@ -0,0 +1,92 @@
+"""Forms for viewing scraper job runs, backfills and watermarks."""
+
+from django.contrib import admin
+
+from ..models import Backfill, BackfillCheckpoint, JobRun, Watermark
+from .mixins import LargeTableMixin
+
+
+class JobRunAdmin(LargeTableMixin, admin.ModelAdmin):
+    """List of measured scraper job runs, read-only."""
+
+    list_display = [
+        "job",
+        "source",
+        "started_at",
+        "duration",
+        "queue_wait",
+        "db_queries",
+        "db_time",
+        "http_requests",
+        "http_time",
+        "rows_written",
+        "success",
+    ]
+    list_display_links = ["job", "started_at"]
+    list_filter = ["success", "source", "executor", "job"]
+    date_hierarchy = "started_at"
+    search_fields = ["job", "arguments", "error"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+admin.site.register(JobRun, JobRunAdmin)
+
+
+class BackfillCheckpointInline(admin.TabularInline):
+    """Completed parts of a backfill, read-only."""
+
+    model = BackfillCheckpoint
+    fields = ["step", "start_date", "end_date", "completed_at"]
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class BackfillAdmin(admin.ModelAdmin):
+    """List of unfinished backfills.
+
+    Deleting a backfill discards its progress, so it is not resumed.
+    """
+
+    list_display = ["job", "product_type", "product_id", "started_at", "last_modified"]
+    list_filter = ["job"]
+    readonly_fields = list_display
+    inlines = [BackfillCheckpointInline]
+
+    def has_add_permission(self, request):
+        return False
+
+
+admin.site.register(Backfill, BackfillAdmin)
+
+
+class WatermarkAdmin(admin.ModelAdmin):
+    """List of watermarks of the periodic scrapers.
+
+    Deleting a watermark makes the next run request the default time range again.
+    """
+
+    list_display = [
+        "job",
+        "source",
+        "product_type",
+        "product_id",
+        "final_until",
+        "last_updated",
+    ]
+    list_filter = ["source", "job"]
+    readonly_fields = list_display
+
+    def has_add_permission(self, request):
+        return False
+
+
+admin.site.register(Watermark, WatermarkAdmin)
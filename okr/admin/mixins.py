@@ -1,12 +1,26 @@
 """ """
 
+import base64
+import datetime as dt
+import json
 from os import environ
+from typing import Any, List, Optional, Sequence, Tuple
 
-from django.core.paginator import Paginator
-from django.db import connection
+from django.contrib.admin.utils import get_fields_from_path
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import F, Field, Model, Q
+from django.db.models.expressions import OrderBy
 from django.utils.functional import cached_property
 from loguru import logger
 
+from ..models.base import estimated_count
+from . import caching
+
+# Query parameter with the position of the next or previous page
+CURSOR_VAR = "cursor"
+
 
 # Source: https://medium.com/squad-engineering/estimated-counts-for-faster-django-admin-change-list-963cbf43683e
 class LargeTablePaginator(Paginator):
@@ -21,31 +35,341 @@ class LargeTablePaginator(Paginator):
         query = self.object_list.query
         if not query.where:
             try:
-                cursor = connection.cursor()
-                cursor.execute(
-                    "SELECT reltuples FROM pg_class WHERE relname = %s",
-                    [query.model._meta.db_table],
-                )
-                return int(cursor.fetchone()[0])
+                estimate = estimated_count(query.model)
             except Exception:
                 logger.warning("Failed to do performant count on {}", query)
-                return super().count
+                estimate = None
+
+            if estimate is not None:
+                return estimate
+
+        return super().count
+
+
+class KeysetPage(Page):
+    """Page of a :class:`KeysetPaginator` with the cursors of its neighbours."""
+
+    def __init__(
+        self,
+        object_list: List[Model],
+        number: int,
+        paginator: "KeysetPaginator",
+        *,
+        has_next: bool,
+        has_previous: bool,
+    ):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    @property
+    def next_cursor(self) -> Optional[str]:
+        if not self.has_next() or not self.object_list:
+            return None
+        return self.paginator.encode_cursor("next", self.object_list[-1])
+
+    @property
+    def previous_cursor(self) -> Optional[str]:
+        if not self.has_previous() or not self.object_list:
+            return None
+        return self.paginator.encode_cursor("previous", self.object_list[0])
+
+
+class KeysetPaginator(LargeTablePaginator):
+    """
+    Paginator that seeks to the rows after (or before) a cursor instead of skipping
+    rows with OFFSET, which gets slower with every page of a large table.
+
+    The cursor holds the values of the ordering fields of the last (or first) row of
+    the page it was created on. Foreign keys in the ordering are sorted by their ID.
+    If the ordering can't be compared this way (nullable fields, annotations, fields
+    of related models), the pages fall back to OFFSET.
+    """
+
+    def __init__(
+        self,
+        object_list,
+        per_page,
+        orphans=0,
+        allow_empty_first_page=True,
+        cursor: Optional[str] = None,
+    ):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        self.cursor = cursor
+        self.current_page: Optional[Page] = None
+
+    @cached_property
+    def keys(self) -> Optional[List[Tuple[Field, bool]]]:
+        """Fields of the ordering and whether they are descending, ending with a
+        unique field. None if the ordering doesn't allow seeking.
+        """
+        opts = self.object_list.model._meta
+        keys = []
+
+        for item in self.object_list.query.order_by or opts.ordering:
+            if isinstance(item, str):
+                name, descending = item.lstrip("-"), item.startswith("-")
+            elif isinstance(item, OrderBy) and isinstance(item.expression, F):
+                name, descending = item.expression.name, item.descending
+            else:
+                return None
+
+            try:
+                field = opts.pk if name == "pk" else opts.get_field(name)
+            except FieldDoesNotExist:
+                return None
+
+            if field.null or not field.concrete or field.many_to_many:
+                return None
+
+            keys.append((field, descending))
+
+            if field.unique:
+                return keys
+
+        # Same tiebreaker as the one the admin adds to the ordering
+        return keys + [(opts.pk, True)]
+
+    @cached_property
+    def ordered(self):
+        """The rows in the order of the keys."""
+        return self.object_list.order_by(
+            *(
+                f"{'-' if descending else ''}{field.attname}"
+                for field, descending in self.keys
+            )
+        )
+
+    def encode_cursor(self, direction: str, obj: Model) -> str:
+        """Create the cursor for the rows after (``"next"``) or before
+        (``"previous"``) an object.
+        """
+        values = []
+
+        for field, _ in self.keys:
+            value = getattr(obj, field.attname)
+            if isinstance(value, (dt.date, dt.time)):
+                # Includes datetimes, with microseconds unlike DjangoJSONEncoder
+                value = value.isoformat()
+            elif isinstance(value, dt.timedelta):
+                value = value.total_seconds()
+            values.append(value)
+
+        data = json.dumps([direction, values], separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor: str) -> Tuple[str, List[Any]]:
+        """Get the direction and the key values from a cursor.
+
+        Raises:
+            InvalidPage: If the cursor is invalid, e.g. because it was created for
+                another ordering.
+        """
+        try:
+            data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            direction, values = json.loads(data)
+
+            if direction not in ("next", "previous") or len(values) != len(self.keys):
+                raise ValueError(f"Invalid cursor {cursor!r}")
+
+            return direction, [
+                field.to_python(
+                    dt.timedelta(seconds=value)
+                    if field.get_internal_type() == "DurationField"
+                    else value
+                )
+                for (field, _), value in zip(self.keys, values)
+            ]
+        except (ValueError, TypeError, ValidationError) as e:
+            raise InvalidPage(str(e)) from e
+
+    def _seek(self, values: Sequence[Any], before: bool) -> Q:
+        # (a, b, c) > (x, y, z) as a > x OR (a = x AND b > y) OR ..., as the
+        # directions of the fields may differ
+        condition = Q()
+        equal = Q()
+
+        for (field, descending), value in zip(self.keys, values):
+            lookup = "lt" if descending != before else "gt"
+            condition |= equal & Q(**{f"{field.attname}__{lookup}": value})
+            equal &= Q(**{field.attname: value})
+
+        # Redundant range on the first field, so an index on it can be used
+        field, descending = self.keys[0]
+        lookup = "lte" if descending != before else "gte"
+        return Q(**{f"{field.attname}__{lookup}": values[0]}) & condition
+
+    def page(self, number) -> Page:
+        if self.keys is None:
+            self.current_page = super().page(number)
+            return self.current_page
+
+        if self.cursor is None:
+            # Pages opened by number, e.g. the first one, still need OFFSET
+            number = self.validate_number(number)
+            offset = (number - 1) * self.per_page
+            rows = list(self.ordered[offset : offset + self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            has_previous = number > 1
         else:
-            return super().count
+            number = int(number)
+            direction, values = self.decode_cursor(self.cursor)
+            queryset = self.ordered.filter(
+                self._seek(values, before=direction == "previous")
+            )
+
+            if direction == "previous":
+                rows = list(queryset.reverse()[: self.per_page + 1])
+                has_previous = len(rows) > self.per_page
+                rows = rows[: self.per_page][::-1]
+                has_next = True
+            else:
+                rows = list(queryset[: self.per_page + 1])
+                has_next = len(rows) > self.per_page
+                has_previous = True
+
+            if not has_previous:
+                number = 1
+
+        self.current_page = KeysetPage(
+            rows[: self.per_page],
+            number,
+            self,
+            has_next=has_next,
+            has_previous=has_previous,
+        )
+        return self.current_page
+
+
+def _related_paths(model, names: Sequence[Any]) -> List[str]:
+    """Relations to load with ``select_related`` to show the columns of a change list
+    without a query per row.
+    """
+    paths = set()
+
+    for name in names:
+        if not isinstance(name, str) or name == "__str__":
+            continue
+
+        try:
+            fields = get_fields_from_path(model, name)
+        except (FieldDoesNotExist, LookupError):
+            continue
+
+        # Only forward relations to a single object can be joined
+        relations = []
+        for field in fields:
+            if not field.concrete or not (field.many_to_one or field.one_to_one):
+                break
+            relations.append(field)
+
+        # <FK>_id columns don't need a join
+        if not relations or name == relations[0].attname:
+            continue
+
+        path = "__".join(field.name for field in relations)
+        paths.add(path)
+
+        # __str__ of related objects often includes their product, e.g. the podcast
+        for field in relations[-1].related_model._meta.concrete_fields:
+            if field.many_to_one and not field.null:
+                paths.add(f"{path}__{field.name}")
 
+    return sorted(paths)
 
-def large_table(cls):
+
+def _pagination_links(cl) -> Optional[dict]:
+    page = getattr(cl.paginator, "current_page", None)
+
+    if not isinstance(page, KeysetPage) or not cl.multi_page or cl.show_all:
+        return None
+
+    links = {"number": page.number}
+
+    if page.has_previous():
+        links["first"] = cl.get_query_string(remove=[PAGE_VAR])
+        links["previous"] = cl.get_query_string(
+            {PAGE_VAR: max(page.number - 1, 1), CURSOR_VAR: page.previous_cursor}
+        )
+    if page.has_next():
+        links["next"] = cl.get_query_string(
+            {PAGE_VAR: page.number + 1, CURSOR_VAR: page.next_cursor}
+        )
+
+    return links
+
+
+class LargeTableMixin:
     """
-    Class decorator to apply custom paginator that doesn't do accurate row counts
-    as they are exceedingly slow for large tables.
-    Triggers only if we're connected to PostgreSQL.
+    Admin mixin for tables with millions of rows:
+
+    * Pages are loaded with a :class:`KeysetPaginator`, so later pages are as fast as
+      the first one. The change list links to the previous and next page instead of
+      showing page numbers.
+    * Unfiltered row counts are estimated, see :class:`LargeTablePaginator`. On
+      PostgreSQL, the total count isn't shown next to filtered counts.
+    * Related objects shown in ``list_display`` are loaded with ``select_related``,
+      in addition to the paths in ``list_select_related``.
+    * The dates of the ``date_hierarchy`` and the choices of the ``list_filter`` are
+      cached, see :mod:`okr.admin.caching`.
     """
 
+    change_list_template = "admin/okr/change_list_keyset.html"
+
     if environ.get("DATABASE_URL", "").startswith("postgres://"):
-        cls.paginator = LargeTablePaginator
-        cls.show_full_result_count = False
+        show_full_result_count = False
+
+    def __init__(self, model, admin_site):
+        super().__init__(model, admin_site)
+        caching.watch(model, self.date_hierarchy, self.list_filter)
+
+    def get_list_filter(self, request):
+        return caching.cached_list_filter(self.model, super().get_list_filter(request))
+
+    def get_paginator(
+        self, request, queryset, per_page, orphans=0, allow_empty_first_page=True
+    ):
+        return KeysetPaginator(
+            queryset,
+            per_page,
+            orphans,
+            allow_empty_first_page,
+            cursor=getattr(request, "keyset_cursor", None),
+        )
+
+    def get_list_select_related(self, request):
+        explicit = super().get_list_select_related(request)
+
+        if explicit is True:
+            return True
+
+        paths = set(explicit or ()) | set(
+            _related_paths(self.model, self.get_list_display(request))
+        )
+        return sorted(paths) or False
+
+    def changelist_view(self, request, extra_context=None):
+        # The change list treats unknown parameters as filters
+        cursor = request.GET.get(CURSOR_VAR)
+        if cursor is not None:
+            request.GET = request.GET.copy()
+            del request.GET[CURSOR_VAR]
+        request.keyset_cursor = cursor
+
+        response = super().changelist_view(request, extra_context)
+
+        cl = (getattr(response, "context_data", None) or {}).get("cl")
+        if cl is not None:
+            response.context_data["keyset_pagination"] = _pagination_links(cl)
+            response.context_data["cached_date_hierarchy"] = caching.date_hierarchy(cl)
 
-    return cls
+        return response
 
 
 class UnrequiredFieldsMixin:
@@ -18,7 +18,7 @@ from okr.models.pages import (
     PropertyDataQueryGSC,
 )
 from .base import ProductAdmin
-from .mixins import large_table
+from .mixins import LargeTableMixin
 
 
 class PropertyAdmin(ProductAdmin):
@@ -44,8 +44,7 @@ class PageAdmin(admin.ModelAdmin):
     autocomplete_fields = ["sophora_id"]
 
 
-@large_table
-class PropertyDataGSCAdmin(admin.ModelAdmin):
+class PropertyDataGSCAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing GSC property data to edit."""
 
     list_display = [
@@ -62,8 +61,7 @@ class PropertyDataGSCAdmin(admin.ModelAdmin):
     date_hierarchy = "date"
 
 
-@large_table
-class PropertyDataQueryGSCAdmin(admin.ModelAdmin):
+class PropertyDataQueryGSCAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing GSC property query data to edit."""
 
     list_display = [
@@ -80,8 +78,7 @@ class PropertyDataQueryGSCAdmin(admin.ModelAdmin):
     search_fields = ["query"]
 
 
-@large_table
-class PageDataGSCAdmin(admin.ModelAdmin):
+class PageDataGSCAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing GSC page data to edit."""
 
     list_display = [
@@ -100,8 +97,7 @@ class PageDataGSCAdmin(admin.ModelAdmin):
     autocomplete_fields = ["page"]
 
 
-@large_table
-class PageDataQueryGSCAdmin(admin.ModelAdmin):
+class PageDataQueryGSCAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing GSC page query data to edit."""
 
     list_display = [
@@ -199,8 +195,7 @@ class PageWebtrekkMetaAdmin(admin.ModelAdmin):
     autocomplete_fields = ["page"]
 
 
-@large_table
-class PageDataWebtrekkAdmin(admin.ModelAdmin):
+class PageDataWebtrekkAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing Webtrekk data to edit."""
 
     list_display = [
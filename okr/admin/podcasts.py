@@ -28,9 +28,7 @@ from ..models import (
     PodcastEpisodeDataArdAudiothekPerformance,
 )
 from .base import ProductAdmin
-from .mixins import UnrequiredFieldsMixin, large_table
-from ..scrapers.podcasts import feed
-from ..scrapers.podcasts.spotify_api import spotify_api
+from .mixins import LargeTableMixin, UnrequiredFieldsMixin
 
 
 class FeedForm(forms.ModelForm):
@@ -53,6 +51,11 @@ class FeedForm(forms.ModelForm):
     )
 
     def clean(self) -> Dict[str, Any]:
+        # The scrapers need spotipy, feedparser and pandas, which are only loaded once
+        # a podcast is added
+        from ..scrapers.podcasts import feed
+        from ..scrapers.podcasts.spotify_api import spotify_api
+
         try:
             feed_dict = feed.parse(self.cleaned_data["feed_url"])
         except Exception as e:
@@ -223,7 +226,7 @@ class PodcastITunesReviewAdmin(admin.ModelAdmin):
     date_hierarchy = "date"
 
 
-class PodcastDataSpotifyDemographicsAdmin(admin.ModelAdmin):
+class PodcastDataSpotifyDemographicsAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing Spotify episode demographics data to edit."""
 
     list_display = [
@@ -239,7 +242,7 @@ class PodcastDataSpotifyDemographicsAdmin(admin.ModelAdmin):
     search_fields = ["podcast__name"]
 
 
-class DataWebtrekkPickerAdmin(admin.ModelAdmin):
+class DataWebtrekkPickerAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing Spotify podcast Webtrekk Podcast Picker data to edit."""
 
     list_display = [
@@ -254,7 +257,7 @@ class DataWebtrekkPickerAdmin(admin.ModelAdmin):
     date_hierarchy = "date"
 
 
-class DataSpotifyAdmin(admin.ModelAdmin):
+class DataSpotifyAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing Spotify podcast user data to edit."""
 
     list_display = [
@@ -271,8 +274,7 @@ class DataSpotifyAdmin(admin.ModelAdmin):
     date_hierarchy = "date"
 
 
-@large_table
-class DataSpotifyHourlyAdmin(admin.ModelAdmin):
+class DataSpotifyHourlyAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing Spotify hourly podcast data to edit."""
 
     list_display = [
@@ -305,8 +307,7 @@ class EpisodeAdmin(admin.ModelAdmin):
     search_fields = ["title", "spotify_id", "ard_audiothek_id", "zmdb_id"]
 
 
-@large_table
-class EpisodeDataSpotifyAdmin(admin.ModelAdmin):
+class EpisodeDataSpotifyAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing Spotify podcast episode data to edit."""
 
     list_display = [
@@ -324,7 +325,7 @@ class EpisodeDataSpotifyAdmin(admin.ModelAdmin):
     autocomplete_fields = ["episode"]
 
 
-class EpisodeDataSpotifyUserAdmin(admin.ModelAdmin):
+class EpisodeDataSpotifyUserAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing Spotify episode user data to edit."""
 
     list_display = [
@@ -350,8 +351,7 @@ class EpisodeDataSpotifyUserAdmin(admin.ModelAdmin):
     autocomplete_fields = ["episode"]
 
 
-@large_table
-class EpisodeDataSpotifyDemographicsAdmin(admin.ModelAdmin):
+class EpisodeDataSpotifyDemographicsAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing Spotify episode demographics data to edit."""
 
     list_display = [
@@ -366,8 +366,7 @@ class EpisodeDataSpotifyDemographicsAdmin(admin.ModelAdmin):
     autocomplete_fields = ["episode"]
 
 
-@large_table
-class EpisodeDataSpotifyPerformanceAdmin(admin.ModelAdmin):
+class EpisodeDataSpotifyPerformanceAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing Spotify episode performance data to edit."""
 
     list_display = [
@@ -386,8 +385,7 @@ class EpisodeDataSpotifyPerformanceAdmin(admin.ModelAdmin):
     autocomplete_fields = ["episode"]
 
 
-@large_table
-class EpisodeDataWebtrekkPerformanceAdmin(admin.ModelAdmin):
+class EpisodeDataWebtrekkPerformanceAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing Webtrekk episode performance data to edit."""
 
     list_display = [
@@ -404,8 +402,7 @@ class EpisodeDataWebtrekkPerformanceAdmin(admin.ModelAdmin):
     autocomplete_fields = ["episode"]
 
 
-@large_table
-class EpisodeDataArdAudiothekPerformanceAdmin(admin.ModelAdmin):
+class EpisodeDataArdAudiothekPerformanceAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing ARD Audiothek episode performance data to edit."""
 
     list_display = [
@@ -421,8 +418,7 @@ class EpisodeDataArdAudiothekPerformanceAdmin(admin.ModelAdmin):
     autocomplete_fields = ["episode"]
 
 
-@large_table
-class EpisodeDataPodstatAdmin(admin.ModelAdmin):
+class EpisodeDataPodstatAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing Podstat episode data to edit."""
 
     list_display = [
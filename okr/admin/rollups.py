@@ -0,0 +1,100 @@
+"""Forms for viewing pre-aggregated data, read-only."""
+
+from django.contrib import admin
+
+from ..models import (
+    InstaRollup,
+    PageQueryRollupGSC,
+    PageRollupGSC,
+    PodcastEpisodeRollupSpotify,
+)
+from .mixins import LargeTableMixin
+
+
+class RollupAdmin(LargeTableMixin, admin.ModelAdmin):
+    """Base class for lists of rollups, which are only written by the scrapers."""
+
+    list_filter = ["period"]
+    date_hierarchy = "start_date"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class PageRollupGSCAdmin(RollupAdmin):
+    """List of GSC page data per day, week and month."""
+
+    list_display = [
+        "page",
+        "period",
+        "start_date",
+        "days",
+        "clicks",
+        "impressions",
+        "ctr",
+        "position",
+    ]
+    list_display_links = ["page", "start_date"]
+    search_fields = ["page__url"]
+
+
+class PageQueryRollupGSCAdmin(RollupAdmin):
+    """List of GSC page query data per week and month."""
+
+    list_display = [
+        "page",
+        "query",
+        "period",
+        "start_date",
+        "days",
+        "clicks",
+        "impressions",
+        "ctr",
+        "position",
+    ]
+    list_display_links = ["page", "start_date"]
+    search_fields = ["page__url", "query"]
+
+
+class PodcastEpisodeRollupSpotifyAdmin(RollupAdmin):
+    """List of Spotify podcast episode data per week and month."""
+
+    list_display = [
+        "episode",
+        "period",
+        "start_date",
+        "days",
+        "starts",
+        "streams",
+        "listeners",
+        "listeners_all_time",
+    ]
+    list_display_links = ["episode", "start_date"]
+    list_filter = ["period", "episode__podcast"]
+    search_fields = ["episode__title"]
+
+
+class InstaRollupAdmin(RollupAdmin):
+    """List of Instagram insights per week and month."""
+
+    list_display = [
+        "insta",
+        "period",
+        "start_date",
+        "days",
+        "reach",
+        "impressions",
+        "followers",
+        "profile_views",
+    ]
+    list_display_links = ["insta", "start_date"]
+    list_filter = ["period", "insta"]
+
+
+admin.site.register(PageRollupGSC, PageRollupGSCAdmin)
+admin.site.register(PageQueryRollupGSC, PageQueryRollupGSCAdmin)
+admin.site.register(PodcastEpisodeRollupSpotify, PodcastEpisodeRollupSpotifyAdmin)
+admin.site.register(InstaRollup, InstaRollupAdmin)
@@ -8,9 +8,10 @@ from ..models import (
     SnapchatShowSnap,
 )
 from .base import QuintlyAdmin
+from .mixins import LargeTableMixin
 
 
-class SnapchatShowInsightAdmin(admin.ModelAdmin):
+class SnapchatShowInsightAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing Snapchat show data to edit."""
 
     list_display = [
@@ -10,9 +10,10 @@ from ..models import (
     TikTokTag,
 )
 from .base import QuintlyAdmin
+from .mixins import LargeTableMixin
 
 
-class DataAdmin(admin.ModelAdmin):
+class DataAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing TikTok account data to edit."""
 
     list_display = [
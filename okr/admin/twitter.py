@@ -7,9 +7,10 @@ from ..models import (
     Tweet,
 )
 from .base import QuintlyAdmin
+from .mixins import LargeTableMixin
 
 
-class InsightAdmin(admin.ModelAdmin):
+class InsightAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing insight data to edit."""
 
     list_display = [
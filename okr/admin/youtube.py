@@ -10,7 +10,6 @@ from django.contrib import admin
 from django.contrib import messages
 from django.core.files.uploadedfile import UploadedFile
 from django.http.request import HttpRequest
-import pandas as pd
 from loguru import logger
 
 from ..models import (
@@ -27,10 +26,11 @@ from ..models import (
     YouTubeVideoExternalTraffic,
 )
 from .base import QuintlyAdmin
+from .mixins import LargeTableMixin
 from .uploads import UploadFileMixin, UploadMultipleFilesForm
 
 
-class YouTubeAnalyticsAdmin(admin.ModelAdmin):
+class YouTubeAnalyticsAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing YouTube analytics data to edit."""
 
     list_display = [
@@ -45,7 +45,7 @@ class YouTubeAnalyticsAdmin(admin.ModelAdmin):
     date_hierarchy = "date"
 
 
-class YouTubeDemographicsAdmin(admin.ModelAdmin):
+class YouTubeDemographicsAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing YouTube demographics data to edit."""
 
     list_display = [
@@ -61,7 +61,7 @@ class YouTubeDemographicsAdmin(admin.ModelAdmin):
     date_hierarchy = "date"
 
 
-class YouTubeTrafficSourceAdmin(admin.ModelAdmin):
+class YouTubeTrafficSourceAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing YouTube traffic source data to edit."""
 
     list_display = [
@@ -96,7 +96,7 @@ class YouTubeVideoAdmin(admin.ModelAdmin):
     date_hierarchy = "published_at"
 
 
-class YouTubeVideoAnalyticsAdmin(admin.ModelAdmin):
+class YouTubeVideoAnalyticsAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing YouTube video analytics data to edit."""
 
     list_display = [
@@ -176,6 +176,11 @@ class YouTubeVideoAnalyticsExtraAdmin(UploadFileMixin, admin.ModelAdmin):
             request (HttpRequest): The request generated by the upload form
             file (UploadedFile): The uploaded file
         """
+        # Only load pandas when a file is uploaded, not with the admin
+        import pandas as pd
+
+        from ..scrapers.common import frames
+
         logger.info("Uploaded file: {}", file.name)
 
         try:
@@ -320,26 +325,29 @@ class YouTubeVideoAnalyticsExtraAdmin(UploadFileMixin, admin.ModelAdmin):
             external_id__in=df[names["column_content"]].unique().tolist()
         )
 
-        new_models = []
         youtube_videos = {video.external_id: video for video in youtube_videos}
+        known = df[names["column_content"]].isin(youtube_videos.keys())
 
-        for index, row in df.iterrows():
-            if row[names["column_content"]] not in youtube_videos:
-                logger.warning(
-                    "Could not find YouTube video with external_id {}",
-                    row[names["column_content"]],
-                )
-                continue
-
-            new_models.append(
-                YouTubeVideoAnalyticsExtra(
-                    youtube_video=youtube_videos[row[names["column_content"]]],
-                    date=start_date,
-                    impressions=row[names["column_impressions"]],
-                    clicks=row["Clicks"],
-                )
+        for external_id in df[names["column_content"]][~known]:
+            logger.warning(
+                "Could not find YouTube video with external_id {}", external_id
             )
 
+        new_models = list(
+            frames.to_models(
+                YouTubeVideoAnalyticsExtra,
+                df[known],
+                {
+                    "youtube_video": lambda df: df[names["column_content"]].map(
+                        youtube_videos
+                    ),
+                    "impressions": names["column_impressions"],
+                    "clicks": "Clicks",
+                },
+                date=start_date,
+            )
+        )
+
         result = bulk_sync(
             new_models=new_models,
             filters=Q(date=start_date),
@@ -352,7 +360,7 @@ class YouTubeVideoAnalyticsExtraAdmin(UploadFileMixin, admin.ModelAdmin):
         self.message_user(request, f'Datei "{filename}" erfolgreich eingelesen!')
 
 
-class YouTubeVideoDemographicsAdmin(admin.ModelAdmin):
+class YouTubeVideoDemographicsAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing YouTube video demographics data to edit."""
 
     list_display = [
@@ -367,7 +375,7 @@ class YouTubeVideoDemographicsAdmin(admin.ModelAdmin):
     search_fields = ["youtube_video__title", "youtube_video__external_id"]
 
 
-class YouTubeVideoTrafficSourceAdmin(admin.ModelAdmin):
+class YouTubeVideoTrafficSourceAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing YouTube video traffic source data to edit."""
 
     list_display = [
@@ -382,7 +390,7 @@ class YouTubeVideoTrafficSourceAdmin(admin.ModelAdmin):
     list_filter = ["source_type", "youtube_video__youtube"]
 
 
-class YouTubeVideoSearchTermAdmin(admin.ModelAdmin):
+class YouTubeVideoSearchTermAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing YouTube video search term data to edit."""
 
     list_display = [
@@ -397,7 +405,7 @@ class YouTubeVideoSearchTermAdmin(admin.ModelAdmin):
     list_filter = ["youtube_video__youtube"]
 
 
-class YouTubeVideoExternalTrafficAdmin(admin.ModelAdmin):
+class YouTubeVideoExternalTrafficAdmin(LargeTableMixin, admin.ModelAdmin):
     """List for choosing existing YouTube video search term data to edit."""
 
     list_display = [
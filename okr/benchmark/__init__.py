@@ -0,0 +1,253 @@
+"""Replay the scheduled scraper jobs offline and measure their cost.
+
+The jobs registered in :meth:`~okr.scrapers.scheduler.add_jobs` are run one by one
+against a throwaway test database, with all external APIs replaced by the
+stand-ins from :mod:`okr.benchmark.fixtures`. For each job, the wall time, the
+number and duration of database queries, the rows written per model and the peak
+resident memory are recorded, so changes to the scrapers can be compared at
+different data sizes before they reach production.
+"""
+
+import datetime as dt
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from django.db import connection
+from django.test.utils import setup_databases, teardown_databases
+from loguru import logger
+
+from ..scrapers.common import rollups
+from ..scrapers.common.instrumentation import JobRecorder, job_name
+from . import fixtures
+
+
+@dataclass
+class JobResult:
+    """Measurements for a single run of a job."""
+
+    job: str
+    size: int
+    accounts: int
+    run: int
+    wall_time: float = 0.0
+    queries: int = 0
+    query_time: float = 0.0
+    rows_written: Dict[str, int] = field(default_factory=dict)
+    peak_rss: int = 0
+    skipped_sleep: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def total_rows_written(self) -> int:
+        return sum(self.rows_written.values())
+
+    def as_dict(self) -> Dict:
+        return {**asdict(self), "total_rows_written": self.total_rows_written}
+
+
+class _PeakMemory:
+    """Sample the resident set size of this process in a background thread."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 0
+
+    def _rss(self) -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self._page_size
+        except (OSError, ValueError, IndexError):
+            # Not a Linux system, fall back to the peak of the whole process
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self._rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._rss())
+
+
+class _JobRecorder:
+    """Stand-in for the scheduler that only records the jobs that are added."""
+
+    def __init__(self):
+        self.jobs: List[Callable] = []
+
+    def add_listener(self, *args, **kwargs):
+        pass
+
+    def add_job(self, func: Callable, *args, **kwargs):
+        if func not in self.jobs:
+            self.jobs.append(func)
+
+    def get_jobs(self) -> list:
+        return []
+
+
+def scheduled_jobs() -> List[Callable]:
+    """Collect the jobs from :meth:`~okr.scrapers.scheduler.add_jobs`.
+
+    Jobs that are scheduled multiple times are only returned once, in the order of
+    their first occurrence.
+
+    Returns:
+        List[Callable]: Functions run by the scheduler.
+    """
+    from unittest import mock
+
+    from ..scrapers import scheduler
+
+    recorder = _JobRecorder()
+    with mock.patch.object(scheduler, "scheduler", recorder):
+        scheduler.add_jobs()
+
+    return recorder.jobs
+
+
+@contextmanager
+def _test_database() -> Iterator[None]:
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+def run_job(
+    func: Callable, stand_ins: fixtures.StandIns, *, size: int, accounts: int, run: int
+) -> JobResult:
+    """Run a single job and measure it.
+
+    Exceptions raised by the job are recorded in the result instead of being raised.
+
+    Args:
+        func (Callable): Job to run.
+        stand_ins (fixtures.StandIns): Installed API stand-ins.
+        size (int): Data size the stand-ins were created with.
+        accounts (int): Number of accounts per product.
+        run (int): Number of the run, starting at 1.
+
+    Returns:
+        JobResult: Measurements of the run.
+    """
+    result = JobResult(job=job_name(func), size=size, accounts=accounts, run=run)
+    recorder = JobRecorder()
+    slept_before = stand_ins.slept
+    captured_before = len(stand_ins.captured)
+
+    # Refresh rollups once at the end, like instrument() does for scheduled jobs
+    with _PeakMemory() as memory, recorder.record(), rollups.collect():
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            logger.exception("Benchmark of {} failed", result.job)
+            result.error = f"{type(e).__name__}: {e}"
+        result.wall_time = time.perf_counter() - start
+
+    result.queries = recorder.queries.queries
+    result.query_time = recorder.queries.time
+    result.rows_written = dict(recorder.queries.rows_written)
+    result.peak_rss = memory.peak
+    result.skipped_sleep = stand_ins.slept - slept_before
+
+    # Most scrapers only report errors to Sentry and carry on with the next account
+    captured = stand_ins.captured[captured_before:]
+    if captured and result.error is None:
+        result.error = f"{len(captured)} captured, first: {captured[0]!r}"
+
+    return result
+
+
+def run_benchmark(
+    sizes: Sequence[int],
+    *,
+    accounts: int = 2,
+    repeat: int = 1,
+    job_filter: Optional[str] = None,
+) -> List[JobResult]:
+    """Run all scheduled jobs for each data size on a fresh test database.
+
+    The first run of a job starts with the tables it writes to empty, later runs
+    (see ``repeat``) update the rows written before.
+
+    Args:
+        sizes (Sequence[int]): Items per account and source to generate.
+        accounts (int, optional): Accounts per product. Defaults to 2.
+        repeat (int, optional): Runs per job and size. Defaults to 1.
+        job_filter (Optional[str], optional): Only run jobs whose name contains
+          this string. Defaults to None.
+
+    Returns:
+        List[JobResult]: Measurements of each run.
+    """
+    jobs = [
+        func
+        for func in scheduled_jobs()
+        if job_filter is None or job_filter in job_name(func)
+    ]
+    results = []
+
+    for size in sizes:
+        logger.info("Running benchmark with size {} for {} jobs", size, len(jobs))
+
+        with _test_database():
+            fixtures.seed(accounts)
+
+            stand_ins = fixtures.StandIns(size, accounts)
+            with stand_ins.install():
+                for run in range(1, repeat + 1):
+                    for func in jobs:
+                        logger.debug("{}: {} run {}", size, job_name(func), run)
+                        results.append(
+                            run_job(
+                                func, stand_ins, size=size, accounts=accounts, run=run
+                            )
+                        )
+
+    return results
+
+
+def summary_rows(results: Sequence[JobResult]) -> List[Dict]:
+    """Format results for display as a table."""
+    return [
+        {
+            "job": result.job,
+            "size": result.size,
+            "run": result.run,
+            "time (s)": round(result.wall_time, 3),
+            "queries": result.queries,
+            "query time (s)": round(result.query_time, 3),
+            "rows written": result.total_rows_written,
+            "peak RSS (MB)": round(result.peak_rss / 1024**2, 1),
+            "skipped sleep (s)": round(result.skipped_sleep, 1),
+            "error": result.error or "",
+        }
+        for result in results
+    ]
+
+
+def report(results: Sequence[JobResult]) -> Dict:
+    """Serializable report of the results, including the environment."""
+    return {
+        "created": dt.datetime.now().isoformat(),
+        "database": connection.vendor,
+        "results": [result.as_dict() for result in results],
+    }
@@ -0,0 +1,766 @@
+"""Local stand-ins for the external APIs used by the scrapers.
+
+Every stand-in answers with deterministic data in the shape of the recorded API
+responses, scaled by ``size`` (items per account, e.g. posts, videos, pages or
+episodes). They are installed by patching the API clients at the same points the
+scrapers use to reach them, so the scraper code under test runs unchanged.
+"""
+
+import datetime as dt
+import importlib
+import json
+import random
+import sys
+from contextlib import ExitStack, contextmanager
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional, Set
+
+import pandas as pd
+from django.core.cache.backends.locmem import LocMemCache
+
+from ..models import (
+    Facebook,
+    Insta,
+    Podcast,
+    Property,
+    SnapchatShow,
+    SophoraNode,
+    TikTok,
+    Twitter,
+    YouTube,
+)
+from ..models.youtube import (
+    YouTubeTrafficSource,
+    YouTubeVideo,
+    YouTubeVideoTrafficSource,
+)
+
+QUINTLY_MODELS = [Facebook, Insta, SnapchatShow, TikTok, Twitter, YouTube]
+
+NACHRICHTEN_URL = "https://www1.wdr.de/nachrichten/"
+
+# Quintly fields that are formatted as date and time strings
+_QUINTLY_DATETIME_FIELDS = {
+    "time",
+    "importTime",
+    "intervalStartTime",
+    "createTime",
+    "startTime",
+    "firstLiveTime",
+    "spotlightEndTime",
+    "publishTime",
+}
+
+# Quintly fields that contain durations in seconds
+_QUINTLY_DURATION_FIELDS = {
+    "duration",
+    "videoLength",
+    "spotlightDuration",
+    "viewTime",
+    "averageViewTimePerUser",
+    "topsnapViewTime",
+    "topsnapAverageViewTimePerUser",
+    "totalTimeViewed",
+    "averageTimeSpentPerUser",
+}
+
+_QUINTLY_TEXT_FIELDS = {
+    "caption",
+    "description",
+    "message",
+    "musicId",
+    "musicTitle",
+    "name",
+    "subscribeOptionsHeadline",
+    "title",
+    "username",
+    "videoCoverUrl",
+    "videoTitle",
+}
+
+# Tables that reference items of other tables, mapped to the referenced table
+_QUINTLY_REFERENCES = {
+    "externalPostId": "instagramInsightsOwnPosts",
+    "storyId": "snapchatShowInsightsStories",
+}
+
+
+def podcast_name(index: int) -> str:
+    return f"Benchmark Podcast {index}"
+
+
+def podcast_feed_url(index: int) -> str:
+    return f"https://benchmark.invalid/podcasts/{index}/feed.xml"
+
+
+def podcast_spotify_id(index: int) -> str:
+    return f"benchmarkshow{index}"
+
+
+def episode_zmdb_id(podcast_index: int, episode_index: int) -> int:
+    return podcast_index * 100000 + episode_index
+
+
+def page_url(index: int) -> str:
+    return f"{NACHRICHTEN_URL}benchmark-{index}-100.html"
+
+
+def seed(accounts: int):
+    """Create ``accounts`` objects for each product the scheduled jobs iterate over.
+
+    ``bulk_create`` is used on purpose, so the ``post_save`` receivers in
+    :mod:`okr.scrapers.scheduler` don't enqueue full scrapes.
+
+    Args:
+        accounts (int): Number of accounts per product.
+    """
+    for offset, model in enumerate(QUINTLY_MODELS):
+        extra = {"bigquery_suffix": "benchmark"} if model is YouTube else {}
+        model.objects_all.bulk_create(
+            model(
+                name=f"Benchmark {model.__name__} {i}",
+                quintly_profile_id=(offset + 1) * 1000 + i,
+                **extra,
+            )
+            for i in range(accounts)
+        )
+
+    Podcast.objects_all.bulk_create(
+        Podcast(
+            name=podcast_name(i),
+            feed_url=podcast_feed_url(i),
+            author="Benchmark",
+            image="https://benchmark.invalid/image.jpg",
+            description="Benchmark",
+            spotify_id=podcast_spotify_id(i),
+            itunes_url=f"https://benchmark.invalid/itunes/{i}",
+        )
+        for i in range(accounts)
+    )
+
+    Property.objects_all.bulk_create(
+        [Property(name="Benchmark Nachrichten", url=NACHRICHTEN_URL)]
+        + [
+            Property(
+                name=f"Benchmark Property {i}", url=f"https://{i}.benchmark.invalid/"
+            )
+            for i in range(1, accounts)
+        ]
+    )
+
+    SophoraNode.objects.bulk_create(
+        SophoraNode(node=f"/wdr/benchmark/node{i}", use_exact_search=bool(i % 2))
+        for i in range(accounts)
+    )
+
+
+class _LocalLock:
+    """In-process replacement for a Redis lock, without expiry or waiting."""
+
+    def __init__(self, held: Set[str], name: str):
+        self.held = held
+        self.name = name
+
+    def acquire(self, **kwargs) -> bool:
+        if self.name in self.held:
+            return False
+        self.held.add(self.name)
+        return True
+
+    def reacquire(self) -> bool:
+        return True
+
+    def release(self):
+        self.held.discard(self.name)
+
+
+class StandIns:
+    """Deterministic stand-ins for all external APIs, scaled by ``size``.
+
+    Args:
+        size (int): Number of items per account and source.
+        accounts (int): Number of accounts per product, as created by :func:`seed`.
+        seed (int): Seed for the random values. Defaults to 0.
+    """
+
+    def __init__(self, size: int, accounts: int, seed: int = 0):
+        self.size = size
+        self.accounts = accounts
+        self.random = random.Random(seed)
+        self.slept = 0.0
+        self.captured: List[BaseException] = []
+        self._locks: Set[str] = set()
+
+    def _int(self, upper: int = 10000) -> int:
+        return self.random.randint(0, upper)
+
+    # Quintly
+
+    def quintly_run_query(
+        self,
+        profiles: List[int],
+        table: str,
+        fields: List[str],
+        start_date: dt.date,
+        end_date: dt.date,
+        interval: str = "daily",
+        **kwargs,
+    ) -> pd.DataFrame:
+        rows = []
+
+        for profile_id in profiles:
+            if "externalId" in fields or "id" in fields:
+                # Item tables, e.g. posts or stories
+                days = (end_date - start_date).days + 1
+                for i in range(self.size):
+                    day = start_date + dt.timedelta(days=i % days)
+                    rows.append(self._quintly_row(profile_id, table, fields, day, i))
+            else:
+                # Time series tables
+                day = start_date
+                while day <= end_date:
+                    rows.append(self._quintly_row(profile_id, table, fields, day, 0))
+                    day += dt.timedelta(days=1)
+
+        return pd.DataFrame(rows)
+
+    def _quintly_row(
+        self, profile_id: int, table: str, fields: List[str], day: dt.date, i: int
+    ) -> Dict:
+        row = {}
+
+        for field in fields:
+            row[field] = self._quintly_value(profile_id, table, field, day, i)
+
+        return row
+
+    def _quintly_value(  # noqa: C901
+        self, profile_id: int, table: str, field: str, day: dt.date, i: int
+    ):
+        if field == "profileId":
+            return profile_id
+        elif field in ("externalId", "id"):
+            return f"{table}-{profile_id}-{i}"
+        elif field in _QUINTLY_REFERENCES:
+            return f"{_QUINTLY_REFERENCES[field]}-{profile_id}-{i}"
+        elif field in _QUINTLY_DATETIME_FIELDS:
+            return f"{day.isoformat()} {i % 24:02d}:{i % 60:02d}:00"
+        elif field in _QUINTLY_DURATION_FIELDS:
+            return self._int(3600)
+        elif field in _QUINTLY_TEXT_FIELDS:
+            return f"Benchmark {field} {i}"
+        elif field == "link":
+            return f"https://benchmark.invalid/{table}/{profile_id}/{i}"
+        elif field == "type":
+            return ["image", "video", "reel", "carousel"][i % 4]
+        elif field == "state":
+            return "Available"
+        elif field == "liveBroadcastContent":
+            return "none"
+        elif field in ("liveActualStartTime", "parentCommentId"):
+            return None
+        elif field in ("isRetweet", "is_published", "is_hidden"):
+            return "1" if i % 2 else "0"
+        elif field in ("isAccountAnswer", "isReply", "isHidden"):
+            return i % 2
+        elif field in ("completionRate", "dropOffRate", "attachmentConversion"):
+            return self.random.uniform(0, 100)
+        elif field == "hashtags":
+            return json.dumps([f"hashtag{j}" for j in range(i % 5)])
+        elif field == "postTags":
+            return json.dumps([{"name": f"tag{j}"} for j in range(i % 3)])
+        elif field == "audienceGenderAndAge":
+            return json.dumps(
+                [
+                    {"id": f"{gender}-{age_range}", "followers": self._int()}
+                    for gender in ("F", "M", "U")
+                    for age_range in ("13-17", "18-24", "25-34", "35-44", "45-54")
+                ]
+            )
+        elif field == "onlineFollowers":
+            return json.dumps(
+                [{"id": hour, "followers": self._int()} for hour in range(24)]
+            )
+        elif field == "viewsPercentageByAgeAndGender":
+            return json.dumps(
+                [
+                    {
+                        "gender": gender,
+                        "ageGroupName": f"{age_range} years",
+                        "value": self.random.uniform(0, 10),
+                    }
+                    for gender in ("female", "male", "genderUserSpecified")
+                    for age_range in ("13-17", "18-24", "25-34", "35-44")
+                ]
+            )
+        elif field in (
+            "viewsByTrafficSource",
+            "estimatedMinutesWatchedByTrafficSource",
+        ):
+            return json.dumps(
+                [
+                    {"trafficSource": name, "value": self._int()}
+                    for name in YouTubeTrafficSource.SourceType.names
+                ]
+            )
+        else:
+            return self._int()
+
+    # Google Search Console
+
+    def gsc_query(self, siteUrl: str, body: Dict) -> Dict:
+        dimensions = body["dimensions"]
+        start_date = dt.date.fromisoformat(body["startDate"])
+        end_date = dt.date.fromisoformat(body["endDate"])
+        days = (end_date - start_date).days + 1
+
+        if dimensions == ["date", "device"]:
+            count = days * 3
+        elif dimensions == ["page", "query"]:
+            count = self.size * 3
+        else:
+            count = self.size
+
+        start_row = body.get("startRow", 0)
+        end_row = min(count, start_row + body["rowLimit"])
+
+        rows = []
+
+        for i in range(start_row, end_row):
+            keys = []
+            for dimension in dimensions:
+                if dimension == "date":
+                    keys.append((start_date + dt.timedelta(days=i // 3)).isoformat())
+                elif dimension == "device":
+                    keys.append(["MOBILE", "DESKTOP", "TABLET"][i % 3])
+                elif dimension == "page":
+                    keys.append(page_url(i % self.size))
+                elif dimension == "query":
+                    keys.append(f"benchmark query {i}")
+
+            rows.append(
+                {
+                    "keys": keys,
+                    "clicks": self._int(),
+                    "impressions": self._int(),
+                    "ctr": self.random.random(),
+                    "position": self.random.uniform(1, 50),
+                }
+            )
+
+        return {"rows": rows} if rows else {}
+
+    def searchconsole_service(self):
+        def query(siteUrl, body):
+            return SimpleNamespace(execute=lambda: self.gsc_query(siteUrl, body))
+
+        return SimpleNamespace(
+            searchanalytics=lambda: SimpleNamespace(query=query),
+        )
+
+    # BigQuery
+
+    def bigquery_client(self):
+        def query(query, job_config=None):
+            return SimpleNamespace(result=lambda: None, destination=query)
+
+        def list_rows(table, page_size=None):
+            return SimpleNamespace(
+                to_dataframe_iterable=lambda: iter([self.bigquery_dataframe(table)])
+            )
+
+        return SimpleNamespace(
+            query=query,
+            get_table=lambda destination: destination,
+            list_rows=list_rows,
+        )
+
+    def bigquery_dataframe(self, query: str) -> pd.DataFrame:
+        """Build a result for a BigQuery query, based on its selected columns."""
+        select = query.split("\nFROM", 1)[0]
+        columns = [
+            line.strip().rstrip(",").split("`")[-2]
+            for line in select.splitlines()[1:]
+            if "`" in line
+        ]
+
+        # Analytics are only stored for videos that were scraped from Quintly before
+        video_ids = YouTubeVideo.objects.values_list("external_id", flat=True)[
+            : self.size
+        ]
+        rows = []
+
+        for video_id in video_ids:
+            for i in range(3):
+                row = {}
+                for column in columns:
+                    row[column] = self._bigquery_value(column, video_id, i)
+                rows.append(row)
+
+        return pd.DataFrame(rows, columns=columns)
+
+    def _bigquery_value(self, column: str, video_id: str, i: int):
+        if column == "date":
+            return (dt.date.today() - dt.timedelta(days=i + 1)).isoformat()
+        elif column == "video_id":
+            return video_id
+        elif column == "live_or_on_demand":
+            return "on_demand"
+        elif column == "traffic_source_type":
+            names = YouTubeVideoTrafficSource.SourceType.names
+            return int(names[i % len(names)].rsplit("_", 1)[-1])
+        elif column == "traffic_source_detail":
+            return f"benchmark detail {i}"
+        elif column == "age_group":
+            return ["AGE_18_24", "AGE_25_34", "AGE_65_"][i]
+        elif column == "gender":
+            return ["FEMALE", "MALE", "USER_SPECIFIED"][i]
+        elif column == "views_percentage":
+            return self.random.uniform(0, 100)
+        else:
+            return self._int()
+
+    # Webtrekk
+
+    def webtrekk_page_data(self, date: dt.date) -> Dict:
+        data = {}
+
+        for i in range(self.size):
+            for query in (None, f"benchmark query {i}"):
+                data[(page_url(i), f"Benchmark headline {i}", query)] = {
+                    "visits": self._int(),
+                    "entries": self._int(),
+                    "visits_campaign": self._int(),
+                    "bounces": self._int(),
+                    "length_of_stay": self._int(),
+                    "impressions": self._int(),
+                    "exits": self._int(),
+                    "visits_search": self._int(),
+                    "entries_search": self._int(),
+                    "visits_campaign_search": self._int(),
+                    "bounces_search": self._int(),
+                    "length_of_stay_search": self._int(),
+                    "impressions_search": self._int(),
+                    "exits_search": self._int(),
+                }
+
+        return data
+
+    def webtrekk_picker_data(self, date: dt.date) -> Dict:
+        from ..scrapers.podcasts.webtrekk import normalize_name
+
+        return {
+            normalize_name(podcast_name(i)): {
+                "visits": self._int(),
+                "visits_campaign": self._int(),
+                "exits": self._int(),
+            }
+            for i in range(self.accounts)
+        }
+
+    def webtrekk_audio_data(self, date: dt.date) -> Dict:
+        return {
+            episode_zmdb_id(i, j): {
+                "media_views": self._int(),
+                "media_views_complete": self._int(),
+                "playing_time": dt.timedelta(seconds=self._int()),
+            }
+            for i in range(self.accounts)
+            for j in range(self.size)
+        }
+
+    # Sophora
+
+    def sophora_documents_in_node(
+        self, node: SophoraNode, *, force_exact: bool = False, **kwargs
+    ) -> Iterator[Dict]:
+        now = dt.datetime.now().timestamp()
+        node_name = node.node.rsplit("/", 1)[-1]
+        suffix = "exact" if force_exact else "sub"
+
+        for i in range(self.size):
+            yield {
+                "teaser": {
+                    "redaktionellerStand": now,
+                    "schlagzeile": f"Benchmark headline {i}",
+                    "teaserText": ["Benchmark teaser"],
+                    "tags": [f"tag{i % 10}", "benchmark"],
+                    "shareLink": f"{NACHRICHTEN_URL}{node_name}-{suffix}-{i}-100.html",
+                    "uuid": f"{node_name}-{suffix}-{i}",
+                    "mediaType": "beitrag",
+                },
+                "detail": {
+                    "messageBody": [
+                        {
+                            "paragraphType": "copytext",
+                            "paragraphValue": "Benchmark " * 50,
+                        }
+                    ]
+                },
+            }
+
+    def sophora_document(self, sophora_id: str) -> Dict:
+        return {"teaser": {"uuid": sophora_id}}
+
+    # Podcasts
+
+    def _episode_publication(self, j: int) -> dt.datetime:
+        return dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=j % 30, hours=1)
+
+    def feed_xml(self, url: str) -> bytes:
+        index = int(url.split("/")[-2])
+        items = []
+
+        for j in range(self.size):
+            published = self._episode_publication(j).strftime(
+                "%a, %d %b %Y %H:%M:%S +0000"
+            )
+            items.append(f"""
+    <item>
+      <title>Episode {j}</title>
+      <description>Benchmark episode {j}</description>
+      <pubDate>{published}</pubDate>
+      <enclosure url="https://benchmark.invalid/{episode_zmdb_id(index, j)}/file.mp3"
+        type="audio/mpeg" length="1" />
+      <itunes:duration>00:30:00</itunes:duration>
+    </item>""")
+
+        return f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd">
+  <channel>
+    <title>{podcast_name(index)}</title>
+    <description>Benchmark</description>
+    <itunes:author>Benchmark</itunes:author>
+    <itunes:image href="https://benchmark.invalid/image.jpg" />
+    <itunes:category text="News">
+      <itunes:category text="Daily News" />
+    </itunes:category>
+    {"".join(items)}
+  </channel>
+</rss>""".encode()
+
+    def feed_session(self, name: str, **kwargs):
+        def get(url, *args, **kwargs):
+            return SimpleNamespace(
+                content=self.feed_xml(url),
+                raise_for_status=lambda: None,
+            )
+
+        return SimpleNamespace(get=get)
+
+    def itunes_reviews(self, podcast: Podcast):
+        ratings = {
+            "ratings_average": self.random.uniform(1, 5),
+            "ratings_count": self._int(),
+            **{f"ratings_{stars}_stars": 0.2 for stars in range(1, 6)},
+        }
+        reviews = {
+            f"Benchmark author {i}": {
+                "date": dt.date.today() - dt.timedelta(days=i),
+                "title": f"Benchmark review {i}",
+                "text": "Benchmark " * 20,
+                "rating": i % 5 + 1,
+            }
+            for i in range(self.size)
+        }
+        return ratings, reviews
+
+    def spotify_api(self):
+        from ..scrapers.podcasts.spotify_api import CustomSpotify
+
+        def total(*args, **kwargs):
+            return {"total": self._int()}
+
+        def episode_ids(podcast_id):
+            return [f"{podcast_id}ep{j}" for j in range(self.size)]
+
+        return SimpleNamespace(
+            Precision=CustomSpotify.Precision,
+            licensed_podcasts=lambda: {
+                "shows": {
+                    f"spotify:show:{podcast_spotify_id(i)}": {}
+                    for i in range(self.accounts)
+                }
+            },
+            shows=lambda ids, market=None: {
+                "shows": [
+                    {"id": id_, "name": podcast_name(int(id_[len("benchmarkshow") :]))}
+                    for id_ in ids
+                ]
+            },
+            podcast_episodes=lambda podcast_id: {
+                "episodes": {
+                    f"spotify:episode:{id_}": {} for id_ in episode_ids(podcast_id)
+                }
+            },
+            podcast_episode_meta=lambda podcast_id, episode_id: {
+                "name": f"Episode {episode_id.rsplit('ep', 1)[-1]}"
+            },
+            episodes=lambda ids, market=None: {
+                "episodes": [
+                    {"name": f"Episode {id_.rsplit('ep', 1)[-1]}"} for id_ in ids
+                ]
+            },
+            podcast_data=total,
+            podcast_data_date_range=total,
+            podcast_episode_data=total,
+            podcast_episode_data_all_time=total,
+        )
+
+    def _spotify_aggregate(self) -> Dict:
+        return {
+            "ageFacetedCounts": {
+                age_range: {
+                    "counts": {
+                        gender: self._int()
+                        for gender in ("FEMALE", "MALE", "NON_BINARY", "NOT_SPECIFIED")
+                    }
+                }
+                for age_range in ("0-17", "18-22", "23-27", "28-34", "35-44")
+            }
+        }
+
+    def experimental_spotify_podcast_api(self):
+        def podcast_followers(podcast_id, start, end):
+            counts = []
+            day = start
+            while day <= end:
+                counts.append({"date": day.isoformat(), "count": self._int()})
+                day += dt.timedelta(days=1)
+            return {"counts": counts}
+
+        return SimpleNamespace(
+            podcast_followers=podcast_followers,
+            podcast_aggregate=lambda *args, **kwargs: self._spotify_aggregate(),
+            episode_aggregate=lambda *args, **kwargs: self._spotify_aggregate(),
+            episode_performance=lambda episode_id: {
+                "medianCompletion": {"seconds": self._int(1800)},
+                "percentiles": {
+                    "25": self._int(100),
+                    "50": self._int(100),
+                    "75": self._int(100),
+                    "100": self._int(100),
+                },
+            },
+        )
+
+    # Redis
+
+    def redis(self):
+        return SimpleNamespace(
+            lock=lambda name, **kwargs: _LocalLock(self._locks, name),
+            # The stand-ins have no quota, so rate limits never have to wait
+            register_script=lambda script: lambda keys, args: 0,
+        )
+
+    def queue(self):
+        # Jobs for the worker aren't part of the measured job, so they aren't run
+        return SimpleNamespace(enqueue=lambda func, **kwargs: None)
+
+    def cache(self):
+        # Each test database gets an empty cache
+        return LocMemCache(
+            f"benchmark-{id(self)}", {"OPTIONS": {"MAX_ENTRIES": 1_000_000}}
+        )
+
+    # Installation
+
+    def sleep(self, seconds: float):
+        """Record politeness delays instead of waiting for them."""
+        self.slept += seconds
+
+    def capture_exception(self, error: Optional[BaseException] = None, **kwargs):
+        """Record exceptions the scrapers would otherwise only report to Sentry."""
+        self.captured.append(error or sys.exc_info()[1])
+
+    @contextmanager
+    def install(self):
+        """Patch all external API clients with the stand-ins while active."""
+        from unittest import mock
+
+        def module(name):
+            return sys.modules.get(name) or importlib.import_module(name)
+
+        def constant(value):
+            return lambda: value
+
+        patches = [
+            ("okr.scrapers.common.quintly", "quintly", self._quintly()),
+            # Every run should request the stand-ins instead of reading the cache
+            ("okr.scrapers.common.quintly", "cache_ttl", constant(dt.timedelta(0))),
+            ("okr.scrapers.common.locks", "conn", self.redis()),
+            ("okr.scrapers.common.ratelimit", "conn", self.redis()),
+            # Scripts registered with the stand-in, not with Redis
+            ("okr.scrapers.common.ratelimit", "_scripts", {}),
+            ("okr.scrapers.scheduler", "q", self.queue()),
+            ("okr.admin.caching", "cache", self.cache()),
+            ("okr.scrapers.pages.urls", "cache", self.cache()),
+            ("okr.scrapers.pages.enrichment", "cache", self.cache()),
+            (
+                "okr.scrapers.pages.gsc",
+                "get_searchconsole_service",
+                constant(self.searchconsole_service()),
+            ),
+            (
+                "okr.scrapers.youtube.google",
+                "get_bigquery_client",
+                constant(self.bigquery_client()),
+            ),
+            (
+                "okr.scrapers.pages.webtrekk",
+                "cleaned_webtrekk_page_data",
+                self.webtrekk_page_data,
+            ),
+            (
+                "okr.scrapers.pages.sophora",
+                "get_documents_in_node",
+                self.sophora_documents_in_node,
+            ),
+            (
+                "okr.scrapers.pages.sophora",
+                "get_document_by_sophora_id",
+                self.sophora_document,
+            ),
+            ("okr.scrapers.podcasts", "spotify_api", self.spotify_api()),
+            (
+                "okr.scrapers.podcasts",
+                "experimental_spotify_podcast_api",
+                self.experimental_spotify_podcast_api(),
+            ),
+            ("okr.scrapers.podcasts.feed", "get_session", self.feed_session),
+            ("okr.scrapers.podcasts.itunes", "get_reviews", self.itunes_reviews),
+            (
+                "okr.scrapers.podcasts.webtrekk",
+                "cleaned_picker_data",
+                self.webtrekk_picker_data,
+            ),
+            (
+                "okr.scrapers.podcasts.webtrekk",
+                "cleaned_audio_data",
+                self.webtrekk_audio_data,
+            ),
+        ]
+
+        with ExitStack() as stack:
+            for module_name, attribute, stand_in in patches:
+                stack.enter_context(
+                    mock.patch.object(module(module_name), attribute, stand_in)
+                )
+
+            # Don't wait for rate limit delays and don't report to Sentry, but keep
+            # track of both
+            for name, scraper_module in list(sys.modules.items()):
+                if not name.startswith("okr.scrapers"):
+                    continue
+                for attribute in ("sleep", "capture_exception"):
+                    if hasattr(scraper_module, attribute):
+                        stack.enter_context(
+                            mock.patch.object(
+                                scraper_module, attribute, getattr(self, attribute)
+                            )
+                        )
+
+            yield self
+
+    def _quintly(self):
+        return SimpleNamespace(run_query=self.quintly_run_query)
@@ -0,0 +1,133 @@
+"""Measure how long the processes of the app take to start.
+
+The web dyno, the release phase (``manage.py migrate``) and other management commands
+only need Django, the models and the admin. The scrapers and the libraries they use
+(pandas, BigQuery, the Google API client, Spotipy, ...) are only needed by the worker,
+so they must not be imported on startup, see :meth:`~okr.apps.OkrConfig.ready`.
+
+Each role is started in a fresh Python process, as modules that are already imported
+don't cost anything. Besides the startup time, the heavy modules that were imported
+are reported, so an import that pulls in a scraper is noticed right away.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Sequence
+
+from django.conf import settings
+
+# Modules only the scrapers need, none of them may be imported on startup
+HEAVY_MODULES = (
+    "apscheduler.schedulers",
+    "bs4",
+    "feedparser",
+    "google.cloud.bigquery",
+    "googleapiclient",
+    "numpy",
+    "pandas",
+    "pyarrow",
+    "spotipy",
+    "sqlalchemy",
+)
+
+# Code run after ``django.setup()`` to start each role
+ROLES: Dict[str, str] = {
+    # Management commands like ``migrate`` in the release phase
+    "manage": "",
+    # gunicorn loads the WSGI application, the first request loads the URLs and views
+    "web": (
+        "from app.wsgi import application\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns\n"
+    ),
+}
+
+_SCRIPT = """
+import json, sys, time
+
+start = time.perf_counter()
+import django
+
+django.setup()
+{code}
+print(json.dumps({{"seconds": time.perf_counter() - start, "modules": list(sys.modules)}}))
+"""
+
+
+@dataclass
+class ImportResult:
+    """Measurements for starting a single role."""
+
+    role: str
+    seconds: float
+    modules: int
+    heavy_modules: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _is_imported(name: str, modules: Sequence[str]) -> bool:
+    return any(module == name or module.startswith(f"{name}.") for module in modules)
+
+
+def measure_startup(role: str) -> ImportResult:
+    """Start a role in a new Python process and measure it.
+
+    Args:
+        role (str): Name of the role in :data:`ROLES`.
+
+    Raises:
+        subprocess.CalledProcessError: If the process fails.
+
+    Returns:
+        ImportResult: Startup time and imported modules.
+    """
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": os.environ.get(
+            "DJANGO_SETTINGS_MODULE", "app.settings"
+        ),
+    }
+    process = subprocess.run(
+        [sys.executable, "-c", _SCRIPT.format(code=ROLES[role])],
+        cwd=settings.BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # Logs may be written to stdout as well, the result is on the last line
+    data = json.loads(process.stdout.strip().splitlines()[-1])
+
+    return ImportResult(
+        role=role,
+        seconds=data["seconds"],
+        modules=len(data["modules"]),
+        heavy_modules=[
+            name for name in HEAVY_MODULES if _is_imported(name, data["modules"])
+        ],
+    )
+
+
+def run_import_benchmark(roles: Sequence[str], repeat: int = 3) -> List[ImportResult]:
+    """Measure the startup of each role, keeping the fastest of ``repeat`` runs.
+
+    Args:
+        roles (Sequence[str]): Names of the roles in :data:`ROLES`.
+        repeat (int, optional): Runs per role. Defaults to 3.
+
+    Returns:
+        List[ImportResult]: The fastest run of each role.
+    """
+    return [
+        min(
+            (measure_startup(role) for _ in range(max(repeat, 1))),
+            key=lambda result: result.seconds,
+        )
+        for role in roles
+    ]
@@ -0,0 +1,180 @@
+"""Measure how fast the URLs of pages are parsed.
+
+The page scrapers parse the URL of every row they get from the Google Search Console,
+Webtrekk and the Sophora API, see :func:`~okr.scrapers.pages.urls.parse_sophora_url`.
+Most URLs come back many times, across dates and across the page, page × query and
+device dimensions of the GSC. The benchmark parses a generated corpus with the same
+shape: few URLs are very frequent, most are rare, and some aren't pages at all.
+
+The corpus is parsed in three modes:
+
+* ``uncached``: every URL is parsed from scratch
+* ``cold``: the memo cache is empty at the start
+* ``warm``: the memo cache already contains the URLs of the corpus
+"""
+
+import random
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List
+
+from loguru import logger
+
+# URL shapes seen in the GSC and Webtrekk data, weighted by how common they are
+_SHAPES = (
+    ("https://www1.wdr.de/{node}/{slug}-{id}.html", 60),
+    ("https://www1.wdr.de/{node}/{slug}-{id}~_page-{page}.html", 8),
+    ("https://www1.wdr.de/{node}/{slug}-{id}.amp", 12),
+    ("https://www1.wdr.de/{node}/{slug}-{id}~_layout-popup.html", 3),
+    ("https://www1.wdr.de/{node}/{slug}-{id}.html?utm_source=twitter", 5),
+    ("https://www1.wdr.de/{node}/index.html", 4),
+    ("https://www1.wdr.de/{node}/", 4),
+    ("https://www1.wdr.de/{node}/{slug}-{id}.pdf", 2),
+    ("https://www1.wdr.de/{node}/{slug}-{id}.jsp", 1),
+    ("https://www1.wdr.de/{node}/{slug}-{id}.html/:~:text=corona", 1),
+)
+
+_NODES = (
+    "nachrichten",
+    "nachrichten/landespolitik",
+    "nachrichten/rheinland",
+    "nachrichten/ruhrgebiet",
+    "nachrichten/westfalen-lippe",
+    "nachrichten/themen/coronavirus",
+    "sport/fussball",
+    "verbraucher/gesundheit",
+    "k%C3%BCche/rezepte",
+)
+
+_WORDS = (
+    "corona",
+    "wetter",
+    "unwetter",
+    "landtag",
+    "schule",
+    "bahn",
+    "stau",
+    "k%C3%B6ln",
+    "d%C3%BCsseldorf",
+    "dortmund",
+    "impfung",
+    "inzidenz",
+)
+
+
+def url_corpus(size: int, unique: int, seed: int = 0) -> List[str]:
+    """Generate URLs with a long-tailed distribution of repeats.
+
+    Args:
+        size (int): Number of URLs, including repeats.
+        unique (int): Number of distinct URLs to draw from.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        List[str]: The URLs in random order.
+    """
+    rng = random.Random(seed)
+    templates = [template for template, _ in _SHAPES]
+    weights = [weight for _, weight in _SHAPES]
+
+    distinct = [
+        rng.choices(templates, weights)[0].format(
+            node=rng.choice(_NODES),
+            slug="-".join(rng.sample(_WORDS, 3)),
+            id=100 + i,
+            page=rng.randint(2, 5),
+        )
+        for i in range(unique)
+    ]
+
+    # Pareto distributed indices, so a few URLs make up most of the corpus
+    return [
+        (
+            distinct[min(int(rng.paretovariate(1.2)) - 1, unique - 1)]
+            if rng.random() < 0.8
+            else rng.choice(distinct)
+        )
+        for _ in range(size)
+    ]
+
+
+@dataclass
+class ParseResult:
+    """Measurements for parsing the corpus once."""
+
+    mode: str
+    urls: int
+    seconds: float
+    hits: int
+    misses: int
+
+    @property
+    def microseconds_per_url(self) -> float:
+        return self.seconds / max(self.urls, 1) * 1_000_000
+
+    def as_dict(self) -> Dict:
+        return {**asdict(self), "microseconds_per_url": self.microseconds_per_url}
+
+
+def _measure(mode: str, parse: Callable, corpus: List[str]) -> ParseResult:
+    from ..scrapers.pages import urls
+
+    before = urls._parse_cached.cache_info()
+    start = time.perf_counter()
+
+    for url in corpus:
+        parse(url)
+
+    seconds = time.perf_counter() - start
+    after = urls._parse_cached.cache_info()
+
+    return ParseResult(
+        mode=mode,
+        urls=len(corpus),
+        seconds=seconds,
+        hits=after.hits - before.hits,
+        misses=after.misses - before.misses,
+    )
+
+
+def run_url_parser_benchmark(
+    size: int, unique: int, repeat: int = 3, seed: int = 0
+) -> List[ParseResult]:
+    """Parse a generated corpus without, with an empty and with a filled memo cache,
+    keeping the fastest of ``repeat`` runs of each.
+
+    Args:
+        size (int): Number of URLs, including repeats.
+        unique (int): Number of distinct URLs.
+        repeat (int, optional): Runs per mode. Defaults to 3.
+        seed (int, optional): Seed of the corpus. Defaults to 0.
+
+    Returns:
+        List[ParseResult]: The fastest run of each mode.
+    """
+    from ..scrapers.pages import urls
+
+    corpus = url_corpus(size, unique, seed)
+
+    def cold():
+        urls._parse_cached.cache_clear()
+        return _measure("cold", urls._parse_cached, corpus)
+
+    runs: Dict[str, Callable[[], ParseResult]] = {
+        "uncached": lambda: _measure("uncached", urls._parse, corpus),
+        "cold": cold,
+        "warm": lambda: _measure("warm", urls._parse_cached, corpus),
+    }
+
+    # The parser logs skipped URLs, which would measure the log sinks instead
+    logger.disable("okr.scrapers.pages.urls")
+    try:
+        return [
+            min(
+                (run() for _ in range(max(repeat, 1))),
+                key=lambda result: result.seconds,
+            )
+            for run in runs.values()
+        ]
+    finally:
+        logger.enable("okr.scrapers.pages.urls")
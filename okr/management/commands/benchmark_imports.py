@@ -0,0 +1,82 @@
+"""Measure the startup time of the web and management processes."""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from tabulate import tabulate
+
+from ...benchmark.imports import ROLES, run_import_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the web app and management commands in new processes and report their "
+        "startup time. Fails if they import scraper dependencies like pandas or "
+        "BigQuery, or take longer than --max-seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--role",
+            action="append",
+            dest="roles",
+            choices=sorted(ROLES),
+            help="Role to start, can be given multiple times (default: all).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Runs per role, the fastest one is reported (default: 3).",
+        )
+        parser.add_argument(
+            "--max-seconds",
+            type=float,
+            help="Fail if a role takes longer than this to start.",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the results as JSON to this file.",
+        )
+
+    def handle(self, *args, **options):
+        results = run_import_benchmark(
+            options["roles"] or sorted(ROLES), repeat=options["repeat"]
+        )
+
+        self.stdout.write(
+            tabulate(
+                [
+                    {
+                        "role": result.role,
+                        "time (s)": round(result.seconds, 3),
+                        "modules": result.modules,
+                        "heavy modules": ", ".join(result.heavy_modules) or "-",
+                    }
+                    for result in results
+                ],
+                headers="keys",
+            )
+        )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump([result.as_dict() for result in results], f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        errors = []
+        max_seconds = options["max_seconds"]
+
+        for result in results:
+            if result.heavy_modules:
+                errors.append(
+                    f"{result.role} imports {', '.join(result.heavy_modules)}"
+                )
+            if max_seconds is not None and result.seconds > max_seconds:
+                errors.append(
+                    f"{result.role} takes {result.seconds:.3f}s to start "
+                    f"(limit: {max_seconds}s)"
+                )
+
+        if errors:
+            raise CommandError("; ".join(errors))
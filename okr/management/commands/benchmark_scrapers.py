@@ -0,0 +1,60 @@
+"""Run the offline benchmark of the scheduled scraper jobs."""
+
+import json
+
+from django.core.management.base import BaseCommand
+from tabulate import tabulate
+
+from ...benchmark import report, run_benchmark, summary_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Run all scheduled scraper jobs against a test database with generated API "
+        "responses and report time, queries, rows written and peak memory per job."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size",
+            type=int,
+            action="append",
+            dest="sizes",
+            help="Items per account and source, can be given multiple times "
+            "(default: 10 and 100).",
+        )
+        parser.add_argument(
+            "--accounts",
+            type=int,
+            default=2,
+            help="Accounts per product (default: 2).",
+        )
+        parser.add_argument(
+            "--job",
+            help="Only run jobs whose name contains this string, e.g. 'insta.'.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=1,
+            help="Runs per job and size, later runs update existing rows (default: 1).",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the full results as JSON to this file.",
+        )
+
+    def handle(self, *args, **options):
+        results = run_benchmark(
+            options["sizes"] or [10, 100],
+            accounts=options["accounts"],
+            repeat=options["repeat"],
+            job_filter=options["job"],
+        )
+
+        self.stdout.write(tabulate(summary_rows(results), headers="keys"))
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report(results), f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
@@ -0,0 +1,66 @@
+"""Measure how fast the URLs of pages are parsed."""
+
+import json
+
+from django.core.management.base import BaseCommand
+from tabulate import tabulate
+
+from ...benchmark.parsing import run_url_parser_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Parse a generated corpus of page URLs with and without the memo cache and "
+        "report the time per URL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size",
+            type=int,
+            default=200_000,
+            help="URLs in the corpus, including repeats (default: 200000).",
+        )
+        parser.add_argument(
+            "--unique",
+            type=int,
+            default=20_000,
+            help="Distinct URLs in the corpus (default: 20000).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Runs per mode, the fastest one is reported (default: 3).",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the results as JSON to this file.",
+        )
+
+    def handle(self, *args, **options):
+        results = run_url_parser_benchmark(
+            options["size"], options["unique"], repeat=options["repeat"]
+        )
+
+        self.stdout.write(
+            tabulate(
+                [
+                    {
+                        "mode": result.mode,
+                        "urls": result.urls,
+                        "time (s)": round(result.seconds, 3),
+                        "µs per url": round(result.microseconds_per_url, 2),
+                        "cache hits": result.hits,
+                        "cache misses": result.misses,
+                    }
+                    for result in results
+                ],
+                headers="keys",
+            )
+        )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump([result.as_dict() for result in results], f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
@@ -0,0 +1,65 @@
+"""Compute the pre-aggregated data for existing data."""
+
+import datetime as dt
+
+from django.core.management.base import BaseCommand, CommandError
+from tabulate import tabulate
+
+
+def _date(value: str) -> dt.date:
+    return dt.date.fromisoformat(value)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the weekly and monthly rollups from the daily data between two "
+        "dates, e.g. after deploying the rollups or changing their definitions. "
+        "The scrapers keep them up to date afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start",
+            type=_date,
+            required=True,
+            help="First date of the data (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--end",
+            type=_date,
+            help="Last date of the data (YYYY-MM-DD, default: today).",
+        )
+        parser.add_argument(
+            "--model",
+            action="append",
+            dest="models",
+            help="Name of a rollup model to refresh, can be given multiple times "
+            "(default: all).",
+        )
+
+    def handle(self, *args, **options):
+        from ...scrapers.common.rollups import DEFINITIONS, refresh_all
+        from ...scrapers.common.utils import local_today
+
+        names = {definition.rollup.__name__: definition for definition in DEFINITIONS}
+        rollups = None
+
+        if options["models"]:
+            unknown = set(options["models"]) - set(names)
+            if unknown:
+                raise CommandError(
+                    f"Unknown rollup models: {', '.join(sorted(unknown))} "
+                    f"(available: {', '.join(sorted(names))})"
+                )
+            rollups = [names[name].rollup for name in options["models"]]
+
+        results = refresh_all(
+            options["start"], options["end"] or local_today(), rollups=rollups
+        )
+
+        self.stdout.write(
+            tabulate(
+                [{"model": name, "rows": rows} for name, rows in results.items()],
+                headers="keys",
+            )
+        )
@@ -0,0 +1,163 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("okr", "0089_alter_instacomment_username"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobRun",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "job",
+                    models.CharField(
+                        help_text="Name der ausgeführten Funktion, z.B. insta.scrape_insights",
+                        max_length=200,
+                        verbose_name="Job",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[
+                            ("scheduler", "Zeitplan"),
+                            ("executor", "Auf Anfrage"),
+                        ],
+                        help_text="Zeitgesteuerter Job oder Ausführung auf Anfrage (z.B. für neue Objekte)",
+                        max_length=20,
+                        verbose_name="Quelle",
+                    ),
+                ),
+                (
+                    "executor",
+                    models.CharField(
+                        blank=True,
+                        help_text="Name des Thread-Pools, in dem der Job ausgeführt wurde",
+                        max_length=100,
+                        verbose_name="Executor",
+                    ),
+                ),
+                (
+                    "arguments",
+                    models.TextField(
+                        blank=True,
+                        help_text="Argumente, mit denen der Job aufgerufen wurde",
+                        verbose_name="Argumente",
+                    ),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        db_index=True,
+                        help_text="Zeitpunkt, an dem der Job gestartet wurde",
+                        verbose_name="Gestartet",
+                    ),
+                ),
+                (
+                    "queue_wait",
+                    models.DurationField(
+                        help_text="Zeit zwischen geplantem bzw. angefordertem und tatsächlichem Start",
+                        null=True,
+                        verbose_name="Wartezeit",
+                    ),
+                ),
+                (
+                    "duration",
+                    models.DurationField(
+                        help_text="Laufzeit des Jobs", verbose_name="Laufzeit"
+                    ),
+                ),
+                (
+                    "db_queries",
+                    models.PositiveIntegerField(
+                        help_text="Anzahl der Datenbank-Abfragen",
+                        verbose_name="DB-Abfragen",
+                    ),
+                ),
+                (
+                    "db_time",
+                    models.DurationField(
+                        help_text="Summierte Dauer der Datenbank-Abfragen",
+                        verbose_name="DB-Zeit",
+                    ),
+                ),
+                (
+                    "http_requests",
+                    models.PositiveIntegerField(
+                        help_text="Anzahl der HTTP-Anfragen an externe APIs",
+                        verbose_name="HTTP-Anfragen",
+                    ),
+                ),
+                (
+                    "http_time",
+                    models.DurationField(
+                        help_text="Summierte Dauer der HTTP-Anfragen an externe APIs",
+                        verbose_name="HTTP-Zeit",
+                    ),
+                ),
+                (
+                    "http_hosts",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Anzahl und summierte Dauer (in Sekunden) der HTTP-Anfragen pro Host",
+                        verbose_name="HTTP-Anfragen pro Host",
+                    ),
+                ),
+                (
+                    "rows_written",
+                    models.PositiveIntegerField(
+                        help_text="Anzahl der eingefügten, aktualisierten oder gelöschten Zeilen",
+                        verbose_name="Geschriebene Zeilen",
+                    ),
+                ),
+                (
+                    "rows_written_per_model",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Anzahl der eingefügten, aktualisierten oder gelöschten Zeilen pro Model",
+                        verbose_name="Geschriebene Zeilen pro Model",
+                    ),
+                ),
+                (
+                    "success",
+                    models.BooleanField(
+                        help_text="Gibt an, ob der Job ohne Fehler beendet wurde",
+                        verbose_name="Erfolgreich",
+                    ),
+                ),
+                (
+                    "error",
+                    models.TextField(
+                        blank=True,
+                        help_text="Fehlermeldung, falls der Job abgebrochen ist",
+                        verbose_name="Fehler",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Job-Ausführung",
+                "verbose_name_plural": "Job-Ausführungen",
+                "db_table": "job_run",
+                "ordering": ["-started_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["job", "started_at"], name="job_run_job_2764d7_idx"
+                    )
+                ],
+            },
+        ),
+    ]
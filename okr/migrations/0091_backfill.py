@@ -0,0 +1,138 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("okr", "0090_jobrun"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Backfill",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "job",
+                    models.CharField(
+                        help_text="Name der Funktion für den vollständigen Scrape, z.B. podcasts.scrape_full",
+                        max_length=200,
+                        verbose_name="Job",
+                    ),
+                ),
+                (
+                    "product_type",
+                    models.CharField(
+                        help_text="Model des gescrapten Objekts, z.B. okr.podcast",
+                        max_length=100,
+                        verbose_name="Objekt-Typ",
+                    ),
+                ),
+                (
+                    "product_id",
+                    models.PositiveIntegerField(
+                        help_text="ID des gescrapten Objekts", verbose_name="Objekt-ID"
+                    ),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Zeitpunkt, an dem der Backfill zum ersten Mal gestartet wurde",
+                        verbose_name="Gestartet",
+                    ),
+                ),
+                (
+                    "last_modified",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="Zeitpunkt, an dem zuletzt ein Abschnitt abgeschlossen wurde",
+                        verbose_name="Zuletzt geändert",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Backfill",
+                "verbose_name_plural": "Backfills",
+                "db_table": "backfill",
+                "ordering": ["-started_at"],
+                "unique_together": {("job", "product_type", "product_id")},
+            },
+        ),
+        migrations.CreateModel(
+            name="BackfillCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "step",
+                    models.CharField(
+                        help_text="Name der ausgeführten Funktion, z.B. podcasts.scrape_spotify_api",
+                        max_length=200,
+                        verbose_name="Schritt",
+                    ),
+                ),
+                (
+                    "start_date",
+                    models.DateField(
+                        blank=True,
+                        help_text="Erster Tag des abgeschlossenen Zeitraums (leer: Schritt ohne Zeitraum)",
+                        null=True,
+                        verbose_name="Startdatum",
+                    ),
+                ),
+                (
+                    "end_date",
+                    models.DateField(
+                        blank=True,
+                        help_text="Letzter Tag des abgeschlossenen Zeitraums (leer: bis zum Tag des Scrapes)",
+                        null=True,
+                        verbose_name="Enddatum",
+                    ),
+                ),
+                (
+                    "completed_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Zeitpunkt, an dem der Abschnitt abgeschlossen wurde",
+                        verbose_name="Abgeschlossen",
+                    ),
+                ),
+                (
+                    "backfill",
+                    models.ForeignKey(
+                        help_text="Backfill, zu dem der Abschnitt gehört",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="checkpoints",
+                        related_query_name="checkpoint",
+                        to="okr.backfill",
+                        verbose_name="Backfill",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Backfill-Checkpoint",
+                "verbose_name_plural": "Backfill-Checkpoints",
+                "db_table": "backfill_checkpoint",
+                "ordering": ["backfill", "step", "-start_date"],
+            },
+        ),
+    ]
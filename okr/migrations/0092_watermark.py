@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("okr", "0091_backfill"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Watermark",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "job",
+                    models.CharField(
+                        help_text="Name der Funktion, die die Daten abfragt, z.B. pages.scrape_gsc",
+                        max_length=200,
+                        verbose_name="Job",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        help_text="Name der Datenquelle, z.B. gsc",
+                        max_length=100,
+                        verbose_name="Datenquelle",
+                    ),
+                ),
+                (
+                    "product_type",
+                    models.CharField(
+                        help_text="Model des gescrapten Objekts, z.B. okr.property",
+                        max_length=100,
+                        verbose_name="Objekt-Typ",
+                    ),
+                ),
+                (
+                    "product_id",
+                    models.PositiveIntegerField(
+                        help_text="ID des gescrapten Objekts", verbose_name="Objekt-ID"
+                    ),
+                ),
+                (
+                    "final_until",
+                    models.DateTimeField(
+                        help_text="Daten vor diesem Zeitpunkt ändern sich nicht mehr und werden nicht erneut abgefragt",
+                        verbose_name="Final bis",
+                    ),
+                ),
+                (
+                    "last_updated",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="Zeitpunkt, an dem die Watermark zuletzt weitergesetzt wurde",
+                        verbose_name="Zuletzt geändert",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Watermark",
+                "verbose_name_plural": "Watermarks",
+                "db_table": "watermark",
+                "ordering": ["job", "product_type", "product_id"],
+                "unique_together": {("job", "source", "product_type", "product_id")},
+            },
+        ),
+    ]
@@ -0,0 +1,423 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("okr", "0092_watermark"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InstaRollup",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("day", "Tag"), ("week", "Woche"), ("month", "Monat")],
+                        help_text="Tag, Woche oder Monat",
+                        max_length=8,
+                        verbose_name="Zeitraum",
+                    ),
+                ),
+                (
+                    "start_date",
+                    models.DateField(
+                        help_text="Erster Tag des Zeitraums (bei Wochen der Montag)",
+                        verbose_name="Beginn",
+                    ),
+                ),
+                (
+                    "days",
+                    models.IntegerField(
+                        help_text="Anzahl der Tage im Zeitraum, für die Daten vorliegen",
+                        verbose_name="Tage mit Daten",
+                    ),
+                ),
+                (
+                    "last_updated",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="Letzte Aktualisierung des Datenpunktes",
+                        verbose_name="Zuletzt upgedated",
+                    ),
+                ),
+                (
+                    "reach",
+                    models.IntegerField(
+                        help_text="Summe der Reichweite der einzelnen Tage",
+                        null=True,
+                        verbose_name="Reichweite",
+                    ),
+                ),
+                (
+                    "impressions",
+                    models.IntegerField(
+                        help_text="Impressions im Zeitraum",
+                        null=True,
+                        verbose_name="Impressions",
+                    ),
+                ),
+                (
+                    "followers",
+                    models.IntegerField(
+                        help_text="Follower am letzten Tag des Zeitraums",
+                        null=True,
+                        verbose_name="Follower",
+                    ),
+                ),
+                (
+                    "text_message_clicks",
+                    models.IntegerField(
+                        help_text="Klicks auf „Nachricht senden“ im Zeitraum",
+                        null=True,
+                        verbose_name="Nachricht senden",
+                    ),
+                ),
+                (
+                    "email_contacts",
+                    models.IntegerField(
+                        help_text="Klicks auf „Email senden“ im Zeitraum",
+                        null=True,
+                        verbose_name="Email senden",
+                    ),
+                ),
+                (
+                    "profile_views",
+                    models.IntegerField(
+                        help_text="Profilansichten im Zeitraum",
+                        null=True,
+                        verbose_name="Profilansichten",
+                    ),
+                ),
+                (
+                    "insta",
+                    models.ForeignKey(
+                        help_text="Globale ID des Instagram-Accounts",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rollups",
+                        related_query_name="rollups",
+                        to="okr.insta",
+                        verbose_name="Instagram-Account",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Instagram-Insight (zusammengefasst)",
+                "verbose_name_plural": "Instagram-Insights (zusammengefasst)",
+                "db_table": "instagram_rollup",
+                "ordering": ["-start_date", "insta"],
+                "indexes": [
+                    models.Index(
+                        fields=["period", "start_date"],
+                        name="instagram_r_period_c13dd2_idx",
+                    )
+                ],
+                "unique_together": {("insta", "period", "start_date")},
+            },
+        ),
+        migrations.CreateModel(
+            name="PageQueryRollupGSC",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("day", "Tag"), ("week", "Woche"), ("month", "Monat")],
+                        help_text="Tag, Woche oder Monat",
+                        max_length=8,
+                        verbose_name="Zeitraum",
+                    ),
+                ),
+                (
+                    "start_date",
+                    models.DateField(
+                        help_text="Erster Tag des Zeitraums (bei Wochen der Montag)",
+                        verbose_name="Beginn",
+                    ),
+                ),
+                (
+                    "days",
+                    models.IntegerField(
+                        help_text="Anzahl der Tage im Zeitraum, für die Daten vorliegen",
+                        verbose_name="Tage mit Daten",
+                    ),
+                ),
+                (
+                    "last_updated",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="Letzte Aktualisierung des Datenpunktes",
+                        verbose_name="Zuletzt upgedated",
+                    ),
+                ),
+                (
+                    "clicks",
+                    models.IntegerField(
+                        help_text="Klicks im Zeitraum", verbose_name="Klicks"
+                    ),
+                ),
+                (
+                    "impressions",
+                    models.IntegerField(
+                        help_text="Impressions im Zeitraum", verbose_name="Impressions"
+                    ),
+                ),
+                (
+                    "ctr",
+                    models.FloatField(
+                        help_text="Click-Through Rate im Zeitraum", verbose_name="CTR"
+                    ),
+                ),
+                (
+                    "position",
+                    models.FloatField(
+                        help_text="Durchschnittliche Position in den Suchergebnissen, gewichtet nach Impressions",
+                        null=True,
+                        verbose_name="Position",
+                    ),
+                ),
+                (
+                    "query",
+                    models.TextField(
+                        help_text="Query (Suchanfrage)", verbose_name="Query"
+                    ),
+                ),
+                (
+                    "page",
+                    models.ForeignKey(
+                        help_text="Globale ID der Online-Seite",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="query_rollups_gsc",
+                        related_query_name="query_rollups_gsc",
+                        to="okr.page",
+                        verbose_name="Seite",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Seiten-Query-Performance (GSC, zusammengefasst)",
+                "verbose_name_plural": "Seiten-Query-Performance (GSC, zusammengefasst)",
+                "db_table": "page_query_rollup_gsc",
+                "ordering": ["-start_date", "-clicks"],
+                "indexes": [
+                    models.Index(
+                        fields=["period", "start_date"],
+                        name="page_query__period_27ff40_idx",
+                    )
+                ],
+                "unique_together": {("page", "query", "period", "start_date")},
+            },
+        ),
+        migrations.CreateModel(
+            name="PageRollupGSC",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("day", "Tag"), ("week", "Woche"), ("month", "Monat")],
+                        help_text="Tag, Woche oder Monat",
+                        max_length=8,
+                        verbose_name="Zeitraum",
+                    ),
+                ),
+                (
+                    "start_date",
+                    models.DateField(
+                        help_text="Erster Tag des Zeitraums (bei Wochen der Montag)",
+                        verbose_name="Beginn",
+                    ),
+                ),
+                (
+                    "days",
+                    models.IntegerField(
+                        help_text="Anzahl der Tage im Zeitraum, für die Daten vorliegen",
+                        verbose_name="Tage mit Daten",
+                    ),
+                ),
+                (
+                    "last_updated",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="Letzte Aktualisierung des Datenpunktes",
+                        verbose_name="Zuletzt upgedated",
+                    ),
+                ),
+                (
+                    "clicks",
+                    models.IntegerField(
+                        help_text="Klicks im Zeitraum", verbose_name="Klicks"
+                    ),
+                ),
+                (
+                    "impressions",
+                    models.IntegerField(
+                        help_text="Impressions im Zeitraum", verbose_name="Impressions"
+                    ),
+                ),
+                (
+                    "ctr",
+                    models.FloatField(
+                        help_text="Click-Through Rate im Zeitraum", verbose_name="CTR"
+                    ),
+                ),
+                (
+                    "position",
+                    models.FloatField(
+                        help_text="Durchschnittliche Position in den Suchergebnissen, gewichtet nach Impressions",
+                        null=True,
+                        verbose_name="Position",
+                    ),
+                ),
+                (
+                    "page",
+                    models.ForeignKey(
+                        help_text="Globale ID der Online-Seite",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rollups_gsc",
+                        related_query_name="rollups_gsc",
+                        to="okr.page",
+                        verbose_name="Seite",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Seiten-Daten (GSC, zusammengefasst)",
+                "verbose_name_plural": "Seiten-Daten (GSC, zusammengefasst)",
+                "db_table": "page_rollup_gsc",
+                "ordering": ["-start_date", "-clicks"],
+                "indexes": [
+                    models.Index(
+                        fields=["period", "start_date"],
+                        name="page_rollup_period_62fc92_idx",
+                    )
+                ],
+                "unique_together": {("page", "period", "start_date")},
+            },
+        ),
+        migrations.CreateModel(
+            name="PodcastEpisodeRollupSpotify",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("day", "Tag"), ("week", "Woche"), ("month", "Monat")],
+                        help_text="Tag, Woche oder Monat",
+                        max_length=8,
+                        verbose_name="Zeitraum",
+                    ),
+                ),
+                (
+                    "start_date",
+                    models.DateField(
+                        help_text="Erster Tag des Zeitraums (bei Wochen der Montag)",
+                        verbose_name="Beginn",
+                    ),
+                ),
+                (
+                    "days",
+                    models.IntegerField(
+                        help_text="Anzahl der Tage im Zeitraum, für die Daten vorliegen",
+                        verbose_name="Tage mit Daten",
+                    ),
+                ),
+                (
+                    "last_updated",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="Letzte Aktualisierung des Datenpunktes",
+                        verbose_name="Zuletzt upgedated",
+                    ),
+                ),
+                (
+                    "starts",
+                    models.IntegerField(
+                        help_text="Anzahl der Starts im Zeitraum", verbose_name="Starts"
+                    ),
+                ),
+                (
+                    "streams",
+                    models.IntegerField(
+                        help_text="Anzahl der Streams im Zeitraum",
+                        verbose_name="Streams",
+                    ),
+                ),
+                (
+                    "listeners",
+                    models.IntegerField(
+                        help_text="Summe der Hörer*innen der einzelnen Tage",
+                        verbose_name="Listeners",
+                    ),
+                ),
+                (
+                    "listeners_all_time",
+                    models.IntegerField(
+                        help_text="Gesamtzahl der Hörer*innen am letzten Tag des Zeitraums",
+                        verbose_name="Listeners (insgesamt)",
+                    ),
+                ),
+                (
+                    "episode",
+                    models.ForeignKey(
+                        help_text="Globale ID der Episode",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rollups_spotify",
+                        related_query_name="rollups_spotify",
+                        to="okr.podcastepisode",
+                        verbose_name="Episode",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Podcast-Episoden-Abruf (Spotify, zusammengefasst)",
+                "verbose_name_plural": "Podcast-Episoden-Abrufe (Spotify, zusammengefasst)",
+                "db_table": "podcast_episode_rollup_spotify",
+                "ordering": ["-start_date", "episode"],
+                "indexes": [
+                    models.Index(
+                        fields=["period", "start_date"],
+                        name="podcast_epi_period_eb7ed7_idx",
+                    )
+                ],
+                "unique_together": {("episode", "period", "start_date")},
+            },
+        ),
+    ]
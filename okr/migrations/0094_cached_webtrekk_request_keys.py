@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def clear_cache(apps, schema_editor):
+    # The old entries are keyed by the full payload and never expire, so they
+    # can't be reused. The cache is filled again by the next requests.
+    CachedWebtrekkRequest = apps.get_model("okr", "CachedWebtrekkRequest")
+    CachedWebtrekkRequest.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("okr", "0093_rollups"),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_cache, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="cachedwebtrekkrequest",
+            name="payload",
+        ),
+        migrations.RemoveField(
+            model_name="cachedwebtrekkrequest",
+            name="response",
+        ),
+        migrations.AddField(
+            model_name="cachedwebtrekkrequest",
+            name="key",
+            field=models.CharField(
+                default="",
+                help_text="SHA-256-Hash von Methode und Parametern der Abfrage",
+                max_length=64,
+                unique=True,
+                verbose_name="Schlüssel",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="cachedwebtrekkrequest",
+            name="method",
+            field=models.CharField(
+                default="",
+                help_text="Methode der Webtrekk JSON/RPC API, z.B. getAnalysisData",
+                max_length=64,
+                verbose_name="Methode",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="cachedwebtrekkrequest",
+            name="response",
+            field=models.BinaryField(
+                default=b"",
+                help_text="Ergebnis der API-Abfrage als zlib-komprimiertes JSON",
+                verbose_name="Webtrekk Response",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="cachedwebtrekkrequest",
+            name="expires",
+            field=models.DateTimeField(
+                db_index=True,
+                default=django.utils.timezone.now,
+                help_text="Zeitpunkt, ab dem der Eintrag nicht mehr verwendet wird",
+                verbose_name="Gültig bis",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="cachedwebtrekkrequest",
+            name="last_used",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                help_text="Letzter Abruf des Eintrags aus der Datenbank",
+                verbose_name="Zuletzt verwendet",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="cachedwebtrekkrequest",
+            index=models.Index(
+                fields=["method", "last_used"], name="cached_webt_method_745608_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:59
+
+import django.db.models.deletion
+import okr.models.auth
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("okr", "0094_cached_webtrekk_request_keys"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ApiToken",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="Verwendung des Tokens, z.B. Power BI",
+                        max_length=200,
+                        verbose_name="Name",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        default=okr.models.auth.generate_key,
+                        editable=False,
+                        help_text="Wird im Header Authorization: Token <Schlüssel> übergeben",
+                        max_length=64,
+                        unique=True,
+                        verbose_name="Schlüssel",
+                    ),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Zeitpunkt, an dem der Token erstellt wurde",
+                        verbose_name="Erstellt",
+                    ),
+                ),
+                (
+                    "last_used",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Letzte Abfrage mit dem Token",
+                        null=True,
+                        verbose_name="Zuletzt verwendet",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        help_text="User, dessen Berechtigungen für Abfragen mit dem Token gelten",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="api_tokens",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="User",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "API-Token",
+                "verbose_name_plural": "API-Tokens",
+                "db_table": "api_token",
+                "ordering": ["user", "name"],
+            },
+        ),
+    ]
@@ -2,13 +2,16 @@
 
 # flake8: noqa
 
+from .auth import *
 from .base import *
 from .cached_requests import *
 from .custom import *
 from .facebook import *
 from .insta import *
+from .jobs import *
 from .pages import *
 from .podcasts import *
+from .rollups import *
 from .snapchat_shows import *
 from .tiktok import *
 from .twitter import *
@@ -0,0 +1,68 @@
+"""Database models for authenticating scripts and BI tools."""
+
+import secrets
+
+from django.conf import settings
+from django.db import models
+
+
+def generate_key() -> str:
+    """Generate a random key for an API token.
+
+    Returns:
+        str: The URL-safe key.
+    """
+    return secrets.token_urlsafe(32)
+
+
+class ApiToken(models.Model):
+    """Token, mit dem Skripte und BI-Tools im Namen eines Users auf Exporte und
+    Auswertungen zugreifen.
+    """
+
+    class Meta:
+        """Model meta options."""
+
+        db_table = "api_token"
+        verbose_name = "API-Token"
+        verbose_name_plural = "API-Tokens"
+        ordering = ["user", "name"]
+
+    user = models.ForeignKey(
+        verbose_name="User",
+        help_text="User, dessen Berechtigungen für Abfragen mit dem Token gelten",
+        to=settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="api_tokens",
+    )
+
+    name = models.CharField(
+        verbose_name="Name",
+        help_text="Verwendung des Tokens, z.B. Power BI",
+        max_length=200,
+    )
+
+    key = models.CharField(
+        verbose_name="Schlüssel",
+        help_text="Wird im Header Authorization: Token <Schlüssel> übergeben",
+        max_length=64,
+        unique=True,
+        default=generate_key,
+        editable=False,
+    )
+
+    created = models.DateTimeField(
+        verbose_name="Erstellt",
+        help_text="Zeitpunkt, an dem der Token erstellt wurde",
+        auto_now_add=True,
+    )
+
+    last_used = models.DateTimeField(
+        verbose_name="Zuletzt verwendet",
+        help_text="Letzte Abfrage mit dem Token",
+        null=True,
+        blank=True,
+    )
+
+    def __str__(self):
+        return f"{self.name} ({self.user})"
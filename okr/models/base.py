@@ -1,7 +1,14 @@
 """Base classes for database models."""
 
+from typing import Optional, Type
+
 from django.conf import settings
-from django.db import models
+from django.db import connection, models
+from django.dispatch import Signal
+
+# Sent with ``sender=model`` after rows of a model were deleted in bulk, e.g. by the DB
+# cleanup, so caches of the model can be invalidated without post_delete for each row
+rows_deleted = Signal()
 
 
 class ActiveManager(models.Manager):
@@ -29,6 +36,37 @@ def with_active_manager(cls):
     return cls
 
 
+def estimated_count(model: Type[models.Model]) -> Optional[int]:
+    """Estimate the number of rows in the table of a model.
+
+    Counting all rows of large tables takes very long on PostgreSQL. Instead, this
+    reads the estimate from the statistics in ``pg_class``, which are updated by
+    ``VACUUM`` and ``ANALYZE`` and may be stale.
+
+    Args:
+        model (Type[models.Model]): The model.
+
+    Returns:
+        Optional[int]: The estimate, or None if the database isn't PostgreSQL or has
+        no statistics for the table yet.
+    """
+    if connection.vendor != "postgresql":
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples FROM pg_class WHERE relname = %s",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+
+    # Tables that were never analyzed have an estimate of -1
+    if row is None or row[0] < 0:
+        return None
+
+    return int(row[0])
+
+
 @with_active_manager
 class Product(models.Model):
     """Base model for products."""
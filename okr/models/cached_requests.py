@@ -18,16 +18,35 @@ class CachedWebtrekkRequest(models.Model):
         verbose_name = "Webtrekk Cache-Eintrag"
         verbose_name_plural = "Webtrekk Cache-Einträge"
         ordering = ["last_updated"]
+        indexes = [models.Index(fields=["method", "last_used"])]
 
-    payload = models.TextField(
-        verbose_name="Webtrekk Query-Payload",
-        help_text="Query-Payload für Archiv-Eintrag",
+    key = models.CharField(
+        verbose_name="Schlüssel",
+        help_text="SHA-256-Hash von Methode und Parametern der Abfrage",
+        max_length=64,
         unique=True,
     )
 
-    response = models.TextField(
+    method = models.CharField(
+        verbose_name="Methode",
+        help_text="Methode der Webtrekk JSON/RPC API, z.B. getAnalysisData",
+        max_length=64,
+    )
+
+    response = models.BinaryField(
         verbose_name="Webtrekk Response",
-        help_text="API-Response von Webtrekk",
+        help_text="Ergebnis der API-Abfrage als zlib-komprimiertes JSON",
+    )
+
+    expires = models.DateTimeField(
+        verbose_name="Gültig bis",
+        help_text="Zeitpunkt, ab dem der Eintrag nicht mehr verwendet wird",
+        db_index=True,
+    )
+
+    last_used = models.DateTimeField(
+        verbose_name="Zuletzt verwendet",
+        help_text="Letzter Abruf des Eintrags aus der Datenbank",
     )
 
     last_updated = models.DateTimeField(
@@ -37,4 +56,4 @@ class CachedWebtrekkRequest(models.Model):
     )
 
     def __str__(self):
-        return self.last_updated
+        return f"{self.method} ({self.key[:12]})"
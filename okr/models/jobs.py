@@ -0,0 +1,266 @@
+"""Database models for monitoring scraper jobs."""
+
+from django.db import models
+
+
+class JobRun(models.Model):
+    """Messwerte zu einer Ausführung eines Scraper-Jobs."""
+
+    class Source(models.TextChoices):
+        """Available sources of job runs."""
+
+        SCHEDULER = "scheduler", "Zeitplan"
+        EXECUTOR = "executor", "Auf Anfrage"
+
+    class Meta:
+        """Model meta options."""
+
+        db_table = "job_run"
+        verbose_name = "Job-Ausführung"
+        verbose_name_plural = "Job-Ausführungen"
+        ordering = ["-started_at"]
+        indexes = [models.Index(fields=["job", "started_at"])]
+
+    job = models.CharField(
+        verbose_name="Job",
+        help_text="Name der ausgeführten Funktion, z.B. insta.scrape_insights",
+        max_length=200,
+    )
+
+    source = models.CharField(
+        verbose_name="Quelle",
+        help_text="Zeitgesteuerter Job oder Ausführung auf Anfrage (z.B. für neue Objekte)",
+        max_length=20,
+        choices=Source.choices,
+    )
+
+    executor = models.CharField(
+        verbose_name="Executor",
+        help_text="Name des Thread-Pools, in dem der Job ausgeführt wurde",
+        max_length=100,
+        blank=True,
+    )
+
+    arguments = models.TextField(
+        verbose_name="Argumente",
+        help_text="Argumente, mit denen der Job aufgerufen wurde",
+        blank=True,
+    )
+
+    started_at = models.DateTimeField(
+        verbose_name="Gestartet",
+        help_text="Zeitpunkt, an dem der Job gestartet wurde",
+        db_index=True,
+    )
+
+    queue_wait = models.DurationField(
+        verbose_name="Wartezeit",
+        help_text="Zeit zwischen geplantem bzw. angefordertem und tatsächlichem Start",
+        null=True,
+    )
+
+    duration = models.DurationField(
+        verbose_name="Laufzeit",
+        help_text="Laufzeit des Jobs",
+    )
+
+    db_queries = models.PositiveIntegerField(
+        verbose_name="DB-Abfragen",
+        help_text="Anzahl der Datenbank-Abfragen",
+    )
+
+    db_time = models.DurationField(
+        verbose_name="DB-Zeit",
+        help_text="Summierte Dauer der Datenbank-Abfragen",
+    )
+
+    http_requests = models.PositiveIntegerField(
+        verbose_name="HTTP-Anfragen",
+        help_text="Anzahl der HTTP-Anfragen an externe APIs",
+    )
+
+    http_time = models.DurationField(
+        verbose_name="HTTP-Zeit",
+        help_text="Summierte Dauer der HTTP-Anfragen an externe APIs",
+    )
+
+    http_hosts = models.JSONField(
+        verbose_name="HTTP-Anfragen pro Host",
+        help_text="Anzahl und summierte Dauer (in Sekunden) der HTTP-Anfragen pro Host",
+        default=dict,
+    )
+
+    rows_written = models.PositiveIntegerField(
+        verbose_name="Geschriebene Zeilen",
+        help_text="Anzahl der eingefügten, aktualisierten oder gelöschten Zeilen",
+    )
+
+    rows_written_per_model = models.JSONField(
+        verbose_name="Geschriebene Zeilen pro Model",
+        help_text="Anzahl der eingefügten, aktualisierten oder gelöschten Zeilen pro Model",
+        default=dict,
+    )
+
+    success = models.BooleanField(
+        verbose_name="Erfolgreich",
+        help_text="Gibt an, ob der Job ohne Fehler beendet wurde",
+    )
+
+    error = models.TextField(
+        verbose_name="Fehler",
+        help_text="Fehlermeldung, falls der Job abgebrochen ist",
+        blank=True,
+    )
+
+    def __str__(self):
+        return f"{self.job} ({self.started_at})"
+
+
+class Backfill(models.Model):
+    """Nicht abgeschlossener vollständiger Scrape eines Objekts (z.B. eines neuen
+    Podcasts), der nach einem Neustart fortgesetzt wird."""
+
+    class Meta:
+        """Model meta options."""
+
+        db_table = "backfill"
+        verbose_name = "Backfill"
+        verbose_name_plural = "Backfills"
+        ordering = ["-started_at"]
+        unique_together = ("job", "product_type", "product_id")
+
+    job = models.CharField(
+        verbose_name="Job",
+        help_text="Name der Funktion für den vollständigen Scrape, z.B. podcasts.scrape_full",
+        max_length=200,
+    )
+
+    product_type = models.CharField(
+        verbose_name="Objekt-Typ",
+        help_text="Model des gescrapten Objekts, z.B. okr.podcast",
+        max_length=100,
+    )
+
+    product_id = models.PositiveIntegerField(
+        verbose_name="Objekt-ID",
+        help_text="ID des gescrapten Objekts",
+    )
+
+    started_at = models.DateTimeField(
+        verbose_name="Gestartet",
+        help_text="Zeitpunkt, an dem der Backfill zum ersten Mal gestartet wurde",
+        auto_now_add=True,
+    )
+
+    last_modified = models.DateTimeField(
+        verbose_name="Zuletzt geändert",
+        help_text="Zeitpunkt, an dem zuletzt ein Abschnitt abgeschlossen wurde",
+        auto_now=True,
+    )
+
+    def __str__(self):
+        return f"{self.job} ({self.product_type} {self.product_id})"
+
+
+class BackfillCheckpoint(models.Model):
+    """Abgeschlossener Abschnitt eines Backfills."""
+
+    class Meta:
+        """Model meta options."""
+
+        db_table = "backfill_checkpoint"
+        verbose_name = "Backfill-Checkpoint"
+        verbose_name_plural = "Backfill-Checkpoints"
+        ordering = ["backfill", "step", "-start_date"]
+
+    backfill = models.ForeignKey(
+        verbose_name="Backfill",
+        to=Backfill,
+        on_delete=models.CASCADE,
+        related_name="checkpoints",
+        related_query_name="checkpoint",
+        help_text="Backfill, zu dem der Abschnitt gehört",
+    )
+
+    step = models.CharField(
+        verbose_name="Schritt",
+        help_text="Name der ausgeführten Funktion, z.B. podcasts.scrape_spotify_api",
+        max_length=200,
+    )
+
+    start_date = models.DateField(
+        verbose_name="Startdatum",
+        help_text="Erster Tag des abgeschlossenen Zeitraums (leer: Schritt ohne Zeitraum)",
+        null=True,
+        blank=True,
+    )
+
+    end_date = models.DateField(
+        verbose_name="Enddatum",
+        help_text="Letzter Tag des abgeschlossenen Zeitraums (leer: bis zum Tag des Scrapes)",
+        null=True,
+        blank=True,
+    )
+
+    completed_at = models.DateTimeField(
+        verbose_name="Abgeschlossen",
+        help_text="Zeitpunkt, an dem der Abschnitt abgeschlossen wurde",
+        auto_now_add=True,
+    )
+
+    def __str__(self):
+        return f"{self.backfill}: {self.step} {self.start_date or ''} - {self.end_date or ''}"
+
+
+class Watermark(models.Model):
+    """Zeitpunkt, bis zu dem die Daten eines Objekts aus einer Datenquelle final sind.
+
+    Regelmäßige Jobs fragen nur Daten ab diesem Zeitpunkt (zzgl. der Zeit, bis sich
+    die Daten nicht mehr ändern) erneut ab.
+    """
+
+    class Meta:
+        """Model meta options."""
+
+        db_table = "watermark"
+        verbose_name = "Watermark"
+        verbose_name_plural = "Watermarks"
+        ordering = ["job", "product_type", "product_id"]
+        unique_together = ("job", "source", "product_type", "product_id")
+
+    job = models.CharField(
+        verbose_name="Job",
+        help_text="Name der Funktion, die die Daten abfragt, z.B. pages.scrape_gsc",
+        max_length=200,
+    )
+
+    source = models.CharField(
+        verbose_name="Datenquelle",
+        help_text="Name der Datenquelle, z.B. gsc",
+        max_length=100,
+    )
+
+    product_type = models.CharField(
+        verbose_name="Objekt-Typ",
+        help_text="Model des gescrapten Objekts, z.B. okr.property",
+        max_length=100,
+    )
+
+    product_id = models.PositiveIntegerField(
+        verbose_name="Objekt-ID",
+        help_text="ID des gescrapten Objekts",
+    )
+
+    final_until = models.DateTimeField(
+        verbose_name="Final bis",
+        help_text="Daten vor diesem Zeitpunkt ändern sich nicht mehr und werden nicht erneut abgefragt",
+    )
+
+    last_updated = models.DateTimeField(
+        verbose_name="Zuletzt geändert",
+        help_text="Zeitpunkt, an dem die Watermark zuletzt weitergesetzt wurde",
+        auto_now=True,
+    )
+
+    def __str__(self):
+        return f"{self.job} ({self.product_type} {self.product_id})"
@@ -0,0 +1,260 @@
+"""Database models for pre-aggregated data per day, week and month."""
+
+import datetime as dt
+from typing import Optional
+
+from django.db import models
+
+from .insta import Insta
+from .pages import Page
+from .podcasts import PodcastEpisode
+
+
+class Period(models.TextChoices):
+    """Available periods of rollups."""
+
+    DAY = "day", "Tag"
+    WEEK = "week", "Woche"
+    MONTH = "month", "Monat"
+
+
+class RollupQuerySet(models.QuerySet):
+    """Filters for reading rollups."""
+
+    def period(self, period: str) -> "RollupQuerySet":
+        """Only rollups of the given period, e.g. ``"week"``."""
+        return self.filter(period=period)
+
+    def between(
+        self, start_date: Optional[dt.date] = None, end_date: Optional[dt.date] = None
+    ) -> "RollupQuerySet":
+        """Only periods that start within the given dates (both inclusive)."""
+        queryset = self
+
+        if start_date is not None:
+            queryset = queryset.filter(start_date__gte=start_date)
+        if end_date is not None:
+            queryset = queryset.filter(start_date__lte=end_date)
+
+        return queryset
+
+
+class Rollup(models.Model):
+    """Base model for pre-aggregated data."""
+
+    class Meta:
+        """Model meta options."""
+
+        abstract = True
+
+    objects = RollupQuerySet.as_manager()
+
+    period = models.CharField(
+        verbose_name="Zeitraum",
+        help_text="Tag, Woche oder Monat",
+        max_length=8,
+        choices=Period.choices,
+    )
+    start_date = models.DateField(
+        verbose_name="Beginn",
+        help_text="Erster Tag des Zeitraums (bei Wochen der Montag)",
+    )
+    days = models.IntegerField(
+        verbose_name="Tage mit Daten",
+        help_text="Anzahl der Tage im Zeitraum, für die Daten vorliegen",
+    )
+    last_updated = models.DateTimeField(
+        verbose_name="Zuletzt upgedated",
+        help_text="Letzte Aktualisierung des Datenpunktes",
+        auto_now=True,
+    )
+
+
+class RollupGSC(Rollup):
+    """Base model for pre-aggregated Google Search Console data."""
+
+    class Meta:
+        """Model meta options."""
+
+        abstract = True
+
+    clicks = models.IntegerField(
+        verbose_name="Klicks",
+        help_text="Klicks im Zeitraum",
+    )
+    impressions = models.IntegerField(
+        verbose_name="Impressions",
+        help_text="Impressions im Zeitraum",
+    )
+    ctr = models.FloatField(
+        verbose_name="CTR",
+        help_text="Click-Through Rate im Zeitraum",
+    )
+    position = models.FloatField(
+        verbose_name="Position",
+        help_text="Durchschnittliche Position in den Suchergebnissen, gewichtet nach "
+        "Impressions",
+        null=True,
+    )
+
+
+class PageRollupGSC(RollupGSC):
+    """SEO-Performance pro Seite und Tag, Woche oder Monat über alle Gerätetypen,
+    basierend auf :class:`~okr.models.pages.PageDataGSC`.
+    """
+
+    class Meta:
+        """Model meta options."""
+
+        db_table = "page_rollup_gsc"
+        verbose_name = "Seiten-Daten (GSC, zusammengefasst)"
+        verbose_name_plural = "Seiten-Daten (GSC, zusammengefasst)"
+        ordering = ["-start_date", "-clicks"]
+        unique_together = ["page", "period", "start_date"]
+        indexes = [models.Index(fields=["period", "start_date"])]
+
+    page = models.ForeignKey(
+        to=Page,
+        verbose_name="Seite",
+        help_text="Globale ID der Online-Seite",
+        on_delete=models.CASCADE,
+        related_name="rollups_gsc",
+        related_query_name="rollups_gsc",
+    )
+
+    def __str__(self):
+        return f"{self.start_date} ({self.get_period_display()}) - {self.page.url}"
+
+
+class PageQueryRollupGSC(RollupGSC):
+    """SEO-Query-Performance pro Seite und Woche oder Monat, basierend auf
+    :class:`~okr.models.pages.PageDataQueryGSC`.
+    """
+
+    class Meta:
+        """Model meta options."""
+
+        db_table = "page_query_rollup_gsc"
+        verbose_name = "Seiten-Query-Performance (GSC, zusammengefasst)"
+        verbose_name_plural = "Seiten-Query-Performance (GSC, zusammengefasst)"
+        ordering = ["-start_date", "-clicks"]
+        unique_together = ["page", "query", "period", "start_date"]
+        indexes = [models.Index(fields=["period", "start_date"])]
+
+    page = models.ForeignKey(
+        to=Page,
+        verbose_name="Seite",
+        help_text="Globale ID der Online-Seite",
+        on_delete=models.CASCADE,
+        related_name="query_rollups_gsc",
+        related_query_name="query_rollups_gsc",
+    )
+    query = models.TextField(
+        verbose_name="Query",
+        help_text="Query (Suchanfrage)",
+    )
+
+    def __str__(self):
+        return f"{self.start_date} ({self.get_period_display()}) - {self.query}"
+
+
+class PodcastEpisodeRollupSpotify(Rollup):
+    """Abrufzahlen pro Podcast-Episode und Woche oder Monat, basierend auf
+    :class:`~okr.models.podcasts.PodcastEpisodeDataSpotify`.
+    """
+
+    class Meta:
+        """Model meta options."""
+
+        db_table = "podcast_episode_rollup_spotify"
+        verbose_name = "Podcast-Episoden-Abruf (Spotify, zusammengefasst)"
+        verbose_name_plural = "Podcast-Episoden-Abrufe (Spotify, zusammengefasst)"
+        ordering = ["-start_date", "episode"]
+        unique_together = ["episode", "period", "start_date"]
+        indexes = [models.Index(fields=["period", "start_date"])]
+
+    episode = models.ForeignKey(
+        to=PodcastEpisode,
+        verbose_name="Episode",
+        help_text="Globale ID der Episode",
+        on_delete=models.CASCADE,
+        related_name="rollups_spotify",
+        related_query_name="rollups_spotify",
+    )
+    starts = models.IntegerField(
+        verbose_name="Starts",
+        help_text="Anzahl der Starts im Zeitraum",
+    )
+    streams = models.IntegerField(
+        verbose_name="Streams",
+        help_text="Anzahl der Streams im Zeitraum",
+    )
+    listeners = models.IntegerField(
+        verbose_name="Listeners",
+        help_text="Summe der Hörer*innen der einzelnen Tage",
+    )
+    listeners_all_time = models.IntegerField(
+        verbose_name="Listeners (insgesamt)",
+        help_text="Gesamtzahl der Hörer*innen am letzten Tag des Zeitraums",
+    )
+
+    def __str__(self):
+        return f"{self.start_date} ({self.get_period_display()}) - {self.episode}"
+
+
+class InstaRollup(Rollup):
+    """Kennzahlen pro Instagram-Account und Woche oder Monat, basierend auf
+    :class:`~okr.models.insta.InstaInsight`.
+    """
+
+    class Meta:
+        """Model meta options."""
+
+        db_table = "instagram_rollup"
+        verbose_name = "Instagram-Insight (zusammengefasst)"
+        verbose_name_plural = "Instagram-Insights (zusammengefasst)"
+        ordering = ["-start_date", "insta"]
+        unique_together = ["insta", "period", "start_date"]
+        indexes = [models.Index(fields=["period", "start_date"])]
+
+    insta = models.ForeignKey(
+        to=Insta,
+        verbose_name="Instagram-Account",
+        help_text="Globale ID des Instagram-Accounts",
+        on_delete=models.CASCADE,
+        related_name="rollups",
+        related_query_name="rollups",
+    )
+    reach = models.IntegerField(
+        verbose_name="Reichweite",
+        help_text="Summe der Reichweite der einzelnen Tage",
+        null=True,
+    )
+    impressions = models.IntegerField(
+        verbose_name="Impressions",
+        help_text="Impressions im Zeitraum",
+        null=True,
+    )
+    followers = models.IntegerField(
+        verbose_name="Follower",
+        help_text="Follower am letzten Tag des Zeitraums",
+        null=True,
+    )
+    text_message_clicks = models.IntegerField(
+        verbose_name="Nachricht senden",
+        help_text="Klicks auf „Nachricht senden“ im Zeitraum",
+        null=True,
+    )
+    email_contacts = models.IntegerField(
+        verbose_name="Email senden",
+        help_text="Klicks auf „Email senden“ im Zeitraum",
+        null=True,
+    )
+    profile_views = models.IntegerField(
+        verbose_name="Profilansichten",
+        help_text="Profilansichten im Zeitraum",
+        null=True,
+    )
+
+    def __str__(self):
+        return f"{self.start_date} ({self.get_period_display()}) - {self.insta.name}"
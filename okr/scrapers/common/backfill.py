@@ -0,0 +1,209 @@
+"""Resume full scrapes of new products where they stopped.
+
+The ``scrape_full`` functions request years of data for a new product. They run in the
+worker, so a restart (e.g. the daily restart of the dyno) or a crash used to throw all
+of that work away. Inside :func:`checkpointed`, each step of a full scrape, and for
+date-based steps each month, is recorded as
+:class:`~okr.models.jobs.BackfillCheckpoint` once it is done. Running the full scrape
+again skips these parts. The checkpoints are removed when the full scrape completes.
+
+Steps report products they couldn't process with :func:`mark_incomplete`, so their
+parts are repeated on the next run instead of being recorded as done. Unfinished
+backfills are started again by :meth:`~okr.scrapers.scheduler.resume_backfills` when
+the worker starts.
+"""
+
+import datetime as dt
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from django.apps import apps
+from django.db.models import Model
+from loguru import logger
+from sentry_sdk import capture_exception
+
+from ...models import Backfill, BackfillCheckpoint
+from .instrumentation import job_name, resolve_job
+from .utils import local_today
+
+Window = Tuple[Optional[dt.date], Optional[dt.date]]
+
+
+@dataclass
+class _Part:
+    """State of the part of a step that is currently running."""
+
+    complete: bool = True
+
+
+_current_part: ContextVar[Optional[_Part]] = ContextVar("backfill_part", default=None)
+
+
+def mark_incomplete():
+    """Record that the running part of a backfill missed data and has to be repeated.
+
+    Call this when a product is skipped or fails. Does nothing outside of a backfill.
+    """
+    part = _current_part.get()
+
+    if part is not None:
+        part.complete = False
+
+
+def monthly_windows(start_date: dt.date, end_date: Optional[dt.date]) -> List[Window]:
+    """Split a date range into calendar months, most recent first.
+
+    The windows don't depend on the day the backfill runs, so the checkpoints of an
+    earlier run still match. Only the most recent window keeps ``end_date``, which may
+    be None to use the default of the step.
+
+    Args:
+        start_date (dt.date): First day of the range.
+        end_date (Optional[dt.date]): Last day of the range, or None for today.
+
+    Returns:
+        List[Window]: Start and end date of each window.
+    """
+    last_day = end_date or local_today()
+    windows = []
+    window_end = end_date
+
+    while last_day >= start_date:
+        month_start = max(last_day.replace(day=1), start_date)
+        windows.append((month_start, window_end))
+        last_day = month_start - dt.timedelta(days=1)
+        window_end = last_day
+
+    return windows
+
+
+class Checkpoints:
+    """Runs the steps of a backfill and records which parts are done."""
+
+    def __init__(self, backfill: Backfill):
+        self.backfill = backfill
+        self.complete = True
+
+    def _is_done(self, step: str, window: Window) -> bool:
+        return self.backfill.checkpoints.filter(
+            step=step,
+            start_date=window[0],
+            end_date=window[1],
+        ).exists()
+
+    def run(self, step: Callable, *, monthly: bool = False, **kwargs):
+        """Run a step of the backfill, skipping the parts that are already done.
+
+        Exceptions are reported to Sentry and leave the part to be repeated, the
+        remaining parts and steps still run.
+
+        Args:
+            step (Callable): Scraper function to call with ``kwargs``.
+            monthly (bool, optional): Whether to call ``step`` once per calendar month
+                between ``start_date`` and ``end_date`` instead of once for the whole
+                time range. Defaults to False.
+            **kwargs: Keyword arguments for ``step``, e.g. ``start_date``,
+                ``end_date`` and the product filter.
+        """
+        name = job_name(step)
+        start_date = kwargs.pop("start_date", None)
+        end_date = kwargs.pop("end_date", None)
+
+        if monthly:
+            windows = monthly_windows(start_date, end_date)
+        else:
+            windows = [(start_date, end_date)]
+
+        for window in windows:
+            if self._is_done(name, window):
+                logger.debug("Skipping {} {}, already done", name, window)
+                continue
+
+            window_kwargs = {}
+            if window[0] is not None:
+                window_kwargs["start_date"] = window[0]
+            if window[1] is not None:
+                window_kwargs["end_date"] = window[1]
+
+            part = _Part()
+            token = _current_part.set(part)
+
+            try:
+                step(**window_kwargs, **kwargs)
+            except Exception as e:
+                logger.exception("{} failed in backfill {}", name, self.backfill)
+                capture_exception(e)
+                part.complete = False
+            finally:
+                _current_part.reset(token)
+
+            if part.complete:
+                BackfillCheckpoint.objects.create(
+                    backfill=self.backfill,
+                    step=name,
+                    start_date=window[0],
+                    end_date=window[1],
+                )
+            else:
+                self.complete = False
+
+
+@contextmanager
+def checkpointed(job: Callable, product: Model) -> Iterator[Checkpoints]:
+    """Run the steps of a full scrape so it can be resumed.
+
+    Args:
+        job (Callable): The ``scrape_full`` function.
+        product (Model): The product that is scraped.
+
+    Yields:
+        Checkpoints: Object to run the steps with.
+    """
+    backfill, created = Backfill.objects.get_or_create(
+        job=job_name(job),
+        product_type=product._meta.label_lower,
+        product_id=product.pk,
+    )
+
+    if not created:
+        logger.info(
+            "Resuming backfill {} with {} parts done",
+            backfill,
+            backfill.checkpoints.count(),
+        )
+
+    checkpoints = Checkpoints(backfill)
+    yield checkpoints
+
+    if checkpoints.complete:
+        backfill.delete()
+    else:
+        logger.warning("Backfill {} is incomplete, it will be resumed", backfill)
+
+
+def pending_backfills() -> Iterator[Tuple[Callable, Model]]:
+    """Find the backfills that haven't been completed yet.
+
+    Backfills of products that were deleted in the meantime are removed.
+
+    Yields:
+        Tuple[Callable, Model]: The ``scrape_full`` function and the product.
+    """
+    for backfill in Backfill.objects.all():
+        try:
+            func = resolve_job(backfill.job)
+            model = apps.get_model(backfill.product_type)
+        except (ImportError, AttributeError, LookupError, ValueError) as e:
+            capture_exception(e)
+            logger.exception("Cannot resume backfill {}", backfill)
+            continue
+
+        product = model.objects.filter(pk=backfill.product_id).first()
+
+        if product is None:
+            backfill.delete()
+            continue
+
+        yield func, product
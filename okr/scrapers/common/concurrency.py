@@ -0,0 +1,138 @@
+"""Process the products of a scraper in parallel threads.
+
+Most scrapers spend nearly all of their time waiting for an API to respond to the
+request for a single account. :func:`for_each_product` runs these requests in
+parallel, bounded per data source, so a run takes about as long as its slowest account
+instead of the sum of all of them.
+
+The limit for a source is read from the environment variable
+``SCRAPER_CONCURRENCY_<SOURCE>`` (e.g. ``SCRAPER_CONCURRENCY_QUINTLY=8``) and defaults
+to :data:`DEFAULT_CONCURRENCY`. It applies to all jobs of the process together, so
+jobs that run at the same time share it. A limit of ``1`` processes the products one
+after another in the calling thread, which is always the case for SQLite, as it only
+allows a single writer at a time.
+"""
+
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, TypeVar, Union
+
+from django.db import close_old_connections, connection
+from loguru import logger
+from sentry_sdk import capture_exception
+
+from . import backfill, instrumentation, locks
+
+DEFAULT_CONCURRENCY = {
+    "gsc": 4,
+    "quintly": 4,
+    "sophora": 4,
+    "webtrekk": 4,
+}
+
+ProductType = TypeVar("ProductType")
+
+_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_semaphores_lock = threading.Lock()
+
+
+def concurrency_limit(source: str) -> int:
+    """Get the number of products of ``source`` that may be processed at once.
+
+    Args:
+        source (str): Name of the data source, e.g. ``"quintly"``.
+
+    Returns:
+        int: The limit, at least 1.
+    """
+    value = os.environ.get(f"SCRAPER_CONCURRENCY_{source.upper()}")
+
+    try:
+        limit = int(value) if value else DEFAULT_CONCURRENCY.get(source, 1)
+    except ValueError:
+        logger.warning("Invalid concurrency limit {!r} for {}", value, source)
+        limit = DEFAULT_CONCURRENCY.get(source, 1)
+
+    return max(limit, 1)
+
+
+def _semaphore(source: str, limit: int) -> threading.BoundedSemaphore:
+    with _semaphores_lock:
+        if source not in _semaphores:
+            _semaphores[source] = threading.BoundedSemaphore(limit)
+        return _semaphores[source]
+
+
+def _run_for_product(
+    func: Callable[[ProductType], Any], product: ProductType, job: str
+):
+    with locks.lock(job, product) as acquired:
+        if not acquired:
+            logger.info("Skipping {} for {}, another run is in progress", job, product)
+            backfill.mark_incomplete()
+            return
+
+        try:
+            func(product)
+        except Exception as e:
+            logger.exception("Failed to run {} for {}", job, product)
+            capture_exception(e)
+            backfill.mark_incomplete()
+
+
+def _run_in_thread(
+    func: Callable[[ProductType], Any],
+    product: ProductType,
+    job: str,
+    semaphore: threading.BoundedSemaphore,
+):
+    try:
+        with semaphore, instrumentation.record_thread():
+            _run_for_product(func, product, job)
+    finally:
+        close_old_connections()
+
+
+def for_each_product(
+    products: Iterable[ProductType],
+    func: Callable[[ProductType], Any],
+    *,
+    job: Union[Callable, str],
+    source: str,
+):
+    """Call ``func`` for each product, in parallel up to the limit of ``source``.
+
+    Like a loop over :func:`~okr.scrapers.common.locks.locked`, each product is locked
+    while it is processed and exceptions are reported to Sentry without affecting the
+    other products. Returns once all products are processed.
+
+    Args:
+        products (Iterable[ProductType]): Products to process, e.g. a queryset.
+        func (Callable[[ProductType], Any]): Function to call with each product.
+        job (Union[Callable, str]): The scraper function or its name, used for locks
+            and logs.
+        source (str): Name of the data source ``func`` requests data from, e.g.
+            ``"quintly"``.
+    """
+    name = job if isinstance(job, str) else instrumentation.job_name(job)
+    products = list(products)
+    limit = concurrency_limit(source)
+
+    if limit == 1 or len(products) <= 1 or connection.vendor == "sqlite":
+        for product in products:
+            _run_for_product(func, product, name)
+        return
+
+    semaphore = _semaphore(source, limit)
+
+    with ThreadPoolExecutor(
+        max_workers=min(limit, len(products)),
+        thread_name_prefix=f"{source}-{name}",
+    ) as executor:
+        for product in products:
+            # Each thread gets a copy of the context, to keep lock and instrumentation
+            # settings of the job
+            context = contextvars.copy_context()
+            executor.submit(context.run, _run_in_thread, func, product, name, semaphore)
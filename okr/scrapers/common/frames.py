@@ -0,0 +1,238 @@
+"""Turn the DataFrames returned by Quintly and BigQuery into model instances.
+
+Looping over a DataFrame with ``iterrows`` creates a new :class:`pandas.Series` for
+every row, which takes most of the CPU time of a scraper for large results. Instead,
+:func:`to_models` and :func:`to_rows` convert whole columns at once and only then
+combine them into model instances or rows.
+
+The mapping from model fields to columns is given as a dict. Values are either the
+name of a column, whose missing values are replaced by ``None``, or a function that
+takes the DataFrame and returns the converted column, like the converters below:
+
+.. code-block:: python
+
+    objs = to_models(
+        InstaStory,
+        df,
+        {
+            "external_id": "externalId",
+            "created_at": local_datetimes("time"),
+            "caption": "caption",
+            "reach": filled("reach", 0),
+        },
+        insta=insta,
+    )
+"""
+
+from collections import namedtuple
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Type, Union
+
+import numpy as np
+import pandas as pd
+import pytz
+from django.db.models import Model
+
+from .utils import BERLIN
+
+Converter = Callable[[pd.DataFrame], Union[pd.Series, Any]]
+Column = Union[str, Converter]
+
+
+def _to_python(values: Union[pd.Series, Any], length: int) -> List:
+    """Convert a column to a list of Python objects with ``None`` for missing values."""
+    if not isinstance(values, pd.Series):
+        return [values] * length
+
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        objects = pd.Series(values.dt.to_pydatetime(), index=values.index, dtype=object)
+    elif pd.api.types.is_timedelta64_dtype(values.dtype):
+        objects = pd.Series(
+            values.dt.to_pytimedelta(), index=values.index, dtype=object
+        )
+    else:
+        objects = values.astype(object)
+
+    return objects.where(values.notna(), None).tolist()
+
+
+def _column(df: pd.DataFrame, column: Column) -> Union[pd.Series, Any]:
+    if callable(column):
+        return column(df)
+
+    return df[column]
+
+
+def columns(df: pd.DataFrame, mapping: Mapping[str, Column]) -> Dict[str, List]:
+    """Convert the columns of a DataFrame to lists of Python objects.
+
+    Args:
+        df (pd.DataFrame): The data.
+        mapping (Mapping[str, Column]): Column name or converter per output name.
+
+    Returns:
+        Dict[str, List]: Converted values per output name.
+    """
+    # Empty results often don't have any columns
+    if df.empty:
+        return {name: [] for name in mapping}
+
+    return {
+        name: _to_python(_column(df, column), len(df))
+        for name, column in mapping.items()
+    }
+
+
+def to_rows(
+    df: pd.DataFrame, mapping: Optional[Mapping[str, Column]] = None
+) -> Iterator[tuple]:
+    """Iterate over the converted rows of a DataFrame.
+
+    Replacement for ``df.iterrows()`` for loops that need more than
+    :func:`to_models`. Values are accessed as attributes, like with ``iterrows``.
+
+    Args:
+        df (pd.DataFrame): The data.
+        mapping (Optional[Mapping[str, Column]], optional): Column name or
+            converter per attribute of the rows. Defaults to None, meaning all columns
+            with missing values replaced by ``None``.
+
+    Yields:
+        tuple: Named tuple for each row.
+    """
+    if mapping is None:
+        mapping = {column: column for column in df.columns}
+
+    data = columns(df, mapping)
+    Row = namedtuple("Row", data.keys(), rename=True)
+
+    for values in zip(*data.values()):
+        yield Row._make(values)
+
+
+def to_models(
+    model: Type[Model],
+    df: pd.DataFrame,
+    fields: Mapping[str, Column],
+    **constants: Any,
+) -> Iterator[Model]:
+    """Create unsaved model instances from the rows of a DataFrame.
+
+    Args:
+        model (Type[Model]): Model to create instances of.
+        df (pd.DataFrame): The data.
+        fields (Mapping[str, Column]): Column name or converter per model field.
+        **constants: Values for fields that are the same for all rows, e.g. the
+            product the data belongs to.
+
+    Yields:
+        Model: An instance for each row.
+    """
+    data = columns(df, fields)
+    names = list(data.keys())
+
+    for values in zip(*data.values()):
+        yield model(**constants, **dict(zip(names, values)))
+
+
+def local_datetimes(column: str, tz: pytz.BaseTzInfo = BERLIN) -> Converter:
+    """Parse naive ISO date/time strings as local time, like
+    :func:`~okr.scrapers.common.utils.as_local_tz`.
+
+    Args:
+        column (str): Name of the column.
+        tz (pytz.BaseTzInfo, optional): Time zone of the values. Defaults to BERLIN.
+    """
+
+    def convert(df: pd.DataFrame) -> pd.Series:
+        values = pd.to_datetime(df[column])
+
+        if values.dt.tz is not None:
+            return values.dt.tz_convert(tz)
+
+        return values.dt.tz_localize(
+            tz,
+            # Same as pytz' localize(): ambiguous times are standard time and times
+            # skipped by the DST change are shifted by an hour
+            ambiguous=np.zeros(len(values), dtype=bool),
+            nonexistent=pd.Timedelta(hours=1),
+        )
+
+    return convert
+
+
+def dates(column: str) -> Converter:
+    """Parse the date part of ISO date or date/time strings.
+
+    Args:
+        column (str): Name of the column.
+    """
+
+    def convert(df: pd.DataFrame) -> pd.Series:
+        values = pd.to_datetime(df[column].str.slice(0, 10), format="%Y-%m-%d")
+        return pd.Series(values.dt.date, index=values.index).where(values.notna())
+
+    return convert
+
+
+def timedeltas(column: str, unit: str = "s") -> Converter:
+    """Convert numbers to durations, like :func:`~okr.scrapers.common.utils.to_timedelta`.
+
+    Args:
+        column (str): Name of the column.
+        unit (str, optional): Unit of the numbers, e.g. ``"m"`` for minutes.
+            Defaults to ``"s"``.
+    """
+
+    def convert(df: pd.DataFrame) -> pd.Series:
+        # Missing values are cast to integers internally, but end up as NaT
+        with np.errstate(invalid="ignore"):
+            return pd.to_timedelta(pd.to_numeric(df[column]), unit=unit)
+
+    return convert
+
+
+def bools(column: str, default: Optional[bool] = None) -> Converter:
+    """Parse ``"1"`` and ``"0"`` strings, like
+    :func:`~okr.scrapers.common.quintly.parse_bool`.
+
+    Args:
+        column (str): Name of the column.
+        default (Optional[bool], optional): Value for anything that is not a number.
+            Defaults to None.
+    """
+
+    def convert(df: pd.DataFrame) -> pd.Series:
+        numbers = pd.to_numeric(df[column], errors="coerce")
+        parsed = (numbers != 0).astype(object)
+        return parsed.where(numbers.notna(), default)
+
+    return convert
+
+
+def truthy(column: str) -> Converter:
+    """Truth value of each value, like calling ``bool()`` on it.
+
+    Args:
+        column (str): Name of the column.
+    """
+
+    def convert(df: pd.DataFrame) -> pd.Series:
+        return df[column].map(bool, na_action="ignore").fillna(False).astype(bool)
+
+    return convert
+
+
+def filled(column: str, default: Any) -> Converter:
+    """Replace missing and empty values, like ``value or default``.
+
+    Args:
+        column (str): Name of the column.
+        default (Any): Value for missing and empty values.
+    """
+
+    def convert(df: pd.DataFrame) -> pd.Series:
+        values = df[column]
+        empty = values.isna() | (values == "") | (values == 0)
+        return values.astype(object).where(~empty, default)
+
+    return convert
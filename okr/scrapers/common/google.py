@@ -1,48 +1,92 @@
 """Set up Google service account credentials and required services.
 Requires the ``GOOGLE_SERVICE_ACCOUNT`` environment variable to be set.
+
+The services are created on first use, as building the Search Console client loads
+its discovery document. Each thread gets its own Search Console client, as its HTTP
+connection can't be shared between threads.
 """
 
+import functools
 import json
 import os
 import re
-from typing import Callable, Generator
+import threading
+from typing import Any, Callable, Generator, Optional
 
 from loguru import logger
 import pandas as pd
-from apiclient.discovery import build
+from googleapiclient.discovery import build
 from google.cloud import bigquery
 from google.cloud.bigquery.job.query import QueryJobConfig
 from google.oauth2 import service_account
 
-try:
-    credentials = service_account.Credentials.from_service_account_info(
-        json.loads(os.environ["GOOGLE_SERVICE_ACCOUNT"]),
-        scopes=[
-            "https://www.googleapis.com/auth/webmasters",
-            "https://www.googleapis.com/auth/cloud-platform",
-        ],
-    )
-
-except KeyError:
-    logger.warning(
-        "Service account info not found in environment, GSC/BigQuery-related scrapers will fail"
-    )
-    searchconsole_service = None
-    bigquery_client = None
-
-except json.JSONDecodeError:
-    logger.warning(
-        "Failed to parse service account info, GSC/BigQuery-related scrapers will fail"
-    )
-    searchconsole_service = None
-    bigquery_client = None
-
-else:
-    searchconsole_service = build("searchconsole", "v1", credentials=credentials)
-    bigquery_client = bigquery.Client(
-        credentials=credentials,
-        project=credentials.project_id,
-    )
+
+@functools.lru_cache(maxsize=None)
+def get_credentials() -> Optional[service_account.Credentials]:
+    """Read the service account credentials from the environment.
+
+    Returns:
+        Optional[service_account.Credentials]: The credentials, or None if they are
+        missing or invalid.
+    """
+    try:
+        return service_account.Credentials.from_service_account_info(
+            json.loads(os.environ["GOOGLE_SERVICE_ACCOUNT"]),
+            scopes=[
+                "https://www.googleapis.com/auth/webmasters",
+                "https://www.googleapis.com/auth/cloud-platform",
+            ],
+        )
+
+    except KeyError:
+        logger.warning(
+            "Service account info not found in environment, GSC/BigQuery-related scrapers will fail"
+        )
+
+    except json.JSONDecodeError:
+        logger.warning(
+            "Failed to parse service account info, GSC/BigQuery-related scrapers will fail"
+        )
+
+    return None
+
+
+_local = threading.local()
+
+
+def get_searchconsole_service() -> Optional[Any]:
+    """Get the Search Console API client of the current thread, creating it on first
+    use.
+
+    Returns:
+        Optional[Any]: The client, or None without credentials.
+    """
+    credentials = get_credentials()
+
+    if credentials is None:
+        return None
+
+    if getattr(_local, "searchconsole_service", None) is None:
+        _local.searchconsole_service = build(
+            "searchconsole", "v1", credentials=credentials
+        )
+
+    return _local.searchconsole_service
+
+
+@functools.lru_cache(maxsize=None)
+def get_bigquery_client() -> Optional[bigquery.Client]:
+    """Get the shared BigQuery client, creating it on first use.
+
+    Returns:
+        Optional[bigquery.Client]: The client, or None without credentials.
+    """
+    credentials = get_credentials()
+
+    if credentials is None:
+        return None
+
+    return bigquery.Client(credentials=credentials, project=credentials.project_id)
 
 
 def insert_table_name(
@@ -66,22 +110,24 @@ def insert_table_name(
     return query.replace(placeholder, f"{table_prefix}{table_suffix}")
 
 
-def iter_results(
+def iter_frames(
     bigquery_client: bigquery.Client,
     query: str,
     job_config: QueryJobConfig,
     df_cleaner: Callable[[pd.DataFrame], pd.DataFrame] = None,
-) -> Generator[pd.Series, None, None]:
+) -> Generator[pd.DataFrame, None, None]:
     """
-    Page through the results of a query and yield each row as a pandas Series
+    Page through the results of a query and yield each page as a pandas DataFrame
 
     Args:
         bigquery_client (bigquery.Client): The BigQuery client
         query (str): The query to run
         job_config (QueryJobConfig): The BigQuery job config
+        df_cleaner (Callable[[pd.DataFrame], pd.DataFrame], optional): Function to
+          apply to each page
 
     Returns:
-        Generator[pd.Series, None, None]: A generator of pandas Series
+        Generator[pd.DataFrame, None, None]: A generator of pandas DataFrames
     """
 
     query_job = bigquery_client.query(query, job_config=job_config)
@@ -98,5 +144,4 @@ def iter_results(
         if df_cleaner is not None:
             df = df_cleaner(df)
 
-        for index, row in df.iterrows():
-            yield row
+        yield df
@@ -0,0 +1,331 @@
+"""Measure what each scraper job costs and store the results as
+:class:`~okr.models.jobs.JobRun`.
+
+For every run of an instrumented job, the duration, the time it waited for a free
+thread, the number and duration of database queries, the rows written per model and
+the HTTP requests per host are recorded.
+
+Database queries are counted per connection, HTTP requests are counted for all
+``requests`` sessions (used by Quintly, Spotify, Webtrekk, Sophora and BigQuery).
+Both are attributed to the job running in the current thread, or to the job that
+started the thread with :func:`record_thread`.
+"""
+
+import datetime as dt
+import functools
+import importlib
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+from apscheduler.events import JobExecutionEvent
+from django.apps import apps
+from django.db import connection
+from django.utils import timezone
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from sentry_sdk import capture_exception
+
+from ...models import JobRun
+from . import rollups
+
+_WRITE_STATEMENT = re.compile(
+    r"^\s*(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|UPDATE|DELETE\s+FROM)\s+[`\"]?(\w+)",
+    re.IGNORECASE,
+)
+
+_current_recorder: ContextVar[Optional["JobRecorder"]] = ContextVar(
+    "job_recorder", default=None
+)
+
+# Runs of scheduled jobs that still wait for their queue time, by APScheduler job ID
+_pending_runs: Dict[str, Deque[Tuple[int, dt.datetime]]] = defaultdict(deque)
+
+
+class QueryRecorder:
+    """Database execute wrapper that counts queries and written rows per model.
+
+    Use with ``connection.execute_wrapper``.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.time = 0.0
+        self.rows_written = Counter()
+        self._lock = threading.Lock()
+        self._models = {
+            model._meta.db_table: model._meta.label for model in apps.get_models()
+        }
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            match = _WRITE_STATEMENT.match(sql)
+
+            with self._lock:
+                self.time += duration
+                self.queries += 1
+
+                if match:
+                    table = match.group(1)
+                    self.rows_written[self._models.get(table, table)] += self._rowcount(
+                        sql, params, many, context["cursor"]
+                    )
+
+    @staticmethod
+    def _rowcount(sql: str, params, many: bool, cursor) -> int:
+        rowcount = getattr(cursor, "rowcount", -1)
+        if rowcount > 0 or " RETURNING " not in sql or not params:
+            return max(rowcount, 0)
+
+        # SQLite only reports the row count of INSERT ... RETURNING once all rows
+        # have been fetched, so count the inserted rows from the parameters instead
+        if many:
+            return len(params)
+        columns = sql[sql.index("(") + 1 : sql.index(")")].count(",") + 1
+        return len(params) // columns
+
+
+class JobRecorder:
+    """Collects the database and HTTP activity of a single job run."""
+
+    def __init__(self):
+        self.queries = QueryRecorder()
+        self.http_hosts = defaultdict(lambda: {"requests": 0, "time": 0.0})
+        self._lock = threading.Lock()
+
+    @property
+    def http_requests(self) -> int:
+        return sum(host["requests"] for host in self.http_hosts.values())
+
+    @property
+    def http_time(self) -> float:
+        return sum(host["time"] for host in self.http_hosts.values())
+
+    def record_http(self, host: str, seconds: float):
+        with self._lock:
+            self.http_hosts[host]["requests"] += 1
+            self.http_hosts[host]["time"] += seconds
+
+    @contextmanager
+    def record(self) -> Iterator["JobRecorder"]:
+        """Attribute all activity of the current thread to this recorder."""
+        token = _current_recorder.set(self)
+        try:
+            with connection.execute_wrapper(self.queries):
+                yield self
+        finally:
+            _current_recorder.reset(token)
+
+
+@contextmanager
+def record_thread() -> Iterator[None]:
+    """Attribute the database queries of a helper thread to the job that started it.
+
+    Has to run in a copy of the job's context (see ``contextvars.copy_context``).
+    """
+    recorder = _current_recorder.get()
+
+    if recorder is None:
+        yield
+        return
+
+    with connection.execute_wrapper(recorder.queries):
+        yield
+
+
+def _send(send: Callable) -> Callable:
+    @functools.wraps(send)
+    def wrapper(self, request, *args, **kwargs):
+        recorder = _current_recorder.get()
+        if recorder is None:
+            return send(self, request, *args, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            return send(self, request, *args, **kwargs)
+        finally:
+            host = urlsplit(request.url).hostname or "unknown"
+            recorder.record_http(host, time.perf_counter() - start)
+
+    wrapper._instrumented = True
+    return wrapper
+
+
+def install_http_instrumentation():
+    """Count HTTP requests made through ``requests`` for the running job.
+
+    Safe to call multiple times.
+    """
+    if not getattr(HTTPAdapter.send, "_instrumented", False):
+        HTTPAdapter.send = _send(HTTPAdapter.send)
+
+
+def job_name(func: Callable) -> str:
+    """Name of a job as stored in :class:`~okr.models.jobs.JobRun`.
+
+    Args:
+        func (Callable): The job function.
+
+    Returns:
+        str: Name relative to :mod:`okr.scrapers`, e.g. ``insta.scrape_insights``.
+    """
+    module = func.__module__.replace("okr.scrapers.", "")
+    return f"{module}.{func.__name__}"
+
+
+def resolve_job(name: str) -> Callable:
+    """Import the job function of a name created by :func:`job_name`.
+
+    Args:
+        name (str): Name relative to :mod:`okr.scrapers`, e.g. ``insta.scrape_full``.
+
+    Raises:
+        ImportError: If the module doesn't exist.
+        AttributeError: If the module has no such function.
+
+    Returns:
+        Callable: The job function.
+    """
+    module_name, _, func_name = name.rpartition(".")
+    module = importlib.import_module(f"okr.scrapers.{module_name}")
+    return getattr(module, func_name)
+
+
+def _save_run(
+    func: Callable,
+    recorder: JobRecorder,
+    *,
+    source: str,
+    executor: str,
+    arguments: str,
+    started_at: dt.datetime,
+    duration: float,
+    queued_at: Optional[dt.datetime],
+    error: Optional[BaseException],
+) -> Optional[JobRun]:
+    try:
+        return JobRun.objects.create(
+            job=job_name(func),
+            source=source,
+            executor=executor,
+            arguments=arguments,
+            started_at=started_at,
+            queue_wait=started_at - queued_at if queued_at else None,
+            duration=dt.timedelta(seconds=duration),
+            db_queries=recorder.queries.queries,
+            db_time=dt.timedelta(seconds=recorder.queries.time),
+            http_requests=recorder.http_requests,
+            http_time=dt.timedelta(seconds=recorder.http_time),
+            http_hosts=dict(recorder.http_hosts),
+            rows_written=sum(recorder.queries.rows_written.values()),
+            rows_written_per_model=dict(recorder.queries.rows_written),
+            success=error is None,
+            error=repr(error) if error else "",
+        )
+    except Exception as e:
+        # Never fail a job because its measurements couldn't be stored
+        capture_exception(e)
+        logger.exception("Failed to store run of {}", job_name(func))
+
+
+def instrument(
+    func: Callable,
+    *,
+    source: str = JobRun.Source.SCHEDULER,
+    executor: str = "",
+    arguments: str = "",
+    queued_at: Optional[dt.datetime] = None,
+    job_id: Optional[str] = None,
+) -> Callable:
+    """Wrap a job function so each call is measured and stored as
+    :class:`~okr.models.jobs.JobRun`.
+
+    Exceptions raised by ``func`` are recorded and then re-raised. The rollups of the
+    data written by ``func`` are refreshed when it ends, see
+    :func:`~okr.scrapers.common.rollups.collect`.
+
+    Args:
+        func (Callable): The job function.
+        source (str, optional): One of :class:`~okr.models.jobs.JobRun.Source`.
+            Defaults to ``JobRun.Source.SCHEDULER``.
+        executor (str, optional): Name of the executor running the job. Defaults to
+            ``""``.
+        arguments (str, optional): Description of the arguments ``func`` is called
+            with. Defaults to ``""``.
+        queued_at (Optional[dt.datetime], optional): Time the job was requested, to
+            calculate the queue wait from. Defaults to None.
+        job_id (Optional[str], optional): ID of the APScheduler job, to fill in the
+            queue wait from :func:`record_queue_wait` later. Defaults to None.
+
+    Returns:
+        Callable: The wrapped function.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs) -> Any:
+        recorder = JobRecorder()
+        started_at = timezone.now()
+        start = time.perf_counter()
+        error = None
+
+        try:
+            with recorder.record(), rollups.collect():
+                return func(*args, **kwargs)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            run = _save_run(
+                func,
+                recorder,
+                source=source,
+                executor=executor,
+                arguments=arguments,
+                started_at=started_at,
+                duration=time.perf_counter() - start,
+                queued_at=queued_at,
+                error=error,
+            )
+            if run and job_id:
+                _pending_runs[job_id].append((run.pk, started_at))
+
+    return wrapper
+
+
+def record_queue_wait(event: JobExecutionEvent):
+    """Scheduler listener that stores how long a scheduled job waited to start.
+
+    APScheduler only reports the scheduled run time after the job is done, so this
+    updates the run stored by the wrapper from :func:`instrument`.
+
+    Args:
+        event (JobExecutionEvent): Event for an executed or failed job.
+    """
+    pending = _pending_runs.get(event.job_id)
+    if not pending:
+        return
+
+    pk, started_at = pending.popleft()
+    JobRun.objects.filter(pk=pk).update(
+        queue_wait=max(started_at - event.scheduled_run_time, dt.timedelta(0))
+    )
+
+
+def instrument_scheduled_jobs(scheduler):
+    """Replace the functions of all jobs of ``scheduler`` with instrumented ones.
+
+    Args:
+        scheduler (BaseScheduler): Scheduler with jobs added.
+    """
+    for job in scheduler.get_jobs():
+        if getattr(job.func, "__wrapped__", None) is None:
+            job.modify(func=instrument(job.func, executor=job.executor, job_id=job.id))
@@ -0,0 +1,180 @@
+"""Redis locks to keep overlapping scraper runs from processing the same product.
+
+Scheduled runs and full scrapes of new products (see
+:meth:`~okr.scrapers.scheduler.run_in_executor`) can overlap, e.g. when a run of
+:meth:`~okr.scrapers.pages.scrape_sophora_nodes` takes longer than its interval, or
+when the worker is restarted during a deployment. Scrapers iterate over their products
+with :func:`locked`, so each product is only processed by one run of a scraper at a
+time. The locks are shared between processes through :data:`app.redis.conn`.
+
+By default, runs skip products that another run is already processing, since that run
+writes the same data. Code running inside :func:`wait_for_locks` waits for the other
+run to finish instead, so on-demand scrapes aren't dropped.
+
+While a block holds a lock, a background thread renews it every third of its timeout,
+so products that take longer than the timeout stay locked. The lock only expires if
+the process holding it dies.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, Iterator, Optional, TypeVar, Union
+
+from django.db.models import Model
+from loguru import logger
+from redis.exceptions import LockError, RedisError
+from redis.lock import Lock
+from sentry_sdk import capture_exception
+
+from app.redis import conn
+from .backfill import mark_incomplete
+from .instrumentation import job_name
+
+# Locks expire after this many seconds in case the process holding them dies
+DEFAULT_TIMEOUT = 30 * 60
+
+# Share of the timeout after which a held lock is renewed
+RENEW_FRACTION = 1 / 3
+
+_wait_timeout: ContextVar[Optional[float]] = ContextVar(
+    "lock_wait_timeout", default=None
+)
+
+ProductType = TypeVar("ProductType", bound=Model)
+
+
+def lock_key(job: str, product: Optional[Model] = None) -> str:
+    """Build the Redis key for the lock of a job and, optionally, a product.
+
+    Args:
+        job (str): Name of the job, e.g. ``podcasts.scrape_feed``.
+        product (Optional[Model], optional): Product processed by the job. Defaults to
+            None.
+
+    Returns:
+        str: The Redis key.
+    """
+    key = f"okr:lock:{job}"
+
+    if product is not None:
+        key = f"{key}:{product._meta.label_lower}:{product.pk}"
+
+    return key
+
+
+def _renew(key: str, redis_lock: Lock, interval: float, stopped: threading.Event):
+    while not stopped.wait(interval):
+        try:
+            redis_lock.reacquire()
+        except LockError:
+            logger.warning("Lock {} expired before it was renewed", key)
+            return
+        except RedisError as e:
+            capture_exception(e)
+            logger.warning("Could not renew lock {}", key)
+
+
+@contextmanager
+def lock(
+    job: str, product: Optional[Model] = None, *, timeout: int = DEFAULT_TIMEOUT
+) -> Iterator[bool]:
+    """Hold the lock for a job and product while the block is running.
+
+    The lock is renewed in the background while the block is running. If Redis is not
+    available, the block runs without a lock, since scraping twice is better than not
+    scraping at all.
+
+    Args:
+        job (str): Name of the job, e.g. ``podcasts.scrape_feed``.
+        product (Optional[Model], optional): Product processed by the job. Defaults to
+            None.
+        timeout (int, optional): Seconds after which the lock expires unless it is
+            renewed. Defaults to ``DEFAULT_TIMEOUT``.
+
+    Yields:
+        bool: Whether the lock was acquired (or Redis is not available).
+    """
+    key = lock_key(job, product)
+    # The token must be visible to the thread renewing the lock
+    redis_lock = conn.lock(key, timeout=timeout, thread_local=False)
+    wait_timeout = _wait_timeout.get()
+
+    try:
+        acquired = redis_lock.acquire(
+            blocking=wait_timeout is not None,
+            blocking_timeout=wait_timeout,
+        )
+    except RedisError as e:
+        capture_exception(e)
+        logger.warning("Could not acquire lock {}, continuing without it", key)
+        redis_lock = None
+        acquired = True
+
+    stopped = threading.Event()
+    if acquired and redis_lock is not None:
+        threading.Thread(
+            target=_renew,
+            args=(key, redis_lock, timeout * RENEW_FRACTION, stopped),
+            name=f"renew-{key}",
+            daemon=True,
+        ).start()
+
+    try:
+        yield acquired
+    finally:
+        stopped.set()
+        if acquired and redis_lock is not None:
+            try:
+                redis_lock.release()
+            except (LockError, RedisError):
+                logger.warning("Lock {} expired before it was released", key)
+
+
+def locked(
+    products: Iterable[ProductType],
+    job: Union[Callable, str],
+    *,
+    timeout: int = DEFAULT_TIMEOUT,
+) -> Iterator[ProductType]:
+    """Iterate over the products that are not being processed by another run of
+    ``job``.
+
+    Each product stays locked until the next one is requested.
+
+    Args:
+        products (Iterable[ProductType]): Products to process, e.g. a queryset.
+        job (Union[Callable, str]): The scraper function or its name.
+        timeout (int, optional): Seconds after which a lock expires unless it is
+            renewed. Defaults to ``DEFAULT_TIMEOUT``.
+
+    Yields:
+        ProductType: Products to process.
+    """
+    name = job if isinstance(job, str) else job_name(job)
+
+    for product in products:
+        with lock(name, product, timeout=timeout) as acquired:
+            if not acquired:
+                logger.info(
+                    "Skipping {} for {}, another run is in progress", name, product
+                )
+                mark_incomplete()
+                continue
+
+            yield product
+
+
+@contextmanager
+def wait_for_locks(timeout: float = DEFAULT_TIMEOUT) -> Iterator[None]:
+    """Wait for other runs to release their locks instead of skipping the product.
+
+    Args:
+        timeout (float, optional): Maximum seconds to wait for each lock. Defaults to
+            ``DEFAULT_TIMEOUT``.
+    """
+    token = _wait_timeout.set(timeout)
+    try:
+        yield
+    finally:
+        _wait_timeout.reset(token)
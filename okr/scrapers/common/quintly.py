@@ -1,13 +1,84 @@
-"""Basic functions to connect to Quintly API."""
+"""Basic functions to connect to Quintly API.
 
-import os
+Queries should be made with :func:`run_query`, which caches the results of final days
+on the local file system, so that jobs with overlapping time ranges (e.g. periodic
+scrapes and backfills) don't request the same data again. The results are cached per
+profile, table, fields, interval and day as Arrow/Feather files, which are memory-mapped
+when they are read.
+
+Days are final once they are older than the settle window of Quintly (see
+:func:`~okr.scrapers.common.watermarks.settle_window`); more recent days are always
+requested. Cached days are used for ``SCRAPER_CACHE_HOURS_QUINTLY`` hours (default: 24,
+``0`` disables the cache) and are stored in ``SCRAPER_CACHE_DIR`` (default: a
+directory in the temporary directory of the system).
+
+Scrapers process their accounts with :func:`for_each_account`, which requests each
+table once for all accounts of a platform (see :func:`batched`) instead of once per
+account, and splits the result by profile. Queries for several profiles always request
+the ``profileId`` field for this.
+"""
+
+import datetime as dt
 import functools
-from typing import Callable, Optional
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-from analytics.quintly import QuintlyAPI
+import pandas as pd
+from analytics.quintly import QuintlyAPI, QuintlyRequest
+from loguru import logger
+from requests.exceptions import HTTPError
+from sentry_sdk import capture_exception
 
+from ...models.base import Quintly
+from .concurrency import for_each_product
+from .ratelimit import MAX_RETRIES, get_limiter
+from .utils import date_range, local_now
+from .watermarks import settle_window
 
 quintly = None
+_quintly_lock = threading.Lock()
+
+DEFAULT_CACHE_TTL = dt.timedelta(hours=24)
+
+
+class RateLimitedQuintlyRequest(QuintlyRequest):
+    """Quintly request that keeps within the rate limit of the Quintly API.
+
+    ``QuintlyAPI.run_query`` only prints errors of single requests, so requests that
+    were answered with ``429 Too Many Requests`` are repeated here.
+
+    ``QuintlyRequest`` keeps the parameters and the response of a request on the
+    instance, and all threads share the request of the client. Each request is
+    therefore sent with a new ``QuintlyRequest``.
+    """
+
+    def _send_once(self, **kwargs):
+        return QuintlyRequest(self._quintly_api).send(**kwargs)
+
+    def send(self, **kwargs):
+        limiter = get_limiter("quintly")
+
+        for _ in range(MAX_RETRIES):
+            limiter.acquire()
+
+            try:
+                return self._send_once(**kwargs)
+            except HTTPError as e:
+                if e.response is None or e.response.status_code != 429:
+                    raise
+
+                limiter.backoff(e.response.headers.get("Retry-After"))
+
+        limiter.acquire()
+        return self._send_once(**kwargs)
 
 
 def requires_quintly(func: Callable) -> Callable:
@@ -23,16 +94,402 @@ def requires_quintly(func: Callable) -> Callable:
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         global quintly
-        if not quintly:
-            quintly = QuintlyAPI(
-                os.environ.get("QUINTLY_CLIENT_ID"),
-                os.environ.get("QUINTLY_CLIENT_SECRET"),
-            )
+        # Accounts are scraped in several threads, which must share one client
+        with _quintly_lock:
+            if not quintly:
+                client = QuintlyAPI(
+                    os.environ.get("QUINTLY_CLIENT_ID"),
+                    os.environ.get("QUINTLY_CLIENT_SECRET"),
+                )
+                client._request = RateLimitedQuintlyRequest(client)
+                quintly = client
         return func(*args, **kwargs)
 
     return wrapper
 
 
+def cache_ttl() -> dt.timedelta:
+    """Get how long cached days of Quintly queries are used.
+
+    Returns:
+        dt.timedelta: The time to live, zero if the cache is disabled.
+    """
+    value = os.environ.get("SCRAPER_CACHE_HOURS_QUINTLY")
+
+    try:
+        return dt.timedelta(hours=float(value)) if value else DEFAULT_CACHE_TTL
+    except ValueError:
+        logger.warning("Invalid Quintly cache time {!r}", value)
+        return DEFAULT_CACHE_TTL
+
+
+def _cache_dir() -> Path:
+    default = Path(tempfile.gettempdir()) / "okr-cache"
+    return Path(os.environ.get("SCRAPER_CACHE_DIR") or default) / "quintly"
+
+
+def _cache_path(
+    profile_id: int, table: str, fields: List[str], interval: str, day: dt.date
+) -> Path:
+    """Content address of the data of a profile on a single day."""
+    key = json.dumps([profile_id, table, fields, interval, day.isoformat()])
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return _cache_dir() / digest[:2] / f"{digest}.feather"
+
+
+def _load_slice(path: Path, ttl: dt.timedelta) -> Optional[pd.DataFrame]:
+    try:
+        modified = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+    if time.time() - modified > ttl.total_seconds():
+        path.unlink(missing_ok=True)
+        return None
+
+    from pyarrow import feather
+
+    try:
+        return feather.read_table(path, memory_map=True).to_pandas()
+    except (OSError, ValueError) as e:
+        logger.warning("Removing unreadable Quintly cache file {}: {}", path, e)
+        path.unlink(missing_ok=True)
+        return None
+
+
+def _store_slice(path: Path, df: pd.DataFrame):
+    from pyarrow import feather
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+
+    # Uncompressed, so the file can be memory-mapped when it is read
+    feather.write_feather(df, temp_path, compression="uncompressed")
+    os.replace(temp_path, path)
+
+
+def _day_ranges(days: List[dt.date]) -> Iterator[Tuple[dt.date, dt.date]]:
+    """Group sorted days into ranges of consecutive days."""
+    start = end = None
+
+    for day in days:
+        if end is not None and day == end + dt.timedelta(days=1):
+            end = day
+            continue
+
+        if start is not None:
+            yield start, end
+        start = end = day
+
+    if start is not None:
+        yield start, end
+
+
+def _split(
+    df: pd.DataFrame, profile_ids: List[int], days: List[dt.date]
+) -> Optional[Dict[Tuple[int, dt.date], pd.DataFrame]]:
+    """Split the result of a query into the rows of each profile and day. None if it
+    can't be split or stored.
+    """
+    if "time" not in df.columns or not pd.api.types.is_string_dtype(df["time"]):
+        return None
+
+    # Structured values would change their type in Arrow
+    for column in df.columns[df.dtypes == object]:
+        if df[column].map(lambda value: isinstance(value, (dict, list))).any():
+            return None
+
+    if "profileId" in df.columns:
+        profile_column = df["profileId"]
+    elif len(profile_ids) == 1:
+        profile_column = pd.Series(profile_ids[0], index=df.index)
+    else:
+        return None
+
+    day_column = df["time"].str[:10]
+    slices = {
+        (profile_id, day): df[
+            (profile_column == profile_id) & (day_column == day.isoformat())
+        ].reset_index(drop=True)
+        for profile_id in profile_ids
+        for day in days
+    }
+
+    # Rows that can't be assigned, e.g. of unexpected profile IDs, must not get lost
+    in_days = day_column.isin([day.isoformat() for day in days]).sum()
+    if sum(len(df_slice) for df_slice in slices.values()) != in_days:
+        return None
+
+    return slices
+
+
+def _cached_query(
+    profile_ids: List[int],
+    table: str,
+    fields: List[str],
+    start_date: dt.date,
+    end_date: dt.date,
+    interval: str,
+    use_cache: bool,
+) -> pd.DataFrame:
+    """Query a Quintly table, reading final days from the cache.
+
+    Only the days that aren't cached are requested from Quintly, in as few queries as
+    possible. Final days of successful queries are added to the cache. Results for
+    several profiles contain their ``profileId``, even if it isn't one of ``fields``.
+    """
+    with_profile = len(profile_ids) > 1 and "profileId" not in fields
+    query_fields = [*fields, "profileId"] if with_profile else fields
+
+    ttl = cache_ttl()
+    cacheable = (
+        use_cache
+        and ttl
+        and interval == "daily"
+        and "time" in fields
+        and not isinstance(start_date, dt.datetime)
+        and not isinstance(end_date, dt.datetime)
+    )
+
+    if not cacheable:
+        return quintly.run_query(
+            profile_ids, table, query_fields, start_date, end_date, interval=interval
+        )
+
+    final_until = (local_now() - settle_window("quintly")).date()
+    days = date_range(start_date, end_date)
+
+    cached: Dict[dt.date, List[pd.DataFrame]] = {}
+    for day in days:
+        if day >= final_until:
+            continue
+
+        slices = []
+        for profile_id in profile_ids:
+            path = _cache_path(profile_id, table, fields, interval, day)
+            df = _load_slice(path, ttl)
+            if df is None:
+                break
+            if with_profile:
+                df = df.assign(profileId=profile_id)
+            slices.append(df)
+        else:
+            cached[day] = slices
+
+    missing = [day for day in days if day not in cached]
+    logger.debug(
+        "{} of {} days of {} cached for profiles {}",
+        len(cached),
+        len(days),
+        table,
+        profile_ids,
+    )
+
+    fetched = []
+    for start, end in _day_ranges(missing):
+        df = quintly.run_query(
+            profile_ids, table, query_fields, start, end, interval=interval
+        )
+        fetched.append(df)
+
+        # Failed requests also return empty results, so they aren't stored
+        final = [day for day in date_range(start, end) if day < final_until]
+        slices = _split(df, profile_ids, final) if final and not df.empty else None
+
+        for (profile_id, day), df_slice in (slices or {}).items():
+            path = _cache_path(profile_id, table, fields, interval, day)
+            if with_profile:
+                df_slice = df_slice.drop(columns="profileId")
+            try:
+                _store_slice(path, df_slice)
+            except (OSError, ValueError, TypeError) as e:
+                capture_exception(e)
+                logger.warning("Failed to cache Quintly data of {}", table)
+                break
+
+    if not cached:
+        return (
+            fetched[0] if len(fetched) == 1 else pd.concat(fetched, ignore_index=True)
+        )
+
+    frames = [df for day in days if day in cached for df in cached[day]]
+    frames += [df for df in fetched if not df.empty]
+
+    return pd.concat(frames, ignore_index=True)
+
+
+class _BatchEntry:
+    """Result of a query for all profiles of a batch."""
+
+    def __init__(self, profile_ids: Iterable[int]):
+        self.lock = threading.Lock()
+        self.df: Optional[pd.DataFrame] = None
+        # Profiles that haven't read the result yet
+        self.pending = set(profile_ids)
+
+
+class _Batch:
+    """Queries of the same table and time range, shared by the profiles of a batch."""
+
+    def __init__(self, profile_ids: Iterable[int]):
+        self.profile_ids = list(dict.fromkeys(profile_ids))
+        self._entries: Dict[tuple, _BatchEntry] = {}
+        self._lock = threading.Lock()
+
+    def covers(self, profile_ids: List[int]) -> bool:
+        return len(profile_ids) < len(self.profile_ids) and set(profile_ids) <= set(
+            self.profile_ids
+        )
+
+    def query(
+        self,
+        profile_ids: List[int],
+        table: str,
+        fields: List[str],
+        start_date: dt.date,
+        end_date: dt.date,
+        interval: str,
+        use_cache: bool,
+    ) -> Optional[pd.DataFrame]:
+        """Get the rows of some profiles from the query for all profiles of the batch,
+        with their ``profileId``. None if the result can't be split by profile.
+        """
+        key = (table, tuple(fields), start_date, end_date, interval, use_cache)
+
+        with self._lock:
+            entry = self._entries.setdefault(key, _BatchEntry(self.profile_ids))
+
+        with entry.lock:
+            if entry.df is None:
+                logger.debug(
+                    "Requesting {} for {} profiles at once",
+                    table,
+                    len(self.profile_ids),
+                )
+                entry.df = _cached_query(
+                    self.profile_ids,
+                    table,
+                    fields,
+                    start_date,
+                    end_date,
+                    interval,
+                    use_cache,
+                )
+
+            df = entry.df
+            entry.pending -= set(profile_ids)
+
+        # Free the memory once every profile got its rows
+        if not entry.pending:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+
+        # Failed requests also return empty results, so the profiles request again
+        if df.empty or "profileId" not in df.columns:
+            return None
+
+        if not df["profileId"].isin(self.profile_ids).all():
+            logger.warning("Unexpected profile IDs in {}, not splitting", table)
+            return None
+
+        return df[df["profileId"].isin(profile_ids)].reset_index(drop=True)
+
+
+_batch: ContextVar[Optional[_Batch]] = ContextVar("quintly_batch", default=None)
+
+
+@contextmanager
+def batched(profile_ids: Iterable[int]) -> Iterator[None]:
+    """Request the data of all profiles at once when it is requested for one of them.
+
+    Within this context, :func:`run_query` requests a table for all ``profile_ids`` in
+    a single query the first time it is called for a subset of them, and returns the
+    rows of the requested profiles from that result to all calls with the same table,
+    fields, time range and interval. Calls with other time ranges, e.g. of profiles
+    with an older watermark, start a new query for all profiles.
+
+    Args:
+        profile_ids (Iterable[int]): Quintly profile IDs of all accounts.
+    """
+    token = _batch.set(_Batch(profile_ids))
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+
+
+def for_each_account(
+    accounts: Iterable[Quintly],
+    func: Callable[[Quintly], Any],
+    *,
+    job: Union[Callable, str],
+):
+    """Call ``func`` for each account like
+    :func:`~okr.scrapers.common.concurrency.for_each_product`, with the Quintly
+    queries of all accounts :func:`batched`.
+
+    Args:
+        accounts (Iterable[Quintly]): Accounts to process, e.g. a queryset.
+        func (Callable[[Quintly], Any]): Function to call with each account.
+        job (Union[Callable, str]): The scraper function or its name.
+    """
+    accounts = list(accounts)
+
+    with batched(account.quintly_profile_id for account in accounts):
+        for_each_product(accounts, func, job=job, source="quintly")
+
+
+def run_query(
+    profile_ids: List[int],
+    table: str,
+    fields: List[str],
+    start_date: dt.date,
+    end_date: dt.date,
+    interval: str = "daily",
+    *,
+    use_cache: bool = True,
+) -> pd.DataFrame:
+    """Query a Quintly table.
+
+    Final days are read from the cache, and only the other days are requested from
+    Quintly. Within :func:`batched`, the table is requested for all profiles of the
+    batch at once, together with the ``profileId`` field to split the result.
+
+    Args:
+        profile_ids (List[int]): IDs of the profiles to request data for.
+        table (str): Name of the Quintly table.
+        fields (List[str]): Fields to request. The cache requires ``"time"``.
+        start_date (dt.date): Earliest day to request data for.
+        end_date (dt.date): Latest day to request data for.
+        interval (str, optional): Aggregation interval. Only ``"daily"`` queries are
+          cached. Defaults to "daily".
+        use_cache (bool, optional): Set to ``False`` to bypass the cache, e.g. to
+          request the current data of all days. Defaults to ``True``.
+
+    Returns:
+        pd.DataFrame: The rows of all profiles and days.
+    """
+    batch = _batch.get()
+    df = None
+
+    if batch is not None and batch.covers(profile_ids):
+        df = batch.query(
+            profile_ids, table, fields, start_date, end_date, interval, use_cache
+        )
+
+    if df is None:
+        df = _cached_query(
+            profile_ids, table, fields, start_date, end_date, interval, use_cache
+        )
+
+    # Only requested to split the result by profile
+    if "profileId" not in fields and "profileId" in df.columns:
+        df = df.drop(columns="profileId")
+
+    return df
+
+
 def parse_bool(value: str, default: Optional[bool] = None) -> Optional[bool]:
     """
     Parse bool from some quintly tables being a string with the value "1" or "0"
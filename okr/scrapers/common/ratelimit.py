@@ -0,0 +1,262 @@
+"""Token bucket rate limits for the external APIs, shared through Redis.
+
+Each API in :data:`RATE_LIMITS` has a bucket in :data:`app.redis.conn` that is filled
+with ``rate`` tokens per second, up to ``burst`` tokens. Every request takes one token
+and waits if there is none left, so all threads and processes together stay below the
+configured rate. The rate of an API can be changed with the environment variable
+``SCRAPER_RATE_LIMIT_<API>`` (requests per second, e.g.
+``SCRAPER_RATE_LIMIT_SOPHORA=5``).
+
+When an API responds with ``429 Too Many Requests``, :meth:`RateLimiter.backoff`
+pauses the bucket for the time from the ``Retry-After`` header and halves the rate.
+The rate then recovers linearly over :data:`RECOVERY_SECONDS`, so the limiter settles
+close to the actual quota of the API.
+
+Clients based on :func:`~okr.scrapers.common.sessions.get_session` are rate limited by
+passing ``rate_limit``, other clients call :meth:`RateLimiter.acquire` before each
+request themselves.
+"""
+
+import datetime as dt
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from time import sleep
+from typing import Dict, Optional, Tuple, Union
+
+from loguru import logger
+from redis.commands.core import Script
+from redis.exceptions import RedisError
+from sentry_sdk import capture_exception
+
+from app.redis import conn
+
+# Requests per second and burst size per API
+RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+    "experimental_spotify": (0.5, 1),
+    "gsc": (10.0, 10),
+    "itunes": (0.3, 1),
+    "quintly": (5.0, 10),
+    "sophora": (10.0, 20),
+    "spotify": (5.0, 10),
+    "spotify_podcasters": (2.0, 5),
+    "webtrekk": (2.0, 4),
+}
+
+# Seconds until a rate that was halved after a 429 response is back at its maximum
+RECOVERY_SECONDS = 60
+
+# The rate is never reduced below this fraction of the configured rate
+MIN_FACTOR = 1 / 16
+
+# How often a request that was answered with 429 is repeated
+MAX_RETRIES = 5
+
+# Buckets that weren't used for this many seconds are removed from Redis
+_EXPIRE_SECONDS = 60 * 60
+
+# Seconds between reports to Sentry while Redis is not available
+OUTAGE_REPORT_SECONDS = 60
+
+_ACQUIRE = """
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local recovery = tonumber(ARGV[3])
+
+local state = redis.call("HMGET", KEYS[1], "tokens", "updated", "factor", "paused")
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+local factor = tonumber(state[3]) or 1
+local paused = tonumber(state[4]) or 0
+
+if now < paused then
+    return tostring(paused - now)
+end
+
+local elapsed = math.max(now - math.max(updated, paused), 0)
+factor = math.min(1, factor + elapsed / recovery)
+tokens = math.min(burst, tokens + elapsed * rate * factor)
+
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / (rate * factor)
+end
+
+redis.call("HSET", KEYS[1], "tokens", tokens, "updated", now, "factor", factor)
+redis.call("EXPIRE", KEYS[1], ARGV[4])
+return tostring(wait)
+"""
+
+_BACKOFF = """
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local retry_after = tonumber(ARGV[2])
+local min_factor = tonumber(ARGV[3])
+
+local state = redis.call("HMGET", KEYS[1], "factor", "paused")
+local factor = math.max((tonumber(state[1]) or 1) / 2, min_factor)
+local paused = tonumber(state[2]) or 0
+
+if retry_after <= 0 then
+    retry_after = 1 / (rate * factor)
+end
+
+paused = math.max(paused, now + retry_after)
+
+redis.call(
+    "HSET", KEYS[1], "tokens", 0, "updated", now, "factor", factor, "paused", paused
+)
+redis.call("EXPIRE", KEYS[1], ARGV[4])
+return tostring(paused - now)
+"""
+
+_limiters: Dict[str, "RateLimiter"] = {}
+_limiters_lock = threading.Lock()
+
+# Lua scripts registered with conn, by source
+_scripts: Dict[str, Script] = {}
+_scripts_lock = threading.Lock()
+
+_outage_reported_at: Optional[float] = None
+_outage_lock = threading.Lock()
+
+
+def _script(source: str) -> Script:
+    with _scripts_lock:
+        if source not in _scripts:
+            _scripts[source] = conn.register_script(source)
+        return _scripts[source]
+
+
+def _report_outage(error: RedisError, limiter: "RateLimiter"):
+    """Report that Redis is not available, at most once per
+    :data:`OUTAGE_REPORT_SECONDS` for all APIs together.
+    """
+    global _outage_reported_at
+
+    now = time.monotonic()
+    with _outage_lock:
+        report = (
+            _outage_reported_at is None
+            or now - _outage_reported_at >= OUTAGE_REPORT_SECONDS
+        )
+        if report:
+            _outage_reported_at = now
+
+    if report:
+        capture_exception(error)
+        logger.warning("Rate limit of {} not available", limiter)
+    else:
+        logger.debug("Rate limit of {} not available", limiter)
+
+
+def parse_retry_after(value: Union[str, float, None]) -> Optional[float]:
+    """Parse the value of a ``Retry-After`` header.
+
+    Args:
+        value (Union[str, float, None]): Seconds or an HTTP date.
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if the value is missing or invalid.
+    """
+    if value is None:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=dt.timezone.utc)
+
+    return max((retry_at - dt.datetime.now(dt.timezone.utc)).total_seconds(), 0.0)
+
+
+class RateLimiter:
+    """Token bucket for a single API, shared through Redis."""
+
+    def __init__(self, name: str, rate: float, burst: int):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.key = f"okr:ratelimit:{name}"
+
+    def __str__(self):
+        return f"{self.name} ({self.rate}/s)"
+
+    def _run(self, script: str, *args) -> float:
+        return float(_script(script)(keys=[self.key], args=[*args, _EXPIRE_SECONDS]))
+
+    def acquire(self):
+        """Wait until a request to the API may be sent.
+
+        If Redis is not available, waits for a single interval of the configured
+        rate instead.
+        """
+        while True:
+            try:
+                wait = self._run(_ACQUIRE, self.rate, self.burst, RECOVERY_SECONDS)
+            except RedisError as e:
+                _report_outage(e, self)
+                sleep(1 / self.rate)
+                return
+
+            if wait <= 0:
+                return
+
+            sleep(wait)
+
+    def backoff(self, retry_after: Union[str, float, None] = None):
+        """Pause requests to the API and reduce the rate after a 429 response.
+
+        Args:
+            retry_after (Union[str, float, None], optional): Value of the
+                ``Retry-After`` header. If missing, pauses for one interval of the
+                reduced rate. Defaults to None.
+        """
+        seconds = parse_retry_after(retry_after) or 0.0
+
+        try:
+            paused = self._run(_BACKOFF, self.rate, seconds, MIN_FACTOR)
+        except RedisError as e:
+            _report_outage(e, self)
+            sleep(seconds or 1 / self.rate)
+            return
+
+        logger.info("Rate limit of {} reached, pausing for {:.1f}s", self, paused)
+
+
+def get_limiter(name: str) -> RateLimiter:
+    """Get the rate limiter for an API.
+
+    Args:
+        name (str): Name of the API, one of the keys of :data:`RATE_LIMITS`.
+
+    Returns:
+        RateLimiter: The rate limiter.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            rate, burst = RATE_LIMITS[name]
+            value = os.environ.get(f"SCRAPER_RATE_LIMIT_{name.upper()}")
+
+            try:
+                rate = float(value) if value else rate
+            except ValueError:
+                logger.warning("Invalid rate limit {!r} for {}", value, name)
+
+            _limiters[name] = RateLimiter(name, max(rate, 0.01), burst)
+
+        return _limiters[name]
@@ -0,0 +1,521 @@
+"""Keep the pre-aggregated data in :mod:`okr.models.rollups` up to date.
+
+Dashboards and bots mostly need totals per week or month, which used to be computed
+from the daily data (per device or per search query) on every request. Instead, each
+:class:`RollupDefinition` describes how the rows of a source model are summed up per
+product and period.
+
+Whenever :func:`~okr.scrapers.common.upsert.bulk_upsert` writes rows of a source model,
+the affected products and dates are recorded. Inside :func:`collect` (which
+:func:`~okr.scrapers.common.instrumentation.instrument` wraps around every job), the
+rollups are refreshed once when the job ends. Outside of it, e.g. in management
+commands, the changes are collected for :data:`DEFER_SECONDS` and then refreshed by a
+separate job in the worker (see :func:`flush_deferred`). Only the days, weeks and
+months that contain one of the written dates are computed again.
+
+Rollups that are expensive to compute, like the page × query data of the GSC, are
+marked as ``background``. Instead of delaying the end of the job, they are refreshed
+by :func:`refresh_rollup` in a separate job in the worker.
+
+Use the ``refresh_rollups`` management command to build the rollups for existing data.
+"""
+
+import atexit
+import datetime as dt
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Type
+
+from django.db.models import Count, F, FloatField, Model, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.dispatch import receiver
+from loguru import logger
+from sentry_sdk import capture_exception
+
+from ...models import (
+    InstaInsight,
+    InstaRollup,
+    PageDataGSC,
+    PageDataQueryGSC,
+    PageQueryRollupGSC,
+    PageRollupGSC,
+    Period,
+    PodcastEpisodeDataSpotify,
+    PodcastEpisodeRollupSpotify,
+)
+from .upsert import _batches, bulk_upsert, rows_upserted
+
+# Products per aggregation query, stays below the parameter limit of SQLite
+CHUNK_SIZE = 500
+
+# Seconds that changes outside of collect() are gathered before they are refreshed
+DEFER_SECONDS = 60
+
+_TRUNC = {
+    Period.DAY: lambda field: F(field),
+    Period.WEEK: TruncWeek,
+    Period.MONTH: TruncMonth,
+}
+
+
+def period_start(period: str, date: dt.date) -> dt.date:
+    """Get the first day of the period that contains ``date``.
+
+    Args:
+        period (str): One of :class:`~okr.models.rollups.Period`.
+        date (dt.date): Any day of the period.
+
+    Returns:
+        dt.date: The day itself, the Monday of its week or the first of its month.
+    """
+    if period == Period.WEEK:
+        return date - dt.timedelta(days=date.weekday())
+    if period == Period.MONTH:
+        return date.replace(day=1)
+    return date
+
+
+def period_end(period: str, date: dt.date) -> dt.date:
+    """Get the last day of the period that contains ``date``.
+
+    Args:
+        period (str): One of :class:`~okr.models.rollups.Period`.
+        date (dt.date): Any day of the period.
+
+    Returns:
+        dt.date: The day itself, the Sunday of its week or the last of its month.
+    """
+    if period == Period.WEEK:
+        return period_start(period, date) + dt.timedelta(days=6)
+    if period == Period.MONTH:
+        next_month = date.replace(day=28) + dt.timedelta(days=4)
+        return next_month - dt.timedelta(days=next_month.day)
+    return date
+
+
+@dataclass
+class RollupDefinition:
+    """Describes how the daily rows of ``source`` are summed up into ``rollup``.
+
+    The first field of ``group_by`` is the product the data belongs to.
+    """
+
+    rollup: Type[Model]
+    source: Type[Model]
+    group_by: List[str]
+    periods: List[str]
+    # Rollup field -> source field, summed up
+    sums: Dict[str, str] = field(default_factory=dict)
+    # Rollup field -> source field, value of the last day with data
+    last: Dict[str, str] = field(default_factory=dict)
+    # Rollup field -> source field to weight it with (the field has the same name)
+    weighted: Dict[str, str] = field(default_factory=dict)
+    # Rollup field -> (numerator, denominator) of two summed up rollup fields
+    ratios: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+    date_field: str = "date"
+    # Refresh in a separate job in the worker instead of at the end of the job
+    background: bool = False
+
+    @property
+    def product_field(self) -> str:
+        """Attribute with the ID of the product on the source model."""
+        return self.source._meta.get_field(self.group_by[0]).attname
+
+    @property
+    def group_fields(self) -> List[str]:
+        return [self.source._meta.get_field(name).attname for name in self.group_by]
+
+    def _source_rows(self, product_ids: Iterable, start: dt.date, end: dt.date):
+        return self.source.objects.filter(
+            **{
+                f"{self.product_field}__in": list(product_ids),
+                f"{self.date_field}__gte": start,
+                f"{self.date_field}__lte": end,
+            }
+        ).order_by()
+
+    def _last_values(
+        self, period: str, product_ids: Iterable, start: dt.date, end: dt.date
+    ) -> Dict[Tuple, Dict]:
+        if not self.last:
+            return {}
+
+        rows = (
+            self._source_rows(product_ids, start, end)
+            .order_by(self.date_field)
+            .values_list(*self.group_fields, self.date_field, *self.last.values())
+        )
+        groups = len(self.group_fields)
+
+        # Later dates overwrite earlier ones
+        return {
+            (*row[:groups], period_start(period, row[groups])): dict(
+                zip(self.last.keys(), row[groups + 1 :])
+            )
+            for row in rows
+        }
+
+    def aggregate(
+        self, period: str, product_ids: Iterable, start: dt.date, end: dt.date
+    ) -> Iterator[Model]:
+        """Compute the rollups of some products for the periods between two dates.
+
+        Args:
+            period (str): One of :class:`~okr.models.rollups.Period`.
+            product_ids (Iterable): IDs of the products.
+            start (dt.date): First day of the first period.
+            end (dt.date): Last day of the last period.
+
+        Yields:
+            Model: Unsaved instances of the rollup model.
+        """
+        product_ids = list(product_ids)
+        # Prefixed, as annotations must not shadow the fields of the source model
+        aggregates = {
+            "total_days": Count(self.date_field, distinct=True),
+            **{f"total_{name}": Sum(source) for name, source in self.sums.items()},
+            **{
+                f"weighted_{name}": Sum(
+                    F(name) * F(self.sums[weight]), output_field=FloatField()
+                )
+                for name, weight in self.weighted.items()
+            },
+        }
+        rows = (
+            self._source_rows(product_ids, start, end)
+            .annotate(start_date=_TRUNC[period](self.date_field))
+            .values(*self.group_fields, "start_date")
+            .annotate(**aggregates)
+        )
+        last_values = self._last_values(period, product_ids, start, end)
+
+        for row in rows:
+            values = {name: row[name] for name in self.group_fields}
+            values.update({name: row[f"total_{name}"] for name in ["days", *self.sums]})
+
+            for name, weight in self.weighted.items():
+                total = values.get(weight)
+                weighted = row[f"weighted_{name}"]
+                values[name] = (
+                    weighted / total if total and weighted is not None else None
+                )
+
+            for name, (numerator, denominator) in self.ratios.items():
+                values[name] = (
+                    values[numerator] / values[denominator]
+                    if values[denominator]
+                    else 0.0
+                )
+
+            # TruncWeek/TruncMonth return datetimes on some databases
+            start_date = row["start_date"]
+            if isinstance(start_date, dt.datetime):
+                start_date = start_date.date()
+
+            key = tuple(row[name] for name in self.group_fields) + (start_date,)
+            values.update(last_values.get(key, {}))
+
+            yield self.rollup(period=period, start_date=start_date, **values)
+
+    def refresh(self, product_ids: Iterable, start: dt.date, end: dt.date) -> int:
+        """Compute and store the rollups of all periods that overlap two dates.
+
+        Args:
+            product_ids (Iterable): IDs of the products.
+            start (dt.date): First date with changed data.
+            end (dt.date): Last date with changed data.
+
+        Returns:
+            int: Number of written rollups.
+        """
+        unique_fields = [*self.group_by, "period", "start_date"]
+        written = 0
+
+        for period in self.periods:
+            period_first = period_start(period, start)
+            period_last = period_end(period, end)
+
+            for chunk in _batches(sorted(product_ids), CHUNK_SIZE):
+                written += bulk_upsert(
+                    self.rollup,
+                    self.aggregate(period, chunk, period_first, period_last),
+                    unique_fields,
+                )
+
+        return written
+
+    def refresh_dates(self, product_ids: Iterable, dates: Iterable[dt.date]) -> int:
+        """Compute and store the rollups of the periods that contain some dates.
+
+        Unlike :meth:`refresh`, periods between the dates are left alone.
+
+        Args:
+            product_ids (Iterable): IDs of the products.
+            dates (Iterable[dt.date]): Dates with changed data.
+
+        Returns:
+            int: Number of written rollups.
+        """
+        unique_fields = [*self.group_by, "period", "start_date"]
+        product_ids = sorted(product_ids)
+        dates = set(dates)
+        written = 0
+
+        for period in self.periods:
+            for first in sorted({period_start(period, date) for date in dates}):
+                last = period_end(period, first)
+
+                for chunk in _batches(product_ids, CHUNK_SIZE):
+                    written += bulk_upsert(
+                        self.rollup,
+                        self.aggregate(period, chunk, first, last),
+                        unique_fields,
+                    )
+
+        return written
+
+
+DEFINITIONS: List[RollupDefinition] = [
+    RollupDefinition(
+        rollup=PageRollupGSC,
+        source=PageDataGSC,
+        group_by=["page"],
+        periods=[Period.DAY, Period.WEEK, Period.MONTH],
+        sums={"clicks": "clicks", "impressions": "impressions"},
+        weighted={"position": "impressions"},
+        ratios={"ctr": ("clicks", "impressions")},
+    ),
+    RollupDefinition(
+        rollup=PageQueryRollupGSC,
+        source=PageDataQueryGSC,
+        group_by=["page", "query"],
+        periods=[Period.WEEK, Period.MONTH],
+        sums={"clicks": "clicks", "impressions": "impressions"},
+        weighted={"position": "impressions"},
+        ratios={"ctr": ("clicks", "impressions")},
+        # Almost as large as the daily data, so it would delay every GSC run
+        background=True,
+    ),
+    RollupDefinition(
+        rollup=PodcastEpisodeRollupSpotify,
+        source=PodcastEpisodeDataSpotify,
+        group_by=["episode"],
+        periods=[Period.WEEK, Period.MONTH],
+        sums={"starts": "starts", "streams": "streams", "listeners": "listeners"},
+        last={"listeners_all_time": "listeners_all_time"},
+    ),
+    RollupDefinition(
+        rollup=InstaRollup,
+        source=InstaInsight,
+        group_by=["insta"],
+        periods=[Period.WEEK, Period.MONTH],
+        sums={
+            "reach": "reach",
+            "impressions": "impressions",
+            "text_message_clicks": "text_message_clicks_day",
+            "email_contacts": "email_contacts_day",
+            "profile_views": "profile_views",
+        },
+        last={"followers": "followers"},
+    ),
+]
+
+
+class _Changes:
+    """Products and dates written during a job, per rollup definition."""
+
+    def __init__(self):
+        self.products: Dict[int, Set] = {}
+        self.dates: Dict[int, Set[dt.date]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, index: int, product_ids: Set, dates: Set[dt.date]):
+        # Scrapers write from multiple threads, see ``for_each_product``
+        with self._lock:
+            self.products.setdefault(index, set()).update(product_ids)
+            self.dates.setdefault(index, set()).update(dates)
+
+
+_current_changes: ContextVar[Optional[_Changes]] = ContextVar(
+    "rollup_changes", default=None
+)
+
+# Changes outside of collect(), handed to the worker by flush_deferred()
+_deferred = _Changes()
+_deferred_timer: Optional[threading.Timer] = None
+_deferred_lock = threading.Lock()
+
+
+def _refresh(definition: RollupDefinition, product_ids: Set, dates: Set[dt.date]):
+    try:
+        written = definition.refresh_dates(product_ids, dates)
+    except Exception as e:
+        capture_exception(e)
+        logger.exception("Failed to refresh {}", definition.rollup.__name__)
+        return
+
+    logger.debug(
+        "Refreshed {} {} from {} to {}",
+        written,
+        definition.rollup.__name__,
+        min(dates),
+        max(dates),
+    )
+
+
+def _refresh_in_background(
+    definition: RollupDefinition, product_ids: Set, dates: Set[dt.date]
+):
+    from ..scheduler import run_in_worker
+
+    try:
+        run_in_worker(
+            "common.rollups.refresh_rollup",
+            args=[definition.rollup.__name__, sorted(product_ids), sorted(dates)],
+            executor="rollups",
+        )
+    except Exception as e:
+        capture_exception(e)
+        logger.warning(
+            "Failed to enqueue refresh of {}, refreshing now",
+            definition.rollup.__name__,
+        )
+        _refresh(definition, product_ids, dates)
+
+
+def refresh_rollup(name: str, product_ids: List, dates: List[dt.date]):
+    """Refresh the periods of a rollup that contain some dates, for rollups that are
+    refreshed in the ``background``.
+
+    Args:
+        name (str): Name of the rollup model.
+        product_ids (List): IDs of the products.
+        dates (List[dt.date]): Dates with changed data.
+    """
+    definition = next(d for d in DEFINITIONS if d.rollup.__name__ == name)
+    _refresh(definition, set(product_ids), set(dates))
+
+
+def _defer(index: int, product_ids: Set, dates: Set[dt.date]):
+    global _deferred_timer
+
+    with _deferred_lock:
+        _deferred.add(index, product_ids, dates)
+
+        if _deferred_timer is None:
+            _deferred_timer = threading.Timer(DEFER_SECONDS, flush_deferred)
+            _deferred_timer.daemon = True
+            _deferred_timer.start()
+
+
+def flush_deferred():
+    """Enqueue the refresh of the rollups of all data written outside of
+    :func:`collect` since the last flush.
+
+    Called :data:`DEFER_SECONDS` after the first such write, and when the process
+    exits.
+    """
+    global _deferred, _deferred_timer
+
+    with _deferred_lock:
+        changes, _deferred = _deferred, _Changes()
+
+        if _deferred_timer is not None:
+            _deferred_timer.cancel()
+            _deferred_timer = None
+
+    for index, product_ids in changes.products.items():
+        _refresh_in_background(DEFINITIONS[index], product_ids, changes.dates[index])
+
+
+atexit.register(flush_deferred)
+
+
+@receiver(rows_upserted)
+def _record_upsert(sender: Type[Model], objs: List[Model], **kwargs):
+    changes = _current_changes.get()
+
+    for index, definition in enumerate(DEFINITIONS):
+        if definition.source is not sender or not objs:
+            continue
+
+        product_ids = {getattr(obj, definition.product_field) for obj in objs}
+        dates = {getattr(obj, definition.date_field) for obj in objs}
+
+        if changes is None:
+            _defer(index, product_ids, dates)
+        else:
+            changes.add(index, product_ids, dates)
+
+
+@contextmanager
+def collect() -> Iterator[None]:
+    """Refresh the rollups for all data written inside this block once it ends.
+
+    Rollups marked as ``background`` are only enqueued. A failing refresh is reported
+    to Sentry and doesn't raise.
+    """
+    if _current_changes.get() is not None:
+        # Already collected by an outer block
+        yield
+        return
+
+    changes = _Changes()
+    token = _current_changes.set(changes)
+
+    try:
+        yield
+    finally:
+        _current_changes.reset(token)
+
+        for index, product_ids in changes.products.items():
+            definition = DEFINITIONS[index]
+            dates = changes.dates[index]
+
+            if definition.background:
+                _refresh_in_background(definition, product_ids, dates)
+            else:
+                _refresh(definition, product_ids, dates)
+
+
+def refresh_all(
+    start: dt.date,
+    end: dt.date,
+    rollups: Optional[Iterable[Type[Model]]] = None,
+) -> Dict[str, int]:
+    """Compute the rollups of all products for the periods between two dates.
+
+    Args:
+        start (dt.date): First date of the data.
+        end (dt.date): Last date of the data.
+        rollups (Optional[Iterable[Type[Model]]], optional): Only refresh these
+            rollup models. Defaults to None, meaning all of them.
+
+    Returns:
+        Dict[str, int]: Number of written rollups per rollup model.
+    """
+    rollups = None if rollups is None else set(rollups)
+    results = {}
+
+    for definition in DEFINITIONS:
+        if rollups is not None and definition.rollup not in rollups:
+            continue
+
+        product_ids = set(
+            definition.source.objects.filter(
+                **{
+                    f"{definition.date_field}__gte": start,
+                    f"{definition.date_field}__lte": end,
+                }
+            )
+            .order_by()
+            .values_list(definition.product_field, flat=True)
+            .distinct()
+        )
+        results[definition.rollup.__name__] = definition.refresh(
+            product_ids, start, end
+        )
+
+    return results
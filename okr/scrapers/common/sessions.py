@@ -0,0 +1,138 @@
+"""Shared ``requests`` sessions for the API clients of the scrapers.
+
+Calling ``requests.get`` opens a new connection (including the TLS handshake) for
+every request. The sessions returned by :func:`get_session` instead keep their
+connections alive and reuse them, with one connection pool per host. All requests
+made through them get a default timeout, and failed connections as well as
+temporary server errors are retried with an exponential backoff. Sessions with a
+``rate_limit`` take a token from the :mod:`~okr.scrapers.common.ratelimit` bucket of
+that API before each request and back off when the API responds with ``429``.
+
+Sessions are created once per name and process and are shared between threads.
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import ratelimit
+
+# Seconds to wait for a connection and for a response, respectively
+DEFAULT_TIMEOUT = (10, 60)
+
+# Connections kept open per host, should be at least the number of threads that use
+# the same session at a time
+POOL_MAXSIZE = 10
+
+DEFAULT_RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(500, 502, 503, 504),
+    # Rate limits are handled by the clients, see okr.scrapers.common.ratelimit
+    respect_retry_after_header=False,
+    # Return the last response instead of raising, so callers can handle the status
+    raise_on_status=False,
+)
+
+TimeoutType = Union[float, Tuple[float, float], None]
+
+_sessions: Dict[str, "Session"] = {}
+_sessions_lock = threading.Lock()
+
+
+class Session(requests.Session):
+    """Session that applies a default timeout to all requests."""
+
+    def __init__(self, timeout: TimeoutType = DEFAULT_TIMEOUT):
+        super().__init__()
+        self.timeout = timeout
+        self.pid = os.getpid()
+
+    def request(self, method, url, *args, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, *args, **kwargs)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """Adapter that keeps requests within the rate limit of an API.
+
+    Requests answered with ``429 Too Many Requests`` are repeated up to
+    ``ratelimit.MAX_RETRIES`` times, after waiting for the time the API asks for.
+    """
+
+    def __init__(self, limiter: ratelimit.RateLimiter, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+
+    def send(self, request, *args, **kwargs) -> requests.Response:
+        for _ in range(ratelimit.MAX_RETRIES):
+            self.limiter.acquire()
+            response = super().send(request, *args, **kwargs)
+
+            if response.status_code != 429:
+                return response
+
+            self.limiter.backoff(response.headers.get("Retry-After"))
+            response.close()
+
+        self.limiter.acquire()
+        return super().send(request, *args, **kwargs)
+
+
+def _create_session(
+    retry: Retry, timeout: TimeoutType, rate_limit: Optional[str]
+) -> Session:
+    session = Session(timeout=timeout)
+
+    if rate_limit:
+        # Leave 429 responses to the adapter, which shares the pause with all processes
+        adapter = RateLimitedAdapter(
+            ratelimit.get_limiter(rate_limit),
+            max_retries=retry.new(respect_retry_after_header=False),
+            pool_maxsize=POOL_MAXSIZE,
+        )
+    else:
+        adapter = HTTPAdapter(max_retries=retry, pool_maxsize=POOL_MAXSIZE)
+
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(
+    name: str,
+    *,
+    retry: Optional[Retry] = None,
+    timeout: TimeoutType = DEFAULT_TIMEOUT,
+    rate_limit: Optional[str] = None,
+) -> Session:
+    """Get the shared session for an API, creating it on first use.
+
+    Args:
+        name (str): Name of the API, e.g. ``"sophora"``. Each name gets its own session
+            with its own cookies and connection pools.
+        retry (Optional[Retry], optional): Retry configuration, only used when the
+            session is created. Defaults to ``DEFAULT_RETRY``.
+        timeout (TimeoutType, optional): Default timeout in seconds, only used when the
+            session is created. Defaults to ``DEFAULT_TIMEOUT``.
+        rate_limit (Optional[str], optional): Name of the rate limit in
+            :data:`~okr.scrapers.common.ratelimit.RATE_LIMITS` to apply to all
+            requests, only used when the session is created. Defaults to None.
+
+    Returns:
+        Session: The shared session.
+    """
+    with _sessions_lock:
+        session = _sessions.get(name)
+
+        # Forked processes (like the RQ work horse) must not share connections with
+        # their parent
+        if session is None or session.pid != os.getpid():
+            session = _create_session(retry or DEFAULT_RETRY, timeout, rate_limit)
+            _sessions[name] = session
+
+        return session
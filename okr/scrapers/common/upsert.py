@@ -0,0 +1,180 @@
+"""Write batches of model instances to the database with as few queries as possible.
+
+Replaces per-row ``update_or_create`` calls (one ``SELECT`` plus one ``INSERT`` or
+``UPDATE`` and a commit for every row) with a single statement per batch.
+
+On databases that support conflict targets (PostgreSQL, SQLite) this uses
+``INSERT ... ON CONFLICT (...) DO UPDATE``. Other backends fall back to one
+``SELECT`` for the existing keys of a batch, followed by ``bulk_update`` and
+``bulk_create`` inside a transaction.
+
+After each batch, :data:`rows_upserted` is sent with the model as sender and the
+written instances as ``objs``, so derived data like the rollups in
+:mod:`okr.scrapers.common.rollups` can be kept up to date.
+"""
+
+from itertools import islice
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Type
+
+from django.db import connections, router, transaction
+from django.db.models import Field, Model, Q
+from django.dispatch import Signal
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Sent after each written batch with ``sender=model`` and ``objs=batch``
+rows_upserted = Signal()
+
+
+def _batches(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _key(obj: Model, fields: Sequence[Field]) -> Hashable:
+    return tuple(getattr(obj, field.attname) for field in fields)
+
+
+def _default_update_fields(
+    model: Type[Model], unique_fields: Sequence[str]
+) -> List[str]:
+    return [
+        field.name
+        for field in model._meta.concrete_fields
+        if not field.primary_key
+        and field.name not in unique_fields
+        and not getattr(field, "auto_now_add", False)
+    ]
+
+
+def _auto_now_fields(model: Type[Model]) -> List[Field]:
+    return [
+        field
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False)
+    ]
+
+
+def _upsert_on_conflict(
+    model: Type[Model],
+    objs: List[Model],
+    unique_fields: Sequence[str],
+    update_fields: Sequence[str],
+    using: str,
+):
+    if update_fields:
+        model._base_manager.using(using).bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
+    else:
+        # Nothing to update, the row only consists of its key
+        model._base_manager.using(using).bulk_create(objs, ignore_conflicts=True)
+
+
+def _upsert_fallback(
+    model: Type[Model],
+    objs: List[Model],
+    key_fields: Sequence[Field],
+    update_fields: Sequence[str],
+    using: str,
+):
+    lookup = Q()
+    for obj in objs:
+        lookup |= Q(
+            **{field.attname: getattr(obj, field.attname) for field in key_fields}
+        )
+
+    existing: Dict[Hashable, int] = {
+        _key(row, key_fields): row.pk
+        for row in model._base_manager.using(using)
+        .filter(lookup)
+        .only("pk", *(field.attname for field in key_fields))
+    }
+
+    to_update = []
+    to_create = []
+
+    for obj in objs:
+        pk = existing.get(_key(obj, key_fields))
+
+        if pk is None:
+            to_create.append(obj)
+            continue
+
+        obj.pk = pk
+        # bulk_update doesn't call pre_save, so auto_now fields need to be set manually
+        for field in _auto_now_fields(model):
+            field.pre_save(obj, add=False)
+        to_update.append(obj)
+
+    with transaction.atomic(using=using):
+        if to_update and update_fields:
+            model._base_manager.using(using).bulk_update(to_update, update_fields)
+        if to_create:
+            model._base_manager.using(using).bulk_create(to_create)
+
+
+def bulk_upsert(
+    model: Type[Model],
+    objs: Iterable[Model],
+    unique_fields: Sequence[str],
+    *,
+    update_fields: Optional[Sequence[str]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Insert or update model instances in batches, keyed by ``unique_fields``.
+
+    This is the bulk equivalent of calling ``update_or_create`` with the
+    ``unique_fields`` as lookup and all other fields as ``defaults`` for each instance.
+    ``objs`` is consumed lazily, so generators work without loading all rows into
+    memory. If the same key occurs multiple times within a batch, the last instance
+    wins.
+
+    Args:
+        model (Type[Model]): Model class of the instances.
+        objs (Iterable[Model]): Unsaved instances to write.
+        unique_fields (Sequence[str]): Names of the fields that make up the unique
+            key of the model, usually its ``unique_together`` or a ``unique`` field.
+        update_fields (Optional[Sequence[str]]): Fields to overwrite on existing rows.
+            Defaults to ``None``, which updates all fields except the primary key, the
+            ``unique_fields`` and ``auto_now_add`` fields. Pass this explicitly if the
+            instances don't carry values for every column.
+        batch_size (int): Number of rows per statement. Defaults to
+            ``DEFAULT_BATCH_SIZE``.
+
+    Returns:
+        int: Number of rows written.
+    """
+    if update_fields is None:
+        update_fields = _default_update_fields(model, unique_fields)
+    else:
+        update_fields = list(update_fields)
+        # Keep auto_now fields (e.g. last_updated) current, like save() would
+        for field in _auto_now_fields(model):
+            if field.name not in update_fields:
+                update_fields.append(field.name)
+
+    key_fields = [model._meta.get_field(name) for name in unique_fields]
+
+    using = router.db_for_write(model)
+    on_conflict = connections[using].features.supports_update_conflicts_with_target
+
+    written = 0
+
+    for batch in _batches(objs, batch_size):
+        # A single statement must not touch the same row twice
+        batch = list({_key(obj, key_fields): obj for obj in batch}.values())
+
+        if on_conflict:
+            _upsert_on_conflict(model, batch, unique_fields, update_fields, using)
+        else:
+            _upsert_fallback(model, batch, key_fields, update_fields, using)
+
+        written += len(batch)
+        rows_upserted.send(sender=model, objs=batch)
+
+    return written
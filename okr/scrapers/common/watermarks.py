@@ -0,0 +1,199 @@
+"""Only request the data of a product that may have changed since the last scrape.
+
+Most periodic jobs used to request a fixed number of days every run, no matter how
+recently the data was scraped. A :class:`~okr.models.jobs.Watermark` records for each
+job and product up to which point the scraped data is final. Inside
+:func:`incremental`, jobs request data from that point on, and the watermark is moved
+forward once the scrape succeeded.
+
+Data is considered final once it is older than the settle window of its source, in
+which the API may still update it. The settle window can be changed with the
+environment variable ``SCRAPER_SETTLE_HOURS_<SOURCE>`` (e.g.
+``SCRAPER_SETTLE_HOURS_GSC=72``). If a job doesn't run or fails for a while, the next
+run requests everything since the watermark, up to :data:`MAX_CATCH_UP` into the past.
+"""
+
+import datetime as dt
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Optional, TypeVar, Union
+
+from django.db.models import Model
+from loguru import logger
+
+from ...models import Watermark
+from .instrumentation import job_name
+from .utils import BERLIN, date_param, local_now
+
+DEFAULT_SETTLE = dt.timedelta(days=2)
+
+SETTLE: Dict[str, dt.timedelta] = {
+    "sophora": dt.timedelta(minutes=5),
+}
+
+# Jobs never request more than this much data before now to catch up with their
+# watermark, so a watermark that is stuck doesn't lead to ever growing requests
+MAX_CATCH_UP = dt.timedelta(days=31)
+
+DateType = TypeVar("DateType", dt.date, dt.datetime)
+
+
+def settle_window(source: str) -> dt.timedelta:
+    """Get the time in which data of ``source`` may still change.
+
+    Args:
+        source (str): Name of the data source, e.g. ``"gsc"``.
+
+    Returns:
+        dt.timedelta: The settle window.
+    """
+    default = SETTLE.get(source, DEFAULT_SETTLE)
+    value = os.environ.get(f"SCRAPER_SETTLE_HOURS_{source.upper()}")
+
+    try:
+        return dt.timedelta(hours=float(value)) if value else default
+    except ValueError:
+        logger.warning("Invalid settle window {!r} for {}", value, source)
+        return default
+
+
+def _as_datetime(value: Union[dt.date, dt.datetime]) -> dt.datetime:
+    if isinstance(value, dt.datetime):
+        return value
+
+    return BERLIN.localize(dt.datetime.combine(value, dt.time()))
+
+
+@dataclass
+class Increment:
+    """Time range to request for a single product."""
+
+    start_date: Union[dt.date, dt.datetime]
+    complete: bool = True
+
+    def mark_incomplete(self):
+        """Record that data is missing, so the watermark is not moved forward."""
+        self.complete = False
+
+
+def _final_until(
+    source: str,
+    end_date: Union[dt.date, dt.datetime, None],
+    by_date: bool,
+) -> dt.datetime:
+    settled = local_now() - settle_window(source)
+
+    if by_date:
+        # Only whole days are final
+        final_until = settled.date()
+        if end_date is not None:
+            final_until = min(final_until, end_date + dt.timedelta(days=1))
+    else:
+        final_until = settled
+        if end_date is not None:
+            final_until = min(final_until, end_date)
+
+    return _as_datetime(final_until)
+
+
+@contextmanager
+def incremental(
+    job: Callable,
+    product: Model,
+    *,
+    source: str,
+    default: Union[DateType, Callable[[], DateType]],
+    start_date: Optional[DateType] = None,
+    end_date: Optional[DateType] = None,
+    earliest: Optional[DateType] = None,
+    latest: Optional[DateType] = None,
+) -> Iterator[Increment]:
+    """Request only the data of a product that isn't final yet.
+
+    Yields the time range to request. If the block completes without an exception and
+    without calling :meth:`Increment.mark_incomplete`, the watermark is moved forward
+    to the end of the range, but not into the settle window of ``source``.
+
+    Dates are handled as whole days. If ``end_date`` is a datetime, the range is
+    handled with the precision of datetimes instead.
+
+    Args:
+        job (Callable): The scraper function.
+        product (Model): The product that is scraped.
+        source (str): Name of the data source, e.g. ``"gsc"``.
+        default (Union[DateType, Callable[[], DateType]]): Start of the range if
+            there is no watermark yet, or a function that returns it.
+        start_date (Optional[DateType], optional): Start of the range, overrides the
+            watermark. The watermark is only moved forward if this doesn't leave a
+            gap. Defaults to None.
+        end_date (Optional[DateType], optional): Last day or time requested.
+            Defaults to None, meaning up to today.
+        earliest (Optional[DateType], optional): Earliest start that the API
+            supports. Defaults to None.
+        latest (Optional[DateType], optional): Latest start that the API supports.
+            Defaults to None.
+
+    Yields:
+        Increment: The time range to request.
+    """
+    by_date = not isinstance(end_date, dt.datetime)
+    key = dict(
+        job=job_name(job),
+        source=source,
+        product_type=product._meta.label_lower,
+        product_id=product.pk,
+    )
+
+    watermark = Watermark.objects.filter(**key).first()
+    final_until = None
+
+    if watermark is not None:
+        final_until = watermark.final_until.astimezone(BERLIN)
+        if by_date:
+            final_until = final_until.date()
+
+    # A start date given by the caller that is later than the watermark leaves a gap
+    leaves_gap = (
+        start_date is not None and final_until is not None and start_date > final_until
+    )
+
+    if start_date is not None:
+        requested = start_date
+    elif final_until is not None:
+        now = local_now()
+        catch_up = (now.date() if by_date else now) - MAX_CATCH_UP
+        requested = max(final_until, catch_up)
+    else:
+        requested = None
+
+        if callable(default):
+            default = default()
+
+    increment = Increment(
+        start_date=date_param(
+            requested,
+            default=default,
+            earliest=earliest,
+            latest=latest,
+        )
+    )
+
+    logger.debug("Requesting {} since {} (watermark: {})", key, requested, final_until)
+    yield increment
+
+    if not increment.complete:
+        logger.info("Not moving watermark of {}, data is incomplete", key)
+        return
+
+    if leaves_gap:
+        logger.debug("Not moving watermark of {}, range starts after it", key)
+        return
+
+    new_final_until = _final_until(source, end_date, by_date)
+
+    if watermark is None:
+        Watermark.objects.create(final_until=new_final_until, **key)
+    elif new_final_until > watermark.final_until:
+        watermark.final_until = new_final_until
+        watermark.save(update_fields=["final_until", "last_updated"])
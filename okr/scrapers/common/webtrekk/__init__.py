@@ -1,25 +1,69 @@
-"""Wrapper for Webtrekk API."""
+"""Wrapper for Webtrekk API.
 
+Scrapers share a single logged-in client through :func:`shared_session`. It logs in
+on the first request, renews its token once it is older than :data:`TOKEN_MAX_AGE` or
+after an error about the token, and logs out when the outermost session ends. Independent requests
+can run at the same time with :meth:`Webtrekk.get_analyses` and
+:func:`fetch_concurrently`, in up to ``SCRAPER_CONCURRENCY_WEBTREKK`` threads.
+"""
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
-from typing import Any, Dict, Optional
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+import contextvars
 import datetime as dt
-import json
 import os
+import re
+import threading
+import time
 
-import requests
+from django.db import close_old_connections, connection
 from loguru import logger
 
-from ....models.cached_requests import CachedWebtrekkRequest
-
+from .. import instrumentation
+from ..concurrency import concurrency_limit
+from ..sessions import get_session
+from . import cache
 
 WEBTREKK_LOGIN = os.environ.get("WEBTREKK_LOGIN")
 WEBTREKK_PASSWORD = os.environ.get("WEBTREKK_PASSWORD")
 
+# Age after which the token is renewed before the next request
+TOKEN_MAX_AGE = dt.timedelta(minutes=15)
+
+# Messages of errors that are fixed by logging in again
+TOKEN_ERROR_PATTERN = re.compile(r"token|session|login|auth", re.IGNORECASE)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Set in the threads of fetch_concurrently(), so nested calls don't start more threads
+_in_worker: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "webtrekk_in_worker", default=False
+)
+
 
 class WebtrekkError(Exception):
     """Error class for Webtrekk."""
 
-    pass
+    @property
+    def is_token_error(self) -> bool:
+        """Whether the error is about an invalid or expired token."""
+        error = self.args[0] if self.args else None
+        message = error.get("message", "") if isinstance(error, dict) else error
+        return bool(TOKEN_ERROR_PATTERN.search(str(message or "")))
 
 
 class Webtrekk:
@@ -34,6 +78,9 @@ class Webtrekk:
         self.token = None
         self.account = os.environ.get("WEBTREKK_ACCOUNT_LIVE_ID")
         self.name = f"{WEBTREKK_LOGIN}-LIVE-account"
+        self._logged_in_at: Optional[float] = None
+        self._sessions = 0
+        self._lock = threading.RLock()
 
     def __str__(self):
         if self.token:
@@ -49,6 +96,7 @@ class Webtrekk:
             "language": "de",
         }
         self.token = self._get_response(method="login", params=params)
+        self._logged_in_at = time.monotonic()
         logger.info(
             "{} has been successfully connected to to {}.",
             WEBTREKK_LOGIN,
@@ -58,6 +106,8 @@ class Webtrekk:
     def logout(self):
         """Logout from JSON/RPC API."""
         self._get_response("logout", {"token": self.token})
+        self.token = None
+        self._logged_in_at = None
         logger.info(
             "{} has been logged out successfully from {}.",
             WEBTREKK_LOGIN,
@@ -65,15 +115,35 @@ class Webtrekk:
         )
 
     @contextmanager
-    def session(self):
-        """Initiate session with :meth:`~okr.scrapers.common.webtrekk.Webtrekk.login`
-        and use :meth:`~okr.scrapers.common.webtrekk.Webtrekk.logout` in case of errors.
+    def session(self) -> Iterator["Webtrekk"]:
+        """Keep the client logged in while the context is active.
+
+        Sessions may be nested and used by several threads at once. The client logs
+        in with :meth:`~okr.scrapers.common.webtrekk.Webtrekk.login` on the first
+        request and logs out with
+        :meth:`~okr.scrapers.common.webtrekk.Webtrekk.logout` when the last session
+        ends, also in case of errors.
         """
-        self.login()
+        with self._lock:
+            self._sessions += 1
         try:
-            yield
+            yield self
         finally:
-            self.logout()
+            with self._lock:
+                self._sessions -= 1
+                if self._sessions == 0 and self.token:
+                    self.logout()
+
+    def _ensure_token(self, stale: Optional[str] = None) -> str:
+        """Log in if there is no token, or if it is too old or equal to ``stale``."""
+        with self._lock:
+            expired = (
+                self._logged_in_at is None
+                or time.monotonic() - self._logged_in_at > TOKEN_MAX_AGE.total_seconds()
+            )
+            if not self.token or expired or self.token == stale:
+                self.login()
+            return self.token
 
     def _get_response(
         self,
@@ -90,9 +160,9 @@ class Webtrekk:
               "getCustomReportsList".
             params (Dict[str, str], optional): Parameters for API request. Defaults to
               {}.
-            use_cache (bool, optional): If set to ``True``, requests will be saved to and
-              retrieved from a persistent cache to avoid repeat API requests.
-              Defaults to ``False``.
+            use_cache (bool, optional): If set to ``True``, results will be saved to and
+              retrieved from the cache in :mod:`~okr.scrapers.common.webtrekk.cache` to
+              avoid repeat API requests. Defaults to ``False``.
             force_cache_refresh (bool, optional): If set to ``True``, makes a query to the
               API even on cache hit and caches the result. Requires ``use_cache`` to be ``True``.
               Defaults to ``False``.
@@ -111,48 +181,52 @@ class Webtrekk:
                 f"Can't have {force_cache_refresh = } while {use_cache = }"
             )
 
-        url = "https://report2.webtrekk.de/cgi-bin/wt/JSONRPC.cgi"
-
         payload = {
             "params": params,
             "version": "1.1",
             "method": method,
         }
 
-        # Create key for cache lookups
-        payload_cache_key = json.dumps(payload)
-
-        # Insert token after creating the payload cache key
-        if self.token:
-            params["token"] = self.token
-
-        # Check if a request with this payload is already cached - query API if not
+        # Check if a request with these params is already cached - query API if not
         logger.debug(f"{use_cache = }, {force_cache_refresh = }")
         if use_cache and not force_cache_refresh:
-            cached = CachedWebtrekkRequest.objects.filter(
-                payload=payload_cache_key
-            ).first()
+            result = cache.load(method, params)
+
+            if result is not cache.MISSING:
+                return result
 
-            if cached:
-                logger.debug("Cached request for payload found")
-                logger.debug(payload_cache_key)
-                return json.loads(cached.response)["result"]
+        if method in ("login", "logout"):
+            return self._post(payload)
 
-            logger.debug("No cached request for payload found")
-            logger.debug(payload_cache_key)
+        # Insert token after the cache lookup, as it changes with every session
+        token = self._ensure_token()
+        payload["params"] = {**params, "token": token}
 
-        response = requests.post(url, json=payload)
+        try:
+            result = self._post(payload)
+        except WebtrekkError as e:
+            # The token may have been invalidated by Webtrekk, so retry once with a
+            # new one. Other errors, e.g. about the analysis config, would only fail
+            # again.
+            if not e.is_token_error:
+                raise
+
+            logger.warning("Webtrekk {} failed ({}), renewing token", method, e)
+            payload["params"]["token"] = self._ensure_token(stale=token)
+            result = self._post(payload)
+
+        if use_cache and result is not None:
+            cache.store(method, params, result)
+
+        return result
+
+    def _post(self, payload: Dict[str, Any]) -> Any:
+        response = get_session("webtrekk", rate_limit="webtrekk").post(
+            "https://report2.webtrekk.de/cgi-bin/wt/JSONRPC.cgi", json=payload
+        )
         response_data = response.json()
 
         if "result" in response_data:
-            if use_cache:
-                CachedWebtrekkRequest.objects.create(
-                    payload=payload_cache_key,
-                    response=response.text,
-                )
-                logger.debug("New cached entry for payload created")
-                logger.debug(payload_cache_key)
-
             return response_data["result"]
 
         if "error" in response_data:
@@ -206,6 +280,19 @@ class Webtrekk:
         data = self._get_response("getAnalysisData", params, use_cache=True)
         return data
 
+    def get_analyses(self, analysis_configs: List[str]) -> List[Dict]:
+        """Call getAnalysisData for several analyses at the same time.
+
+        Args:
+            analysis_configs (List[str]): Config information for each analysis
+            (according to API documentation).
+
+        Returns:
+            List[Dict]: Replies from API, in the order of ``analysis_configs``.
+        """
+        futures = fetch_concurrently(self.get_analysis_data, analysis_configs)
+        return [future.result() for _, future in futures]
+
     def get_dimensions_metrics(self) -> Dict:
         """Call getAnalysisObjectsAndMetricsList method at Webtrekk's JSON/RPC API.
 
@@ -221,3 +308,84 @@ class Webtrekk:
             Dict:  Reply from API.
         """
         return self._get_response("getCustomReportsList")
+
+
+_shared = Webtrekk()
+
+
+def shared_session() -> ContextManager[Webtrekk]:
+    """Session of the client shared by all scrapers of the process.
+
+    Wrapping a loop over dates in this session keeps the client logged in between
+    them, instead of logging in and out for each date.
+
+    Returns:
+        ContextManager[Webtrekk]: Context manager that yields the shared client.
+    """
+    return _shared.session()
+
+
+def _call_in_thread(func: Callable[[T], R], item: T) -> R:
+    _in_worker.set(True)
+
+    try:
+        with instrumentation.record_thread():
+            return func(item)
+    finally:
+        close_old_connections()
+
+
+def fetch_concurrently(
+    func: Callable[[T], R], items: List[T]
+) -> Iterator[Tuple[T, "Future[R]"]]:
+    """Call ``func`` for each item in parallel threads within a
+    :func:`shared_session`, e.g. to request the data of several dates at once.
+
+    At most ``SCRAPER_CONCURRENCY_WEBTREKK`` calls run at a time, and results are
+    only requested ahead as far as the limit allows, so the caller can process
+    (and release) each result before the later ones are requested. Calls from
+    within ``func`` run in its thread, so nesting doesn't exceed the limit. On SQLite,
+    the items are processed one after another, as the cache writes to the database.
+
+    Args:
+        func (Callable[[T], R]): Function that requests Webtrekk.
+        items (List[T]): Items to call ``func`` with.
+
+    Yields:
+        Tuple[T, Future[R]]: Each item with the future of its result, in the order
+        of ``items``. Exceptions are raised by ``Future.result()``.
+    """
+    limit = concurrency_limit("webtrekk")
+
+    with shared_session():
+        if (
+            limit == 1
+            or len(items) <= 1
+            or _in_worker.get()
+            or connection.vendor == "sqlite"
+        ):
+            for item in items:
+                future: Future = Future()
+                try:
+                    future.set_result(func(item))
+                except Exception as e:
+                    future.set_exception(e)
+                yield item, future
+            return
+
+        with ThreadPoolExecutor(
+            max_workers=min(limit, len(items)), thread_name_prefix="webtrekk"
+        ) as executor:
+            pending: Deque[Tuple[T, Future]] = deque()
+
+            for item in items:
+                context = contextvars.copy_context()
+                pending.append(
+                    (item, executor.submit(context.run, _call_in_thread, func, item))
+                )
+
+                if len(pending) >= limit:
+                    yield pending.popleft()
+
+            while pending:
+                yield pending.popleft()
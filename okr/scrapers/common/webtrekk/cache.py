@@ -0,0 +1,283 @@
+"""Cache for results of the Webtrekk JSON/RPC API.
+
+Results are looked up in two tiers:
+
+1. An LRU cache in the memory of the process, limited to :data:`MEMORY_LIMIT` bytes
+2. The :class:`~okr.models.cached_requests.CachedWebtrekkRequest` table, which is
+   shared by all processes
+
+Both tiers store the results as compressed JSON and are keyed by a SHA-256 hash of
+the method and the parameters of the request (without the session token). How long a
+result is used and how many results are kept in the database is defined per method
+in :data:`POLICIES`. Results for dates that are older than the ``settle_window`` of
+the method don't change anymore and are kept for its ``settled_ttl`` instead. Expired
+and surplus entries are deleted by :func:`evict`.
+"""
+
+import datetime as dt
+import hashlib
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from django.utils import timezone
+from loguru import logger
+
+from ....models.cached_requests import CachedWebtrekkRequest
+from ..upsert import bulk_upsert
+
+# Maximum size of the compressed results in the memory of each process
+MEMORY_LIMIT = 64 * 1024 * 1024
+
+# Rows deleted per statement by evict()
+EVICT_CHUNK_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How results of an API method are cached."""
+
+    # How long a result is used before the API is requested again
+    ttl: dt.timedelta
+    # Results kept in the database, the least recently used ones are evicted first
+    max_entries: int
+    # Days after which the data of a date is final
+    settle_window: Optional[dt.timedelta] = None
+    # How long results that end before the settle window are used
+    settled_ttl: Optional[dt.timedelta] = None
+
+
+POLICIES: Dict[str, CachePolicy] = {
+    # Data of the last days isn't final yet, so results are only reused briefly
+    "getAnalysisData": CachePolicy(
+        ttl=dt.timedelta(days=2),
+        max_entries=5000,
+        settle_window=dt.timedelta(days=3),
+        settled_ttl=dt.timedelta(days=30),
+    ),
+    "getReportData": CachePolicy(
+        ttl=dt.timedelta(days=2),
+        max_entries=1000,
+        settle_window=dt.timedelta(days=3),
+        settled_ttl=dt.timedelta(days=30),
+    ),
+}
+
+DEFAULT_POLICY = CachePolicy(ttl=dt.timedelta(hours=1), max_entries=100)
+
+# Returned by load() if there's no valid result, as None is a valid result
+MISSING = object()
+
+
+def policy(method: str) -> CachePolicy:
+    """The cache policy of an API method."""
+    return POLICIES.get(method, DEFAULT_POLICY)
+
+
+def _stop_date(params: Dict[str, Any]) -> Optional[dt.date]:
+    """The last date requested by ``getAnalysisData`` or ``getReportData``, if any."""
+    stop = params.get("time_stop")
+
+    config = params.get("analysisConfig")
+    if stop is None and isinstance(config, dict):
+        stop = config.get("stopTime")
+
+    try:
+        return dt.date.fromisoformat(str(stop)[:10])
+    except ValueError:
+        return None
+
+
+def ttl(method: str, params: Dict[str, Any]) -> dt.timedelta:
+    """How long the result of a request is used.
+
+    Args:
+        method (str): API request method.
+        params (Dict[str, Any]): Parameters of the request, without the token.
+
+    Returns:
+        dt.timedelta: The ``settled_ttl`` of the method if the request ends before
+        its settle window, otherwise its ``ttl``.
+    """
+    method_policy = policy(method)
+
+    if method_policy.settle_window is None or method_policy.settled_ttl is None:
+        return method_policy.ttl
+
+    stop = _stop_date(params)
+    if stop is not None and stop < timezone.localdate() - method_policy.settle_window:
+        return method_policy.settled_ttl
+
+    return method_policy.ttl
+
+
+def cache_key(method: str, params: Dict[str, Any]) -> str:
+    """Fixed-size key of a request, independent of the order of the parameters.
+
+    Args:
+        method (str): API request method.
+        params (Dict[str, Any]): Parameters of the request, without the token.
+
+    Returns:
+        str: Hex digest of the request.
+    """
+    data = json.dumps([method, params], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def _compress(result: Any) -> bytes:
+    return zlib.compress(json.dumps(result, separators=(",", ":")).encode())
+
+
+def _decompress(data: bytes) -> Any:
+    return json.loads(zlib.decompress(data))
+
+
+class _MemoryTier:
+    """LRU cache of compressed results, limited by their total size."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[dt.datetime, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            expires, data = entry
+            if expires <= timezone.now():
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return data
+
+    def set(self, key: str, data: bytes, expires: dt.datetime):
+        if len(data) > self.limit:
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (expires, data)
+            self.size += len(data)
+
+            while self.size > self.limit:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+_memory = _MemoryTier(MEMORY_LIMIT)
+
+
+def load(method: str, params: Dict[str, Any]) -> Any:
+    """Get the cached result of a request.
+
+    Args:
+        method (str): API request method.
+        params (Dict[str, Any]): Parameters of the request, without the token.
+
+    Returns:
+        Any: The result, or :data:`MISSING` if there is no valid result.
+    """
+    key = cache_key(method, params)
+
+    data = _memory.get(key)
+    if data is not None:
+        logger.debug("Cached result of {} found in memory", method)
+        return _decompress(data)
+
+    now = timezone.now()
+    row = (
+        CachedWebtrekkRequest.objects.filter(key=key, expires__gt=now)
+        .values_list("pk", "response", "expires")
+        .first()
+    )
+
+    if row is None:
+        logger.debug("No cached result of {} found", method)
+        return MISSING
+
+    pk, data, expires = row
+    data = bytes(data)
+    CachedWebtrekkRequest.objects.filter(pk=pk).update(last_used=now)
+    _memory.set(key, data, expires)
+
+    logger.debug("Cached result of {} found in database", method)
+    return _decompress(data)
+
+
+def store(method: str, params: Dict[str, Any], result: Any):
+    """Store the result of a request in both tiers, replacing an older result.
+
+    Args:
+        method (str): API request method.
+        params (Dict[str, Any]): Parameters of the request, without the token.
+        result (Any): The result from the API.
+    """
+    key = cache_key(method, params)
+    data = _compress(result)
+    now = timezone.now()
+    expires = now + ttl(method, params)
+
+    bulk_upsert(
+        CachedWebtrekkRequest,
+        [
+            CachedWebtrekkRequest(
+                key=key,
+                method=method,
+                response=data,
+                expires=expires,
+                last_used=now,
+            )
+        ],
+        unique_fields=["key"],
+    )
+    _memory.set(key, data, expires)
+
+    logger.debug("Cached result of {} ({} bytes compressed)", method, len(data))
+
+
+def evict() -> int:
+    """Delete expired results and the least recently used results of each method
+    beyond its ``max_entries`` from the database.
+
+    Returns:
+        int: The number of deleted rows.
+    """
+    deleted, _ = CachedWebtrekkRequest.objects.filter(
+        expires__lte=timezone.now()
+    ).delete()
+
+    methods = (
+        CachedWebtrekkRequest.objects.order_by()
+        .values_list("method", flat=True)
+        .distinct()
+    )
+
+    for method in list(methods):
+        surplus = CachedWebtrekkRequest.objects.filter(method=method).order_by(
+            "-last_used"
+        )[policy(method).max_entries :]
+
+        while pks := list(surplus.values_list("pk", flat=True)[:EVICT_CHUNK_SIZE]):
+            count, _ = CachedWebtrekkRequest.objects.filter(pk__in=pks).delete()
+            deleted += count
+
+    return deleted
@@ -1,7 +1,31 @@
-import os
+"""Delete old data from the largest tables to keep the database small.
+
+Each :class:`RetentionPolicy` deletes the rows of a model that are older than its
+retention window. Rows are deleted in chunks of :data:`CHUNK_SIZE` in the order of
+their primary key, with a short pause after each chunk. Each chunk is a short
+transaction, so the cleanup doesn't hold locks on the whole table for minutes or
+block the scrapers that write to the same tables at the same time.
+
+On the staging deployment, all policies use :data:`STAGING_MAX_AGE`. Anywhere else,
+only the models with a retention window set in the environment variable
+``DB_CLEANUP_DAYS_<TABLE>`` (e.g. ``DB_CLEANUP_DAYS_PAGE_DATA_QUERY_GSC=400``) or a
+``default`` window, like the runs of the jobs, are cleaned up. The variable overrides
+the window on staging as well.
+
+Expired results of the Webtrekk cache are evicted in every environment, see
+:func:`okr.scrapers.common.webtrekk.cache.evict`.
+"""
+
 import datetime as dt
+import os
+import time
+from dataclasses import dataclass
+from time import sleep
+from typing import List, Optional, Type
 
+from django.db.models import DateTimeField, Model
 from loguru import logger
+from sentry_sdk import capture_exception
 
 from ..models import (
     # Podcasts
@@ -9,7 +33,6 @@ from ..models import (
     PodcastDataSpotifyHourly,
     PodcastEpisodeDataPodstat,
     PodcastEpisodeDataSpotify,
-    PodcastEpisodeDataSpotifyDemographics,
     PodcastEpisodeDataSpotifyPerformance,
     PodcastEpisodeDataWebtrekkPerformance,
     # Pages
@@ -18,62 +41,170 @@ from ..models import (
     PageDataGSC,
     PageDataQueryGSC,
     PageDataWebtrekk,
+    # Jobs
+    JobRun,
 )
+from ..models.base import estimated_count, rows_deleted
+from .common.utils import BERLIN, local_today
+from .common.webtrekk import cache as webtrekk_cache
 
+STAGING_MAX_AGE = dt.timedelta(days=45)
 
-def run_db_cleanup():
-    # Only run on Heroku staging deployment
-    if os.environ.get("HEROKU_APP_NAME") != "wdr-okr-staging":
-        return
-
-    max_age = dt.timedelta(days=45)
-    cutoff = dt.date.today() - max_age
-
-    purge_models = [
-        # Podcasts
-        PodcastDataSpotify,
-        PodcastDataSpotifyHourly,
-        PodcastEpisodeDataPodstat,
-        PodcastEpisodeDataSpotify,
-        PodcastEpisodeDataSpotifyDemographics,
-        PodcastEpisodeDataSpotifyPerformance,
-        PodcastEpisodeDataWebtrekkPerformance,
-        # Pages
-        PropertyDataGSC,
-        PropertyDataQueryGSC,
-        PageDataGSC,
-        PageDataQueryGSC,
-        PageDataWebtrekk,
-    ]
-
-    date_field_names = ["date", "date_time"]
-
-    for model in purge_models:
-        date_field = None
-
-        for date_field_name in date_field_names:
+# Rows deleted per statement and pause between statements in seconds
+CHUNK_SIZE = 5000
+PAUSE = 0.5
+
+
+def _is_staging() -> bool:
+    return os.environ.get("HEROKU_APP_NAME") == "wdr-okr-staging"
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Deletes the rows of a model that are older than its retention window."""
+
+    model: Type[Model]
+    date_field: str = "date"
+    # Retention window outside of staging if none is set in the environment
+    default: Optional[dt.timedelta] = None
+
+    @property
+    def variable(self) -> str:
+        """Name of the environment variable for the retention window in days."""
+        return f"DB_CLEANUP_DAYS_{self.model._meta.db_table.upper()}"
+
+    def max_age(self) -> Optional[dt.timedelta]:
+        """Get the retention window of the model in this environment.
+
+        Returns:
+            Optional[dt.timedelta]: The retention window, or None to keep all rows.
+        """
+        value = os.environ.get(self.variable)
+
+        if value:
             try:
-                date_field = getattr(model, date_field_name)
+                return dt.timedelta(days=int(value))
+            except ValueError:
+                logger.warning(
+                    "Invalid retention window {!r} in {}", value, self.variable
+                )
+
+        return STAGING_MAX_AGE if _is_staging() else self.default
+
+    def apply(
+        self,
+        max_age: dt.timedelta,
+        *,
+        chunk_size: int = CHUNK_SIZE,
+        pause: float = PAUSE,
+    ) -> int:
+        """Delete the rows that are older than ``max_age``.
+
+        Args:
+            max_age (dt.timedelta): The retention window.
+            chunk_size (int, optional): Rows deleted per statement. Defaults to
+                ``CHUNK_SIZE``.
+            pause (float, optional): Seconds to wait between chunks. Defaults to
+                ``PAUSE``.
+
+        Returns:
+            int: The number of deleted rows.
+        """
+        cutoff = local_today() - max_age
+        field = self.model._meta.get_field(self.date_field)
+
+        if isinstance(field, DateTimeField):
+            cutoff = BERLIN.localize(dt.datetime.combine(cutoff, dt.time()))
+
+        expired = self.model.objects.filter(
+            **{f"{self.date_field}__lt": cutoff}
+        ).order_by("pk")
+
+        deleted = 0
+        last_pk = None
+
+        while True:
+            chunk = expired if last_pk is None else expired.filter(pk__gt=last_pk)
+            pks = list(chunk.values_list("pk", flat=True)[:chunk_size])
+
+            if not pks:
+                break
+
+            count, _ = self.model.objects.filter(pk__in=pks).delete()
+            deleted += count
+            last_pk = pks[-1]
+
+            if len(pks) < chunk_size:
                 break
-            except AttributeError:
-                continue
-
-        if not date_field:
-            logger.error(
-                "date_field not found for model {} - tried: {}",
-                model,
-                date_field_names,
-            )
+
+            sleep(pause)
+
+        return deleted
+
+
+POLICIES: List[RetentionPolicy] = [
+    # Podcasts
+    RetentionPolicy(PodcastDataSpotify),
+    RetentionPolicy(PodcastDataSpotifyHourly, date_field="date_time"),
+    RetentionPolicy(PodcastEpisodeDataPodstat),
+    RetentionPolicy(PodcastEpisodeDataSpotify),
+    RetentionPolicy(PodcastEpisodeDataSpotifyPerformance),
+    RetentionPolicy(PodcastEpisodeDataWebtrekkPerformance),
+    # Pages
+    RetentionPolicy(PropertyDataGSC),
+    RetentionPolicy(PropertyDataQueryGSC),
+    RetentionPolicy(PageDataGSC),
+    RetentionPolicy(PageDataQueryGSC),
+    RetentionPolicy(PageDataWebtrekk),
+    # Jobs
+    RetentionPolicy(JobRun, date_field="started_at", default=dt.timedelta(days=90)),
+]
+
+
+def run_db_cleanup():
+    """Apply the retention policies that have a retention window in this environment
+    and evict expired results from the Webtrekk cache.
+
+    A failing policy is reported to Sentry and doesn't stop the others.
+    """
+    for policy in POLICIES:
+        max_age = policy.max_age()
+
+        if max_age is None:
             continue
 
-        filter_kwargs = {f"{date_field.field.name}__lt": cutoff}
+        model_name = policy.model.__name__
+        estimate = estimated_count(policy.model)
+        logger.info(
+            "Deleting rows older than {} days from {} (estimated table size: {})",
+            max_age.days,
+            model_name,
+            "n/a" if estimate is None else estimate,
+        )
+        start = time.perf_counter()
+
+        try:
+            deleted = policy.apply(max_age)
+        except Exception as e:
+            capture_exception(e)
+            logger.exception("DB cleanup of {} failed", model_name)
+            continue
+
+        if deleted:
+            rows_deleted.send(sender=policy.model)
 
-        result_set = model.objects.filter(**filter_kwargs)
         logger.info(
-            "Deleting {delete_count} out of {total_count} items from {model}",
-            delete_count=result_set.count(),
-            total_count=model.objects.count(),
-            model=model,
+            "Deleted {} rows from {} in {:.1f}s",
+            deleted,
+            model_name,
+            time.perf_counter() - start,
         )
-        result_set.delete()
-        logger.success("DB cleanup complete.")
+
+    try:
+        deleted = webtrekk_cache.evict()
+        logger.info("Evicted {} cached Webtrekk results", deleted)
+    except Exception as e:
+        capture_exception(e)
+        logger.exception("Eviction of cached Webtrekk results failed")
+
+    logger.success("DB cleanup complete.")
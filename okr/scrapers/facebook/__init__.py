@@ -1,7 +1,7 @@
 """Read and process data for Facebook from Quintly."""
 
-from datetime import date, datetime
-from time import sleep
+import functools
+from datetime import date
 from typing import Optional
 
 from django.db.utils import IntegrityError
@@ -15,8 +15,10 @@ from ...models.facebook import (
     FacebookPost,
 )
 from . import quintly
-from ..common.quintly import parse_bool
-from ..common.utils import BERLIN
+from ..common import frames
+from ..common.backfill import checkpointed
+from ..common.quintly import for_each_account
+from ..common.upsert import bulk_upsert
 
 
 def scrape_full(facebook: Facebook):
@@ -30,11 +32,15 @@ def scrape_full(facebook: Facebook):
     facebook_filter = Q(id=facebook.id)
     start_date = date(2019, 1, 1)
 
-    sleep(1)
+    with checkpointed(scrape_full, facebook) as backfill:
+        backfill.run(
+            scrape_insights, start_date=start_date, facebook_filter=facebook_filter
+        )
 
-    scrape_insights(start_date=start_date, facebook_filter=facebook_filter)
+        backfill.run(
+            scrape_posts, start_date=start_date, facebook_filter=facebook_filter
+        )
 
-    scrape_posts(start_date=start_date, facebook_filter=facebook_filter)
     logger.success("Finished full Facebook scrape of {}", facebook)
 
 
@@ -58,11 +64,11 @@ def scrape_insights(
     if facebook_filter:
         facebooks = facebooks.filter(facebook_filter)
 
-    for facebook in facebooks:
-        try:
-            _scrape_insights_facebook(start_date, facebook)
-        except Exception as e:
-            capture_exception(e)
+    for_each_account(
+        facebooks,
+        functools.partial(_scrape_insights_facebook, start_date),
+        job=scrape_insights,
+    )
 
 
 def _scrape_insights_facebook(start_date, facebook):
@@ -72,29 +78,30 @@ def _scrape_insights_facebook(start_date, facebook):
         start_date=start_date,
     )
 
-    for index, row in df.iterrows():
-        defaults = {
-            "fans": row.page_fans or 0,
-            "follows": row.page_follows or 0,
-            "impressions_unique": row.page_impressions_unique or 0,
-            "impressions_unique_7_days": row.page_impressions_unique_week or 0,
-            "impressions_unique_28_days": row.page_impressions_unique_days_28 or 0,
-            "fans_online_per_day": row.page_fans_online_per_day or 0,
-        }
-
-        try:
-            obj, created = FacebookInsight.objects.update_or_create(
-                facebook=facebook,
-                date=date.fromisoformat(row.time),
-                defaults=defaults,
-            )
-        except IntegrityError as e:
-            capture_exception(e)
-            logger.exception(
-                "Data for {} insights for date {} failed integrity check:\n{}",
-                row.time,
-                defaults,
-            )
+    objs = frames.to_models(
+        FacebookInsight,
+        df,
+        {
+            "date": frames.dates("time"),
+            "fans": frames.filled("page_fans", 0),
+            "follows": frames.filled("page_follows", 0),
+            "impressions_unique": frames.filled("page_impressions_unique", 0),
+            "impressions_unique_7_days": frames.filled(
+                "page_impressions_unique_week", 0
+            ),
+            "impressions_unique_28_days": frames.filled(
+                "page_impressions_unique_days_28", 0
+            ),
+            "fans_online_per_day": frames.filled("page_fans_online_per_day", 0),
+        },
+        facebook=facebook,
+    )
+
+    try:
+        bulk_upsert(FacebookInsight, objs, ["facebook", "date"])
+    except IntegrityError as e:
+        capture_exception(e)
+        logger.exception("Data for insights of {} failed integrity check", facebook)
 
 
 def scrape_posts(
@@ -115,46 +122,43 @@ def scrape_posts(
     if facebook_filter:
         facebooks = facebooks.filter(facebook_filter)
 
-    for facebook in facebooks:
-        try:
-            _scrape_posts_facebook(start_date, facebook)
-        except Exception as e:
-            capture_exception(e)
+    for_each_account(
+        facebooks,
+        functools.partial(_scrape_posts_facebook, start_date),
+        job=scrape_posts,
+    )
 
 
 def _scrape_posts_facebook(start_date, facebook):
     logger.debug("Scraping post insights for {}", facebook)
     df = quintly.get_facebook_posts(facebook.quintly_profile_id, start_date=start_date)
 
-    for index, row in df.iterrows():
-        defaults = {
-            "created_at": BERLIN.localize(datetime.fromisoformat(row.time)),
-            "post_type": row.type,
-            "link": row.link,
-            "message": row.message,
-            "likes": row.likes or 0,
-            "love": row.love or 0,
-            "wow": row.wow or 0,
-            "haha": row.haha or 0,
-            "sad": row.sad or 0,
-            "angry": row.angry or 0,
-            "comments": row.comments or 0,
-            "shares": row.shares or 0,
-            "impressions_unique": row.post_impressions_unique or 0,
-            "is_published": parse_bool(row.is_published, default=False),
-            "is_hidden": parse_bool(row.is_hidden, default=False),
-        }
-
-        try:
-            obj, created = FacebookPost.objects.update_or_create(
-                facebook=facebook,
-                external_id=row.externalId,
-                defaults=defaults,
-            )
-        except IntegrityError as e:
-            capture_exception(e)
-            logger.exception(
-                "Data for post with ID {} failed integrity check:\n{}",
-                row.externalId,
-                defaults,
-            )
+    objs = frames.to_models(
+        FacebookPost,
+        df,
+        {
+            "external_id": "externalId",
+            "created_at": frames.local_datetimes("time"),
+            "post_type": "type",
+            "link": "link",
+            "message": "message",
+            "likes": frames.filled("likes", 0),
+            "love": frames.filled("love", 0),
+            "wow": frames.filled("wow", 0),
+            "haha": frames.filled("haha", 0),
+            "sad": frames.filled("sad", 0),
+            "angry": frames.filled("angry", 0),
+            "comments": frames.filled("comments", 0),
+            "shares": frames.filled("shares", 0),
+            "impressions_unique": frames.filled("post_impressions_unique", 0),
+            "is_published": frames.bools("is_published", default=False),
+            "is_hidden": frames.bools("is_hidden", default=False),
+        },
+        facebook=facebook,
+    )
+
+    try:
+        bulk_upsert(FacebookPost, objs, ["external_id"])
+    except IntegrityError as e:
+        capture_exception(e)
+        logger.exception("Data for posts of {} failed integrity check", facebook)
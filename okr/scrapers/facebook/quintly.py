@@ -55,7 +55,7 @@ def get_facebook_insights(
     if interval == "daily":
         fields.append("page_fans_online_per_day")
 
-    df_facebook_insights = common_quintly.quintly.run_query(
+    df_facebook_insights = common_quintly.run_query(
         profile_ids,
         table,
         fields,
@@ -117,7 +117,7 @@ def get_facebook_posts(
     start_date = start_date or datetime.date.today() - datetime.timedelta(days=120)
     end_date = datetime.date.today()
 
-    df_posts_insights = common_quintly.quintly.run_query(
+    df_posts_insights = common_quintly.run_query(
         profile_ids,
         table,
         fields,
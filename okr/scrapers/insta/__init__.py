@@ -1,15 +1,14 @@
 """Read and process data for Instagram from Quintly."""
 
 import datetime as dt
+import functools
 import json
-from time import sleep
 from typing import Dict, Generator, Optional
 
 from django.db.utils import IntegrityError
 from django.db.models import Q, Sum
 from loguru import logger
 from sentry_sdk import capture_exception
-from bulk_sync import bulk_sync
 
 from ...models.insta import (
     Insta,
@@ -25,6 +24,11 @@ from ...models.insta import (
     InstaReelData,
 )
 from . import quintly
+from ..common import frames
+from ..common.backfill import checkpointed
+from ..common.quintly import for_each_account
+from ..common.upsert import bulk_upsert
+from ..common.watermarks import incremental
 from ..common.utils import BERLIN, local_today
 
 
@@ -40,15 +44,18 @@ def scrape_full(insta: Insta):
     insta_filter = Q(id=insta.id)
     start_date = dt.date(2019, 1, 1)
 
-    sleep(1)
-
-    scrape_insights(start_date=start_date, insta_filter=insta_filter)
-    scrape_stories(start_date=start_date, insta_filter=insta_filter)
-    scrape_posts(start_date=start_date, insta_filter=insta_filter)
-    scrape_igtv(start_date=start_date, insta_filter=insta_filter)
-    scrape_comments(start_date=start_date, insta_filter=insta_filter)
-    scrape_demographics(start_date=start_date, insta_filter=insta_filter)
-    scrape_hourly_followers(start_date=start_date, insta_filter=insta_filter)
+    with checkpointed(scrape_full, insta) as backfill:
+        backfill.run(scrape_insights, start_date=start_date, insta_filter=insta_filter)
+        backfill.run(scrape_stories, start_date=start_date, insta_filter=insta_filter)
+        backfill.run(scrape_posts, start_date=start_date, insta_filter=insta_filter)
+        backfill.run(scrape_igtv, start_date=start_date, insta_filter=insta_filter)
+        backfill.run(scrape_comments, start_date=start_date, insta_filter=insta_filter)
+        backfill.run(
+            scrape_demographics, start_date=start_date, insta_filter=insta_filter
+        )
+        backfill.run(
+            scrape_hourly_followers, start_date=start_date, insta_filter=insta_filter
+        )
 
     logger.success('Finished full scrape for Instagram account "{}"', insta.name)
 
@@ -64,7 +71,8 @@ def scrape_insights(
 
     Args:
         start_date (Optional[dt.date], optional): Earliest date to request data for.
-            Defaults to None.
+            Defaults to None. If None, requests the data that isn't final yet
+            (see :mod:`~okr.scrapers.common.watermarks`).
         insta_filter (Optional[Q], optional): Filter to apply to
             :class:`~okr.models.insta.Insta` object. Defaults to None.
     """
@@ -73,48 +81,53 @@ def scrape_insights(
     if insta_filter:
         instas = instas.filter(insta_filter)
 
-    for insta in instas:
-        try:
-            _scrape_insights_insta(start_date, insta)
-        except Exception as e:
-            capture_exception(e)
+    for_each_account(
+        instas,
+        functools.partial(_scrape_insights_insta, start_date),
+        job=scrape_insights,
+    )
 
 
 def _scrape_insights_insta(start_date, insta):
-    logger.info(f"Scraping Instagram insights for {insta.name}")
-    df = quintly.get_insta_insights(insta.quintly_profile_id, start_date=start_date)
-
-    for index, row in df.iterrows():
-        if row.importTime is None:
-            continue
+    with incremental(
+        scrape_insights,
+        insta,
+        source="quintly",
+        default=local_today() - dt.timedelta(days=7),
+        start_date=start_date,
+    ) as increment:
+        logger.info(f"Scraping Instagram insights for {insta.name}")
+        df = quintly.get_insta_insights(
+            insta.quintly_profile_id, start_date=increment.start_date
+        )
 
-        defaults = {
-            "quintly_last_updated": BERLIN.localize(
-                dt.datetime.fromisoformat(row.importTime)
-            ),
-            "reach": row.reachDay,
-            "reach_7_days": row.reachWeek,
-            "reach_28_days": row.reachDays28,
-            "impressions": row.impressionsDay,
-            "followers": row.followers,
-            "text_message_clicks_day": row.textMessageClicksDay,
-            "email_contacts_day": row.emailContactsDay,
-            "profile_views": row.profileViewsDay,
-        }
+        if not df.empty:
+            df = df[df.importTime.notna()]
+
+        objs = frames.to_models(
+            InstaInsight,
+            df,
+            {
+                "date": frames.dates("time"),
+                "quintly_last_updated": frames.local_datetimes("importTime"),
+                "reach": "reachDay",
+                "reach_7_days": "reachWeek",
+                "reach_28_days": "reachDays28",
+                "impressions": "impressionsDay",
+                "followers": "followers",
+                "text_message_clicks_day": "textMessageClicksDay",
+                "email_contacts_day": "emailContactsDay",
+                "profile_views": "profileViewsDay",
+            },
+            insta=insta,
+        )
 
         try:
-            obj, created = InstaInsight.objects.update_or_create(
-                insta=insta,
-                date=dt.date.fromisoformat(row.time),
-                defaults=defaults,
-            )
+            bulk_upsert(InstaInsight, objs, ["insta", "date"])
         except IntegrityError as e:
             capture_exception(e)
-            logger.exception(
-                "Data for insights on {} failed integrity check:\n{}",
-                row.time,
-                defaults,
-            )
+            increment.mark_incomplete()
+            logger.exception("Data for insights of {} failed integrity check", insta)
 
 
 def scrape_stories(
@@ -135,45 +148,42 @@ def scrape_stories(
     if insta_filter:
         instas = instas.filter(insta_filter)
 
-    for insta in instas:
-        try:
-            _scrape_stories_insta(start_date, insta)
-        except Exception as e:
-            capture_exception(e)
+    for_each_account(
+        instas,
+        functools.partial(_scrape_stories_insta, start_date),
+        job=scrape_stories,
+    )
 
 
 def _scrape_stories_insta(start_date, insta):
     logger.info(f"Scraping Instagram stories for {insta.name}")
     df = quintly.get_insta_stories(insta.quintly_profile_id, start_date=start_date)
 
-    for index, row in df.iterrows():
-        defaults = {
-            "created_at": BERLIN.localize(dt.datetime.fromisoformat(row.time)),
-            "quintly_last_updated": BERLIN.localize(
-                dt.datetime.fromisoformat(row.importTime)
-            ),
-            "caption": row.caption,
-            "reach": row.reach,
-            "impressions": row.impressions,
-            "replies": row.replies,
-            "taps_forward": row.tapsForward,
-            "taps_back": row.tapsBack,
-            "story_type": row.type,
-            "link": row.link,
-            "exits": row.exits,
-        }
+    objs = frames.to_models(
+        InstaStory,
+        df,
+        {
+            "external_id": "externalId",
+            "created_at": frames.local_datetimes("time"),
+            "quintly_last_updated": frames.local_datetimes("importTime"),
+            "caption": "caption",
+            "reach": "reach",
+            "impressions": "impressions",
+            "replies": "replies",
+            "taps_forward": "tapsForward",
+            "taps_back": "tapsBack",
+            "story_type": "type",
+            "link": "link",
+            "exits": "exits",
+        },
+        insta=insta,
+    )
 
-        try:
-            obj, created = InstaStory.objects.update_or_create(
-                insta=insta, external_id=row.externalId, defaults=defaults
-            )
-        except IntegrityError as e:
-            capture_exception(e)
-            logger.exception(
-                "Data for story with ID {} failed integrity check:\n{}",
-                row.externalId,
-                defaults,
-            )
+    try:
+        bulk_upsert(InstaStory, objs, ["external_id"])
+    except IntegrityError as e:
+        capture_exception(e)
+        logger.exception("Data for stories of {} failed integrity check", insta)
 
 
 def scrape_posts(
@@ -195,11 +205,11 @@ def scrape_posts(
     if insta_filter:
         instas = instas.filter(insta_filter)
 
-    for insta in instas:
-        try:
-            _scrape_posts_insta(start_date, insta)
-        except Exception as e:
-            capture_exception(e)
+    for_each_account(
+        instas,
+        functools.partial(_scrape_posts_insta, start_date),
+        job=scrape_posts,
+    )
 
 
 def _scrape_posts_insta(start_date, insta):
@@ -210,42 +220,61 @@ def _scrape_posts_insta(start_date, insta):
     if df.empty:
         return
 
-    for index, row in df.iterrows():
-        defaults = {
-            "created_at": BERLIN.localize(dt.datetime.fromisoformat(row.time)),
-            "quintly_last_updated": BERLIN.localize(
-                dt.datetime.fromisoformat(row.importTime)
+    defaults = frames.columns(
+        df,
+        {
+            "created_at": frames.local_datetimes("time"),
+            "quintly_last_updated": frames.local_datetimes("importTime"),
+            "message": frames.filled("message", ""),
+            "comments": "comments",
+            "reach": "reach",
+            "impressions": "impressions",
+            "likes": "likes",
+            "saved": "saved",
+            "video_views": "videoViews",
+            "shares": "shares",
+            "post_type": "type",
+            "link": "link",
+        },
+    )
+    defaults_by_external_id = {
+        external_id: dict(zip(defaults.keys(), values))
+        for external_id, *values in zip(df.externalId, *defaults.values())
+    }
+
+    try:
+        bulk_upsert(
+            InstaPost,
+            (
+                InstaPost(insta=insta, external_id=external_id, **defaults)
+                for external_id, defaults in defaults_by_external_id.items()
             ),
-            "message": row.message or "",
-            "comments": row.comments,
-            "reach": row.reach,
-            "impressions": row.impressions,
-            "likes": row.likes,
-            "saved": row.saved,
-            "video_views": row.videoViews,
-            "shares": row.shares,
-            "post_type": row.type,
-            "link": row.link,
-        }
+            ["external_id"],
+        )
+    except IntegrityError as e:
+        capture_exception(e)
+        logger.exception("Data for posts of {} failed integrity check", insta)
+        return
 
-        try:
-            obj, created = InstaPost.objects.update_or_create(
-                insta=insta,
-                external_id=row.externalId,
-                defaults=defaults,
-            )
+    posts = InstaPost.objects.filter(
+        insta=insta,
+        external_id__in=defaults_by_external_id.keys(),
+    )
 
-            # If this is a video or reel post, save additional data
-            if row.type.lower() == "video":
-                _scrape_video_daily(insta, obj, defaults)
-            elif row.type.lower() == "reel":
-                _scrape_reel_daily(insta, obj, defaults)
+    # If this is a video or reel post, save additional data
+    for post in posts:
+        defaults = defaults_by_external_id[post.external_id]
 
+        try:
+            if post.post_type.lower() == "video":
+                _scrape_video_daily(insta, post, defaults)
+            elif post.post_type.lower() == "reel":
+                _scrape_reel_daily(insta, post, defaults)
         except IntegrityError as e:
             capture_exception(e)
             logger.exception(
                 "Data for post with ID {} failed integrity check:\n{}",
-                row.externalId,
+                post.external_id,
                 defaults,
             )
 
@@ -356,44 +385,49 @@ def scrape_igtv(
     if insta_filter:
         instas = instas.filter(insta_filter)
 
-    for insta in instas:
-        try:
-            _scrape_igtv_insta(start_date, insta)
-        except Exception as e:
-            capture_exception(e)
+    for_each_account(
+        instas,
+        functools.partial(_scrape_igtv_insta, start_date),
+        job=scrape_igtv,
+    )
 
 
 def _scrape_igtv_insta(start_date, insta):
     logger.info(f"Scraping IGTV for {insta.name}")
     df = quintly.get_insta_igtv(insta.quintly_profile_id, start_date=start_date)
 
-    for index, row in df.iterrows():
-        defaults = {
-            "created_at": BERLIN.localize(dt.datetime.fromisoformat(row.time)),
-            "quintly_last_updated": BERLIN.localize(
-                dt.datetime.fromisoformat(row.importTime)
-            ),
-            "message": row.message or "",
-            "video_title": row.videoTitle,
-            "likes": row.likes,
-            "comments": row.comments,
-            "reach": row.reach,
-            "impressions": row.impressions,
-            "saved": row.saved,
-            "video_views": row.videoViews,
-            "link": row.link,
-        }
+    rows = frames.to_rows(
+        df,
+        {
+            "external_id": "externalId",
+            "created_at": frames.local_datetimes("time"),
+            "quintly_last_updated": frames.local_datetimes("importTime"),
+            "message": frames.filled("message", ""),
+            "video_title": "videoTitle",
+            "likes": "likes",
+            "comments": "comments",
+            "reach": "reach",
+            "impressions": "impressions",
+            "saved": "saved",
+            "video_views": "videoViews",
+            "link": "link",
+        },
+    )
+
+    for row in rows:
+        defaults = row._asdict()
+        external_id = defaults.pop("external_id")
 
         try:
             obj, created = InstaIGTV.objects.update_or_create(
-                insta=insta, external_id=row.externalId, defaults=defaults
+                insta=insta, external_id=external_id, defaults=defaults
             )
             _scrape_igtv_daily(insta, obj, defaults)
         except IntegrityError as e:
             capture_exception(e)
             logger.exception(
                 "Data for post with ID {} failed integrity check:\n{}",
-                row.externalId,
+                external_id,
                 defaults,
             )
 
@@ -448,12 +482,11 @@ def scrape_comments(
     if insta_filter:
         instas = instas.filter(insta_filter)
 
-    for insta in instas:
-        try:
-            _scrape_comments_insta(start_date, insta)
-        except Exception as e:
-            logger.exception(f"Failed to scrape comments for {insta.name}")
-            capture_exception(e)
+    for_each_account(
+        instas,
+        functools.partial(_scrape_comments_insta, start_date),
+        job=scrape_comments,
+    )
 
 
 def _scrape_comments_insta(start_date, insta):
@@ -463,63 +496,56 @@ def _scrape_comments_insta(start_date, insta):
     post_cache: Dict[str, InstaPost] = {}
 
     for df in dfs:
-        comments = list(_scrape_comments_insta_day(insta, post_cache, df))
-
-        # bulk_sync breaks if there are no comments
-        if not comments:
-            continue
+        comments = _scrape_comments_insta_day(insta, post_cache, df)
 
-        posts = set(comment.post for comment in comments)
-
-        sync_results = bulk_sync(
-            comments,
-            ["external_id"],
-            Q(post__in=posts),
-            batch_size=100,
-            skip_deletes=True,
-        )
-        logger.debug(sync_results)
+        written = bulk_upsert(InstaComment, comments, ["external_id"])
+        logger.debug("Upserted {} comments", written)
 
 
 def _scrape_comments_insta_day(
     insta: Insta, post_cache: Dict[str, InstaPost], df
 ) -> Generator[InstaComment, None, None]:
-    for index, row in df.iterrows():
-        defaults = {
-            "created_at": BERLIN.localize(dt.datetime.fromisoformat(row.time)),
-            "quintly_last_updated": BERLIN.localize(
-                dt.datetime.fromisoformat(row.importTime)
-            ),
-            "is_account_answer": bool(row.isAccountAnswer),
-            "username": row.username,
-            "message_length": len(row.message or ""),
-            "likes": row.likes,
-            "is_reply": bool(row.isReply),
-            "parent_comment_id": row.parentCommentId,
-            "is_hidden": bool(row.isHidden),
-        }
-
-        if row.externalPostId in post_cache:
-            post = post_cache[row.externalPostId]
-        else:
-            post = InstaPost.objects.filter(
-                insta=insta,
-                external_id=row.externalPostId,
-            ).first()
-            post_cache[row.externalPostId] = post
-
-        if not post:
-            logger.debug(
-                "Comment with ID {} and post ID {} has no corresponding post",
-                row.externalId,
-                row.externalPostId,
-            )
-            continue
+    if df.empty:
+        return
 
-        defaults["post"] = post
+    # Look up the posts of all comments of the day at once
+    missing_ids = set(df.externalPostId) - post_cache.keys()
+    if missing_ids:
+        found = InstaPost.objects.filter(insta=insta).in_bulk(
+            missing_ids, field_name="external_id"
+        )
+        post_cache.update({post_id: found.get(post_id) for post_id in missing_ids})
+
+    posts = df.externalPostId.map(post_cache)
+    has_post = posts.notna()
+
+    for comment_id, post_id in zip(
+        df.externalId[~has_post], df.externalPostId[~has_post]
+    ):
+        logger.debug(
+            "Comment with ID {} and post ID {} has no corresponding post",
+            comment_id,
+            post_id,
+        )
 
-        # Build comment object for bulk_sync
-        yield InstaComment(external_id=row.externalId, **defaults)
+    # Build comment objects for bulk_upsert
+    yield from frames.to_models(
+        InstaComment,
+        df[has_post],
+        {
+            "external_id": "externalId",
+            "post": lambda df: posts[has_post],
+            "created_at": frames.local_datetimes("time"),
+            "quintly_last_updated": frames.local_datetimes("importTime"),
+            "is_account_answer": frames.truthy("isAccountAnswer"),
+            "username": "username",
+            "message_length": lambda df: df.message.fillna("").str.len(),
+            "likes": "likes",
+            "is_reply": frames.truthy("isReply"),
+            "parent_comment_id": "parentCommentId",
+            "is_hidden": frames.truthy("isHidden"),
+        },
+    )
 
 
 def scrape_demographics(
@@ -533,7 +559,8 @@ def scrape_demographics(
 
     Args:
         start_date (Optional[dt.date], optional): Earliest date to request data for.
-            Defaults to None.
+            Defaults to None. If None, requests the data that isn't final yet
+            (see :mod:`~okr.scrapers.common.watermarks`).
         insta_filter (Optional[Q], optional): Filter to apply to
             :class:`~okr.models.insta.Insta` object. Defaults to None.
     """
@@ -542,49 +569,68 @@ def scrape_demographics(
     if insta_filter:
         instas = instas.filter(insta_filter)
 
-    for insta in instas:
-        try:
-            _scrape_demographics_insta(start_date, insta)
-        except Exception as e:
-            capture_exception(e)
+    for_each_account(
+        instas,
+        functools.partial(_scrape_demographics_insta, start_date),
+        job=scrape_demographics,
+    )
 
 
 def _scrape_demographics_insta(start_date, insta):
-    logger.info(f"Scraping Instagram demographics for {insta.name}")
-    df = quintly.get_insta_demographics(insta.quintly_profile_id, start_date=start_date)
-
-    for index, row in df.iterrows():
-        if not row.audienceGenderAndAge:
-            continue
-
-        for entry in json.loads(row.audienceGenderAndAge):
-            gender, _, age_range = entry["id"].partition("-")
-            followers = entry["followers"]
-
-            defaults = {
-                "quintly_last_updated": BERLIN.localize(
-                    dt.datetime.fromisoformat(row.importTime)
-                ),
-                "followers": followers,
-            }
-
-            try:
-                obj, created = InstaDemographics.objects.update_or_create(
-                    insta=insta,
-                    date=dt.date.fromisoformat(row.time[:10]),
-                    age_range=age_range,
-                    gender=gender,
-                    defaults=defaults,
-                )
+    with incremental(
+        scrape_demographics,
+        insta,
+        source="quintly",
+        default=local_today() - dt.timedelta(days=7),
+        start_date=start_date,
+    ) as increment:
+        logger.info(f"Scraping Instagram demographics for {insta.name}")
+        df = quintly.get_insta_demographics(
+            insta.quintly_profile_id, start_date=increment.start_date
+        )
+
+        objs = []
 
-            except IntegrityError as e:
-                capture_exception(e)
-                logger.exception(
-                    "Data for demographics on {} failed integrity check:\n{}",
-                    row.time,
-                    insta,
+        rows = frames.to_rows(
+            df,
+            {
+                "date": frames.dates("time"),
+                "quintly_last_updated": frames.local_datetimes("importTime"),
+                "audience": "audienceGenderAndAge",
+            },
+        )
+
+        for row in rows:
+            if not row.audience:
+                continue
+
+            for entry in json.loads(row.audience):
+                gender, _, age_range = entry["id"].partition("-")
+
+                objs.append(
+                    InstaDemographics(
+                        insta=insta,
+                        date=row.date,
+                        age_range=age_range,
+                        gender=gender,
+                        quintly_last_updated=row.quintly_last_updated,
+                        followers=entry["followers"],
+                    )
                 )
 
+        try:
+            bulk_upsert(
+                InstaDemographics,
+                objs,
+                ["insta", "date", "age_range", "gender"],
+            )
+        except IntegrityError as e:
+            capture_exception(e)
+            increment.mark_incomplete()
+            logger.exception(
+                "Data for demographics of {} failed integrity check", insta
+            )
+
 
 def scrape_hourly_followers(
     *,
@@ -597,7 +643,8 @@ def scrape_hourly_followers(
 
     Args:
         start_date (Optional[dt.date], optional): Earliest date to request data for.
-            Defaults to None.
+            Defaults to None. If None, requests the data that isn't final yet
+            (see :mod:`~okr.scrapers.common.watermarks`).
         insta_filter (Optional[Q], optional): Filter to apply to
             :class:`~okr.models.insta.Insta` object. Defaults to None.
     """
@@ -606,48 +653,62 @@ def scrape_hourly_followers(
     if insta_filter:
         instas = instas.filter(insta_filter)
 
-    for insta in instas:
-        try:
-            _scrape_hourly_followers_insta(start_date, insta)
-        except Exception as e:
-            capture_exception(e)
+    for_each_account(
+        instas,
+        functools.partial(_scrape_hourly_followers_insta, start_date),
+        job=scrape_hourly_followers,
+    )
 
 
 def _scrape_hourly_followers_insta(start_date, insta):
-    logger.info(f"Scraping Instagram hourly followers for {insta.name}")
-    df = quintly.get_insta_hourly_followers(
-        insta.quintly_profile_id, start_date=start_date
-    )
+    with incremental(
+        scrape_hourly_followers,
+        insta,
+        source="quintly",
+        default=local_today() - dt.timedelta(days=7),
+        start_date=start_date,
+    ) as increment:
+        logger.info(f"Scraping Instagram hourly followers for {insta.name}")
+        df = quintly.get_insta_hourly_followers(
+            insta.quintly_profile_id, start_date=increment.start_date
+        )
 
-    for index, row in df.iterrows():
-        if not row.onlineFollowers:
-            continue
+        objs = []
 
-        date = dt.date.fromisoformat(row.time[:10])
-        for entry in json.loads(row.onlineFollowers):
-            hour = entry["id"]
-            followers = entry["followers"]
-            date_time = BERLIN.localize(
-                dt.datetime(date.year, date.month, date.day, hour)
-            )
+        rows = frames.to_rows(
+            df,
+            {
+                "date": frames.dates("time"),
+                "quintly_last_updated": frames.local_datetimes("importTime"),
+                "online_followers": "onlineFollowers",
+            },
+        )
 
-            defaults = {
-                "quintly_last_updated": BERLIN.localize(
-                    dt.datetime.fromisoformat(row.importTime)
-                ),
-                "followers": followers,
-            }
-
-            try:
-                obj, created = InstaHourlyFollowers.objects.update_or_create(
-                    insta=insta,
-                    date_time=date_time,
-                    defaults=defaults,
+        for row in rows:
+            if not row.online_followers:
+                continue
+
+            date = row.date
+            for entry in json.loads(row.online_followers):
+                hour = entry["id"]
+                date_time = BERLIN.localize(
+                    dt.datetime(date.year, date.month, date.day, hour)
                 )
-            except IntegrityError as e:
-                capture_exception(e)
-                logger.exception(
-                    "Data for hourly followers on {} failed integrity check:\n{}",
-                    date_time,
-                    insta,
+
+                objs.append(
+                    InstaHourlyFollowers(
+                        insta=insta,
+                        date_time=date_time,
+                        quintly_last_updated=row.quintly_last_updated,
+                        followers=entry["followers"],
+                    )
                 )
+
+        try:
+            bulk_upsert(InstaHourlyFollowers, objs, ["insta", "date_time"])
+        except IntegrityError as e:
+            capture_exception(e)
+            increment.mark_incomplete()
+            logger.exception(
+                "Data for hourly followers of {} failed integrity check", insta
+            )
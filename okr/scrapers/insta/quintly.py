@@ -41,7 +41,7 @@ def get_insta_insights(
         "followers",
     ]
 
-    df_insta = common_quintly.quintly.run_query(
+    df_insta = common_quintly.run_query(
         profile_ids,
         table,
         fields,
@@ -64,7 +64,7 @@ def get_insta_insights(
         "profileViewsDay",
     ]
 
-    df_insta_insights = common_quintly.quintly.run_query(
+    df_insta_insights = common_quintly.run_query(
         profile_ids,
         table,
         fields,
@@ -123,9 +123,7 @@ def get_insta_stories(
     ]
     start_date = start_date or datetime.date.today() - datetime.timedelta(days=7)
     end_date = datetime.date.today()
-    df = common_quintly.quintly.run_query(
-        profile_ids, table, fields, start_date, end_date
-    )
+    df = common_quintly.run_query(profile_ids, table, fields, start_date, end_date)
 
     df = df.replace({np.nan: None})
 
@@ -170,9 +168,7 @@ def get_insta_posts(
     start_date = start_date or datetime.date.today() - datetime.timedelta(days=120)
     end_date = datetime.date.today()
 
-    df = common_quintly.quintly.run_query(
-        profile_ids, table, fields, start_date, end_date
-    )
+    df = common_quintly.run_query(profile_ids, table, fields, start_date, end_date)
 
     df = df.replace({np.nan: None})
 
@@ -214,9 +210,7 @@ def get_insta_igtv(
     ]
     start_date = start_date or datetime.date.today() - datetime.timedelta(days=120)
     end_date = datetime.date.today()
-    df = common_quintly.quintly.run_query(
-        profile_ids, table, fields, start_date, end_date
-    )
+    df = common_quintly.run_query(profile_ids, table, fields, start_date, end_date)
 
     df = df.replace({np.nan: None})
 
@@ -262,7 +256,7 @@ def get_insta_comments(
 
     for date in reversed(utils.date_range(start_date, end_date)):
         logger.trace("Getting next insta comment dataframe")
-        df = common_quintly.quintly.run_query(profile_ids, table, fields, date, date)
+        df = common_quintly.run_query(profile_ids, table, fields, date, date)
 
         df.replace({np.nan: None}, inplace=True)
         yield df
@@ -300,7 +294,7 @@ def get_insta_demographics(
         "audienceGenderAndAge",
     ]
 
-    df = common_quintly.quintly.run_query(
+    df = common_quintly.run_query(
         profile_ids,
         table,
         fields,
@@ -346,7 +340,7 @@ def get_insta_hourly_followers(
         "onlineFollowers",
     ]
 
-    df = common_quintly.quintly.run_query(
+    df = common_quintly.run_query(
         profile_ids,
         table,
         fields,
@@ -2,19 +2,13 @@
 
 import re
 import datetime as dt
-from typing import Dict, Optional, Tuple
-from time import sleep
+from typing import Dict, List, Optional
 
 from django.db.models import Q
 from loguru import logger
 from sentry_sdk import capture_exception, capture_message, push_scope
-from rfc3986 import urlparse
-from urllib.parse import unquote
-
-import sentry_sdk
 
 from okr.models.pages import (
-    Page,
     PageDataWebtrekk,
     PageWebtrekkMeta,
     Property,
@@ -28,6 +22,10 @@ from okr.models.pages import (
     SophoraID,
     SophoraKeyword,
 )
+from okr.scrapers.common.locks import locked
+from okr.scrapers.common.upsert import bulk_upsert
+from okr.scrapers.common.watermarks import Increment, incremental
+from okr.scrapers.common.webtrekk import fetch_concurrently
 from okr.scrapers.common.utils import (
     date_param,
     date_range,
@@ -36,7 +34,11 @@ from okr.scrapers.common.utils import (
     local_yesterday,
     BERLIN,
 )
-from okr.scrapers.pages import gsc, sophora, webtrekk
+from okr.scrapers.pages import enrichment, gsc, sophora, webtrekk
+from okr.scrapers.pages.urls import SkipPageException, parse_sophora_url, resolve_pages
+
+# Old name, still imported by applied migrations
+_parse_sophora_url = parse_sophora_url
 
 
 def scrape_full_gsc(property: Property):
@@ -51,7 +53,6 @@ def scrape_full_gsc(property: Property):
 
     start_date = local_yesterday() - dt.timedelta(days=30)
 
-    sleep(1)
     scrape_gsc(start_date=start_date, property_filter=property_filter)
 
     logger.success("Finished full scrape of property {}", property)
@@ -67,261 +68,142 @@ def scrape_full_sophora(sophora_node: SophoraNode):
 
     sophora_node_filter = Q(id=sophora_node.id)
 
-    sleep(1)
     scrape_sophora_nodes(sophora_node_filter=sophora_node_filter)
 
     logger.success("Finished full scrape of Sophora node {}", sophora_node)
 
 
-class SkipPageException(Exception):
-    pass
-
-
-def _parse_sophora_url(url: str) -> Tuple[str, str, Optional[int]]:
-    # Special cases
-    if url == "https://www1.wdr.de/nachrichten/nrw":
-        # TODO: Investigate if there are more like this
-        url = "https://www1.wdr.de/nachrichten/index.html"
-
-    # Ensure that overview pages with missing "index.html" suffix
-    # get related to the same SophoraID
-    if url.endswith("/"):
-        logger.debug("Adding index.html suffix")
-        url = url + "index.html"
-
-    parsed = urlparse(url)
-    match = re.match(
-        r"(.*)/(.*?)(?:~_page-(\d+))?\.(?:html|amp)$",
-        unquote(parsed.path),
-    )
-
-    if match is None:
-        # Parsing errors that are known and we want to ignore
-        match_expected = re.match(
-            r".*\.(?:jsp|pdf|news)$",
-            unquote(parsed.path),
-        ) or re.match(
-            r".*/:~:text=.*$",
-            unquote(parsed.path),
-        )
-
-        if match_expected is None:
-            logger.error("Unexpected parsing error: {}", url)
-            sentry_sdk.capture_message(
-                f"Failed parsing URL with unexpected format: {url}",
-                level="error",
-            )
-        else:
-            logger.debug("Ignored parsing error: {}", url)
-
-        raise SkipPageException(url)
-
-    node = match.group(1)
-    sophora_id = match.group(2)
-    # Cut off any other weird Sophora parameters
-    sophora_id = re.sub(r"~.*", "", sophora_id)
-    if sophora_id == "index":
-        sophora_id = f"{node}/{sophora_id}"
-
-    sophora_page = match.group(3)
-    if sophora_page is not None:
-        sophora_page = int(sophora_page)
-    return sophora_id, node, sophora_page
-
-
-def _page_from_url(
-    url: str,
-    page_cache: Dict[str, Page],
-    *,
-    property: Optional[Property] = None,
-) -> Optional[Page]:
-    try:
-        sophora_id_str, node, sophora_page = _parse_sophora_url(url)
-    except SkipPageException:
-        return None
-
-    if url in page_cache:
-        return page_cache[url]
-    else:
-        sophora_id, created = SophoraID.objects.get_or_create(
-            sophora_id=sophora_id_str,
-            defaults=dict(
-                sophora_document=None,
-            ),
-        )
-
-        if created:
-            # Best-effort attempt at connecting this SophoraID to an existing SophoraDocument
-            # Will fail most of the time, probably
-            try:
-                sophora_data = sophora.get_document_by_sophora_id(sophora_id_str)
-                uuid = sophora_data["teaser"]["uuid"]
-                sophora_document = SophoraDocument.objects.filter(
-                    export_uuid=uuid
-                ).first()
-
-                if sophora_document:
-                    sophora_id.sophora_document = sophora_document
-                    sophora_id.save()
-
-                    with push_scope() as scope:
-                        scope.set_context(
-                            "info",
-                            {
-                                "url": url,
-                                "sophora_id": sophora_id_str,
-                            },
-                        )
-                        capture_message(
-                            "Added new URL that has not been seen by Sophora API scraper"
-                        )
-            except Exception as e:
-                capture_exception(e)
-
-        page, created = Page.objects.get_or_create(
-            url=url,
-            defaults=dict(
-                property=property,
-                sophora_page=sophora_page,
-                sophora_id=sophora_id,
-                node=node,
-            ),
-        )
-        page_cache[url] = page
-        return page
-
-
-def _property_data_gsc(property: Property, start_date: dt.date, end_date: dt.date):
-    """Scrape from Google Search Console API and update
-    :class:`~okr.models.pages.PropertyDataGSC` of the database models.
+def _property_data_gsc(property: Property, data: List[Dict]):
+    """Update :class:`~okr.models.pages.PropertyDataGSC` of the database models with
+    data from Google Search Console API.
 
     Args:
         property (Property): Selected property.
-        start_date (dt.date): Start date to request data for.
-        end_date (dt.date): End date to request data for.
+        data (List[Dict]): Rows of a page of a query with the dimensions ``date`` and
+          ``device``.
     """
 
-    logger.info("Getting Property Data...")
-
-    data = gsc.fetch_data(
-        property, start_date, end_date=end_date, dimensions=["date", "device"]
-    )
+    logger.info("Writing Property Data...")
 
-    for row in data:
-        date, device = row["keys"]
-
-        PropertyDataGSC.objects.update_or_create(
+    objs = (
+        PropertyDataGSC(
             property=property,
-            date=dt.date.fromisoformat(date),
-            device=device,
-            defaults=dict(
-                clicks=row["clicks"],
-                impressions=row["impressions"],
-                ctr=row["ctr"],
-                position=row["position"],
-            ),
+            date=dt.date.fromisoformat(row["keys"][0]),
+            device=row["keys"][1],
+            clicks=row["clicks"],
+            impressions=row["impressions"],
+            ctr=row["ctr"],
+            position=row["position"],
         )
+        for row in data
+    )
 
+    bulk_upsert(PropertyDataGSC, objs, ["property", "date", "device"])
 
-def _property_data_query_gsc(property: Property, date: dt.date):
-    """Scrape data from Google Search Console API and update
-    :class:`~okr.models.pages.PropertyDataQueryGSC` of the database models.
-
-        Args:
-            property (Property): Property to request data for.
-            date (dt.date): The date to request data for.
-    """
 
-    logger.info("Getting Property Query Data...")
+def _property_data_query_gsc(property: Property, date: dt.date, data: List[Dict]):
+    """Update :class:`~okr.models.pages.PropertyDataQueryGSC` of the database models
+    with data from Google Search Console API.
 
-    data = gsc.fetch_data(property, date, dimensions=["query"])
+    Args:
+        property (Property): Selected property.
+        date (dt.date): The date of the data.
+        data (List[Dict]): Rows of a page of a query with the dimension ``query``.
+    """
 
-    for row in data:
-        (query,) = row["keys"]
+    logger.info("Writing Property Query Data...")
 
-        PropertyDataQueryGSC.objects.update_or_create(
+    objs = (
+        PropertyDataQueryGSC(
             property=property,
             date=date,
-            query=query,
-            defaults=dict(
-                clicks=row["clicks"],
-                impressions=row["impressions"],
-                ctr=row["ctr"],
-                position=row["position"],
-            ),
+            query=row["keys"][0],
+            clicks=row["clicks"],
+            impressions=row["impressions"],
+            ctr=row["ctr"],
+            position=row["position"],
         )
+        for row in data
+    )
 
+    bulk_upsert(PropertyDataQueryGSC, objs, ["property", "date", "query"])
 
-def _page_data_gsc(property: Property, date: dt.date, page_cache: Dict[str, Page]):
-    """Scrape from Google Search Console API and update
-    :class:`~okr.models.pages.Page` and :class:`~okr.models.pages.PageDataGSC`
-    of the database models.
+
+def _page_data_gsc(property: Property, date: dt.date, data: List[Dict]):
+    """Update :class:`~okr.models.pages.Page` and
+    :class:`~okr.models.pages.PageDataGSC` of the database models with data from
+    Google Search Console API.
 
     Args:
-        property (Property): Selected property.r.
-        page_cache (Dict[str, Page]): Cache for url to page mapping.
+        property (Property): Selected property.
+        date (dt.date): The date of the data.
+        data (List[Dict]): Rows of a page of a query with the dimensions ``page`` and
+          ``device``.
     """
 
-    logger.info("Getting Page Data...")
+    logger.info("Writing Page Data...")
+
+    objs = []
+    page_ids = resolve_pages((row["keys"][0] for row in data), property=property)
 
-    data = gsc.fetch_data(property, date)
     for row in data:
         url, device = row["keys"]
 
-        page = _page_from_url(url, page_cache, property=property)
-
-        if page is None:
+        if url not in page_ids:
             continue
 
-        PageDataGSC.objects.update_or_create(
-            page=page,
-            date=date,
-            device=device,
-            defaults=dict(
+        objs.append(
+            PageDataGSC(
+                page_id=page_ids[url],
+                date=date,
+                device=device,
                 clicks=row["clicks"],
                 impressions=row["impressions"],
                 ctr=row["ctr"],
                 position=row["position"],
-            ),
+            )
         )
 
+    bulk_upsert(PageDataGSC, objs, ["page", "date", "device"])
 
-def _page_data_query_gsc(
-    property: Property, date: dt.date, page_cache: Dict[str, Page]
-):
-    """Scrape from Google Search Console API and update
-    :class:`~okr.models.pages.Page` and
-    :class:`~okr.models.pages.PageDataQueryGSC` of the database models.
+
+def _page_data_query_gsc(property: Property, date: dt.date, data: List[Dict]):
+    """Update :class:`~okr.models.pages.Page` and
+    :class:`~okr.models.pages.PageDataQueryGSC` of the database models with data
+    from Google Search Console API.
 
     Args:
         property (Property): Selected property.
-        date (dt.date): Date to request data for.
-        page_cache (Dict[str, Page]): Cache for url to page mapping.
+        date (dt.date): The date of the data.
+        data (List[Dict]): Rows of a page of a query with the dimensions ``page`` and
+          ``query``.
     """
 
-    logger.info("Getting Page Query Data...")
+    logger.info("Writing Page Query Data...")
+
+    objs = []
+    page_ids = resolve_pages((row["keys"][0] for row in data), property=property)
 
-    data = gsc.fetch_data(property, date, dimensions=["page", "query"])
     for row in data:
         url, query = row["keys"]
 
-        page = _page_from_url(url, page_cache, property=property)
-
-        if page is None:
+        if url not in page_ids:
             continue
 
-        PageDataQueryGSC.objects.update_or_create(
-            page=page,
-            date=date,
-            query=query,
-            defaults=dict(
+        objs.append(
+            PageDataQueryGSC(
+                page_id=page_ids[url],
+                date=date,
+                query=query,
                 clicks=row["clicks"],
                 impressions=row["impressions"],
                 ctr=row["ctr"],
                 position=row["position"],
-            ),
+            )
         )
 
+    bulk_upsert(PageDataQueryGSC, objs, ["page", "date", "query"])
+
 
 def scrape_gsc(
     *,
@@ -332,61 +214,77 @@ def scrape_gsc(
 
     Args:
         start_date (Optional[dt.date], optional): Earliest date to request data for.
-          Defaults to None. Will be set to two days before yesterday if None.
+          Defaults to None. Will be set to the first day that isn't final yet (see
+          :mod:`~okr.scrapers.common.watermarks`) if None, or to two days before
+          yesterday for properties that have not been scraped before.
         property_filter (Optional[Q], optional): Filter to select a subset of
           properties. Defaults to None.
     """
     today = local_today()
     yesterday = local_yesterday()
 
-    start_date = date_param(
-        start_date,
-        default=yesterday - dt.timedelta(days=2),
-        earliest=today - dt.timedelta(days=30),
-        latest=yesterday,
-    )
-
     properties = Property.objects.all()
 
     if property_filter:
         properties = properties.filter(property_filter)
 
-    for property in properties:
-        logger.info(
-            "Start scrape Google Search Console data for property {}.",
-            property,
-        )
+    for property in locked(properties, scrape_gsc):
+        with (
+            incremental(
+                scrape_gsc,
+                property,
+                source="gsc",
+                default=yesterday - dt.timedelta(days=2),
+                start_date=start_date,
+                end_date=yesterday,
+                earliest=today - dt.timedelta(days=30),
+                latest=yesterday,
+            ) as increment,
+            enrichment.deferred(),
+        ):
+            _scrape_gsc_property(property, increment, yesterday)
 
-        page_cache = {}
 
-        try:
-            _property_data_gsc(property, start_date, yesterday)
-        except Exception as e:
-            capture_exception(e)
+def _scrape_gsc_property(property: Property, increment: Increment, end_date: dt.date):
+    logger.info(
+        "Start scrape Google Search Console data for property {}.",
+        property,
+    )
 
-        for date in reversed(date_range(start_date, yesterday)):
-            logger.info("Scraping data for {}.", date)
+    dates = list(reversed(date_range(increment.start_date, end_date)))
 
-            # Get page data first to ensure scrape is done before SEO bot runs
-            try:
-                _page_data_gsc(property, date, page_cache)
-            except Exception as e:
-                capture_exception(e)
+    # Get page data first to ensure scrape is done before SEO bot runs
+    queries = [
+        gsc.Query(increment.start_date, end_date, ("date", "device")),
+        *(gsc.Query(date, date, ("page", "device")) for date in dates),
+        *(gsc.Query(date, date, ("page", "query")) for date in dates),
+        *(gsc.Query(date, date, ("query",)) for date in dates),
+    ]
 
-            try:
-                _page_data_query_gsc(property, date, page_cache)
-            except Exception as e:
-                capture_exception(e)
+    for query, result in gsc.fetch_pipelined(property, queries):
+        logger.info(
+            "Scraping {} data for {}.", "/".join(query.dimensions), query.start_date
+        )
 
-            try:
-                _property_data_query_gsc(property, date)
-            except Exception as e:
-                capture_exception(e)
+        try:
+            data = result.result()
+
+            if query.dimensions == ("date", "device"):
+                _property_data_gsc(property, data)
+            elif query.dimensions == ("page", "device"):
+                _page_data_gsc(property, query.start_date, data)
+            elif query.dimensions == ("page", "query"):
+                _page_data_query_gsc(property, query.start_date, data)
+            else:
+                _property_data_query_gsc(property, query.start_date, data)
+        except Exception as e:
+            capture_exception(e)
+            increment.mark_incomplete()
 
-        logger.success(
-            "Finished Google Search Console scrape for property {}.",
-            property,
-        )
+    logger.success(
+        "Finished Google Search Console scrape for property {}.",
+        property,
+    )
 
 
 def _count_words(string: str) -> int:
@@ -467,7 +365,7 @@ def _handle_sophora_document(  # noqa: C901
         contains_info = sophora_document_info
 
     try:
-        sophora_id_str, node, _ = _parse_sophora_url(contains_info["shareLink"])
+        sophora_id_str, node, _ = parse_sophora_url(contains_info["shareLink"])
     except KeyError as error:
         # Don't send error to Sentry for image galleries
         if contains_info.get("mediaType") == "imageGallery":
@@ -596,17 +494,18 @@ def scrape_sophora_nodes(*, sophora_node_filter: Optional[Q] = None):
     if sophora_node_filter:
         sophora_nodes = sophora_nodes.filter(sophora_node_filter)
 
-    for sophora_node in sophora_nodes:
+    for sophora_node in locked(sophora_nodes, scrape_sophora_nodes):
         logger.info("Scraping Sophora API for pages of {}", sophora_node)
 
-        is_first_run = False
+        is_first_run = sophora_node.documents.count() == 0
 
-        if sophora_node.documents.count() == 0:
-            logger.info("No existing documents found, search history")
-            max_age = now - dt.timedelta(days=365)
-            is_first_run = True
-        else:
-            max_age = (
+        def default_max_age() -> dt.datetime:
+            if is_first_run:
+                logger.info("No existing documents found, search history")
+                return now - dt.timedelta(days=365)
+
+            # Nodes that were scraped before they had a watermark
+            return (
                 SophoraDocumentMeta.objects.all()
                 .filter(sophora_document__sophora_node=sophora_node)
                 .order_by("-created")
@@ -614,36 +513,56 @@ def scrape_sophora_nodes(*, sophora_node_filter: Optional[Q] = None):
                 .created
             ) - dt.timedelta(minutes=5)
 
-        logger.info("Scraping exact node matches")
-        logger.debug("max_age: {}", max_age)
-        for sophora_document_info in sophora.get_documents_in_node(
+        with incremental(
+            scrape_sophora_nodes,
             sophora_node,
-            max_age=max_age,
-            force_exact=True,
-        ):
-            _handle_sophora_document(
+            source="sophora",
+            default=default_max_age,
+            end_date=now,
+        ) as increment:
+            _scrape_sophora_node(
                 sophora_node,
-                sophora_document_info,
+                increment.start_date,
                 is_first_run=is_first_run,
             )
 
-        logger.success("Done scraping exact node matches")
 
-        if sophora_node.use_exact_search:
-            continue
+def _scrape_sophora_node(
+    sophora_node: SophoraNode,
+    max_age: dt.datetime,
+    *,
+    is_first_run: bool,
+):
+    logger.info("Scraping exact node matches")
+    logger.debug("max_age: {}", max_age)
+    for sophora_document_info in sophora.get_documents_in_node(
+        sophora_node,
+        max_age=max_age,
+        force_exact=True,
+    ):
+        _handle_sophora_document(
+            sophora_node,
+            sophora_document_info,
+            is_first_run=is_first_run,
+        )
+
+    logger.success("Done scraping exact node matches")
+
+    if sophora_node.use_exact_search:
+        return
 
-        logger.info("Scraping sub-node matches")
-        for sophora_document_info in sophora.get_documents_in_node(
+    logger.info("Scraping sub-node matches")
+    for sophora_document_info in sophora.get_documents_in_node(
+        sophora_node,
+        max_age=max_age,
+    ):
+        _handle_sophora_document(
             sophora_node,
-            max_age=max_age,
-        ):
-            _handle_sophora_document(
-                sophora_node,
-                sophora_document_info,
-                is_first_run=is_first_run,
-            )
+            sophora_document_info,
+            is_first_run=is_first_run,
+        )
 
-        logger.success("Done scraping sub-node matches")
+    logger.success("Done scraping sub-node matches")
 
 
 def scrape_webtrekk(
@@ -672,57 +591,64 @@ def scrape_webtrekk(
         latest=today,
     )
 
-    page_cache = {}
-
     try:
         property = Property.objects.get(url="https://www1.wdr.de/nachrichten/")
     except Property.DoesNotExist:
         property = None
 
-    for date in reversed(date_range(start_date, end_date)):
-        logger.info("Start Webtrekk SEO scrape for {}.", date)
-
-        try:
-            data = webtrekk.cleaned_webtrekk_page_data(date)
-        except Exception as e:
-            capture_exception(e)
-            continue
-
-        for key, item in data.items():
-            url, headline, query = key
-
-            page = _page_from_url(url, page_cache, property=property)
+    with enrichment.deferred():
+        for date, result in fetch_concurrently(
+            webtrekk.cleaned_webtrekk_page_data,
+            list(reversed(date_range(start_date, end_date))),
+        ):
+            logger.info("Start Webtrekk SEO scrape for {}.", date)
 
-            if page is None:
+            try:
+                data = result.result()
+            except Exception as e:
+                capture_exception(e)
                 continue
 
-            webtrekk_meta, created = PageWebtrekkMeta.objects.get_or_create(
-                page=page,
-                headline=headline,
-                query=query or "",
-            )
-
-            PageDataWebtrekk.objects.update_or_create(
-                date=date,
-                webtrekk_meta=webtrekk_meta,
-                defaults=dict(
-                    visits=item.get("visits", 0),
-                    entries=item.get("entries", 0),
-                    visits_campaign=item.get("visits_campaign", 0),
-                    bounces=item.get("bounces", 0),
-                    length_of_stay=dt.timedelta(seconds=item.get("length_of_stay", 0)),
-                    impressions=item.get("impressions", 0),
-                    exits=item.get("exits", 0),
-                    visits_search=item.get("visits_search", 0),
-                    entries_search=item.get("entries_search", 0),
-                    visits_campaign_search=item.get("visits_campaign_search", 0),
-                    bounces_search=item.get("bounces_search", 0),
-                    length_of_stay_search=dt.timedelta(
-                        seconds=item.get("length_of_stay_search", 0)
-                    ),
-                    impressions_search=item.get("impressions_search", 0),
-                    exits_search=item.get("exits_search", 0),
-                ),
-            )
+            objs = []
+            page_ids = resolve_pages((url for url, _, _ in data), property=property)
+
+            for key, item in data.items():
+                url, headline, query = key
+
+                if url not in page_ids:
+                    continue
+
+                webtrekk_meta, created = PageWebtrekkMeta.objects.get_or_create(
+                    page_id=page_ids[url],
+                    headline=headline,
+                    query=query or "",
+                )
+
+                objs.append(
+                    PageDataWebtrekk(
+                        date=date,
+                        webtrekk_meta=webtrekk_meta,
+                        visits=item.get("visits", 0),
+                        entries=item.get("entries", 0),
+                        visits_campaign=item.get("visits_campaign", 0),
+                        bounces=item.get("bounces", 0),
+                        length_of_stay=dt.timedelta(
+                            seconds=item.get("length_of_stay", 0)
+                        ),
+                        impressions=item.get("impressions", 0),
+                        exits=item.get("exits", 0),
+                        visits_search=item.get("visits_search", 0),
+                        entries_search=item.get("entries_search", 0),
+                        visits_campaign_search=item.get("visits_campaign_search", 0),
+                        bounces_search=item.get("bounces_search", 0),
+                        length_of_stay_search=dt.timedelta(
+                            seconds=item.get("length_of_stay_search", 0)
+                        ),
+                        impressions_search=item.get("impressions_search", 0),
+                        exits_search=item.get("exits_search", 0),
+                    )
+                )
+
+            bulk_upsert(PageDataWebtrekk, objs, ["date", "webtrekk_meta"])
 
     logger.success("Finished Webtrekk SEO scrape")
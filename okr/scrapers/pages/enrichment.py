@@ -0,0 +1,246 @@
+"""Link new Sophora IDs to their Sophora documents after the scrape that found them.
+
+When the page scrapers find the URL of an unknown Sophora ID, they create the
+:class:`~okr.models.pages.SophoraID` without a document. Looking up the document in
+the Sophora API right away would stall the scrape on every new ID, so the IDs are
+collected while :func:`deferred` is active and looked up when it ends:
+
+* in batches of :data:`BATCH_SIZE`, with up to ``SCRAPER_CONCURRENCY_SOPHORA``
+  requests at a time
+* each batch is linked with a single query for the documents and a bulk update
+* unlinked IDs of the last :data:`RETRY_WINDOW` are looked up again, e.g. after a
+  timeout of the Sophora API
+* IDs without a document in the Sophora API are remembered for :data:`NEGATIVE_TTL`
+  in the Django cache, so they aren't requested again by every run. IDs whose
+  document just hasn't been scraped yet are looked up again instead.
+"""
+
+import datetime as dt
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from django.core.cache import cache
+from django.utils import timezone
+from loguru import logger
+from redis.exceptions import RedisError
+from requests.exceptions import HTTPError
+from sentry_sdk import capture_exception, capture_message, push_scope
+
+from ...models.pages import SophoraDocument, SophoraID
+from ..common.concurrency import concurrency_limit
+from . import sophora
+
+# Sophora IDs per batch
+BATCH_SIZE = 100
+
+# Age of unlinked Sophora IDs that are looked up again
+RETRY_WINDOW = dt.timedelta(days=3)
+
+# Seconds until Sophora IDs without a document in the Sophora API are looked up again
+NEGATIVE_TTL = 7 * 24 * 60 * 60
+
+# New Sophora IDs of the active deferred() context, with the URL they were found at
+_pending: ContextVar[Optional[Dict[str, Optional[str]]]] = ContextVar(
+    "sophora_enrichment", default=None
+)
+
+
+def defer(sophora_ids: Dict[str, Optional[str]]):
+    """Link new Sophora IDs when the active :func:`deferred` context ends, or right
+    away outside of one.
+
+    Args:
+        sophora_ids (Dict[str, Optional[str]]): URL of a page by new Sophora ID.
+    """
+    pending = _pending.get()
+
+    if pending is None:
+        enrich(sophora_ids)
+        return
+
+    for sophora_id, url in sophora_ids.items():
+        pending.setdefault(sophora_id, url)
+
+
+@contextmanager
+def deferred() -> Iterator[None]:
+    """Collect the new Sophora IDs of a scrape and link them when it ends.
+
+    Nested contexts are part of the outermost one.
+    """
+    if _pending.get() is not None:
+        yield
+        return
+
+    pending: Dict[str, Optional[str]] = {}
+    token = _pending.set(pending)
+
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+
+        try:
+            enrich(pending, retry=True)
+        except Exception as e:
+            logger.exception("Failed to link new Sophora IDs")
+            capture_exception(e)
+
+
+def _negative_key(sophora_id: str) -> str:
+    return f"sophora:unlinked:{hashlib.sha1(sophora_id.encode()).hexdigest()}"
+
+
+def _unlinked(sophora_ids: List[str]) -> Set[str]:
+    """Sophora IDs that couldn't be linked recently."""
+    keys = {_negative_key(sophora_id): sophora_id for sophora_id in sophora_ids}
+
+    try:
+        return {keys[key] for key in cache.get_many(keys)}
+    except RedisError as e:
+        capture_exception(e)
+        logger.warning("Sophora enrichment cache not available")
+        return set()
+
+
+def _remember_unlinked(sophora_ids: List[str]):
+    try:
+        cache.set_many(
+            {_negative_key(sophora_id): True for sophora_id in sophora_ids},
+            timeout=NEGATIVE_TTL,
+        )
+    except RedisError as e:
+        capture_exception(e)
+        logger.warning("Sophora enrichment cache not available")
+
+
+def _export_uuid(sophora_id: str) -> Tuple[Optional[str], bool]:
+    """Request the export UUID of the document of a Sophora ID.
+
+    Returns:
+        Tuple[Optional[str], bool]: The UUID, if any, and whether the request failed
+        in a way that may not happen again.
+    """
+    try:
+        return sophora.get_document_by_sophora_id(sophora_id)["teaser"]["uuid"], False
+    except HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return None, False
+
+        logger.warning("Failed to request Sophora ID {}: {}", sophora_id, e)
+        capture_exception(e)
+        return None, True
+    except (KeyError, TypeError):
+        return None, False
+    except Exception as e:
+        logger.warning("Failed to request Sophora ID {}: {}", sophora_id, e)
+        capture_exception(e)
+        return None, True
+
+
+def _link(uuids: Dict[str, str], urls: Dict[str, Optional[str]]) -> Set[str]:
+    """Link Sophora IDs to the documents with their export UUIDs.
+
+    Returns:
+        Set[str]: The Sophora IDs that were linked.
+    """
+    documents = dict(
+        SophoraDocument.objects.filter(export_uuid__in=set(uuids.values())).values_list(
+            "export_uuid", "id"
+        )
+    )
+
+    objs = list(
+        SophoraID.objects.filter(
+            sophora_id__in=[
+                sophora_id for sophora_id, uuid in uuids.items() if uuid in documents
+            ],
+            sophora_document__isnull=True,
+        )
+    )
+
+    for obj in objs:
+        obj.sophora_document_id = documents[uuids[obj.sophora_id]]
+
+        with push_scope() as scope:
+            scope.set_context(
+                "info",
+                {
+                    "url": urls.get(obj.sophora_id),
+                    "sophora_id": obj.sophora_id,
+                },
+            )
+            capture_message(
+                "Added new URL that has not been seen by Sophora API scraper"
+            )
+
+    SophoraID.objects.bulk_update(objs, ["sophora_document"])
+
+    return {obj.sophora_id for obj in objs}
+
+
+def enrich(sophora_ids: Dict[str, Optional[str]], *, retry: bool = False) -> int:
+    """Link Sophora IDs without a document to their documents.
+
+    Args:
+        sophora_ids (Dict[str, Optional[str]]): URL of a page by Sophora ID.
+        retry (bool, optional): Also look up the unlinked Sophora IDs of the last
+          :data:`RETRY_WINDOW`. Defaults to False.
+
+    Returns:
+        int: The number of linked Sophora IDs.
+    """
+    sophora_ids = dict(sophora_ids)
+
+    if retry:
+        for sophora_id in SophoraID.objects.filter(
+            sophora_document__isnull=True,
+            created__gte=timezone.now() - RETRY_WINDOW,
+        ).values_list("sophora_id", flat=True):
+            sophora_ids.setdefault(sophora_id, None)
+
+    candidates = list(sophora_ids)
+    skipped: Set[str] = set()
+    for i in range(0, len(candidates), BATCH_SIZE):
+        skipped |= _unlinked(candidates[i : i + BATCH_SIZE])
+    candidates = [sophora_id for sophora_id in candidates if sophora_id not in skipped]
+
+    if not candidates:
+        return 0
+
+    logger.info("Linking {} Sophora IDs to their documents", len(candidates))
+
+    linked = 0
+    limit = concurrency_limit("sophora")
+
+    with ThreadPoolExecutor(
+        max_workers=limit, thread_name_prefix="sophora-enrichment"
+    ) as executor:
+        for i in range(0, len(candidates), BATCH_SIZE):
+            batch = candidates[i : i + BATCH_SIZE]
+            results = dict(zip(batch, executor.map(_export_uuid, batch)))
+
+            uuids = {
+                sophora_id: uuid
+                for sophora_id, (uuid, _) in results.items()
+                if uuid is not None
+            }
+            done = _link(uuids, sophora_ids) if uuids else set()
+            linked += len(done)
+
+            # Failed requests are looked up again by the next run, and so are IDs
+            # whose document hasn't been scraped from the Sophora API yet
+            _remember_unlinked(
+                [
+                    sophora_id
+                    for sophora_id, (uuid, failed) in results.items()
+                    if uuid is None and not failed
+                ]
+            )
+
+    logger.success("Linked {} of {} Sophora IDs", linked, len(candidates))
+
+    return linked
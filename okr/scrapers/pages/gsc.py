@@ -1,27 +1,106 @@
-"""Collect and clean up data from the Google Search Console API."""
+"""Collect and clean up data from the Google Search Console API.
 
-import datetime as dt
-from typing import Any, Dict, List, Literal, Optional
+Results are requested page by page with :func:`fetch_data`. The queries of a scraper
+run can be requested with :func:`fetch_pipelined`, which runs up to
+``SCRAPER_CONCURRENCY_GSC`` queries at the same time while the caller writes the pages
+that arrived to the database.
+"""
 
+import contextvars
+import datetime as dt
+import queue
+import socket
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Literal, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+from httplib2 import HttpLib2Error
 from tenacity import retry
+from tenacity.retry import retry_if_exception
 from tenacity.stop import stop_after_attempt
 from tenacity.wait import wait_exponential
 
-from ..common.google import searchconsole_service
+from ..common.concurrency import concurrency_limit
+from ..common.google import get_searchconsole_service
+from ..common.ratelimit import MAX_RETRIES, get_limiter
 from ...models import Property
 
 Dimension = Literal["page", "device", "date", "query", "country", "searchAppearance"]
 
 
-@retry(wait=wait_exponential(), stop=stop_after_attempt(3))
+@dataclass(frozen=True)
+class Query:
+    """A query of the Search Console API for a property."""
+
+    start_date: dt.date
+    end_date: dt.date
+    dimensions: Tuple[Dimension, ...]
+
+
+# Maximum number of rows per request, as allowed by the API
+ROW_LIMIT = 25000
+
+Row = Dict[str, Any]
+
+
+def _is_transient(error: BaseException) -> bool:
+    """Whether a failed request may succeed when it is sent again.
+
+    Server errors and connection problems are retried. Client errors, e.g. a missing
+    permission for the property, fail the same way every time.
+    """
+    if isinstance(error, HttpError):
+        return error.resp.status >= 500
+
+    return isinstance(error, (ConnectionError, socket.timeout, HttpLib2Error))
+
+
+@retry(
+    retry=retry_if_exception(_is_transient),
+    wait=wait_exponential(),
+    stop=stop_after_attempt(3),
+)
+def _fetch_page(property: Property, request: Dict[str, Any]) -> List[Row]:
+    """Request a single page, retrying it on its own if it fails."""
+    limiter = get_limiter("gsc")
+    rate_limited = 0
+
+    while True:
+        limiter.acquire()
+
+        try:
+            response = (
+                get_searchconsole_service()
+                .searchanalytics()
+                .query(siteUrl=property.url, body=request)
+                .execute()
+            )
+        except HttpError as e:
+            if e.resp.status != 429 or rate_limited >= MAX_RETRIES:
+                raise
+
+            # Request the same page again once the quota allows it
+            rate_limited += 1
+            limiter.backoff(e.resp.get("retry-after"))
+            continue
+
+        return response.get("rows", [])
+
+
 def fetch_data(
     property: Property,
     start_date: dt.date,
     *,
     end_date: Optional[dt.date] = None,
     dimensions: Optional[List[Dimension]] = None,
-) -> List[Dict[str, Any]]:
-    """Query Google Search Console API for data.
+) -> Iterator[List[Row]]:
+    """Query Google Search Console API for data, page by page.
+
+    Each page of up to :data:`ROW_LIMIT` rows is yielded as soon as it arrives, so
+    callers can write it before the next one is requested. A failed page is retried
+    at its own ``startRow``, without requesting the previous pages again.
 
     Args:
         property (Property): Property to request data for.
@@ -32,8 +111,8 @@ def fetch_data(
             API. Defaults to ``None``. Will be set to ``["page", "device"]`` if
             ``None``.
 
-    Returns:
-        List[Dict[str, Any]]: Response from API.
+    Yields:
+        List[Row]: The rows of each non-empty page of the response.
     """
     if end_date is None:
         end_date = start_date
@@ -41,9 +120,7 @@ def fetch_data(
     if dimensions is None:
         dimensions = ["page", "device"]
 
-    results = []
     start_row = 0
-    ROW_LIMIT = 25000
 
     while True:
         request = {
@@ -55,18 +132,110 @@ def fetch_data(
             "dataState": "all",
         }
 
-        response = (
-            searchconsole_service.searchanalytics()
-            .query(siteUrl=property.url, body=request)
-            .execute()
-        )
+        rows = _fetch_page(property, request)
+
+        if rows:
+            yield rows
+
+        # A page that isn't full is the last one
+        if len(rows) < ROW_LIMIT:
+            return
 
         start_row += ROW_LIMIT
 
-        result = response.get("rows", [])
-        results.extend(result)
 
-        if len(result) == 0:
-            break
+def _fetch(property: Property, query: Query) -> Iterator[Future]:
+    """Futures of the pages of a query, ending with a failed one on errors."""
+    try:
+        for rows in fetch_data(
+            property,
+            query.start_date,
+            end_date=query.end_date,
+            dimensions=list(query.dimensions),
+        ):
+            future: Future = Future()
+            future.set_result(rows)
+            yield future
+    except Exception as e:
+        future = Future()
+        future.set_exception(e)
+        yield future
+
+
+def fetch_pipelined(
+    property: Property, queries: List[Query]
+) -> Iterator[Tuple[Query, "Future[List[Row]]"]]:
+    """Request several queries at the same time and yield their pages as they arrive.
+
+    Up to ``SCRAPER_CONCURRENCY_GSC`` threads (see
+    :func:`~okr.scrapers.common.concurrency.concurrency_limit`) request the queries in
+    the given order, so queries whose results are needed first should come first.
+    Pages wait in a queue of the same size until the caller takes them, which bounds
+    the memory used while the caller writes them to the database.
+
+    Args:
+        property (Property): Property to request data for.
+        queries (List[Query]): Queries to request.
 
-    return results
+    Yields:
+        Tuple[Query, Future[List[Row]]]: Each page of each query with its query, in
+        the order they arrive. The pages of a query are yielded in order. If a page
+        can't be requested, ``Future.result()`` raises the error and no further pages
+        of the query follow.
+    """
+    limit = min(concurrency_limit("gsc"), len(queries))
+
+    if limit <= 1:
+        for query in queries:
+            for future in _fetch(property, query):
+                yield query, future
+        return
+
+    todo: "queue.SimpleQueue[Query]" = queue.SimpleQueue()
+    done: "queue.Queue[Optional[Tuple[Query, Future]]]" = queue.Queue(maxsize=limit)
+    stop = threading.Event()
+
+    for query in queries:
+        todo.put(query)
+
+    def put(item: Optional[Tuple[Query, Future]]):
+        # Wait for the caller, unless it stopped taking pages
+        while not stop.is_set():
+            try:
+                done.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def produce():
+        try:
+            while not stop.is_set():
+                try:
+                    query = todo.get_nowait()
+                except queue.Empty:
+                    return
+
+                for future in _fetch(property, query):
+                    put((query, future))
+
+                    if stop.is_set():
+                        return
+        finally:
+            # Tell the caller that this thread is done
+            put(None)
+
+    with ThreadPoolExecutor(max_workers=limit, thread_name_prefix="gsc") as executor:
+        try:
+            for _ in range(limit):
+                executor.submit(contextvars.copy_context().run, produce)
+
+            running = limit
+            while running:
+                item = done.get()
+
+                if item is None:
+                    running -= 1
+                else:
+                    yield item
+        finally:
+            stop.set()
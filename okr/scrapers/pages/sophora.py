@@ -5,12 +5,12 @@ from typing import Dict, Generator, Optional, Union
 import datetime as dt
 
 from loguru import logger
-import requests
 from solrq import Q, Range
 from rfc3986 import urlparse
 from pytz import UTC
 
 from ...models.pages import SophoraNode
+from ..common.sessions import get_session
 from ..common.types import JSON
 
 SOPHORA_API_BASE = os.environ.get("SOPHORA_API_BASE")
@@ -31,7 +31,7 @@ def get_document_by_sophora_id(sophora_id: str) -> JSON:
     """
     url = _sophora_api_url("getDocumentBySophoraId", sophora_id)
 
-    response = requests.get(url)
+    response = get_session("sophora", rate_limit="sophora").get(url)
     response.raise_for_status()
 
     return response.json()
@@ -93,8 +93,10 @@ def get_documents_in_node(
     )
     logger.info("Paging through URL {}", url)
 
+    session = get_session("sophora", rate_limit="sophora")
+
     while True:
-        response = requests.get(url, params=params)
+        response = session.get(url, params=params)
         response.raise_for_status()
         logger.debug(response.request.url)
 
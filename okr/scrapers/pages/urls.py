@@ -0,0 +1,356 @@
+"""Parse the URLs of pages and resolve them to :class:`~okr.models.pages.Page` objects.
+
+The page scrapers see tens of thousands of URLs per day, most of which were seen
+before. :func:`resolve_pages` resolves all URLs of a response at once:
+
+1. From an LRU cache in the memory of the process, which lasts across runs
+2. From the Django cache (Redis), which is shared by all processes
+3. From the database, with a single ``IN`` query per :data:`CHUNK_SIZE` URLs
+4. By creating the missing :class:`~okr.models.pages.SophoraID` and
+   :class:`~okr.models.pages.Page` rows in bulk. New Sophora IDs are linked to their
+   documents later, see :mod:`~okr.scrapers.pages.enrichment`.
+
+Both caches only map URLs to page IDs. They are invalidated whenever a page is
+deleted, e.g. in the admin or along with its property.
+
+Parsing a URL only depends on the URL itself, so the results of
+:func:`parse_sophora_url` are kept for the last :data:`PARSE_CACHE_SIZE` URLs. This
+includes URLs that aren't pages, which are skipped before looking them up in any of
+the tiers above. ``manage.py benchmark_url_parser`` measures the parser.
+"""
+
+import hashlib
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import unquote
+
+import sentry_sdk
+from django.core.cache import cache
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from loguru import logger
+from redis.exceptions import RedisError
+from rfc3986 import urlparse
+from sentry_sdk import capture_exception
+
+from ...models.pages import Page, Property, SophoraID
+from . import enrichment
+
+# URLs whose page IDs are kept in the memory of each process
+MEMORY_SIZE = 100_000
+
+# Seconds that page IDs are kept in the shared cache
+TIMEOUT = 7 * 24 * 60 * 60
+
+# URLs per database query
+CHUNK_SIZE = 500
+
+# Parsed URLs kept in the memory of each process
+PARSE_CACHE_SIZE = 200_000
+
+_VERSION_KEY = "pages:version"
+
+_PAGE_PATTERN = re.compile(r"(.*)/(.*?)(?:~_page-(\d+))?\.(?:html|amp)$")
+
+# Parsing errors that are known and we want to ignore
+_IGNORED_PATTERN = re.compile(r".*\.(?:jsp|pdf|news)$|.*/:~:text=.*$")
+
+
+class SkipPageException(Exception):
+    pass
+
+
+def _parse(url: str) -> Optional[Tuple[str, str, Optional[int]]]:
+    """Parse the URL of a page, returning None if it isn't a Sophora document."""
+    # Special cases
+    if url == "https://www1.wdr.de/nachrichten/nrw":
+        # TODO: Investigate if there are more like this
+        url = "https://www1.wdr.de/nachrichten/index.html"
+
+    # Ensure that overview pages with missing "index.html" suffix
+    # get related to the same SophoraID
+    if url.endswith("/"):
+        logger.debug("Adding index.html suffix")
+        url = url + "index.html"
+
+    path = unquote(urlparse(url).path)
+    match = _PAGE_PATTERN.match(path)
+
+    if match is None:
+        if _IGNORED_PATTERN.match(path) is None:
+            logger.error("Unexpected parsing error: {}", url)
+            sentry_sdk.capture_message(
+                f"Failed parsing URL with unexpected format: {url}",
+                level="error",
+            )
+        else:
+            logger.debug("Ignored parsing error: {}", url)
+
+        return None
+
+    node, sophora_id, sophora_page = match.groups()
+    # Cut off any other weird Sophora parameters
+    sophora_id = sophora_id.split("~", 1)[0]
+    if sophora_id == "index":
+        sophora_id = f"{node}/{sophora_id}"
+
+    if sophora_page is not None:
+        sophora_page = int(sophora_page)
+    return sophora_id, node, sophora_page
+
+
+# Results are immutable and only depend on the URL, so URLs that aren't pages are
+# remembered as well and only reported once per process
+_parse_cached = lru_cache(maxsize=PARSE_CACHE_SIZE)(_parse)
+
+
+def parse_sophora_url(url: str) -> Tuple[str, str, Optional[int]]:
+    """Get the Sophora ID, the node and the page number from the URL of a page.
+
+    Args:
+        url (str): URL of the page.
+
+    Raises:
+        SkipPageException: If the URL isn't the URL of a Sophora document.
+
+    Returns:
+        Tuple[str, str, Optional[int]]: Sophora ID, node and page number, if any.
+    """
+    parsed = _parse_cached(url)
+
+    if parsed is None:
+        raise SkipPageException(url)
+
+    return parsed
+
+
+class _MemoryTier:
+    """LRU cache of page IDs by URL, valid for one version of the shared cache."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.version: Optional[str] = None
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, urls: Iterable[str], version: Optional[str]) -> Dict[str, int]:
+        with self._lock:
+            if version is not None and version != self.version:
+                self._entries.clear()
+                self.version = version
+
+            found = {}
+            for url in urls:
+                page_id = self._entries.get(url)
+                if page_id is not None:
+                    self._entries.move_to_end(url)
+                    found[url] = page_id
+            return found
+
+    def set_many(self, page_ids: Dict[str, int]):
+        with self._lock:
+            self._entries.update(page_ids)
+            for url in page_ids:
+                self._entries.move_to_end(url)
+
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_memory = _MemoryTier(MEMORY_SIZE)
+
+
+def _key(version: str, url: str) -> str:
+    return f"pages:url:{version}:{hashlib.sha1(url.encode()).hexdigest()}"
+
+
+def _version() -> Optional[str]:
+    """Current version of the shared cache, or None if it isn't available."""
+    try:
+        return cache.get_or_set(_VERSION_KEY, lambda: uuid.uuid4().hex, timeout=None)
+    except RedisError as e:
+        capture_exception(e)
+        logger.warning("Page cache not available")
+        return None
+
+
+def _shared_get_many(version: str, urls: List[str]) -> Dict[str, int]:
+    keys = {_key(version, url): url for url in urls}
+
+    try:
+        found = cache.get_many(keys)
+    except RedisError as e:
+        capture_exception(e)
+        logger.warning("Page cache not available")
+        return {}
+
+    return {keys[key]: page_id for key, page_id in found.items()}
+
+
+def _shared_set_many(version: str, page_ids: Dict[str, int]):
+    try:
+        cache.set_many(
+            {_key(version, url): page_id for url, page_id in page_ids.items()},
+            timeout=TIMEOUT,
+        )
+    except RedisError as e:
+        capture_exception(e)
+        logger.warning("Page cache not available")
+
+
+def invalidate():
+    """Discard the page IDs in the caches of all processes."""
+    _memory.clear()
+
+    try:
+        cache.set(_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    except RedisError as e:
+        capture_exception(e)
+        logger.warning("Failed to invalidate page cache")
+
+
+@receiver(post_delete, sender=Page)
+def _page_deleted(sender, **kwargs):
+    invalidate()
+
+
+def _chunks(items: List, size: int = CHUNK_SIZE) -> Iterable[List]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def _sophora_ids(parsed: Dict[str, Tuple[str, str, Optional[int]]]) -> Dict[str, int]:
+    """IDs of the SophoraIDs of parsed URLs, creating the missing ones."""
+    first_urls: Dict[str, str] = {}
+    for url, (sophora_id, _, _) in parsed.items():
+        first_urls.setdefault(sophora_id, url)
+
+    sophora_ids = list(first_urls)
+    ids: Dict[str, int] = {}
+
+    for chunk in _chunks(sophora_ids):
+        ids.update(
+            SophoraID.objects.filter(sophora_id__in=chunk).values_list(
+                "sophora_id", "id"
+            )
+        )
+
+    missing = [sophora_id for sophora_id in sophora_ids if sophora_id not in ids]
+
+    if missing:
+        SophoraID.objects.bulk_create(
+            [SophoraID(sophora_id=sophora_id) for sophora_id in missing],
+            batch_size=CHUNK_SIZE,
+            ignore_conflicts=True,
+        )
+
+        for chunk in _chunks(missing):
+            ids.update(
+                SophoraID.objects.filter(sophora_id__in=chunk).values_list(
+                    "sophora_id", "id"
+                )
+            )
+
+        # Looking up their documents in the Sophora API would stall the scrape
+        enrichment.defer({sophora_id: first_urls[sophora_id] for sophora_id in missing})
+
+    return ids
+
+
+def _pages_from_db(
+    urls: List[str], property: Optional[Property]
+) -> Tuple[Dict[str, int], Set[str]]:
+    """IDs of the pages of parseable URLs from the database, creating the missing
+    ones.
+
+    Returns:
+        Tuple[Dict[str, int], Set[str]]: The page IDs by URL and the URLs that aren't
+        pages, because there's no property to create them for.
+    """
+    page_ids: Dict[str, int] = {}
+
+    for chunk in _chunks(urls):
+        page_ids.update(Page.objects.filter(url__in=chunk).values_list("url", "id"))
+
+    parsed = {url: _parse_cached(url) for url in urls if url not in page_ids}
+
+    if not parsed or property is None:
+        return page_ids, set(parsed)
+
+    sophora_ids = _sophora_ids(parsed)
+
+    Page.objects.bulk_create(
+        [
+            Page(
+                url=url,
+                property=property,
+                sophora_page=sophora_page,
+                sophora_id_id=sophora_ids.get(sophora_id),
+                node=node,
+            )
+            for url, (sophora_id, node, sophora_page) in parsed.items()
+        ],
+        batch_size=CHUNK_SIZE,
+        ignore_conflicts=True,
+    )
+
+    for chunk in _chunks(list(parsed)):
+        page_ids.update(Page.objects.filter(url__in=chunk).values_list("url", "id"))
+
+    return page_ids, set()
+
+
+def resolve_pages(
+    urls: Iterable[str], *, property: Optional[Property] = None
+) -> Dict[str, int]:
+    """Get the IDs of the pages of many URLs at once, creating the missing pages.
+
+    Args:
+        urls (Iterable[str]): URLs to resolve, may contain duplicates.
+        property (Optional[Property], optional): Property to create new pages for.
+          Without a property, only existing pages are resolved. Defaults to None.
+
+    Returns:
+        Dict[str, int]: Page IDs by URL. URLs that aren't pages of a Sophora
+        document are missing.
+    """
+    urls = list(dict.fromkeys(urls))
+    version = _version()
+
+    page_ids = _memory.get_many(urls, version)
+    missing = [url for url in urls if url not in page_ids]
+
+    # URLs that aren't pages never are, so they aren't looked up in any cache
+    skipped = {url for url in missing if _parse_cached(url) is None}
+    missing = [url for url in missing if url not in skipped]
+
+    if missing and version is not None:
+        shared = _shared_get_many(version, missing)
+        page_ids.update(shared)
+        _memory.set_many(shared)
+        missing = [url for url in missing if url not in shared]
+
+    if missing:
+        found, unresolved = _pages_from_db(missing, property)
+        page_ids.update(found)
+        _memory.set_many(found)
+
+        if version is not None:
+            _shared_set_many(version, found)
+
+        logger.debug(
+            "Resolved {} URLs, {} from the database, {} skipped",
+            len(urls),
+            len(found),
+            len(skipped) + len(unresolved),
+        )
+
+    return page_ids
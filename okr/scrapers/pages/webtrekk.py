@@ -8,7 +8,7 @@ from loguru import logger
 
 from rfc3986 import urlparse
 
-from ..common.webtrekk import Webtrekk
+from ..common.webtrekk import shared_session
 from ..common.webtrekk.types import (
     AnalysisConfig,
     AnalysisObject,
@@ -83,11 +83,10 @@ def cleaned_webtrekk_page_data(date: dt.date) -> Dict:
         row_limit=10000,
     )
 
-    webtrekk = Webtrekk()
-
-    with webtrekk.session():
-        analysis_all = webtrekk.get_analysis_data(dict(config_all))
-        analysis_search = webtrekk.get_analysis_data(dict(config_search))
+    with shared_session() as webtrekk:
+        analysis_all, analysis_search = webtrekk.get_analyses(
+            [dict(config_all), dict(config_search)]
+        )
 
     data_all = analysis_all["analysisData"]
     data_search = analysis_search["analysisData"]
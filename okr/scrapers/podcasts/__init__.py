@@ -1,9 +1,7 @@
-"""Read and process data for podcasts and podcast episodes from various data sources.
-"""
+"""Read and process data for podcasts and podcast episodes from various data sources."""
 
 import datetime as dt
 import re
-from time import sleep
 from typing import Dict, Generator, List, Optional
 import gc
 import functools
@@ -27,13 +25,17 @@ from .spotify_api import spotify_api, fetch_all
 from .experimental_spotify_podcast_api import experimental_spotify_podcast_api
 from . import webtrekk, ard_audiothek, ati
 from .connection_meta import ConnectionMeta
+from ..common import frames
+from ..common.backfill import checkpointed, mark_incomplete
+from ..common.locks import locked
+from ..common.upsert import bulk_upsert
+from ..common.webtrekk import fetch_concurrently
 from ..common.utils import (
     date_param,
     local_now,
     local_today,
     local_yesterday,
     date_range,
-    to_timedelta,
     BERLIN,
     UTC,
 )
@@ -63,6 +65,9 @@ def scrape_full(
 ):
     """Read and process all available data for podcast.
 
+    The Spotify API is requested month by month. If the scrape is interrupted, the
+    next run resumes after the last completed step or month.
+
     Args:
         podcast (Podcast): Podcast to scrape data for
         start_date (dt.date, optional): earliest date to request data for. Defaults to
@@ -75,58 +80,58 @@ def scrape_full(
     podcast_filter = Q(id=podcast.id)
     start_date = start_date or dt.date(2016, 1, 1)
 
-    sleep(1)
-    scrape_feed(podcast_filter=podcast_filter)
+    with checkpointed(scrape_full, podcast) as backfill:
+        backfill.run(scrape_feed, podcast_filter=podcast_filter)
 
-    sleep(1)
-    scrape_itunes_reviews(podcast_filter=podcast_filter)
+        backfill.run(scrape_itunes_reviews, podcast_filter=podcast_filter)
 
-    sleep(1)
-    scrape_spotify_experimental_performance(
-        podcast_filter=podcast_filter,
-    )
+        backfill.run(
+            scrape_spotify_experimental_performance,
+            podcast_filter=podcast_filter,
+        )
 
-    sleep(1)
-    scrape_spotify_experimental_demographics(
-        start_date=start_date,
-        end_date=end_date,
-        podcast_filter=podcast_filter,
-    )
+        backfill.run(
+            scrape_spotify_experimental_demographics,
+            start_date=start_date,
+            end_date=end_date,
+            podcast_filter=podcast_filter,
+        )
 
-    sleep(1)
-    scrape_spotify_api(
-        start_date=start_date,
-        end_date=end_date,
-        podcast_filter=podcast_filter,
-    )
+        backfill.run(
+            scrape_spotify_api,
+            monthly=True,
+            start_date=start_date,
+            end_date=end_date,
+            podcast_filter=podcast_filter,
+        )
 
-    sleep(1)
-    scrape_podstat(
-        start_date=start_date,
-        end_date=end_date,
-        podcast_filter=podcast_filter,
-    )
+        backfill.run(
+            scrape_podstat,
+            start_date=start_date,
+            end_date=end_date,
+            podcast_filter=podcast_filter,
+        )
 
-    sleep(1)
-    scrape_podcast_data_webtrekk_picker(
-        start_date=start_date,
-        end_date=end_date,
-        podcast_filter=podcast_filter,
-    )
+        backfill.run(
+            scrape_podcast_data_webtrekk_picker,
+            start_date=start_date,
+            end_date=end_date,
+            podcast_filter=podcast_filter,
+        )
 
-    sleep(1)
-    scrape_episode_data_webtrekk_performance(
-        start_date=start_date,
-        end_date=end_date,
-        podcast_filter=podcast_filter,
-    )
+        backfill.run(
+            scrape_episode_data_webtrekk_performance,
+            start_date=start_date,
+            end_date=end_date,
+            podcast_filter=podcast_filter,
+        )
 
-    # TODO: ARD Audiothek API change
-    # sleep(1)
-    # scrape_ard_audiothek(
-    #     start_date=start_date,
-    #     end_date=end_date,
-    # )
+        # TODO: ARD Audiothek API change
+        # backfill.run(
+        #     scrape_ard_audiothek,
+        #     start_date=start_date,
+        #     end_date=end_date,
+        # )
 
     logger.success("Finished full scrape of {}", podcast)
 
@@ -172,7 +177,7 @@ def scrape_feed(*, podcast_filter: Optional[Q] = None):
         capture_exception(e)
         spotify_podcasts = {}
 
-    for podcast in podcasts:
+    for podcast in locked(podcasts, scrape_feed):
         try:
             _scrape_feed_podcast(podcast, spotify_podcasts)
         except Exception as e:
@@ -187,6 +192,7 @@ def scrape_feed(*, podcast_filter: Optional[Q] = None):
                 pass
             else:
                 capture_exception(e)
+                mark_incomplete()
 
     logger.success("Finished scraping feed")
 
@@ -397,13 +403,13 @@ def scrape_itunes_reviews(podcast_filter: Optional[Q] = None):
     if podcast_filter:
         podcasts = podcasts.filter(podcast_filter)
 
-    for podcast in podcasts:
+    for podcast in locked(podcasts, scrape_itunes_reviews):
         try:
             _scrape_itunes_reviews_podcast(podcast)
-            sleep(4)
         except Exception as e:
             logger.exception("Failed! Capturing exception and skipping.")
             capture_exception(e)
+            mark_incomplete()
 
     logger.success("Finished scraping iTunes reviews.")
 
@@ -423,12 +429,14 @@ def _scrape_itunes_reviews_podcast(podcast):
         defaults=itunes_ratings,
     )
 
-    for author, data in itunes_reviews.items():
-        PodcastITunesReview.objects.update_or_create(
-            podcast=podcast,
-            author=author,
-            defaults=data,
-        )
+    bulk_upsert(
+        PodcastITunesReview,
+        (
+            PodcastITunesReview(podcast=podcast, author=author, **data)
+            for author, data in itunes_reviews.items()
+        ),
+        ["podcast", "author"],
+    )
 
 
 def scrape_spotify_api(
@@ -471,12 +479,13 @@ def scrape_spotify_api(
     if podcast_filter:
         podcasts = podcasts.filter(podcast_filter)
 
-    for podcast in podcasts:
+    for podcast in locked(podcasts, scrape_spotify_api):
         try:
             _scrape_spotify_api_podcast(podcast, start_date, end_date)
         except Exception as e:
             logger.exception("Failed! Capturing exception and skipping.")
             capture_exception(e)
+            mark_incomplete()
 
         gc.collect()
 
@@ -498,10 +507,15 @@ def _scrape_spotify_api_podcast(
         if start_date < first_episode_date:
             start_date = first_episode_date
 
+    # Nothing to request before the first episode, e.g. for early months of a backfill
+    if start_date > end_date:
+        return
+
     try:
         _scrape_spotify_api_podcast_data(start_date, end_date, podcast)
     except Exception as e:
         capture_exception(e)
+        mark_incomplete()
 
     # Retrieve data for individual episodes
     _scrape_spotify_api_episode_data(podcast, start_date, end_date)
@@ -516,6 +530,8 @@ def _scrape_spotify_api_episode_data(podcast, start_date, end_date):
     ):
         logger.info("Scraping spotify episode data for {}", podcast_episode)
 
+        objs = []
+
         # Scrape stream stats for episode
         for date in date_range(start_date, end_date):
             if date < podcast_episode.publication_date_time.date():
@@ -547,17 +563,19 @@ def _scrape_spotify_api_episode_data(podcast, start_date, end_date):
             except SpotifyException:
                 episode_data["listeners_all_time"] = {"total": 0}
 
-            PodcastEpisodeDataSpotify.objects.update_or_create(
-                episode=podcast_episode,
-                date=date,
-                defaults=dict(
+            objs.append(
+                PodcastEpisodeDataSpotify(
+                    episode=podcast_episode,
+                    date=date,
                     starts=episode_data["starts"]["total"],
                     streams=episode_data["streams"]["total"],
                     listeners=episode_data["listeners"]["total"],
                     listeners_all_time=episode_data["listeners_all_time"]["total"],
-                ),
+                )
             )
 
+        bulk_upsert(PodcastEpisodeDataSpotify, objs, ["date", "episode"])
+
 
 def _scrape_spotify_api_podcast_data(start_date, end_date, podcast):  # noqa: C901
     # Retrieve follower for podcast from experimental API
@@ -572,6 +590,8 @@ def _scrape_spotify_api_podcast_data(start_date, end_date, podcast):  # noqa: C9
         for item in follower_data["counts"]
     }
 
+    objs = []
+
     for day, date in enumerate(reversed(date_range(start_date, end_date))):
         # Read daily data
         try:
@@ -622,20 +642,20 @@ def _scrape_spotify_api_podcast_data(start_date, end_date, podcast):  # noqa: C9
 
         defaults["followers"] = follower_data[date]
 
-        PodcastDataSpotify.objects.update_or_create(
-            podcast=podcast,
-            date=date,
-            defaults=defaults,
-        )
+        objs.append(PodcastDataSpotify(podcast=podcast, date=date, **defaults))
 
         _scrape_spotify_podcast_hourly(date, podcast)
 
+    bulk_upsert(PodcastDataSpotify, objs, ["date", "podcast"])
+
 
 def _scrape_spotify_podcast_hourly(date, podcast):
     # Read hourly data
     if date < dt.date(2019, 12, 1):
         return
 
+    objs = []
+
     for hour in range(0, 24):
         agg_type_data = {}
         date_time = dt.datetime(date.year, date.month, date.day, hour, tzinfo=UTC)
@@ -650,12 +670,16 @@ def _scrape_spotify_podcast_hourly(date, podcast):
             except Exception:
                 agg_type_data[agg_type] = 0
 
-        PodcastDataSpotifyHourly.objects.update_or_create(
-            podcast=podcast,
-            date_time=date_time,
-            defaults=agg_type_data,
+        objs.append(
+            PodcastDataSpotifyHourly(
+                podcast=podcast,
+                date_time=date_time,
+                **agg_type_data,
+            )
         )
 
+    bulk_upsert(PodcastDataSpotifyHourly, objs, ["date_time", "podcast"])
+
 
 def scrape_spotify_experimental_performance(
     *,
@@ -677,12 +701,13 @@ def scrape_spotify_experimental_performance(
     if podcast_filter:
         podcasts = podcasts.filter(podcast_filter)
 
-    for podcast in podcasts:
+    for podcast in locked(podcasts, scrape_spotify_experimental_performance):
         try:
             _scrape_spotify_experimental_performance_podcast(podcast, today)
         except Exception as e:
             logger.exception("Failed! Capturing exception and skipping.")
             capture_exception(e)
+            mark_incomplete()
 
     logger.success("Finished scraping spotify experimental performance")
 
@@ -698,6 +723,8 @@ def _scrape_spotify_experimental_performance_podcast(
 
     last_available_cutoff = local_today() - dt.timedelta(days=5)
 
+    objs = []
+
     for podcast_episode in podcast.episodes.exclude(spotify_id=None).filter(
         Q(available=True) | Q(last_available_date_time__gt=last_available_cutoff)
     ):
@@ -722,18 +749,20 @@ def _scrape_spotify_experimental_performance_podcast(
             seconds=performance_data["medianCompletion"]["seconds"],
         )
 
-        PodcastEpisodeDataSpotifyPerformance.objects.update_or_create(
-            episode=podcast_episode,
-            date=today,
-            defaults=dict(
+        objs.append(
+            PodcastEpisodeDataSpotifyPerformance(
+                episode=podcast_episode,
+                date=today,
                 average_listen=average_listen,
                 quartile_1=performance_data["percentiles"]["25"],
                 quartile_2=performance_data["percentiles"]["50"],
                 quartile_3=performance_data["percentiles"]["75"],
                 complete=performance_data["percentiles"]["100"],
-            ),
+            )
         )
 
+    bulk_upsert(PodcastEpisodeDataSpotifyPerformance, objs, ["date", "episode"])
+
 
 def scrape_spotify_experimental_demographics(
     *,
@@ -776,7 +805,7 @@ def scrape_spotify_experimental_demographics(
     if podcast_filter:
         podcasts = podcasts.filter(podcast_filter)
 
-    for podcast in podcasts:
+    for podcast in locked(podcasts, scrape_spotify_experimental_demographics):
         try:
             _scrape_spotify_experimental_demographics_podcast(
                 podcast,
@@ -786,6 +815,7 @@ def scrape_spotify_experimental_demographics(
         except Exception as e:
             logger.exception("Failed! Capturing exception and skipping.")
             capture_exception(e)
+            mark_incomplete()
 
     logger.success("Finished scraping spotify experimental demographics")
 
@@ -874,6 +904,7 @@ def _scrape_spotify_experimental_demographics_podcast(
         )
     except Exception as e:
         capture_exception(e)
+        mark_incomplete()
 
     # Get episode-level data
     _scrape_spotify_experimental_demographics_episode_data(podcast)
@@ -907,16 +938,22 @@ def _scrape_spotify_experimental_demographics_episode_data(podcast):
 
             raise
 
-        for age_range, age_range_data in aggregate_data["ageFacetedCounts"].items():
-            for gender, gender_data in age_range_data["counts"].items():
-                PodcastEpisodeDataSpotifyDemographics.objects.update_or_create(
+        bulk_upsert(
+            PodcastEpisodeDataSpotifyDemographics,
+            (
+                PodcastEpisodeDataSpotifyDemographics(
                     episode=podcast_episode,
                     age_range=PodcastEpisodeDataSpotifyDemographics.AgeRange(age_range),
                     gender=PodcastEpisodeDataSpotifyDemographics.Gender(gender),
-                    defaults=dict(
-                        count=gender_data,
-                    ),
+                    count=gender_data,
                 )
+                for age_range, age_range_data in aggregate_data[
+                    "ageFacetedCounts"
+                ].items()
+                for gender, gender_data in age_range_data["counts"].items()
+            ),
+            ["episode", "age_range", "gender"],
+        )
 
 
 def _scrape_spotify_experimental_demographics_podcast_data(
@@ -937,17 +974,23 @@ def _scrape_spotify_experimental_demographics_podcast_data(
 
             raise
 
-        for age_range, age_range_data in aggregate_data["ageFacetedCounts"].items():
-            for gender, gender_data in age_range_data["counts"].items():
-                PodcastDataSpotifyDemographics.objects.update_or_create(
+        bulk_upsert(
+            PodcastDataSpotifyDemographics,
+            (
+                PodcastDataSpotifyDemographics(
                     podcast=podcast,
                     date=date,
                     age_range=PodcastDataSpotifyDemographics.AgeRange(age_range),
                     gender=PodcastDataSpotifyDemographics.Gender(gender),
-                    defaults=dict(
-                        count=gender_data,
-                    ),
+                    count=gender_data,
                 )
+                for age_range, age_range_data in aggregate_data[
+                    "ageFacetedCounts"
+                ].items()
+                for gender, gender_data in age_range_data["counts"].items()
+            ),
+            ["date", "podcast", "age_range", "gender"],
+        )
 
 
 def scrape_podstat(
@@ -997,7 +1040,7 @@ def scrape_podstat(
     if podcast_filter:
         podcasts = podcasts.filter(podcast_filter)
 
-    for podcast in podcasts:
+    for podcast in locked(podcasts, scrape_podstat):
         with podstat.make_connection_meta() as connection_meta:
             try:
                 _scrape_podstat_podcast(
@@ -1009,6 +1052,7 @@ def scrape_podstat(
             except Exception as e:
                 logger.exception("Failed! Capturing exception and skipping.")
                 capture_exception(e)
+                mark_incomplete()
 
         del connection_meta
         gc.collect()
@@ -1079,15 +1123,11 @@ def _scrape_podstat_podcast(
                 "Found {} unique ondemand datapoints",
                 len(ondemand_objects_episode),
             )
-            for obj in objects_episode:
-                PodcastEpisodeDataPodstat.objects.update_or_create(
-                    episode=obj["episode"],
-                    date=obj["date"],
-                    defaults=dict(
-                        downloads=obj["downloads"],
-                        ondemand=obj["ondemand"],
-                    ),
-                )
+            bulk_upsert(
+                PodcastEpisodeDataPodstat,
+                (PodcastEpisodeDataPodstat(**obj) for obj in objects_episode),
+                ["date", "episode"],
+            )
 
 
 def _scrape_episode_data_podstat_ondemand(podcast_episode, podcast_ucount):
@@ -1170,11 +1210,14 @@ def scrape_podcast_data_webtrekk_picker(
         latest=yesterday,
     )
 
-    for date in reversed(date_range(start_date, end_date)):
+    for date, result in fetch_concurrently(
+        webtrekk.cleaned_picker_data, list(reversed(date_range(start_date, end_date)))
+    ):
         try:
-            data = webtrekk.cleaned_picker_data(date)
+            data = result.result()
         except Exception as e:
             capture_exception(e)
+            mark_incomplete()
             logger.warning("Skipping {} due to error {}", date, e)
             continue
 
@@ -1183,14 +1226,20 @@ def scrape_podcast_data_webtrekk_picker(
         if podcast_filter:
             podcasts = podcasts.filter(podcast_filter)
 
+        objs = []
+
         for podcast in podcasts:
             normalized_name = webtrekk.normalize_name(podcast.name)
             if normalized_name not in data:
                 continue
 
-            PodcastDataWebtrekkPicker.objects.update_or_create(
-                date=date, podcast=podcast, defaults=data[normalized_name]
+            objs.append(
+                PodcastDataWebtrekkPicker(
+                    date=date, podcast=podcast, **data[normalized_name]
+                )
             )
+
+        bulk_upsert(PodcastDataWebtrekkPicker, objs, ["date", "podcast"])
         logger.success("Finished scraping of Webtrekk performance data for {}.", date)
 
 
@@ -1232,11 +1281,14 @@ def scrape_episode_data_webtrekk_performance(
         latest=yesterday,
     )
 
-    for date in reversed(date_range(start_date, end_date)):
+    for date, result in fetch_concurrently(
+        webtrekk.cleaned_audio_data, list(reversed(date_range(start_date, end_date)))
+    ):
         try:
-            data = webtrekk.cleaned_audio_data(date)
+            data = result.result()
         except Exception as e:
             capture_exception(e)
+            mark_incomplete()
             logger.warning("Skipping {} due to error {}", date, e)
             continue
 
@@ -1245,14 +1297,21 @@ def scrape_episode_data_webtrekk_performance(
         if podcast_filter:
             podcasts = podcasts.filter(podcast_filter)
 
-        for podcast in podcasts:
-            for episode in podcast.episodes.all():
-                if episode.zmdb_id not in data:
-                    continue
+        episodes = PodcastEpisode.objects.filter(
+            podcast__in=podcasts,
+            zmdb_id__in=data.keys(),
+        )
 
-                PodcastEpisodeDataWebtrekkPerformance.objects.update_or_create(
-                    date=date, episode=episode, defaults=data[episode.zmdb_id]
+        bulk_upsert(
+            PodcastEpisodeDataWebtrekkPerformance,
+            (
+                PodcastEpisodeDataWebtrekkPerformance(
+                    date=date, episode=episode, **data[episode.zmdb_id]
                 )
+                for episode in episodes
+            ),
+            ["date", "episode"],
+        )
         logger.success("Finished scraping of Webtrekk performance data for {}.", date)
 
 
@@ -1370,26 +1429,42 @@ def scrape_ard_audiothek(  # noqa: C901
         df = df.groupby(["episode_ard_id"], as_index=False).sum()
 
         # create Data
-        data = {}
-        for _, row in df.iterrows():
-            data[row["episode_ard_id"]] = {
-                "starts": row["Wiedergaben"],
-                "playback_time": to_timedelta(row["Gesamte Wiedergabedauer"]),
+        rows = frames.to_rows(
+            df,
+            {
+                "episode_ard_id": "episode_ard_id",
+                "starts": "Wiedergaben",
+                "playback_time": frames.timedeltas("Gesamte Wiedergabedauer"),
+            },
+        )
+        data = {
+            row.episode_ard_id: {
+                "starts": row.starts,
+                "playback_time": row.playback_time,
             }
+            for row in rows
+        }
 
         podcasts = Podcast.objects.exclude(ard_audiothek_id=None)
 
         if podcast_filter:
             podcasts = podcasts.filter(podcast_filter)
 
-        for podcast in podcasts:
-            for episode in podcast.episodes.exclude(ard_audiothek_id=None):
-                if episode.ard_audiothek_id not in data:
-                    continue
+        episodes = PodcastEpisode.objects.filter(
+            podcast__in=podcasts,
+            ard_audiothek_id__in=data.keys(),
+        )
 
-                PodcastEpisodeDataArdAudiothekPerformance.objects.update_or_create(
-                    date=date, episode=episode, defaults=data[episode.ard_audiothek_id]
+        bulk_upsert(
+            PodcastEpisodeDataArdAudiothekPerformance,
+            (
+                PodcastEpisodeDataArdAudiothekPerformance(
+                    date=date, episode=episode, **data[episode.ard_audiothek_id]
                 )
+                for episode in episodes
+            ),
+            ["date", "episode"],
+        )
 
     logger.success("Finished scraping ARD Audiothek performance data.")
 
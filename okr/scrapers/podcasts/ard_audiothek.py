@@ -1,11 +1,11 @@
 from typing import Dict, Optional
 
-import requests
+from ..common.sessions import get_session
 
 
 def _request(path: str, params: Optional[Dict[str, str]] = None):
     url = f"https://api.ardaudiothek.de/{path}"
-    return requests.get(url, params=params)
+    return get_session("ard_audiothek").get(url, params=params)
 
 
 def get_programset(programset_id: str) -> Dict:
@@ -3,12 +3,11 @@ from typing import Dict, Optional
 import datetime as dt
 from io import BytesIO
 
-import requests
 import pandas as pd
 
+from ..common.sessions import get_session
 from ..common.utils import local_today, local_yesterday
 
-
 API_KEY = environ.get("ATI_API_KEY_SWR")
 
 
@@ -20,7 +19,7 @@ def _get_data(**params: Optional[Dict[str, str]]):
         **params,
     }
 
-    return requests.get(url, params=params)
+    return get_session("ati").get(url, params=params)
 
 
 def _all_pages_as_df(**params: Optional[Dict[str, str]]) -> pd.DataFrame:
@@ -8,7 +8,6 @@ Cookies supposedly last 1 year.
 import os
 from typing import Dict, Optional
 import datetime as dt
-from time import sleep
 from threading import RLock
 from loguru import logger
 import random
@@ -17,18 +16,22 @@ import base64
 import hashlib
 import re
 
-import requests
 from tenacity import retry
 from tenacity.stop import stop_after_attempt
 from tenacity.wait import wait_exponential
+from urllib3.util.retry import Retry
 import yaml
 
+from ..common.ratelimit import get_limiter
+from ..common.sessions import get_session
+
 BASE_URL = os.environ.get("EXPERIMENTAL_SPOTIFY_BASE_URL")
 CLIENT_ID = os.environ.get("EXPERIMENTAL_SPOTIFY_CLIENT_ID")
 SP_DC = os.environ.get("EXPERIMENTAL_SPOTIFY_SP_DC")
 SP_KEY = os.environ.get("EXPERIMENTAL_SPOTIFY_SP_KEY")
 
-DELAY_BASE = 2.0
+# Server errors and rate limits are handled by the rate limiter in _request
+RETRY = Retry(total=3, backoff_factor=0.5, raise_on_status=False)
 
 
 def random_string(
@@ -39,6 +42,12 @@ def random_string(
     return "".join(random.choices(chars, k=length))
 
 
+def _session():
+    return get_session(
+        "experimental_spotify", retry=RETRY, rate_limit="experimental_spotify"
+    )
+
+
 class ExperimentalSpotifyPodcastAPI:
     """Representation of the experimental Spotify podcast API."""
 
@@ -79,7 +88,7 @@ class ExperimentalSpotifyPodcastAPI:
             logger.trace("code_challenge = {}", code_challenge)
 
             logger.debug("Requesting User Authorization")
-            response = requests.get(
+            response = _session().get(
                 "https://accounts.spotify.com/oauth2/v2/auth",
                 params={
                     "response_type": "code",
@@ -121,7 +130,7 @@ class ExperimentalSpotifyPodcastAPI:
             logger.trace("auth_code = {}", auth_code)
 
             logger.debug("Requesting Bearer Token")
-            response = requests.post(
+            response = _session().post(
                 "https://accounts.spotify.com/api/token",
                 data={
                     "grant_type": "authorization_code",
@@ -164,24 +173,23 @@ class ExperimentalSpotifyPodcastAPI:
         }
 
     def _request(self, url: str, *, params: Optional[Dict[str, str]] = None) -> dict:
-        delay = DELAY_BASE
         for attempt in range(6):
-            sleep(delay)
             self._ensure_auth()
-            response = requests.get(
+            response = _session().get(
                 url,
                 params=params,
                 headers={"Authorization": f"Bearer {self._bearer}"},
             )
 
             if response.status_code in (429, 502, 503, 504):
-                delay *= 2
                 logger.log(
                     ("INFO" if attempt < 3 else "WARNING"),
-                    'Got {} for URL "{}", next delay: {}s',
+                    'Got {} for URL "{}", backing off',
                     response.status_code,
                     url,
-                    delay,
+                )
+                get_limiter("experimental_spotify").backoff(
+                    response.headers.get("Retry-After")
                 )
                 continue
 
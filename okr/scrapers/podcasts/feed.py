@@ -1,9 +1,10 @@
 """Parse podcast feed using the feedparser library."""
 
 import feedparser
-import requests
 import bs4
 
+from ..common.sessions import get_session
+
 
 def parse(url: str) -> feedparser.util.FeedParserDict:
     """Parse feed from ``url`` into ``FeedParserDict``.
@@ -18,7 +19,7 @@ def parse(url: str) -> feedparser.util.FeedParserDict:
         feedparser.util.FeedParserDict: Parsed data.
     """
 
-    result = requests.get(url)
+    result = get_session("podcast_feeds").get(url)
     result.raise_for_status()
 
     raw_xml = result.content
@@ -17,7 +17,7 @@ from tenacity.wait import wait_exponential
 
 from okr.models.podcasts import Podcast
 from ..common import types
-
+from ..common.sessions import get_session
 
 BASE_URL = "https://itunes.apple.com/search"
 COUNTRY_CODE = "DE"
@@ -104,7 +104,7 @@ def _get_apple_meta_data(**params) -> types.JSON:
         types.JSON: Raw JSON representation of search result.
     """
 
-    result = requests.get(BASE_URL, params=params)
+    result = get_session("itunes", rate_limit="itunes").get(BASE_URL, params=params)
     result.raise_for_status()
 
     return result.json()
@@ -146,7 +146,7 @@ def _get_metadata_url(
 
 @retry(wait=wait_exponential(), stop=stop_after_attempt(3))
 def _get_reviews_json_raw(url: str) -> requests.Response:
-    return requests.get(url)
+    return get_session("itunes", rate_limit="itunes").get(url)
 
 
 def _get_reviews_json(podcast: Podcast, retry: bool = True) -> Tuple[types.JSON, dict]:
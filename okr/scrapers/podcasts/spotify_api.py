@@ -4,7 +4,6 @@ import os
 from typing import Dict, List, Iterator, Literal, TypeVar, Union
 import datetime as dt
 from enum import Enum
-from time import sleep
 from typing import Callable, Optional
 import logging
 from loguru import logger
@@ -12,13 +11,16 @@ from loguru import logger
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
 from spotipy.exceptions import SpotifyException
-from requests.exceptions import ReadTimeout, ConnectionError
 
 from ..common.utils import local_yesterday
 from ..common import types
+from ..common.ratelimit import get_limiter
+from ..common.sessions import get_session
 
 LICENSOR_ID = os.environ.get("SPOTIFY_LICENSOR_ID")
 
+PODCAST_API_URL = "https://generic.wg.spotify.com/podcasters-analytics-api/"
+
 # "followers" is omitted here since we have a special function for that
 AggregationType = Literal["starts", "streams", "listeners"]
 
@@ -70,31 +72,31 @@ class CustomSpotify(spotipy.Spotify):
         return headers
 
     def _internal_call(self, method, url, payload, params):
+        # Timeouts and connection errors are retried by the session, only rate limits
+        # of the API pause the other workers
         error = None
         retries = 3
 
+        # The podcaster API has its own quota, separate from the public API
+        if url.startswith(PODCAST_API_URL):
+            limiter = get_limiter("spotify_podcasters")
+        else:
+            limiter = get_limiter("spotify")
+
         for i in range(retries):
+            limiter.acquire()
+
             try:
                 result = super()._internal_call(method, url, payload, params)
                 return result
 
-            except (ReadTimeout, ConnectionError) as e:
-                error = e
-                spotipy.client.logger.info(
-                    "Got {}, attempt {}/{}",
-                    type(e),
-                    i + 1,
-                    retries,
-                )
-                sleep(10 * (i + 1))
-
             except SpotifyException as e:
                 if e.http_status != 429:
                     raise
 
                 error = e
                 spotipy.client.logger.info(f"Got RetryError, attempt {i + 1}/{retries}")
-                sleep(10 * (i + 1))
+                limiter.backoff((e.headers or {}).get("Retry-After"))
 
         raise error
 
@@ -119,7 +121,7 @@ class CustomSpotify(spotipy.Spotify):
         if path.startswith("/"):
             path = path[1:]
 
-        url = "https://generic.wg.spotify.com/podcasters-analytics-api/" + path
+        url = PODCAST_API_URL + path
         return self._internal_call("GET", url, payload, kwargs)
 
     def licensed_podcasts(self) -> Dict:
@@ -310,7 +312,6 @@ def fetch_all(
     ids: List[str],
     result_key: str,
     chunk_size: int = 50,
-    delay: float = 2.0,
 ) -> List[Dict]:
     """Split up larger API requests into chunks.
 
@@ -330,15 +331,15 @@ def fetch_all(
         result = fn(chunk)
         agg.extend(result[result_key])
 
-        if delay:
-            sleep(delay)
-
     return agg
 
 
 try:
     auth_manager = SpotifyClientCredentials()
-    spotify_api = CustomSpotify(auth_manager=auth_manager)
+    spotify_api = CustomSpotify(
+        auth_manager=auth_manager,
+        requests_session=get_session("spotify"),
+    )
 except spotipy.oauth2.SpotifyOauthError:
     logger.warning("Missing Spotipy credentials! Spotify-related scrapers will fail.")
     spotify_api = None
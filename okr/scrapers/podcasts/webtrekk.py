@@ -6,7 +6,7 @@ import re
 
 from loguru import logger
 
-from ..common.webtrekk import Webtrekk
+from ..common.webtrekk import shared_session
 from ..common.webtrekk.types import (
     AnalysisConfig,
     AnalysisObject,
@@ -54,9 +54,7 @@ def cleaned_audio_data(date: dt.date) -> Dict:
         row_limit=10000,
     )
 
-    webtrekk = Webtrekk()
-
-    with webtrekk.session():
+    with shared_session() as webtrekk:
         analysis = webtrekk.get_analysis_data(dict(config))
 
     data = analysis["analysisData"]
@@ -134,9 +132,7 @@ def cleaned_picker_data(date: dt.date) -> Dict:
         row_limit=10000,
     )
 
-    webtrekk = Webtrekk()
-
-    with webtrekk.session():
+    with shared_session() as webtrekk:
         analysis = webtrekk.get_analysis_data(dict(config))
 
     data = analysis["analysisData"]
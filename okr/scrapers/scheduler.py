@@ -1,17 +1,20 @@
 """Configure scheduler to call scraper modules."""
 
-from typing import Any, Callable, List, Mapping, Optional
+import datetime as dt
+from typing import Any, Callable, List, Mapping, Optional, Union
 from concurrent.futures import ThreadPoolExecutor as NativeThreadPoolExecutor
 
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.events import EVENT_JOB_ERROR
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED
 from django.db.models.base import Model
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
+from rq import get_current_job
 from sentry_sdk import capture_exception
 from loguru import logger
 
 from ..models import (
+    JobRun,
     Podcast,
     Insta,
     YouTube,
@@ -22,12 +25,11 @@ from ..models import (
     SophoraNode,
     SnapchatShow,
 )
-from . import insta, youtube, podcasts, pages, tiktok, facebook, twitter, snapchat_shows
+from .common import backfill, instrumentation, locks
 from .common.utils import BERLIN
 from .db_cleanup import run_db_cleanup
 from app.redis import q
 
-
 scheduler = None
 executors = None
 
@@ -41,6 +43,9 @@ def sentry_listener(event):
 
 def setup():
     """Create and start scheduler instance and set up executors."""
+    # Only the worker runs the scheduler
+    from apscheduler.schedulers.background import BackgroundScheduler
+
     global scheduler, executors
 
     # Prevent setting up multiple schedulers
@@ -50,6 +55,8 @@ def setup():
     # Set up ThreadPoolExecutors for on-demand tasks received via rq
     executors = {
         "default": NativeThreadPoolExecutor(4),
+        # Rollups refreshed in the background, one after another
+        "rollups": NativeThreadPoolExecutor(1),
     }
 
     initial_executors = {
@@ -69,6 +76,8 @@ def setup():
 
     executors.update(initial_executors)
 
+    instrumentation.install_http_instrumentation()
+
     # Set up scheduler
     scheduler = BackgroundScheduler(
         timezone=BERLIN,
@@ -109,9 +118,26 @@ def add_jobs():
     * :meth:`~okr.scrapers.pages.scrape_sophora_nodes`
     * :meth:`~okr.scrapers.pages.scrape_gsc`
     * :meth:`~okr.scrapers.pages.scrape_webtrekk`
+
+    Every job is measured with :mod:`~okr.scrapers.common.instrumentation`.
     """
+    # The scrapers pull in pandas, BigQuery and other heavy libraries, so they are only
+    # imported by the worker and not by every process that loads the app
+    from . import (
+        facebook,
+        insta,
+        pages,
+        podcasts,
+        snapchat_shows,
+        tiktok,
+        twitter,
+        youtube,
+    )
 
     scheduler.add_listener(sentry_listener, EVENT_JOB_ERROR)
+    scheduler.add_listener(
+        instrumentation.record_queue_wait, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR
+    )
 
     # Meta
     scheduler.add_job(
@@ -356,9 +382,11 @@ def add_jobs():
         minute="20",
     )
 
+    instrumentation.instrument_scheduled_jobs(scheduler)
+
 
 def run_in_executor(
-    func: Callable,
+    func: Union[Callable, str],
     *,
     args: Optional[List[Any]] = None,
     kwargs: Optional[Mapping[str, Any]] = None,
@@ -367,15 +395,39 @@ def run_in_executor(
     """Run a function in a thread pool executor.
 
     Args:
-        func (Callable): The function to be executed in the executor
+        func (Union[Callable, str]): The function to be executed in the executor, or
+            its name relative to :mod:`okr.scrapers` (e.g. ``"insta.scrape_full"``)
         args (Optional[List[Any]]): List of positional arguments for ``func``
         kwargs (Optional[Mapping[str, Any]]): Mapping of keyword arguments for ``func``
         executor (str): The name of the executor ``func`` should run in. Defaults to ``"default"``.
     """
+    if isinstance(func, str):
+        func = instrumentation.resolve_job(func)
+
+    # Count the queue wait from when the job was enqueued in rq, if it was
+    rq_job = get_current_job()
+    if rq_job and rq_job.enqueued_at:
+        queued_at = rq_job.enqueued_at
+        if timezone.is_naive(queued_at):
+            queued_at = timezone.make_aware(queued_at, dt.timezone.utc)
+    else:
+        queued_at = timezone.now()
+
+    instrumented = instrumentation.instrument(
+        func,
+        source=JobRun.Source.EXECUTOR,
+        executor=executor,
+        arguments=", ".join(
+            [*map(repr, args or []), *(f"{k}={v!r}" for k, v in (kwargs or {}).items())]
+        ),
+        queued_at=queued_at,
+    )
 
     def catcher():
         try:
-            func(*(args or []), **(kwargs or {}))
+            # On-demand scrapes must not be dropped if a scheduled run is in progress
+            with locks.wait_for_locks():
+                instrumented(*(args or []), **(kwargs or {}))
         except Exception as e:
             logger.exception(
                 'Function "{}" running in executor "{}" raised an exception.',
@@ -387,8 +439,23 @@ def run_in_executor(
     executors[executor].submit(catcher)
 
 
+def resume_backfills():
+    """Continue full scrapes that were interrupted, e.g. by a restart of the worker.
+
+    Each full scrape runs in the executor for new objects of its model, like in
+    :meth:`~_on_created`. See :mod:`okr.scrapers.common.backfill`.
+    """
+    for func, product in backfill.pending_backfills():
+        logger.info("Resuming {} for {}", instrumentation.job_name(func), product)
+        run_in_executor(
+            func,
+            args=[product],
+            executor=f"initial_{product.__class__.__name__.lower()}",
+        )
+
+
 def run_in_worker(
-    func: Callable,
+    func: Union[Callable, str],
     *,
     args: Optional[List[Any]] = None,
     kwargs: Optional[Mapping[str, Any]] = None,
@@ -396,8 +463,12 @@ def run_in_worker(
 ):
     """Remotely calls :meth:`~run_in_executor` in the worker process.
 
+    Passing the name of the function instead of the function itself (e.g.
+    ``"insta.scrape_full"``) saves the calling process from importing the scraper.
+
     Args:
-        func (Callable): The function to be executed in the executor
+        func (Union[Callable, str]): The function to be executed in the executor, or
+            its name relative to :mod:`okr.scrapers`
         args (Optional[List[Any]]): List of positional arguments for ``func``
         kwargs (Optional[Mapping[str, Any]]): Mapping of keyword arguments for ``func``
         executor (str): The name of the executor ``func`` should run in. Defaults to ``"default"``.
@@ -413,8 +484,11 @@ def run_in_worker(
     )
 
 
-def _on_created(scraper: Callable, instance: Model):
-    """Wrapper for :meth:`~run_in_worker` for signal receivers"""
+def _on_created(scraper: str, instance: Model):
+    """Wrapper for :meth:`~run_in_worker` for signal receivers.
+
+    The scraper is passed by name, so the web process doesn't import it.
+    """
     run_in_worker(
         scraper,
         args=[instance],
@@ -433,7 +507,7 @@ def podcast_created(instance: Podcast, created: bool, **kwargs):
     """
     logger.debug("{} saved, created={}", instance, created)
     if created:
-        _on_created(podcasts.scrape_full, instance)
+        _on_created("podcasts.scrape_full", instance)
 
 
 @receiver(post_save, sender=Facebook)
@@ -447,7 +521,7 @@ def facebook_created(instance: Facebook, created: bool, **kwargs):
     """
     logger.debug("{} saved, created={}", instance, created)
     if created:
-        _on_created(facebook.scrape_full, instance)
+        _on_created("facebook.scrape_full", instance)
 
 
 @receiver(post_save, sender=Twitter)
@@ -461,7 +535,7 @@ def twitter_created(instance: Twitter, created: bool, **kwargs):
     """
     logger.debug("{} saved, created={}", instance, created)
     if created:
-        _on_created(twitter.scrape_full, instance)
+        _on_created("twitter.scrape_full", instance)
 
 
 @receiver(post_save, sender=Insta)
@@ -475,7 +549,7 @@ def insta_created(instance: Insta, created: bool, **kwargs):
     """
     logger.debug("{} saved, created={}", instance, created)
     if created:
-        _on_created(insta.scrape_full, instance)
+        _on_created("insta.scrape_full", instance)
 
 
 @receiver(post_save, sender=YouTube)
@@ -489,7 +563,7 @@ def youtube_created(instance: YouTube, created: bool, **kwargs):
     """
     logger.debug("{} saved, created={}", instance, created)
     if created:
-        _on_created(youtube.scrape_full, instance)
+        _on_created("youtube.scrape_full", instance)
 
 
 @receiver(post_save, sender=Property)
@@ -503,7 +577,7 @@ def property_created(instance: Property, created: bool, **kwargs):
     """
     logger.debug("{} saved, created={}", instance, created)
     if created:
-        _on_created(pages.scrape_full_gsc, instance)
+        _on_created("pages.scrape_full_gsc", instance)
 
 
 @receiver(post_save, sender=SophoraNode)
@@ -517,7 +591,7 @@ def sophora_node_created(instance: SophoraNode, created: bool, **kwargs):
     """
     logger.debug("{} saved, created={}", instance, created)
     if created:
-        _on_created(pages.scrape_full_sophora, instance)
+        _on_created("pages.scrape_full_sophora", instance)
 
 
 @receiver(post_save, sender=TikTok)
@@ -531,7 +605,7 @@ def tiktok_created(instance: TikTok, created: bool, **kwargs):
     """
     logger.debug("{} saved, created={}", instance, created)
     if created:
-        _on_created(tiktok.scrape_full, instance)
+        _on_created("tiktok.scrape_full", instance)
 
 
 @receiver(post_save, sender=SnapchatShow)
@@ -545,4 +619,4 @@ def snapchat_show_created(instance: SnapchatShow, created: bool, **kwargs):
     """
     logger.debug("{} saved, created={}", instance, created)
     if created:
-        _on_created(snapchat_shows.scrape_full, instance)
+        _on_created("snapchat_shows.scrape_full", instance)
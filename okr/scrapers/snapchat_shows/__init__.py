@@ -2,13 +2,13 @@
 
 # from datetime import date, datetime
 import datetime as dt
-from time import sleep
+import functools
 from typing import Optional
 
 from django.db.utils import IntegrityError
 from django.db.models import Q
 from loguru import logger
-from sentry_sdk import capture_exception
+from sentry_sdk import capture_exception, capture_message
 
 from ...models.snapchat_shows import (
     SnapchatShow,
@@ -17,7 +17,24 @@ from ...models.snapchat_shows import (
     SnapchatShowSnap,
 )
 from . import quintly
-from ..common.utils import as_local_tz, to_timedelta
+from ..common import frames
+from ..common.backfill import checkpointed
+from ..common.quintly import for_each_account
+from ..common.upsert import bulk_upsert
+from ..common.watermarks import incremental
+from ..common.utils import local_today
+
+# Demographics columns, which are the same for shows, stories and snaps
+DEMOGRAPHICS = {
+    "gender_demographics_male": "genderDemographicsMaleUsers",
+    "gender_demographics_female": "genderDemographicsFemaleUsers",
+    "gender_demographics_unknown": "genderDemographicsUnknownGenderUsers",
+    "age_demographics_13_to_17": "ageDemographicsAgeRange13To17Users",
+    "age_demographics_18_to_24": "ageDemographicsAgeRange18To24Users",
+    "age_demographics_25_to_34": "ageDemographicsAgeRange25To34Users",
+    "age_demographics_35_plus": "ageDemographicsAgeRange35PlusUsers",
+    "age_demographics_unknown": "ageDemographicsUnknownAgeUsers",
+}
 
 
 def scrape_full(snapchat_show: SnapchatShow):
@@ -31,11 +48,23 @@ def scrape_full(snapchat_show: SnapchatShow):
     snapchat_show_filter = Q(id=snapchat_show.id)
     start_date = dt.date(2019, 1, 1)
 
-    sleep(1)
+    with checkpointed(scrape_full, snapchat_show) as backfill:
+        backfill.run(
+            scrape_insights,
+            start_date=start_date,
+            snapchat_show_filter=snapchat_show_filter,
+        )
+        backfill.run(
+            scrape_stories,
+            start_date=start_date,
+            snapchat_show_filter=snapchat_show_filter,
+        )
+        backfill.run(
+            scrape_story_snaps,
+            start_date=start_date,
+            snapchat_show_filter=snapchat_show_filter,
+        )
 
-    scrape_insights(start_date=start_date, snapchat_show_filter=snapchat_show_filter)
-    scrape_stories(start_date=start_date, snapchat_show_filter=snapchat_show_filter)
-    scrape_story_snaps(start_date=start_date, snapchat_show_filter=snapchat_show_filter)
     logger.success("Finished full Snapchat show scrape of {}", snapchat_show.name)
 
 
@@ -50,7 +79,8 @@ def scrape_insights(
 
     Args:
         start_date (Optional[dt.date], optional): Earliest date to request data for.
-            Defaults to None.
+            Defaults to None. If None, requests the data that isn't final yet
+            (see :mod:`~okr.scrapers.common.watermarks`).
         snapchat_show_filter (Optional[Q], optional): Filter to apply to
             :class:`~okr.models.snapchat_shows.SnapchatShow` object. Defaults to None.
     """
@@ -59,65 +89,70 @@ def scrape_insights(
     if snapchat_show_filter:
         snapchat_shows = snapchat_shows.filter(snapchat_show_filter)
 
-    for snapchat_show in snapchat_shows:
-        try:
-            _scrape_insights_snapchat_show(start_date, snapchat_show)
-        except Exception as e:
-            capture_exception(e)
+    for_each_account(
+        snapchat_shows,
+        functools.partial(_scrape_insights_snapchat_show, start_date),
+        job=scrape_insights,
+    )
 
 
 def _scrape_insights_snapchat_show(start_date, snapchat_show):
-    logger.debug("Scraping insights for {}", snapchat_show.name)
-    df = quintly.get_snapchat_show_insights(
-        snapchat_show.quintly_profile_id, start_date=start_date
-    )
-
-    for index, row in df.iterrows():
-        if row.importTime is None:
-            continue
-
-        defaults = {
-            "daily_uniques": row.dailyUniques,
-            "monthly_uniques": row.monthlyUniques,
-            "subscribers": row.subscribers,
-            "loyal_users": row.loyalUsers,
-            "frequent_users": row.frequentUsers,
-            "returning_users": row.returningUsers,
-            "new_users": row.newUsers,
-            "gender_demographics_male": row.genderDemographicsMaleUsers,
-            "gender_demographics_female": row.genderDemographicsFemaleUsers,
-            "gender_demographics_unknown": row.genderDemographicsUnknownGenderUsers,
-            "age_demographics_13_to_17": row.ageDemographicsAgeRange13To17Users,
-            "age_demographics_18_to_24": row.ageDemographicsAgeRange18To24Users,
-            "age_demographics_25_to_34": row.ageDemographicsAgeRange25To34Users,
-            "age_demographics_35_plus": row.ageDemographicsAgeRange35PlusUsers,
-            "age_demographics_unknown": row.ageDemographicsUnknownAgeUsers,
-            "total_time_viewed": to_timedelta(row.totalTimeViewed),
-            "average_time_spent_per_user": to_timedelta(row.averageTimeSpentPerUser),
-            "unique_topsnaps_per_user": row.uniqueTopsnapsPerUser,
-            "unique_topsnap_views": row.uniqueTopsnapViews,
-            "topsnap_views": row.topsnapViews,
-            # Convert from percentage to fraction
-            "attachment_conversion": (row.attachmentConversion or 0) / 100.0,
-            "attachment_article_views": row.attachmentArticleViews,
-            "attachment_video_views": row.attachmentVideoViews,
-            "screenshots": row.screenshots,
-            "shares": row.shares,
-            "quintly_last_updated": as_local_tz(row.importTime),
-        }
+    with incremental(
+        scrape_insights,
+        snapchat_show,
+        source="quintly",
+        default=local_today() - dt.timedelta(days=7),
+        start_date=start_date,
+    ) as increment:
+        logger.debug("Scraping insights for {}", snapchat_show.name)
+        df = quintly.get_snapchat_show_insights(
+            snapchat_show.quintly_profile_id, start_date=increment.start_date
+        )
+
+        if not df.empty:
+            df = df[df.importTime.notna()]
+
+        objs = frames.to_models(
+            SnapchatShowInsight,
+            df,
+            {
+                "date": frames.dates("time"),
+                "daily_uniques": "dailyUniques",
+                "monthly_uniques": "monthlyUniques",
+                "subscribers": "subscribers",
+                "loyal_users": "loyalUsers",
+                "frequent_users": "frequentUsers",
+                "returning_users": "returningUsers",
+                "new_users": "newUsers",
+                **DEMOGRAPHICS,
+                "total_time_viewed": frames.timedeltas("totalTimeViewed"),
+                "average_time_spent_per_user": frames.timedeltas(
+                    "averageTimeSpentPerUser"
+                ),
+                "unique_topsnaps_per_user": "uniqueTopsnapsPerUser",
+                "unique_topsnap_views": "uniqueTopsnapViews",
+                "topsnap_views": "topsnapViews",
+                # Convert from percentage to fraction
+                "attachment_conversion": lambda df: (
+                    df.attachmentConversion.fillna(0) / 100.0
+                ),
+                "attachment_article_views": "attachmentArticleViews",
+                "attachment_video_views": "attachmentVideoViews",
+                "screenshots": "screenshots",
+                "shares": "shares",
+                "quintly_last_updated": frames.local_datetimes("importTime"),
+            },
+            snapchat_show=snapchat_show,
+        )
 
         try:
-            obj, created = SnapchatShowInsight.objects.update_or_create(
-                snapchat_show=snapchat_show,
-                date=dt.date.fromisoformat(row.time),
-                defaults=defaults,
-            )
+            bulk_upsert(SnapchatShowInsight, objs, ["snapchat_show", "date"])
         except IntegrityError as e:
             capture_exception(e)
+            increment.mark_incomplete()
             logger.exception(
-                "Data for Snapchat show insights on date {} failed integrity check:\n{}",
-                row.time,
-                defaults,
+                "Data for Snapchat show insights of {} failed integrity check",
+                snapchat_show,
             )
 
 
@@ -139,11 +174,11 @@ def scrape_stories(
     if snapchat_show_filter:
         snapchat_shows = snapchat_shows.filter(snapchat_show_filter)
 
-    for snapchat_show in snapchat_shows:
-        try:
-            _scrape_stories_snapchat_show(start_date, snapchat_show)
-        except Exception as e:
-            capture_exception(e)
+    for_each_account(
+        snapchat_shows,
+        functools.partial(_scrape_stories_snapchat_show, start_date),
+        job=scrape_stories,
+    )
 
 
 def _scrape_stories_snapchat_show(start_date, snapchat_show):
@@ -159,57 +194,49 @@ def _scrape_stories_snapchat_show(start_date, snapchat_show):
     # Ignore unpublished stories as they sometimes have the same ID as published ones
     df = df[df["state"] == "Available"]
 
-    for index, row in df.iterrows():
-        defaults = {
-            "create_date_time": as_local_tz(row.createTime),
-            "start_date_time": as_local_tz(row.startTime),
-            "first_live_date_time": as_local_tz(row.firstLiveTime),
-            "spotlight_end_date_time": as_local_tz(row.spotlightEndTime),
-            "spotlight_duration": to_timedelta(row.spotlightDuration),
-            "title": row.title,
-            "gender_demographics_male": row.genderDemographicsMaleUsers,
-            "gender_demographics_female": row.genderDemographicsFemaleUsers,
-            "gender_demographics_unknown": row.genderDemographicsUnknownGenderUsers,
-            "age_demographics_13_to_17": row.ageDemographicsAgeRange13To17Users,
-            "age_demographics_18_to_24": row.ageDemographicsAgeRange18To24Users,
-            "age_demographics_25_to_34": row.ageDemographicsAgeRange25To34Users,
-            "age_demographics_35_plus": row.ageDemographicsAgeRange35PlusUsers,
-            "age_demographics_unknown": row.ageDemographicsUnknownAgeUsers,
-            "view_time": to_timedelta(row.viewTime),
-            "average_view_time_per_user": to_timedelta(row.averageViewTimePerUser),
-            "total_views": row.totalViews,
-            "unique_viewers": row.uniqueViewers,
-            "unique_completers": row.uniqueCompleters,
+    objs = frames.to_models(
+        SnapchatShowStory,
+        df,
+        {
+            "external_id": "id",
+            "create_date_time": frames.local_datetimes("createTime"),
+            "start_date_time": frames.local_datetimes("startTime"),
+            "first_live_date_time": frames.local_datetimes("firstLiveTime"),
+            "spotlight_end_date_time": frames.local_datetimes("spotlightEndTime"),
+            "spotlight_duration": frames.timedeltas("spotlightDuration"),
+            "title": "title",
+            **DEMOGRAPHICS,
+            "view_time": frames.timedeltas("viewTime"),
+            "average_view_time_per_user": frames.timedeltas("averageViewTimePerUser"),
+            "total_views": "totalViews",
+            "unique_viewers": "uniqueViewers",
+            "unique_completers": "uniqueCompleters",
             # Convert from percentage to fraction
-            "completion_rate": row.completionRate / 100.0,
-            "shares": row.shares,
-            "unique_sharers": row.uniqueSharers,
-            "viewers_from_shares": row.viewersFromShares,
-            "screenshots": row.screenshots,
-            "subscribers": row.subscribers,
-            "topsnap_view_time": to_timedelta(row.topsnapViewTime),
-            "topsnap_average_view_time_per_user": to_timedelta(
-                row.topsnapAverageViewTimePerUser
+            "completion_rate": lambda df: df.completionRate / 100.0,
+            "shares": "shares",
+            "unique_sharers": "uniqueSharers",
+            "viewers_from_shares": "viewersFromShares",
+            "screenshots": "screenshots",
+            "subscribers": "subscribers",
+            "topsnap_view_time": frames.timedeltas("topsnapViewTime"),
+            "topsnap_average_view_time_per_user": frames.timedeltas(
+                "topsnapAverageViewTimePerUser"
             ),
-            "topsnap_total_views": row.topsnapTotalViews,
-            "topsnap_unique_views": row.topsnapUniqueViews,
-            "unique_topsnaps_per_user": row.uniqueTopsnapsPerUser,
-            "quintly_last_updated": as_local_tz(row.importTime),
-        }
+            "topsnap_total_views": "topsnapTotalViews",
+            "topsnap_unique_views": "topsnapUniqueViews",
+            "unique_topsnaps_per_user": "uniqueTopsnapsPerUser",
+            "quintly_last_updated": frames.local_datetimes("importTime"),
+        },
+        snapchat_show=snapchat_show,
+    )
 
-        try:
-            obj, created = SnapchatShowStory.objects.update_or_create(
-                snapchat_show=snapchat_show,
-                external_id=row.id,
-                defaults=defaults,
-            )
-        except IntegrityError as e:
-            capture_exception(e)
-            logger.exception(
-                "Data for Snapchat story with ID {} failed integrity check:\n{}",
-                row.id,
-                defaults,
-            )
+    try:
+        bulk_upsert(SnapchatShowStory, objs, ["external_id"])
+    except IntegrityError as e:
+        capture_exception(e)
+        logger.exception(
+            "Data for Snapchat stories of {} failed integrity check", snapchat_show
+        )
 
 
 def scrape_story_snaps(
@@ -232,11 +259,11 @@ def scrape_story_snaps(
     if snapchat_show_filter:
         snapchat_shows = snapchat_shows.filter(snapchat_show_filter)
 
-    for snapchat_show in snapchat_shows:
-        try:
-            _scrape_story_snaps_snapchat_show(start_date, snapchat_show)
-        except Exception as e:
-            capture_exception(e)
+    for_each_account(
+        snapchat_shows,
+        functools.partial(_scrape_story_snaps_snapchat_show, start_date),
+        job=scrape_story_snaps,
+    )
 
 
 def _scrape_story_snaps_snapchat_show(start_date, snapchat_show):
@@ -245,72 +272,67 @@ def _scrape_story_snaps_snapchat_show(start_date, snapchat_show):
         snapchat_show.quintly_profile_id, start_date=start_date
     )
 
-    for index, row in df.iterrows():
-        if row.storyId is None:
-            continue
-
-        defaults = {
-            "name": row.name,
-            "position": row.position,
-            "duration": to_timedelta(row.duration),
-            "subscribe_options_headline": row.subscribeOptionsHeadline,
-            "tiles": row.tiles,
-            "gender_demographics_male": row.genderDemographicsMaleUsers,
-            "gender_demographics_female": row.genderDemographicsFemaleUsers,
-            "gender_demographics_unknown": row.genderDemographicsUnknownGenderUsers,
-            "age_demographics_13_to_17": row.ageDemographicsAgeRange13To17Users,
-            "age_demographics_18_to_24": row.ageDemographicsAgeRange18To24Users,
-            "age_demographics_25_to_34": row.ageDemographicsAgeRange25To34Users,
-            "age_demographics_35_plus": row.ageDemographicsAgeRange35PlusUsers,
-            "age_demographics_unknown": row.ageDemographicsUnknownAgeUsers,
-            "view_time": to_timedelta(row.viewTime),
-            "average_view_time_per_user": to_timedelta(row.averageViewTimePerUser),
-            "total_views": row.totalViews,
-            "unique_viewers": row.uniqueViewers,
-            "unique_completers": row.uniqueCompleters,
+    if not df.empty:
+        df = df[df.storyId.notna()]
+
+    # Look up all stories at once instead of once per snap
+    stories = SnapchatShowStory.objects.in_bulk(
+        set(df.storyId) if not df.empty else set(), field_name="external_id"
+    )
+
+    # Make sure a matching story does exist before trying to set a ForeignKey
+    if not df.empty:
+        known = df.storyId.isin(stories.keys())
+
+        for story_id, snap_id in zip(df.storyId[~known], df.id[~known]):
+            capture_message(f"Unknown Snapchat story ID {story_id}")
+            logger.error(
+                "Story ID {} for Snapchat story snap with ID {} did not match any known story!",
+                story_id,
+                snap_id,
+            )
+
+        df = df[known]
+
+    objs = frames.to_models(
+        SnapchatShowSnap,
+        df,
+        {
+            "story": lambda df: df.storyId.map(stories),
+            "external_id": "id",
+            "name": "name",
+            "position": "position",
+            "duration": frames.timedeltas("duration"),
+            "subscribe_options_headline": "subscribeOptionsHeadline",
+            "tiles": "tiles",
+            **DEMOGRAPHICS,
+            "view_time": frames.timedeltas("viewTime"),
+            "average_view_time_per_user": frames.timedeltas("averageViewTimePerUser"),
+            "total_views": "totalViews",
+            "unique_viewers": "uniqueViewers",
+            "unique_completers": "uniqueCompleters",
             # Convert from percentage to fraction
-            "completion_rate": row.completionRate / 100.0,
-            "shares": row.shares,
-            "unique_sharers": row.uniqueSharers,
-            "viewers_from_shares": row.viewersFromShares,
-            "screenshots": row.screenshots,
+            "completion_rate": lambda df: df.completionRate / 100.0,
+            "shares": "shares",
+            "unique_sharers": "uniqueSharers",
+            "viewers_from_shares": "viewersFromShares",
+            "screenshots": "screenshots",
             # Convert from percentage to fraction
-            "drop_off_rate": row.dropOffRate / 100.0,
-            "topsnap_view_time": to_timedelta(row.topsnapViewTime),
-            "topsnap_average_view_time_per_user": to_timedelta(
-                row.topsnapAverageViewTimePerUser
+            "drop_off_rate": lambda df: df.dropOffRate / 100.0,
+            "topsnap_view_time": frames.timedeltas("topsnapViewTime"),
+            "topsnap_average_view_time_per_user": frames.timedeltas(
+                "topsnapAverageViewTimePerUser"
             ),
-            "topsnap_total_views": row.topsnapTotalViews,
-            "topsnap_unique_views": row.topsnapUniqueViews,
-            "quintly_last_updated": as_local_tz(row.importTime),
-        }
-
-        # Make sure exactly on matching story does exist before trying to set a ForeignKey
-        try:
-            story = SnapchatShowStory.objects.get(external_id=row.storyId)
-        except (
-            SnapchatShowStory.DoesNotExist,
-            SnapchatShowStory.MultipleObjectsReturned,
-        ) as e:
-            capture_exception(e)
-            logger.exception(
-                "Story ID {} for Snapchat story snap with ID {} did not match any known story or there are more than one story with this ID!\n{}",
-                row.storyId,
-                row.id,
-                defaults,
-            )
-            continue
+            "topsnap_total_views": "topsnapTotalViews",
+            "topsnap_unique_views": "topsnapUniqueViews",
+            "quintly_last_updated": frames.local_datetimes("importTime"),
+        },
+    )
 
-        try:
-            obj, created = SnapchatShowSnap.objects.update_or_create(
-                story=story,
-                external_id=row.id,
-                defaults=defaults,
-            )
-        except IntegrityError as e:
-            capture_exception(e)
-            logger.exception(
-                "Data for Snapchat story snap with ID {} failed integrity check:\n{}",
-                row.id,
-                defaults,
-            )
+    try:
+        bulk_upsert(SnapchatShowSnap, objs, ["external_id"])
+    except IntegrityError as e:
+        capture_exception(e)
+        logger.exception(
+            "Data for Snapchat story snaps of {} failed integrity check", snapchat_show
+        )
@@ -66,7 +66,7 @@ def get_snapchat_show_insights(
         "shares",
     ]
 
-    df = common_quintly.quintly.run_query(
+    df = common_quintly.run_query(
         profile_ids,
         table,
         fields,
@@ -143,7 +143,7 @@ def get_snapchat_show_stories(
     start_date = start_date or datetime.date.today() - datetime.timedelta(days=120)
     end_date = datetime.date.today()
 
-    df = common_quintly.quintly.run_query(
+    df = common_quintly.run_query(
         profile_ids,
         table,
         fields,
@@ -211,7 +211,7 @@ def get_snapchat_show_story_snaps(
     start_date = start_date or datetime.date.today() - datetime.timedelta(days=120)
     end_date = datetime.date.today()
 
-    df = common_quintly.quintly.run_query(
+    df = common_quintly.run_query(
         profile_ids,
         table,
         fields,
@@ -1,13 +1,14 @@
 """Read and process data for TikTok from Quintly."""
 
 import datetime as dt
+import functools
 import json
-from time import sleep
+from bisect import bisect_right
 from typing import Optional
 
 from django.db.models import Q
 from loguru import logger
-from sentry_sdk import capture_exception
+import pandas as pd
 
 from ...models.tiktok import (
     TikTok,
@@ -17,7 +18,11 @@ from ...models.tiktok import (
     TikTokTag,
 )
 from . import quintly
-from ..common.utils import BERLIN, to_timedelta
+from ..common import frames
+from ..common.backfill import checkpointed
+from ..common.quintly import for_each_account
+from ..common.upsert import bulk_upsert
+from ..common.utils import BERLIN
 
 
 def scrape_full(tiktok: TikTok):
@@ -31,11 +36,10 @@ def scrape_full(tiktok: TikTok):
 
     logger.info('Starting full scrape for TikTok account "{}"', tiktok.name)
 
-    sleep(1)
+    with checkpointed(scrape_full, tiktok) as backfill:
+        backfill.run(scrape_data, start_date=start_date, tiktok_filter=tiktok_filter)
 
-    scrape_data(start_date=start_date, tiktok_filter=tiktok_filter)
-
-    scrape_posts(start_date=start_date, tiktok_filter=tiktok_filter)
+        backfill.run(scrape_posts, start_date=start_date, tiktok_filter=tiktok_filter)
 
     logger.success('Finished full scrape for TikTok account "{}"', tiktok.name)
 
@@ -60,46 +64,48 @@ def scrape_data(
     if tiktok_filter:
         tiktoks = tiktoks.filter(tiktok_filter)
 
-    for tiktok in tiktoks:
-        try:
-            _scrape_data_tiktok(start_date, tiktok)
-        except Exception as e:
-            logger.error(
-                'Failed to scrape TikTok data for TikTok "{}": {}',
-                tiktok.name,
-                e,
-            )
-            capture_exception(e)
+    for_each_account(
+        tiktoks,
+        functools.partial(_scrape_data_tiktok, start_date),
+        job=scrape_data,
+    )
 
 
 def _scrape_data_tiktok(start_date, tiktok):
     df = quintly.get_tiktok(tiktok.quintly_profile_id, start_date=start_date)
 
-    for index, row in df.iterrows():
-        date = dt.date.fromisoformat(row.time)
+    # Creation times of all videos in this account, to count them per date below
+    post_times = sorted(
+        TikTokPost.objects.filter(tiktok=tiktok).values_list("created_at", flat=True)
+    )
 
+    def total_videos(df: pd.DataFrame) -> pd.Series:
         # Count all videos in this account until the given date
-        total_videos = TikTokPost.objects.filter(
-            tiktok=tiktok,
-            created_at__lte=BERLIN.localize(dt.datetime.combine(date, dt.time.max)),
-        ).count()
-
-        defaults = {
-            "followers": row.followers,
-            "followers_change": row.followersChange,
-            "following": row.following,
-            "following_change": row.followingChange,
-            "likes": row.likes,
-            "likes_change": row.likesChange,
+        return frames.dates("time")(df).map(
+            lambda date: bisect_right(
+                post_times,
+                BERLIN.localize(dt.datetime.combine(date, dt.time.max)),
+            )
+        )
+
+    objs = frames.to_models(
+        TikTokData,
+        df,
+        {
+            "date": frames.dates("time"),
+            "followers": "followers",
+            "followers_change": "followersChange",
+            "following": "following",
+            "following_change": "followingChange",
+            "likes": "likes",
+            "likes_change": "likesChange",
             "videos": total_videos,
-            "videos_change": row.ownVideos,
-        }
+            "videos_change": "ownVideos",
+        },
+        tiktok=tiktok,
+    )
 
-        obj, created = TikTokData.objects.update_or_create(
-            tiktok=tiktok,
-            date=date,
-            defaults=defaults,
-        )
+    bulk_upsert(TikTokData, objs, ["tiktok", "date"])
 
 
 def scrape_posts(
@@ -120,46 +126,114 @@ def scrape_posts(
     if tiktok_filter:
         tiktoks = tiktoks.filter(tiktok_filter)
 
-    for tiktok in tiktoks:
-        try:
-            _scrape_posts_tiktok(start_date, tiktok)
-        except Exception as e:
-            logger.error(
-                'Failed to scrape TikTok posts for TikTok "{}": {}',
-                tiktok.name,
-                e,
-            )
-            capture_exception(e)
+    for_each_account(
+        tiktoks,
+        functools.partial(_scrape_posts_tiktok, start_date),
+        job=scrape_posts,
+    )
 
 
 def _scrape_posts_tiktok(start_date, tiktok):
     df = quintly.get_tiktok_posts(tiktok.quintly_profile_id, start_date=start_date)
 
-    for index, row in df.iterrows():
-        defaults = {
-            "created_at": BERLIN.localize(dt.datetime.fromisoformat(row.time)),
-            "link": row.link,
-            "description": row.description,
-            "video_length": to_timedelta(row.videoLength),
-            "video_cover_url": row.videoCoverUrl,
-            "likes": row.likes,
-            "comments": row.comments,
-            "shares": row.shares,
-            "views": row.views,
-        }
-
-        tiktok_post, created = TikTokPost.objects.update_or_create(
-            tiktok=tiktok, external_id=row.externalId, defaults=defaults
+    if df.empty:
+        return
+
+    objs = frames.to_models(
+        TikTokPost,
+        df,
+        {
+            "external_id": "externalId",
+            "created_at": frames.local_datetimes("time"),
+            "link": "link",
+            "description": "description",
+            "video_length": frames.timedeltas("videoLength"),
+            "video_cover_url": "videoCoverUrl",
+            "likes": "likes",
+            "comments": "comments",
+            "shares": "shares",
+            "views": "views",
+        },
+        tiktok=tiktok,
+    )
+    hashtags_by_external_id = dict(
+        zip(df.externalId, df.hashtags.map(lambda value: set(json.loads(value))))
+    )
+    tags_by_external_id = dict(
+        zip(
+            df.externalId,
+            df.postTags.map(
+                lambda value: {tag_dict["name"] for tag_dict in json.loads(value)}
+            ),
         )
+    )
+
+    bulk_upsert(TikTokPost, objs, ["external_id"])
+
+    post_ids = dict(
+        TikTokPost.objects.filter(
+            external_id__in=hashtags_by_external_id.keys()
+        ).values_list("external_id", "id")
+    )
+
+    _add_post_relations(
+        TikTokPost.hashtags,
+        TikTokHashtag,
+        "hashtag",
+        post_ids,
+        hashtags_by_external_id,
+    )
+    _add_post_relations(
+        TikTokPost.tags,
+        TikTokTag,
+        "name",
+        post_ids,
+        tags_by_external_id,
+    )
+
+
+def _add_post_relations(descriptor, model, field_name, post_ids, values_by_external_id):
+    """Create missing related objects and link them to their posts in bulk.
+
+    Equivalent to calling ``get_or_create`` and ``post.<relation>.add()`` for every
+    value, but with a constant number of queries.
 
-        for hashtag in json.loads(row.hashtags):
-            tiktok_hashtag, created = TikTokHashtag.objects.get_or_create(
-                hashtag=hashtag,
-            )
-            tiktok_post.hashtags.add(tiktok_hashtag)
-
-        for tag_dict in json.loads(row.postTags):
-            tiktok_tag, created = TikTokTag.objects.get_or_create(
-                name=tag_dict["name"],
+    Args:
+        descriptor: Many-to-many descriptor on :class:`~okr.models.tiktok.TikTokPost`.
+        model: Related model, e.g. :class:`~okr.models.tiktok.TikTokHashtag`.
+        field_name (str): Name of the unique field on ``model``.
+        post_ids (dict): Mapping of external post IDs to primary keys.
+        values_by_external_id (dict): Mapping of external post IDs to sets of values.
+    """
+    values = set().union(*values_by_external_id.values())
+
+    if not values:
+        return
+
+    model.objects.bulk_create(
+        [model(**{field_name: value}) for value in values],
+        ignore_conflicts=True,
+    )
+    related_ids = dict(
+        model.objects.filter(**{f"{field_name}__in": values}).values_list(
+            field_name, "id"
+        )
+    )
+
+    through = descriptor.through
+    source_field = descriptor.field.m2m_field_name()
+    target_field = descriptor.field.m2m_reverse_field_name()
+
+    through.objects.bulk_create(
+        [
+            through(
+                **{
+                    f"{source_field}_id": post_ids[external_id],
+                    f"{target_field}_id": related_ids[value],
+                }
             )
-            tiktok_post.tags.add(tiktok_tag)
+            for external_id, post_values in values_by_external_id.items()
+            for value in post_values
+        ],
+        ignore_conflicts=True,
+    )
@@ -54,7 +54,7 @@ def get_tiktok(
         "ownVideos",
     ]
 
-    df = common_quintly.quintly.run_query(
+    df = common_quintly.run_query(
         profile_ids,
         table,
         fields,
@@ -116,7 +116,7 @@ def get_tiktok_posts(
     start_date = start_date or today - datetime.timedelta(days=120)
     end_date = today
 
-    df = common_quintly.quintly.run_query(
+    df = common_quintly.run_query(
         profile_ids,
         table,
         fields,
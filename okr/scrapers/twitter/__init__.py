@@ -1,7 +1,7 @@
 """Read and process data for Twitter from Quintly."""
 
-from datetime import date, datetime
-from time import sleep
+import functools
+from datetime import date
 from typing import Optional
 
 from django.db.utils import IntegrityError
@@ -15,8 +15,10 @@ from ...models.twitter import (
     Tweet,
 )
 from . import quintly
-from ..common.quintly import parse_bool
-from ..common.utils import BERLIN
+from ..common import frames
+from ..common.backfill import checkpointed
+from ..common.quintly import for_each_account
+from ..common.upsert import bulk_upsert
 
 
 def scrape_full(twitter: Twitter):
@@ -30,11 +32,15 @@ def scrape_full(twitter: Twitter):
     twitter_filter = Q(id=twitter.id)
     start_date = date(2019, 1, 1)
 
-    sleep(1)
+    with checkpointed(scrape_full, twitter) as backfill:
+        backfill.run(
+            scrape_insights, start_date=start_date, twitter_filter=twitter_filter
+        )
 
-    scrape_insights(start_date=start_date, twitter_filter=twitter_filter)
+        backfill.run(
+            scrape_tweets, start_date=start_date, twitter_filter=twitter_filter
+        )
 
-    scrape_tweets(start_date=start_date, twitter_filter=twitter_filter)
     logger.success("Finished full Twitter scrape of {}", twitter)
 
 
@@ -58,35 +64,32 @@ def scrape_insights(
     if twitter_filter:
         twitters = twitters.filter(twitter_filter)
 
-    for twitter in twitters:
-        try:
-            _scrape_insights_twitter(start_date, twitter)
-        except Exception as e:
-            capture_exception(e)
+    for_each_account(
+        twitters,
+        functools.partial(_scrape_insights_twitter, start_date),
+        job=scrape_insights,
+    )
 
 
 def _scrape_insights_twitter(start_date, twitter):
     logger.debug("Scraping insights for {}", twitter)
     df = quintly.get_twitter_insights(twitter.quintly_profile_id, start_date=start_date)
 
-    for index, row in df.iterrows():
-        defaults = {
-            "followers": row.followers or 0,
-        }
-
-        try:
-            obj, created = TwitterInsight.objects.update_or_create(
-                twitter=twitter,
-                date=date.fromisoformat(row.time),
-                defaults=defaults,
-            )
-        except IntegrityError as e:
-            capture_exception(e)
-            logger.exception(
-                "Data for {} insights for date {} failed integrity check:\n{}",
-                row.time,
-                defaults,
-            )
+    objs = frames.to_models(
+        TwitterInsight,
+        df,
+        {
+            "date": frames.dates("time"),
+            "followers": frames.filled("followers", 0),
+        },
+        twitter=twitter,
+    )
+
+    try:
+        bulk_upsert(TwitterInsight, objs, ["twitter", "date"])
+    except IntegrityError as e:
+        capture_exception(e)
+        logger.exception("Data for insights of {} failed integrity check", twitter)
 
 
 def scrape_tweets(
@@ -107,40 +110,37 @@ def scrape_tweets(
     if twitter_filter:
         twitters = twitters.filter(twitter_filter)
 
-    for twitter in twitters:
-        try:
-            _scrape_tweets_twitter(start_date, twitter)
-        except Exception as e:
-            capture_exception(e)
+    for_each_account(
+        twitters,
+        functools.partial(_scrape_tweets_twitter, start_date),
+        job=scrape_tweets,
+    )
 
 
 def _scrape_tweets_twitter(start_date, twitter):
     logger.debug("Scraping post insights for {}", twitter)
     df = quintly.get_tweets(twitter.quintly_profile_id, start_date=start_date)
 
-    for index, row in df.iterrows():
-        defaults = {
-            "created_at": BERLIN.localize(datetime.fromisoformat(row.time)),
-            "tweet_type": row.type,
-            "link": row.link,
+    objs = frames.to_models(
+        Tweet,
+        df,
+        {
+            "external_id": "externalId",
+            "created_at": frames.local_datetimes("time"),
+            "tweet_type": "type",
+            "link": "link",
             # False is just an empty string in this table
-            "is_retweet": parse_bool(row.isRetweet, default=False),
-            "message": row.message,
-            "favs": row.favs or 0,
-            "retweets": row.retweets or 0,
-            "replies": row.replies or 0,
-        }
-
-        try:
-            obj, created = Tweet.objects.update_or_create(
-                twitter=twitter,
-                external_id=row.externalId,
-                defaults=defaults,
-            )
-        except IntegrityError as e:
-            capture_exception(e)
-            logger.exception(
-                "Data for tweet with ID {} failed integrity check:\n{}",
-                row.externalId,
-                defaults,
-            )
+            "is_retweet": frames.bools("isRetweet", default=False),
+            "message": "message",
+            "favs": frames.filled("favs", 0),
+            "retweets": frames.filled("retweets", 0),
+            "replies": frames.filled("replies", 0),
+        },
+        twitter=twitter,
+    )
+
+    try:
+        bulk_upsert(Tweet, objs, ["external_id"])
+    except IntegrityError as e:
+        capture_exception(e)
+        logger.exception("Data for tweets of {} failed integrity check", twitter)
@@ -48,7 +48,7 @@ def get_twitter_insights(
         "followers",
     ]
 
-    df_twitter_insights = common_quintly.quintly.run_query(
+    df_twitter_insights = common_quintly.run_query(
         profile_ids,
         table,
         fields,
@@ -102,7 +102,7 @@ def get_tweets(
     start_date = start_date or datetime.date.today() - datetime.timedelta(days=120)
     end_date = datetime.date.today()
 
-    df_posts_insights = common_quintly.quintly.run_query(
+    df_posts_insights = common_quintly.run_query(
         profile_ids,
         table,
         fields,
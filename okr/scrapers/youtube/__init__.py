@@ -1,8 +1,8 @@
 """Read and process YouTube data."""
 
 import datetime as dt
-from time import sleep
-from typing import Dict, Mapping, Optional
+import functools
+from typing import Dict, Iterator, List, Optional
 import json
 from collections import defaultdict
 
@@ -25,7 +25,13 @@ from ...models.youtube import (
     YouTubeVideoSearchTerm,
 )
 from . import quintly, google
-from ..common.utils import BERLIN, local_today, to_timedelta
+from ..common.backfill import checkpointed, mark_incomplete
+from ..common import frames
+from ..common.locks import locked
+from ..common.quintly import for_each_account
+from ..common.upsert import bulk_upsert
+from ..common.watermarks import incremental
+from ..common.utils import local_today, to_timedelta
 
 
 def scrape_full(youtube: YouTube):
@@ -40,37 +46,59 @@ def scrape_full(youtube: YouTube):
 
     start_date = dt.date(2019, 1, 1)
 
-    sleep(1)
-
-    scrape_channel_analytics(start_date=start_date, youtube_filter=youtube_filter)
-    scrape_videos(start_date=start_date, youtube_filter=youtube_filter)
-    scrape_video_analytics(start_date=start_date, youtube_filter=youtube_filter)
-    scrape_video_traffic_sources(start_date=start_date, youtube_filter=youtube_filter)
-    scrape_video_external_traffic(start_date=start_date, youtube_filter=youtube_filter)
-    scrape_video_search_terms(start_date=start_date, youtube_filter=youtube_filter)
-    scrape_video_demographics(start_date=start_date, youtube_filter=youtube_filter)
+    with checkpointed(scrape_full, youtube) as backfill:
+        backfill.run(
+            scrape_channel_analytics,
+            start_date=start_date,
+            youtube_filter=youtube_filter,
+        )
+        backfill.run(
+            scrape_videos, start_date=start_date, youtube_filter=youtube_filter
+        )
+        backfill.run(
+            scrape_video_analytics, start_date=start_date, youtube_filter=youtube_filter
+        )
+        backfill.run(
+            scrape_video_traffic_sources,
+            start_date=start_date,
+            youtube_filter=youtube_filter,
+        )
+        backfill.run(
+            scrape_video_external_traffic,
+            start_date=start_date,
+            youtube_filter=youtube_filter,
+        )
+        backfill.run(
+            scrape_video_search_terms,
+            start_date=start_date,
+            youtube_filter=youtube_filter,
+        )
+        backfill.run(
+            scrape_video_demographics,
+            start_date=start_date,
+            youtube_filter=youtube_filter,
+        )
 
     logger.success("Finished full YouTube scrape of {}", youtube)
 
 
 def _scrape_youtube_demographics(
     youtube: YouTube,
-    row: pd.Series,
-):
+    row: tuple,
+) -> List[YouTubeDemographics]:
     """Scrape YouTube demographics data from Quintly.
 
     Args:
-        json_str (str): JSON string to scrape data from.
+        youtube (YouTube): YouTube object the data belongs to.
+        row (tuple): Converted row of channel analytics data to scrape data from.
+
+    Returns:
+        List[YouTubeDemographics]: Unsaved demographics objects.
     """
-    demographics_data = json.loads(row.viewsPercentageByAgeAndGender)
+    demographics_data = json.loads(row.views_by_age_and_gender)
+    objs = []
 
     for demo in demographics_data:
-        defaults = {
-            "views_percentage": demo["value"],
-            "quintly_last_updated": BERLIN.localize(
-                dt.datetime.fromisoformat(row.importTime)
-            ),
-        }
         gender = demo["gender"]
         if gender == "genderUserSpecified":
             gender = "other"
@@ -79,34 +107,35 @@ def _scrape_youtube_demographics(
             demo["ageGroupName"].replace(" years", "")
         )
 
-        try:
-            YouTubeDemographics.objects.update_or_create(
+        objs.append(
+            YouTubeDemographics(
                 youtube=youtube,
-                date=dt.date.fromisoformat(row.time),
+                date=row.date,
                 gender=gender,
                 age_range=age_range,
-                defaults=defaults,
-            )
-        except IntegrityError as e:
-            capture_exception(e)
-            logger.exception(
-                "Data for channel demographics at {} failed integrity check:\n{}",
-                row.time,
-                row,
+                views_percentage=demo["value"],
+                quintly_last_updated=row.quintly_last_updated,
             )
+        )
+
+    return objs
 
 
 def _scrape_youtube_traffic_source(
     youtube: YouTube,
-    row: pd.Series,
-):
+    row: tuple,
+) -> List[YouTubeTrafficSource]:
     """Scrape YouTube traffic source data from Quintly.
 
     Args:
-        json_str (str): JSON string to scrape data from.
+        youtube (YouTube): YouTube object the data belongs to.
+        row (tuple): Converted row of channel analytics data to scrape data from.
+
+    Returns:
+        List[YouTubeTrafficSource]: Unsaved traffic source objects.
     """
-    json_data_views = json.loads(row.viewsByTrafficSource)
-    json_data_minutes_watched = json.loads(row.estimatedMinutesWatchedByTrafficSource)
+    json_data_views = json.loads(row.views_by_traffic_source)
+    json_data_minutes_watched = json.loads(row.minutes_watched_by_traffic_source)
 
     json_data = defaultdict(lambda: [None, None])
 
@@ -118,33 +147,25 @@ def _scrape_youtube_traffic_source(
         source_type = YouTubeTrafficSource.SourceType[data["trafficSource"]]
         json_data[source_type][1] = data["value"]
 
-    for source_type, (views, minutes_watched) in json_data.items():
-        defaults = {
-            "views": views,
-            "watch_time": (
-                to_timedelta(minutes_watched * 60)
-                if minutes_watched is not None
-                else None
-            ),
-            "quintly_last_updated": BERLIN.localize(
-                dt.datetime.fromisoformat(row.importTime)
-            ),
-        }
+    objs = []
 
-        try:
-            YouTubeTrafficSource.objects.update_or_create(
+    for source_type, (views, minutes_watched) in json_data.items():
+        objs.append(
+            YouTubeTrafficSource(
                 youtube=youtube,
-                date=dt.date.fromisoformat(row.time),
+                date=row.date,
                 source_type=source_type,
-                defaults=defaults,
-            )
-        except IntegrityError as e:
-            capture_exception(e)
-            logger.exception(
-                "Data for channel traffic source at {} failed integrity check:\n{}",
-                row.time,
-                row,
+                views=views,
+                watch_time=(
+                    to_timedelta(minutes_watched * 60)
+                    if minutes_watched is not None
+                    else None
+                ),
+                quintly_last_updated=row.quintly_last_updated,
             )
+        )
+
+    return objs
 
 
 def scrape_channel_analytics(  # noqa: C901
@@ -161,7 +182,8 @@ def scrape_channel_analytics(  # noqa: C901
 
     Args:
         start_date (Optional[date], optional): Earliest data to request data for.
-            Defaults to None.
+            Defaults to None. If None, requests the data that isn't final yet
+            (see :mod:`~okr.scrapers.common.watermarks`).
         youtube_filter (Optional[Q], optional): Q object to filter data with.
             Defaults to None.
     """
@@ -170,70 +192,116 @@ def scrape_channel_analytics(  # noqa: C901
     if youtube_filter:
         youtubes = youtubes.filter(youtube_filter)
 
-    for youtube in youtubes:
-        try:
-            _scrape_channel_analytics_youtube(start_date, youtube)
-        except Exception as e:
-            capture_exception(e)
+    for_each_account(
+        youtubes,
+        functools.partial(_scrape_channel_analytics_youtube, start_date),
+        job=scrape_channel_analytics,
+    )
 
 
 def _scrape_channel_analytics_youtube(start_date, youtube):
-    logger.info("Scraping Quintly YouTube channel analytics for {}", youtube)
+    with incremental(
+        scrape_channel_analytics,
+        youtube,
+        source="quintly",
+        default=local_today() - dt.timedelta(days=7),
+        start_date=start_date,
+    ) as increment:
+        logger.info("Scraping Quintly YouTube channel analytics for {}", youtube)
 
-    df = quintly.get_youtube_analytics(
-        youtube.quintly_profile_id, start_date=start_date
-    )
+        df = quintly.get_youtube_analytics(
+            youtube.quintly_profile_id, start_date=increment.start_date
+        )
 
-    for index, row in df.iterrows():
-        if row.importTime is None:
-            logger.debug("importTime is None!")
-            continue
-
-        defaults = {
-            "views": row.views,
-            "likes": row.likes,
-            "dislikes": row.dislikes,
-            "subscribers": row.subscribersLifetime,
-            "subscribers_gained": row.subscribersGained,
-            "subscribers_lost": row.subscribersLost,
-            "watch_time": to_timedelta(row.estimatedMinutesWatched * 60),
-            "quintly_last_updated": BERLIN.localize(
-                dt.datetime.fromisoformat(row.importTime)
-            ),
-        }
+        if not df.empty:
+            df = df[df.importTime.notna()]
+
+        analytics = frames.to_models(
+            YouTubeAnalytics,
+            df,
+            {
+                "date": frames.dates("time"),
+                "views": "views",
+                "likes": "likes",
+                "dislikes": "dislikes",
+                "subscribers": "subscribersLifetime",
+                "subscribers_gained": "subscribersGained",
+                "subscribers_lost": "subscribersLost",
+                "watch_time": frames.timedeltas("estimatedMinutesWatched", unit="m"),
+                "quintly_last_updated": frames.local_datetimes("importTime"),
+            },
+            youtube=youtube,
+        )
+        demographics = []
+        traffic_sources = []
+
+        rows = frames.to_rows(
+            df,
+            {
+                "date": frames.dates("time"),
+                "quintly_last_updated": frames.local_datetimes("importTime"),
+                "views_by_age_and_gender": "viewsPercentageByAgeAndGender",
+                "views_by_traffic_source": "viewsByTrafficSource",
+                "minutes_watched_by_traffic_source": (
+                    "estimatedMinutesWatchedByTrafficSource"
+                ),
+            },
+        )
+
+        for row in rows:
+            try:
+                demographics.extend(_scrape_youtube_demographics(youtube, row))
+            except Exception as e:
+                capture_exception(e)
+                logger.exception(
+                    "Failed to scrape YouTube demographics data for {} at {}",
+                    youtube,
+                    row.date,
+                )
+
+            try:
+                traffic_sources.extend(_scrape_youtube_traffic_source(youtube, row))
+            except Exception as e:
+                capture_exception(e)
+                logger.exception(
+                    "Failed to scrape YouTube traffic source data for {} at {}",
+                    youtube,
+                    row.date,
+                )
 
         try:
-            YouTubeAnalytics.objects.update_or_create(
-                youtube=youtube,
-                date=dt.date.fromisoformat(row.time),
-                defaults=defaults,
-            )
+            bulk_upsert(YouTubeAnalytics, analytics, ["youtube", "date"])
         except IntegrityError as e:
             capture_exception(e)
+            increment.mark_incomplete()
             logger.exception(
-                "Data for channel analytics at {} failed integrity check:\n{}",
-                row.time,
-                defaults,
+                "Data for channel analytics of {} failed integrity check", youtube
             )
 
         try:
-            _scrape_youtube_demographics(youtube, row)
-        except Exception as e:
+            bulk_upsert(
+                YouTubeDemographics,
+                demographics,
+                ["youtube", "date", "age_range", "gender"],
+            )
+        except IntegrityError as e:
             capture_exception(e)
+            increment.mark_incomplete()
             logger.exception(
-                "Failed to scrape YouTube demographics data for {} at {}",
-                youtube,
-                row.time,
+                "Data for channel demographics of {} failed integrity check", youtube
             )
 
         try:
-            _scrape_youtube_traffic_source(youtube, row)
-        except Exception as e:
+            bulk_upsert(
+                YouTubeTrafficSource,
+                traffic_sources,
+                ["youtube", "date", "source_type"],
+            )
+        except IntegrityError as e:
             capture_exception(e)
+            increment.mark_incomplete()
             logger.exception(
-                "Failed to scrape YouTube traffic source data for {} at {}",
-                youtube,
-                row.time,
+                "Data for channel traffic sources of {} failed integrity check", youtube
             )
 
 
@@ -258,11 +326,11 @@ def scrape_videos(
     if youtube_filter:
         youtubes = youtubes.filter(youtube_filter)
 
-    for youtube in youtubes:
-        try:
-            _scrape_videos_youtube(start_date, youtube)
-        except Exception as e:
-            capture_exception(e)
+    for_each_account(
+        youtubes,
+        functools.partial(_scrape_videos_youtube, start_date),
+        job=scrape_videos,
+    )
 
 
 def _scrape_videos_youtube(start_date, youtube):
@@ -270,70 +338,95 @@ def _scrape_videos_youtube(start_date, youtube):
 
     df = quintly.get_youtube_videos(youtube.quintly_profile_id, start_date=start_date)
 
-    for index, row in df.iterrows():
-        if row.importTime is None:
-            logger.debug("importTime is None!")
-            continue
-
-            # Ignore scheduled/unpublished videos
-        if row.liveBroadcastContent == "upcoming":
-            logger.debug(
-                "Video {} ({}) is a scheduled live video!",
-                row.title,
-                row.externalId,
-            )
-            continue
+    if not df.empty:
+        df = df[df.importTime.notna()]
+
+        # Ignore scheduled/unpublished videos
+        upcoming = df.liveBroadcastContent == "upcoming"
+
+        for title, external_id in zip(df.title[upcoming], df.externalId[upcoming]):
+            logger.debug("Video {} ({}) is a scheduled live video!", title, external_id)
 
+        df = df[~upcoming]
+
+    objs = frames.to_models(
+        YouTubeVideo,
+        df,
+        {
+            "external_id": "externalId",
+            "published_at": frames.local_datetimes("publishTime"),
             # Check whether video was initially a live stream (or currently is a live
             # stream). is_livestream will be False for all videos that were on-demand
             # videos from the beginning - will be True for Videos that are/were live
             # streams
-        if row.liveActualStartTime:
-            is_livestream = True
-        else:
-            is_livestream = False
-
-        defaults = {
-            "published_at": BERLIN.localize(dt.datetime.fromisoformat(row.publishTime)),
-            "is_livestream": is_livestream,
-            "title": row.title,
-            "description": row.description,
-            "duration": to_timedelta(row.duration),
-            "quintly_last_updated": BERLIN.localize(
-                dt.datetime.fromisoformat(row.importTime)
-            ),
-        }
+            "is_livestream": frames.truthy("liveActualStartTime"),
+            "title": "title",
+            "description": "description",
+            "duration": frames.timedeltas("duration"),
+            "quintly_last_updated": frames.local_datetimes("importTime"),
+        },
+        youtube=youtube,
+    )
 
-        try:
-            YouTubeVideo.objects.update_or_create(
-                youtube=youtube,
-                external_id=row.externalId,
-                defaults=defaults,
-            )
-        except IntegrityError as e:
-            capture_exception(e)
-            logger.exception(
-                "Data for basic YouTube video data for {} failed integrity check:\n{}",
-                row.title,
-                defaults,
-            )
+    try:
+        bulk_upsert(YouTubeVideo, objs, ["external_id"])
+    except IntegrityError as e:
+        capture_exception(e)
+        logger.exception("Data for videos of {} failed integrity check", youtube)
 
 
-def _get_youtube_video(video_id: str, video_cache: Mapping[str, YouTubeVideo]):
-    """Get YouTube video object from cache or database."""
-    try:
-        youtube_video = video_cache[video_id]
-    except KeyError:
-        youtube_video = YouTubeVideo.objects.filter(
-            external_id=video_id,
-        ).first()
+def _get_youtube_videos(
+    video_ids: pd.Series, video_cache: Dict[str, Optional[YouTubeVideo]]
+) -> pd.Series:
+    """Get YouTube video objects for a column of video IDs from cache or database.
+
+    Videos that are not in the cache are requested with a single query.
+    """
+    missing = set(video_ids.dropna().unique()) - video_cache.keys()
+
+    if missing:
+        found = YouTubeVideo.objects.in_bulk(missing, field_name="external_id")
 
-        if youtube_video is None:
-            logger.warning("Video {} not found in database", video_id)
+        for video_id in missing:
+            if video_id not in found:
+                logger.warning("Video {} not found in database", video_id)
 
-        video_cache[video_id] = youtube_video
+            video_cache[video_id] = found.get(video_id)
 
-    return youtube_video
+    return video_ids.map(video_cache)
+
+
+def _with_youtube_videos(
+    df: pd.DataFrame,
+    video_cache: Dict[str, Optional[YouTubeVideo]],
+    *,
+    published_since: Optional[dt.date] = None,
+) -> pd.DataFrame:
+    """Add the YouTube video objects to a page of BigQuery results.
+
+    Rows of videos that are not in the database are dropped. If ``published_since``
+    is given, rows of videos that were published before are dropped as well, to
+    prevent overwriting their data with the sum of only part of their lifetime.
+    """
+    if df.empty:
+        return df
+
+    df = df.assign(youtube_video=_get_youtube_videos(df.video_id, video_cache))
+    df = df[df.youtube_video.notna()]
+
+    if published_since is not None and not df.empty:
+        published = df.youtube_video.map(lambda video: video.published_at.date())
+        skipped = published < published_since
+
+        if skipped.any():
+            logger.trace(
+                "Skipping {} rows of videos published before start date {}",
+                skipped.sum(),
+                published_since,
+            )
+            df = df[~skipped]
+
+    return df
 
 
 def scrape_video_analytics(
@@ -349,7 +442,8 @@ def scrape_video_analytics(
 
     Args:
         start_date (Optional[date], optional): Earliest data to request data for.
-            Defaults to None.
+            Defaults to None. If None, requests the data that isn't final yet
+            (see :mod:`~okr.scrapers.common.watermarks`).
         end_date (Optional[date], optional): Latest data to request data for.
             Defaults to None.
         youtube_filter (Optional[Q], optional): Q object to filter data with.
@@ -360,57 +454,69 @@ def scrape_video_analytics(
     if youtube_filter:
         youtubes = youtubes.filter(youtube_filter)
 
-    for youtube in youtubes:
+    for youtube in locked(youtubes, scrape_video_analytics):
         try:
-            _scrape_video_analytics_youtube(start_date, end_date, youtube)
+            with incremental(
+                scrape_video_analytics,
+                youtube,
+                source="youtube_bigquery",
+                default=local_today() - dt.timedelta(days=7),
+                start_date=start_date,
+                end_date=end_date,
+            ) as increment:
+                _scrape_video_analytics_youtube(increment, end_date, youtube)
         except Exception as e:
             capture_exception(e)
+            mark_incomplete()
 
 
-def _scrape_video_analytics_youtube(start_date, end_date, youtube):
+def _scrape_video_analytics_youtube(increment, end_date, youtube):
     logger.info("Scraping YouTube video analytics for {}", youtube)
 
+    objs = _iter_video_analytics_youtube(increment.start_date, end_date, youtube)
+
+    try:
+        bulk_upsert(
+            YouTubeVideoAnalytics, objs, ["youtube_video", "date", "live_or_on_demand"]
+        )
+    except IntegrityError as e:
+        capture_exception(e)
+        logger.exception(
+            "Data for video analytics of {} failed integrity check", youtube
+        )
+        increment.mark_incomplete()
+
+
+def _iter_video_analytics_youtube(
+    start_date, end_date, youtube
+) -> Iterator[YouTubeVideoAnalytics]:
     # Cache videos to prevent multiple queries for the same video
-    video_cache: Dict[str, YouTubeVideo] = {}
+    video_cache: Dict[str, Optional[YouTubeVideo]] = {}
 
-    rows_iter = google.get_bigquery_basic(
+    dfs = google.get_bigquery_basic(
         youtube.bigquery_suffix,
         start_date=start_date,
         end_date=end_date,
     )
 
-    for row in rows_iter:
-        defaults = {
-            "views": row.views,
-            "likes": row.likes,
-            "dislikes": row.dislikes,
-            "comments": row.comments,
-            "shares": row.shares,
-            "subscribers_gained": row.subscribers_gained,
-            "subscribers_lost": row.subscribers_lost,
-            "watch_time": to_timedelta(row.watch_time_minutes * 60),
-        }
-
-        # Find video in cache or query database
-        youtube_video = _get_youtube_video(row.video_id, video_cache)
-
-        if youtube_video is None:
-            continue
-
-        try:
-            YouTubeVideoAnalytics.objects.update_or_create(
-                youtube_video=youtube_video,
-                date=row.date,
-                live_or_on_demand=row.live_or_on_demand,
-                defaults=defaults,
-            )
-        except IntegrityError as e:
-            capture_exception(e)
-            logger.exception(
-                "Data for video analytics at {} failed integrity check:\n{}",
-                row.time,
-                defaults,
-            )
+    for df in dfs:
+        yield from frames.to_models(
+            YouTubeVideoAnalytics,
+            _with_youtube_videos(df, video_cache),
+            {
+                "youtube_video": "youtube_video",
+                "date": "date",
+                "live_or_on_demand": "live_or_on_demand",
+                "views": "views",
+                "likes": "likes",
+                "dislikes": "dislikes",
+                "comments": "comments",
+                "shares": "shares",
+                "subscribers_gained": "subscribers_gained",
+                "subscribers_lost": "subscribers_lost",
+                "watch_time": frames.timedeltas("watch_time_minutes", unit="m"),
+            },
+        )
 
 
 def scrape_video_traffic_sources(
@@ -442,60 +548,58 @@ def scrape_video_traffic_sources(
     if start_date is None:
         start_date = local_today() - dt.timedelta(days=31 * 6)
 
-    for youtube in youtubes:
+    for youtube in locked(youtubes, scrape_video_traffic_sources):
         try:
             _scrape_video_traffic_sources_youtube(start_date, end_date, youtube)
         except Exception as e:
             capture_exception(e)
+            mark_incomplete()
 
 
 def _scrape_video_traffic_sources_youtube(start_date, end_date, youtube):
     logger.info("Scraping YouTube video traffic source data for {}", youtube)
 
+    objs = _iter_video_traffic_sources_youtube(start_date, end_date, youtube)
+
+    try:
+        bulk_upsert(YouTubeVideoTrafficSource, objs, ["youtube_video", "source_type"])
+    except IntegrityError as e:
+        capture_exception(e)
+        logger.exception(
+            "Data for video traffic sources of {} failed integrity check", youtube
+        )
+
+
+def _iter_video_traffic_sources_youtube(
+    start_date, end_date, youtube
+) -> Iterator[YouTubeVideoTrafficSource]:
     # Cache videos to prevent multiple queries for the same video
-    video_cache: Dict[str, YouTubeVideo] = {}
+    video_cache: Dict[str, Optional[YouTubeVideo]] = {}
 
-    rows_iter = google.get_bigquery_traffic_source(
+    dfs = google.get_bigquery_traffic_source(
         youtube.bigquery_suffix,
         start_date,
         end_date=end_date,
     )
 
-    for row in rows_iter:
-        defaults = {
-            "views": row.views,
-            "watch_time": to_timedelta(row.watch_time_minutes * 60),
-        }
-
-        # Find video in cache or query database
-        youtube_video = _get_youtube_video(row.video_id, video_cache)
-
-        if youtube_video is None:
-            logger.warning("Video {} not found in database", row.video_id)
-            continue
-        elif youtube_video.published_at.date() < start_date:
-            logger.trace(
-                "Video {} published before start date {}, skipping to prevent overwriting with bad data",
-                youtube_video,
-                start_date,
-            )
-            continue
+    def source_types(df: pd.DataFrame) -> pd.Series:
+        return df.traffic_source_type.map(
+            lambda source_type: YouTubeVideoTrafficSource.SourceType[
+                f"SOURCE_TYPE_{source_type}"
+            ]
+        )
 
-        try:
-            YouTubeVideoTrafficSource.objects.update_or_create(
-                youtube_video=youtube_video,
-                source_type=YouTubeVideoTrafficSource.SourceType[
-                    f"SOURCE_TYPE_{row.traffic_source_type}"
-                ],
-                defaults=defaults,
-            )
-        except IntegrityError as e:
-            capture_exception(e)
-            logger.exception(
-                "Data for video analytics at {} failed integrity check:\n{}",
-                row.time,
-                defaults,
-            )
+    for df in dfs:
+        yield from frames.to_models(
+            YouTubeVideoTrafficSource,
+            _with_youtube_videos(df, video_cache, published_since=start_date),
+            {
+                "youtube_video": "youtube_video",
+                "source_type": source_types,
+                "views": "views",
+                "watch_time": frames.timedeltas("watch_time_minutes", unit="m"),
+            },
+        )
 
 
 def scrape_video_external_traffic(
@@ -527,57 +631,51 @@ def scrape_video_external_traffic(
     if start_date is None:
         start_date = local_today() - dt.timedelta(days=31 * 6)
 
-    for youtube in youtubes:
+    for youtube in locked(youtubes, scrape_video_external_traffic):
         try:
             _scrape_video_external_traffic_youtube(start_date, end_date, youtube)
         except Exception as e:
             capture_exception(e)
+            mark_incomplete()
 
 
 def _scrape_video_external_traffic_youtube(start_date, end_date, youtube):
     logger.info("Scraping YouTube video external traffic data for {}", youtube)
 
+    objs = _iter_video_external_traffic_youtube(start_date, end_date, youtube)
+
+    try:
+        bulk_upsert(YouTubeVideoExternalTraffic, objs, ["youtube_video", "name"])
+    except IntegrityError as e:
+        capture_exception(e)
+        logger.exception(
+            "Data for video external traffic of {} failed integrity check", youtube
+        )
+
+
+def _iter_video_external_traffic_youtube(
+    start_date, end_date, youtube
+) -> Iterator[YouTubeVideoExternalTraffic]:
     # Cache videos to prevent multiple queries for the same video
-    video_cache: Dict[str, YouTubeVideo] = {}
+    video_cache: Dict[str, Optional[YouTubeVideo]] = {}
 
-    rows_iter = google.get_bigquery_external_traffic(
+    dfs = google.get_bigquery_external_traffic(
         youtube.bigquery_suffix,
         start_date,
         end_date=end_date,
     )
 
-    for row in rows_iter:
-        defaults = {
-            "views": row.views,
-            "watch_time": to_timedelta(row.watch_time_minutes * 60),
-        }
-
-        # Find video in cache or query database
-        youtube_video = _get_youtube_video(row.video_id, video_cache)
-
-        if youtube_video is None:
-            continue
-        elif youtube_video.published_at.date() < start_date:
-            logger.trace(
-                "Video {} published before start date {}, skipping to prevent overwriting with bad data",
-                youtube_video,
-                start_date,
-            )
-            continue
-
-        try:
-            YouTubeVideoExternalTraffic.objects.update_or_create(
-                youtube_video=youtube_video,
-                name=row.traffic_source_detail,
-                defaults=defaults,
-            )
-        except IntegrityError as e:
-            capture_exception(e)
-            logger.exception(
-                "Data for video analytics at {} failed integrity check:\n{}",
-                row.time,
-                defaults,
-            )
+    for df in dfs:
+        yield from frames.to_models(
+            YouTubeVideoExternalTraffic,
+            _with_youtube_videos(df, video_cache, published_since=start_date),
+            {
+                "youtube_video": "youtube_video",
+                "name": "traffic_source_detail",
+                "views": "views",
+                "watch_time": frames.timedeltas("watch_time_minutes", unit="m"),
+            },
+        )
 
 
 def scrape_video_search_terms(
@@ -609,57 +707,51 @@ def scrape_video_search_terms(
     if start_date is None:
         start_date = local_today() - dt.timedelta(days=31 * 6)
 
-    for youtube in youtubes:
+    for youtube in locked(youtubes, scrape_video_search_terms):
         try:
             _scrape_video_search_terms_youtube(start_date, end_date, youtube)
         except Exception as e:
             capture_exception(e)
+            mark_incomplete()
 
 
 def _scrape_video_search_terms_youtube(start_date, end_date, youtube):
     logger.info("Scraping YouTube video search term data for {}", youtube)
 
+    objs = _iter_video_search_terms_youtube(start_date, end_date, youtube)
+
+    try:
+        bulk_upsert(YouTubeVideoSearchTerm, objs, ["youtube_video", "search_term"])
+    except IntegrityError as e:
+        capture_exception(e)
+        logger.exception(
+            "Data for video search terms of {} failed integrity check", youtube
+        )
+
+
+def _iter_video_search_terms_youtube(
+    start_date, end_date, youtube
+) -> Iterator[YouTubeVideoSearchTerm]:
     # Cache videos to prevent multiple queries for the same video
-    video_cache: Dict[str, YouTubeVideo] = {}
+    video_cache: Dict[str, Optional[YouTubeVideo]] = {}
 
-    rows_iter = google.get_bigquery_search_terms(
+    dfs = google.get_bigquery_search_terms(
         youtube.bigquery_suffix,
         start_date,
         end_date=end_date,
     )
 
-    for row in rows_iter:
-        defaults = {
-            "views": row.views,
-            "watch_time": to_timedelta(row.watch_time_minutes * 60),
-        }
-
-        # Find video in cache or query database
-        youtube_video = _get_youtube_video(row.video_id, video_cache)
-
-        if youtube_video is None:
-            continue
-        elif youtube_video.published_at.date() < start_date:
-            logger.trace(
-                "Video {} published before start date {}, skipping to prevent overwriting with bad data",
-                youtube_video,
-                start_date,
-            )
-            continue
-
-        try:
-            YouTubeVideoSearchTerm.objects.update_or_create(
-                youtube_video=youtube_video,
-                search_term=row.traffic_source_detail,
-                defaults=defaults,
-            )
-        except IntegrityError as e:
-            capture_exception(e)
-            logger.exception(
-                "Data for video analytics at {} failed integrity check:\n{}",
-                row.time,
-                defaults,
-            )
+    for df in dfs:
+        yield from frames.to_models(
+            YouTubeVideoSearchTerm,
+            _with_youtube_videos(df, video_cache, published_since=start_date),
+            {
+                "youtube_video": "youtube_video",
+                "search_term": "traffic_source_detail",
+                "views": "views",
+                "watch_time": frames.timedeltas("watch_time_minutes", unit="m"),
+            },
+        )
 
 
 def scrape_video_demographics(
@@ -691,64 +783,65 @@ def scrape_video_demographics(
     if start_date is None:
         start_date = local_today() - dt.timedelta(days=31 * 6)
 
-    for youtube in youtubes:
+    for youtube in locked(youtubes, scrape_video_demographics):
         try:
             _scrape_video_demographics_youtube(start_date, end_date, youtube)
         except Exception as e:
             capture_exception(e)
+            mark_incomplete()
 
 
 def _scrape_video_demographics_youtube(start_date, end_date, youtube):
     logger.info("Scraping YouTube video demographics data for {}", youtube)
 
+    objs = _iter_video_demographics_youtube(start_date, end_date, youtube)
+
+    try:
+        bulk_upsert(
+            YouTubeVideoDemographics, objs, ["youtube_video", "age_range", "gender"]
+        )
+    except IntegrityError as e:
+        capture_exception(e)
+        logger.exception(
+            "Data for video demographics of {} failed integrity check", youtube
+        )
+
+
+def _iter_video_demographics_youtube(
+    start_date, end_date, youtube
+) -> Iterator[YouTubeVideoDemographics]:
     # Cache videos to prevent multiple queries for the same video
-    video_cache: Dict[str, YouTubeVideo] = {}
+    video_cache: Dict[str, Optional[YouTubeVideo]] = {}
 
-    rows_iter = google.get_bigquery_video_demographics(
+    dfs = google.get_bigquery_video_demographics(
         youtube.bigquery_suffix,
         start_date,
         end_date=end_date,
     )
 
-    for row in rows_iter:
-        # Find video in cache or query database
-        youtube_video = _get_youtube_video(row.video_id, video_cache)
-
-        if youtube_video is None:
-            continue
-        elif youtube_video.published_at.date() < start_date:
-            logger.trace(
-                "Video {} published before start date {}, skipping to prevent overwriting with bad data",
-                youtube_video,
-                start_date,
-            )
-            continue
-
-        # Convert gender to enum
-        gender = row.gender.lower()
-        if gender == "user_specified":
-            gender = "gender_other"
-        gender = YouTubeVideoDemographics.Gender(gender)
-
-        age_range = YouTubeVideoDemographics.AgeRange(
-            row.age_group[4:].replace("65_", "65+").replace("_", "-")
+    def genders(df: pd.DataFrame) -> pd.Series:
+        return (
+            df.gender.str.lower()
+            .replace("user_specified", "gender_other")
+            .map(YouTubeVideoDemographics.Gender)
         )
 
-        defaults = {
-            "views_percentage": row.views_percentage,
-        }
+    def age_ranges(df: pd.DataFrame) -> pd.Series:
+        return (
+            df.age_group.str.slice(4)
+            .str.replace("65_", "65+", regex=False)
+            .str.replace("_", "-", regex=False)
+            .map(YouTubeVideoDemographics.AgeRange)
+        )
 
-        try:
-            YouTubeVideoDemographics.objects.update_or_create(
-                youtube_video=youtube_video,
-                gender=gender,
-                age_range=age_range,
-                defaults=defaults,
-            )
-        except IntegrityError as e:
-            capture_exception(e)
-            logger.exception(
-                "Data for video demographics at {} failed integrity check:\n{}",
-                row.time,
-                defaults,
-            )
+    for df in dfs:
+        yield from frames.to_models(
+            YouTubeVideoDemographics,
+            _with_youtube_videos(df, video_cache, published_since=start_date),
+            {
+                "youtube_video": "youtube_video",
+                "gender": genders,
+                "age_range": age_ranges,
+                "views_percentage": "views_percentage",
+            },
+        )
@@ -1,14 +1,13 @@
-""" Methods for scraping YouTube data with Quintly """
+"""Methods for scraping YouTube data with Quintly"""
 
 import datetime as dt
 from typing import Generator, Optional
 
 from google.cloud import bigquery
-import numpy as np
 import pandas as pd
 
 from ..common import utils
-from ..common.google import bigquery_client, insert_table_name, iter_results
+from ..common.google import get_bigquery_client, insert_table_name, iter_frames
 
 
 def get_bigquery_basic(
@@ -16,7 +15,7 @@ def get_bigquery_basic(
     *,
     start_date: Optional[dt.date] = None,
     end_date: Optional[dt.date] = None,
-) -> Generator[pd.Series, None, None]:
+) -> Generator[pd.DataFrame, None, None]:
     """Read YouTube Video data from BigQuery.
 
     Args:
@@ -28,8 +27,8 @@ def get_bigquery_basic(
           request. This date refers to the partition field value, not the date
           of the data itself. Defaults to None. Will be set to today if None.
 
-    Returns:
-        pd.DataFrame: BigQuery response data.
+    Yields:
+        pd.DataFrame: Pages of BigQuery response data.
     """
 
     today = utils.local_today()
@@ -78,10 +77,10 @@ GROUP BY
     def df_cleaner(df: pd.DataFrame) -> pd.DataFrame:
         # Convert to date
         df.date = pd.to_datetime(df.date).dt.date
-        return df.replace({np.nan: None})
+        return df
 
-    yield from iter_results(
-        bigquery_client,
+    yield from iter_frames(
+        get_bigquery_client(),
         query,
         job_config,
         df_cleaner,
@@ -93,7 +92,7 @@ def get_bigquery_traffic_source(
     start_date: dt.date,
     *,
     end_date: Optional[dt.date] = None,
-) -> Generator[pd.Series, None, None]:
+) -> Generator[pd.DataFrame, None, None]:
     """Read YouTube Video traffic source data from BigQuery.
 
     Args:
@@ -106,7 +105,7 @@ def get_bigquery_traffic_source(
           of the data itself. Defaults to None. Will be set to today if None.
 
     Yields:
-        pd.Series: BigQuery response data.
+        pd.DataFrame: Pages of BigQuery response data.
     """
 
     if end_date is None:
@@ -139,14 +138,11 @@ GROUP BY
         ],
     )
 
-    def df_cleaner(df: pd.DataFrame) -> pd.DataFrame:
-        return df.replace({np.nan: None})
-
-    yield from iter_results(
-        bigquery_client,
+    # Missing values are replaced when the rows are converted to models
+    yield from iter_frames(
+        get_bigquery_client(),
         query,
         job_config,
-        df_cleaner,
     )
 
 
@@ -155,7 +151,7 @@ def get_bigquery_search_terms(
     start_date: dt.date,
     *,
     end_date: Optional[dt.date] = None,
-) -> Generator[pd.Series, None, None]:
+) -> Generator[pd.DataFrame, None, None]:
     """Read YouTube Video search term data from BigQuery.
 
     Args:
@@ -168,7 +164,7 @@ def get_bigquery_search_terms(
           of the data itself. Defaults to None. Will be set to today if None.
 
     Yields:
-        pd.Series: BigQuery response data.
+        pd.DataFrame: Pages of BigQuery response data.
     """
 
     if end_date is None:
@@ -203,14 +199,11 @@ GROUP BY
         ],
     )
 
-    def df_cleaner(df: pd.DataFrame) -> pd.DataFrame:
-        return df.replace({np.nan: None})
-
-    yield from iter_results(
-        bigquery_client,
+    # Missing values are replaced when the rows are converted to models
+    yield from iter_frames(
+        get_bigquery_client(),
         query,
         job_config,
-        df_cleaner,
     )
 
 
@@ -219,7 +212,7 @@ def get_bigquery_external_traffic(
     start_date: dt.date,
     *,
     end_date: Optional[dt.date] = None,
-) -> Generator[pd.Series, None, None]:
+) -> Generator[pd.DataFrame, None, None]:
     """Read YouTube Video external traffic data from BigQuery.
 
     Args:
@@ -232,7 +225,7 @@ def get_bigquery_external_traffic(
           of the data itself. Defaults to None. Will be set to today if None.
 
     Yields:
-        pd.Series: BigQuery response data.
+        pd.DataFrame: Pages of BigQuery response data.
     """
 
     if end_date is None:
@@ -267,14 +260,11 @@ GROUP BY
         ],
     )
 
-    def df_cleaner(df: pd.DataFrame) -> pd.DataFrame:
-        return df.replace({np.nan: None})
-
-    yield from iter_results(
-        bigquery_client,
+    # Missing values are replaced when the rows are converted to models
+    yield from iter_frames(
+        get_bigquery_client(),
         query,
         job_config,
-        df_cleaner,
     )
 
 
@@ -283,7 +273,7 @@ def get_bigquery_video_demographics(
     start_date: dt.date,
     *,
     end_date: Optional[dt.date] = None,
-) -> Generator[pd.Series, None, None]:
+) -> Generator[pd.DataFrame, None, None]:
     """Read YouTube Video demographics data from BigQuery.
 
     Args:
@@ -296,7 +286,7 @@ def get_bigquery_video_demographics(
           of the data itself. Defaults to None. Will be set to today if None.
 
     Yields:
-        pd.Series: BigQuery response data.
+        pd.DataFrame: Pages of BigQuery response data.
     """
 
     if end_date is None:
@@ -429,12 +419,9 @@ ORDER BY
         ],
     )
 
-    def df_cleaner(df: pd.DataFrame) -> pd.DataFrame:
-        return df.replace({np.nan: None})
-
-    yield from iter_results(
-        bigquery_client,
+    # Missing values are replaced when the rows are converted to models
+    yield from iter_frames(
+        get_bigquery_client(),
         query,
         job_config,
-        df_cleaner,
     )
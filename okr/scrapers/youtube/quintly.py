@@ -56,7 +56,7 @@ def get_youtube_analytics(
         "profileId",  # needs to be part of query to receive data for subscribersLifetime
     ]
 
-    df = common_quintly.quintly.run_query(
+    df = common_quintly.run_query(
         profile_ids,
         table,
         fields,
@@ -119,7 +119,7 @@ def get_youtube_videos(
         # "viewsByTrafficSource",  # generates " 500 Server Error: Internal Server Error" if included
     ]
 
-    df = common_quintly.quintly.run_query(
+    df = common_quintly.run_query(
         profile_ids,
         table,
         fields,
@@ -1,3 +1,931 @@
-from django.test import TestCase  # noqa: F401
+import csv
+import datetime as dt
+import io
+import json
+import os
+import tempfile
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Optional
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.paginator import InvalidPage
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from app.redis import conn
+from .admin.mixins import KeysetPage, KeysetPaginator
+from .models import (
+    ApiToken,
+    Backfill,
+    BackfillCheckpoint,
+    CachedWebtrekkRequest,
+    JobRun,
+    Page,
+    PageDataGSC,
+    Property,
+    Watermark,
+)
+from .scrapers import db_cleanup
+from .scrapers.common import (
+    backfill,
+    locks,
+    quintly,
+    ratelimit,
+    rollups,
+    upsert,
+    watermarks,
+)
+from .scrapers.common.webtrekk import cache as webtrekk_cache
+from .scrapers.common.upsert import bulk_upsert, rows_upserted
+from .scrapers.common.utils import date_range
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
+
+def _redis_available() -> bool:
+    try:
+        return conn.ping()
+    except RedisError:
+        return False
+
+
+REDIS = _redis_available()
+
+DATE = dt.date(2021, 1, 4)
+UNIQUE_FIELDS = ["date", "page", "device"]
+
+
+class BulkUpsertTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # bulk_create doesn't send post_save, which would enqueue a full scrape
+        (property,) = Property.objects.bulk_create(
+            [Property(name="Test", url="https://example.com/")]
+        )
+        cls.page = Page.objects.create(
+            property=property, url="https://example.com/test-100.html"
+        )
+
+    def setUp(self):
+        # The rollups of the written rows aren't part of these tests
+        patcher = mock.patch.object(rollups, "_defer")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def data(
+        self,
+        device: str = "MOBILE",
+        clicks: int = 1,
+        date: dt.date = DATE,
+        impressions: int = 10,
+    ) -> PageDataGSC:
+        return PageDataGSC(
+            page=self.page,
+            date=date,
+            device=device,
+            clicks=clicks,
+            impressions=impressions,
+            ctr=0.1,
+            position=1.0,
+        )
+
+    def clicks(self):
+        return dict(PageDataGSC.objects.values_list("device", "clicks"))
+
+    def test_inserts_and_updates(self):
+        bulk_upsert(PageDataGSC, [self.data("MOBILE", 1)], UNIQUE_FIELDS)
+        written = bulk_upsert(
+            PageDataGSC,
+            [self.data("MOBILE", 2), self.data("DESKTOP", 3)],
+            UNIQUE_FIELDS,
+        )
+
+        self.assertEqual(written, 2)
+        self.assertEqual(self.clicks(), {"MOBILE": 2, "DESKTOP": 3})
+
+    def test_last_duplicate_in_batch_wins(self):
+        written = bulk_upsert(
+            PageDataGSC,
+            [self.data("MOBILE", 1), self.data("DESKTOP", 2), self.data("MOBILE", 3)],
+            UNIQUE_FIELDS,
+        )
+
+        self.assertEqual(written, 2)
+        self.assertEqual(self.clicks(), {"MOBILE": 3, "DESKTOP": 2})
+
+    def test_update_fields(self):
+        bulk_upsert(PageDataGSC, [self.data(clicks=1, impressions=10)], UNIQUE_FIELDS)
+        bulk_upsert(
+            PageDataGSC,
+            [self.data(clicks=2, impressions=20)],
+            UNIQUE_FIELDS,
+            update_fields=["clicks"],
+        )
+
+        row = PageDataGSC.objects.get()
+        self.assertEqual((row.clicks, row.impressions), (2, 10))
+
+    def test_auto_now_is_updated(self):
+        first = timezone.now() - dt.timedelta(days=1)
+        second = timezone.now()
+
+        with mock.patch("django.utils.timezone.now", return_value=first):
+            bulk_upsert(PageDataGSC, [self.data(clicks=1)], UNIQUE_FIELDS)
+        self.assertEqual(PageDataGSC.objects.get().last_updated, first)
+
+        # Also without last_updated in explicit update_fields
+        with mock.patch("django.utils.timezone.now", return_value=second):
+            bulk_upsert(
+                PageDataGSC,
+                [self.data(clicks=2)],
+                UNIQUE_FIELDS,
+                update_fields=["clicks"],
+            )
+        self.assertEqual(PageDataGSC.objects.get().last_updated, second)
+
+    def test_sends_rows_upserted_per_batch(self):
+        received = []
+
+        def receiver(sender, objs, **kwargs):
+            received.append((sender, [obj.device for obj in objs]))
+
+        rows_upserted.connect(receiver, sender=PageDataGSC)
+        self.addCleanup(rows_upserted.disconnect, receiver, sender=PageDataGSC)
+
+        bulk_upsert(
+            PageDataGSC,
+            [self.data("MOBILE"), self.data("MOBILE"), self.data("DESKTOP")],
+            UNIQUE_FIELDS,
+            batch_size=2,
+        )
+
+        self.assertEqual(
+            received,
+            [(PageDataGSC, ["MOBILE"]), (PageDataGSC, ["DESKTOP"])],
+        )
+
+    def test_fallback_without_conflict_targets(self):
+        bulk_upsert(
+            PageDataGSC,
+            [self.data("MOBILE", 1, date=DATE + dt.timedelta(days=1))],
+            UNIQUE_FIELDS,
+        )
+
+        with (
+            mock.patch.object(
+                connection.features, "supports_update_conflicts_with_target", False
+            ),
+            mock.patch.object(
+                upsert, "_upsert_on_conflict", side_effect=AssertionError
+            ),
+        ):
+            written = bulk_upsert(
+                PageDataGSC,
+                [
+                    self.data("MOBILE", 2),
+                    self.data("DESKTOP", 3),
+                    self.data("MOBILE", 4),
+                    # Same device on another day, must only match its own row
+                    self.data("MOBILE", 5, date=DATE + dt.timedelta(days=1)),
+                ],
+                UNIQUE_FIELDS,
+                batch_size=3,
+            )
+
+        self.assertEqual(written, 3)
+        self.assertEqual(
+            set(PageDataGSC.objects.values_list("date", "device", "clicks")),
+            {
+                (DATE, "MOBILE", 4),
+                (DATE, "DESKTOP", 3),
+                (DATE + dt.timedelta(days=1), "MOBILE", 5),
+            },
+        )
+
+
+class KeysetPaginatorTest(TestCase):
+    PER_PAGE = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        (property,) = Property.objects.bulk_create(
+            [Property(name="Test", url="https://example.com/")]
+        )
+        pages = Page.objects.bulk_create(
+            [
+                Page(property=property, url=f"https://example.com/test-{i}.html")
+                for i in range(2)
+            ]
+        )
+        # Many rows share the same date and clicks, so only the ID tells them apart
+        PageDataGSC.objects.bulk_create(
+            [
+                PageDataGSC(
+                    page=page,
+                    date=DATE + dt.timedelta(days=day),
+                    device=device,
+                    clicks=(day + i) % 2,
+                    impressions=10,
+                    ctr=0.1,
+                    position=1.0,
+                )
+                for day in range(4)
+                for i, page in enumerate(pages)
+                for device in ["MOBILE", "DESKTOP", "TABLET"]
+            ]
+        )
+
+    def paginator(self, queryset, cursor=None) -> KeysetPaginator:
+        return KeysetPaginator(queryset, self.PER_PAGE, cursor=cursor)
+
+    def test_cursor_round_trip(self):
+        paginator = self.paginator(PageDataGSC.objects.order_by("date", "-clicks"))
+        obj = paginator.ordered.first()
+
+        cursor = paginator.encode_cursor("previous", obj)
+
+        self.assertEqual(
+            paginator.decode_cursor(cursor),
+            ("previous", [obj.date, obj.clicks, obj.pk]),
+        )
+        with self.assertRaises(InvalidPage):
+            paginator.decode_cursor("not a cursor")
+
+    def test_pages_forward_and_back_with_mixed_directions(self):
+        queryset = PageDataGSC.objects.order_by("date", "-clicks")
+        expected = list(queryset.order_by("date", "-clicks", "-pk"))
+        self.assertEqual(
+            [
+                (field.name, descending)
+                for field, descending in self.paginator(queryset).keys
+            ],
+            [("date", False), ("clicks", True), ("id", True)],
+        )
+
+        pages = [self.paginator(queryset).page(1)]
+        while pages[-1].has_next():
+            pages.append(
+                self.paginator(queryset, cursor=pages[-1].next_cursor).page(
+                    pages[-1].number + 1
+                )
+            )
+
+        forward = [obj for page in pages for obj in page.object_list]
+        self.assertEqual(forward, expected)
+        self.assertTrue(all(isinstance(page, KeysetPage) for page in pages))
+
+        back = [pages[-1]]
+        while back[-1].has_previous():
+            back.append(
+                self.paginator(queryset, cursor=back[-1].previous_cursor).page(
+                    back[-1].number - 1
+                )
+            )
+
+        self.assertEqual(
+            [list(page.object_list) for page in back],
+            [list(page.object_list) for page in reversed(pages)],
+        )
+        self.assertEqual(back[-1].number, 1)
+
+    def test_falls_back_to_offset(self):
+        # Nullable fields can't be compared with a cursor
+        queryset = Page.objects.order_by("sophora_page")
+        paginator = KeysetPaginator(queryset, 1)
+
+        self.assertIsNone(paginator.keys)
+        page = paginator.page(2)
+        self.assertNotIsInstance(page, KeysetPage)
+        self.assertEqual(list(page.object_list), list(queryset[1:2]))
+
+
+class QuintlyBatchTest(SimpleTestCase):
+    PROFILE_IDS = [1, 2, 3]
+    FIELDS = ["time", "followers"]
+    END_DATE = DATE + dt.timedelta(days=2)
+
+    def setUp(self):
+        self.requests = []
+
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+
+        for patcher in [
+            mock.patch.dict(os.environ, {"SCRAPER_CACHE_DIR": cache_dir.name}),
+            mock.patch.object(
+                quintly, "quintly", SimpleNamespace(run_query=self.run_query)
+            ),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_query(self, profile_ids, table, fields, start_date, end_date, **kwargs):
+        """Stand-in for Quintly that only returns the requested fields."""
+        self.requests.append((list(profile_ids), list(fields)))
+        values = {"time": lambda profile_id, day: f"{day} 00:00:00"}
+
+        return pd.DataFrame(
+            [
+                {
+                    field: values.get(field, lambda profile_id, day: profile_id)(
+                        profile_id, day
+                    )
+                    for field in fields
+                }
+                for profile_id in profile_ids
+                for day in date_range(start_date, end_date)
+            ]
+        )
+
+    def query_each(self):
+        with quintly.batched(self.PROFILE_IDS):
+            return {
+                profile_id: quintly.run_query(
+                    [profile_id], "instagram", self.FIELDS, DATE, self.END_DATE
+                )
+                for profile_id in self.PROFILE_IDS
+            }
+
+    def test_requests_table_once_for_batch(self):
+        with mock.patch.dict(os.environ, {"SCRAPER_CACHE_HOURS_QUINTLY": "0"}):
+            results = self.query_each()
+
+        self.assertEqual(
+            self.requests, [(self.PROFILE_IDS, [*self.FIELDS, "profileId"])]
+        )
+        for profile_id, df in results.items():
+            self.assertEqual(list(df.columns), self.FIELDS)
+            self.assertEqual(list(df["followers"]), [profile_id] * 3)
+
+    @skipUnless(pyarrow, "requires pyarrow")
+    def test_caches_batch_per_profile(self):
+        self.query_each()
+        results = self.query_each()
+        single = quintly.run_query([2], "instagram", self.FIELDS, DATE, self.END_DATE)
+
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(list(results[3]["followers"]), [3] * 3)
+        self.assertEqual(list(single.columns), self.FIELDS)
+        self.assertEqual(list(single["followers"]), [2] * 3)
+
+
+class RollupsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        (property,) = Property.objects.bulk_create(
+            [Property(name="Test", url="https://example.com/")]
+        )
+        cls.page = Page.objects.create(
+            property=property, url="https://example.com/test-100.html"
+        )
+
+    def setUp(self):
+        self.addCleanup(rollups.flush_deferred)
+
+    def write(self, *dates: dt.date):
+        bulk_upsert(
+            PageDataGSC,
+            [
+                PageDataGSC(
+                    page=self.page,
+                    date=date,
+                    device="MOBILE",
+                    clicks=1,
+                    impressions=10,
+                    ctr=0.1,
+                    position=1.0,
+                )
+                for date in dates
+            ],
+            UNIQUE_FIELDS,
+            batch_size=1,
+        )
+
+    def test_collect_refreshes_once_at_the_end(self):
+        with mock.patch.object(rollups.RollupDefinition, "refresh_dates") as refresh:
+            with rollups.collect():
+                self.write(DATE, DATE + dt.timedelta(days=1))
+                refresh.assert_not_called()
+
+        refresh.assert_called_once_with(
+            {self.page.pk}, {DATE, DATE + dt.timedelta(days=1)}
+        )
+
+    def test_defers_writes_outside_of_collect(self):
+        with (
+            mock.patch.object(rollups.RollupDefinition, "refresh_dates") as refresh,
+            mock.patch.object(rollups, "_refresh_in_background") as enqueue,
+        ):
+            self.write(DATE, DATE + dt.timedelta(days=1))
+            self.write(DATE + dt.timedelta(days=2))
+            rollups.flush_deferred()
+
+        refresh.assert_not_called()
+        enqueue.assert_called_once_with(
+            rollups.DEFINITIONS[0],
+            {self.page.pk},
+            {DATE, DATE + dt.timedelta(days=1), DATE + dt.timedelta(days=2)},
+        )
+        self.assertIsNone(rollups._deferred_timer)
+
+
+class LocksTest(SimpleTestCase):
+    def setUp(self):
+        self.job = f"test.{uuid.uuid4().hex}"
+        self.products = [Property(pk=1), Property(pk=2)]
+
+        if REDIS:
+            self.addCleanup(
+                lambda: [
+                    conn.delete(locks.lock_key(self.job, product))
+                    for product in self.products
+                ]
+            )
+
+    @skipUnless(REDIS, "requires Redis")
+    def test_skips_locked_products(self):
+        with locks.lock(self.job, self.products[0]) as acquired:
+            self.assertTrue(acquired)
+
+            with mock.patch.object(locks, "mark_incomplete") as mark_incomplete:
+                self.assertEqual(
+                    list(locks.locked(self.products, self.job)), self.products[1:]
+                )
+            mark_incomplete.assert_called_once()
+
+        self.assertEqual(list(locks.locked(self.products, self.job)), self.products)
+
+    @skipUnless(REDIS, "requires Redis")
+    def test_lock_expires_if_holder_dies(self):
+        key = locks.lock_key(self.job, self.products[0])
+        # Acquired by a process that never releases or renews it
+        conn.lock(key, timeout=0.2).acquire(blocking=False)
+
+        with locks.lock(self.job, self.products[0]) as acquired:
+            self.assertFalse(acquired)
+
+        time.sleep(0.3)
+
+        with locks.lock(self.job, self.products[0]) as acquired:
+            self.assertTrue(acquired)
+
+    @skipUnless(REDIS, "requires Redis")
+    def test_renews_held_lock(self):
+        # Held for longer than its timeout
+        with locks.lock(self.job, self.products[0], timeout=1) as acquired:
+            self.assertTrue(acquired)
+            time.sleep(1.5)
+
+            with locks.lock(self.job, self.products[0]) as other:
+                self.assertFalse(other)
+
+        with locks.lock(self.job, self.products[0]) as acquired:
+            self.assertTrue(acquired)
+
+    def test_runs_without_redis(self):
+        redis_lock = mock.Mock(**{"acquire.side_effect": RedisError})
+
+        with (
+            mock.patch.object(locks.conn, "lock", return_value=redis_lock),
+            mock.patch.object(locks, "capture_exception") as capture_exception,
+        ):
+            with locks.lock(self.job, self.products[0]) as acquired:
+                self.assertTrue(acquired)
+
+        capture_exception.assert_called_once()
+        redis_lock.release.assert_not_called()
+
+
+class RateLimiterTest(SimpleTestCase):
+    def setUp(self):
+        self.limiter = ratelimit.RateLimiter(f"test-{uuid.uuid4().hex}", 100.0, 2)
+
+        if REDIS:
+            self.addCleanup(conn.delete, self.limiter.key)
+
+        patcher = mock.patch.object(ratelimit, "sleep", side_effect=time.sleep)
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def slept(self) -> float:
+        return sum(call.args[0] for call in self.sleep.call_args_list)
+
+    @skipUnless(REDIS, "requires Redis")
+    def test_waits_when_burst_is_used_up(self):
+        self.limiter.acquire()
+        self.limiter.acquire()
+        self.assertEqual(self.slept(), 0)
+
+        self.limiter.acquire()
+        self.assertAlmostEqual(self.slept(), 0.01, delta=0.005)
+
+    @skipUnless(REDIS, "requires Redis")
+    def test_backoff_pauses_and_halves_rate(self):
+        self.limiter.backoff("0.2")
+        self.assertEqual(float(conn.hget(self.limiter.key, "factor")), 0.5)
+
+        self.limiter.acquire()
+        self.assertAlmostEqual(self.slept(), 0.2, delta=0.05)
+
+        # The rate recovered a little while waiting
+        self.limiter.backoff()
+        self.assertAlmostEqual(
+            float(conn.hget(self.limiter.key, "factor")), 0.25, delta=0.01
+        )
+
+    @skipUnless(REDIS, "requires Redis")
+    def test_backoff_keeps_minimum_rate(self):
+        for _ in range(10):
+            self.limiter.backoff("0")
+
+        self.assertEqual(
+            float(conn.hget(self.limiter.key, "factor")), ratelimit.MIN_FACTOR
+        )
+
+    def test_backoff_without_redis(self):
+        with (
+            mock.patch.object(self.limiter, "_run", side_effect=RedisError),
+            mock.patch.object(ratelimit, "_outage_reported_at", None),
+            mock.patch.object(ratelimit, "capture_exception") as capture_exception,
+        ):
+            self.limiter.backoff("0.05")
+            self.limiter.backoff()
+            self.limiter.acquire()
+
+        self.assertEqual(
+            [call.args[0] for call in self.sleep.call_args_list], [0.05, 0.01, 0.01]
+        )
+        capture_exception.assert_called_once()
+
+    def test_parse_retry_after(self):
+        retry_at = timezone.now() + dt.timedelta(seconds=30)
+
+        self.assertEqual(ratelimit.parse_retry_after("5"), 5.0)
+        self.assertAlmostEqual(
+            ratelimit.parse_retry_after(retry_at.strftime("%a, %d %b %Y %H:%M:%S GMT")),
+            30,
+            delta=2,
+        )
+        self.assertIsNone(ratelimit.parse_retry_after("soon"))
+        self.assertIsNone(ratelimit.parse_retry_after(None))
+
+
+def scrape_test():
+    """Stand-in job for the watermark tests."""
+
+
+class WatermarksTest(TestCase):
+    def setUp(self):
+        self.product = Property(pk=1)
+
+    def run_job(self, fail: bool = False, incomplete: bool = False) -> dt.date:
+        with watermarks.incremental(
+            scrape_test,
+            self.product,
+            source="gsc",
+            default=DATE,
+            end_date=None,
+        ) as increment:
+            if incomplete:
+                increment.mark_incomplete()
+            if fail:
+                raise RuntimeError("Scrape failed")
+
+        return increment.start_date
+
+    def final_until(self) -> dt.date:
+        watermark = Watermark.objects.get()
+        return watermark.final_until.astimezone(watermarks.BERLIN).date()
+
+    def test_moves_to_end_of_settle_window(self):
+        self.assertEqual(self.run_job(), DATE)
+
+        settled = (watermarks.local_now() - watermarks.DEFAULT_SETTLE).date()
+        self.assertEqual(self.final_until(), settled)
+        self.assertEqual(self.run_job(), settled)
+
+    def test_does_not_move_on_failure(self):
+        with self.assertRaises(RuntimeError):
+            self.run_job(fail=True)
+        self.assertFalse(Watermark.objects.exists())
+
+        self.run_job()
+        final_until = self.final_until()
+        Watermark.objects.update(
+            final_until=watermarks._as_datetime(final_until - dt.timedelta(days=5))
+        )
+
+        with self.assertRaises(RuntimeError):
+            self.run_job(fail=True)
+        self.assertEqual(self.final_until(), final_until - dt.timedelta(days=5))
+
+    def test_does_not_move_if_incomplete(self):
+        self.run_job(incomplete=True)
+        self.assertFalse(Watermark.objects.exists())
+
+
+class BackfillTest(TestCase):
+    WINDOWS = [
+        (dt.date(2021, 3, 1), dt.date(2021, 3, 10)),
+        (dt.date(2021, 2, 1), dt.date(2021, 2, 28)),
+        (dt.date(2021, 1, 15), dt.date(2021, 1, 31)),
+    ]
+
+    def setUp(self):
+        self.product = Property(pk=1)
+        self.step = mock.Mock(__module__="okr.scrapers.test", __name__="scrape_step")
+
+        patcher = mock.patch.object(backfill, "capture_exception")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_backfill(self):
+        with backfill.checkpointed(scrape_test, self.product) as checkpoints:
+            checkpoints.run(
+                self.step,
+                monthly=True,
+                start_date=dt.date(2021, 1, 15),
+                end_date=dt.date(2021, 3, 10),
+                property_id=1,
+            )
+
+    def called_windows(self):
+        return [
+            (call.kwargs["start_date"], call.kwargs["end_date"])
+            for call in self.step.call_args_list
+        ]
+
+    def test_monthly_windows(self):
+        self.assertEqual(
+            backfill.monthly_windows(dt.date(2021, 1, 15), dt.date(2021, 3, 10)),
+            self.WINDOWS,
+        )
+
+    def test_resume_skips_finished_windows(self):
+        def fail_february(start_date, end_date, property_id):
+            if start_date.month == 2:
+                raise RuntimeError("Scrape failed")
+
+        self.step.side_effect = fail_february
+        self.run_backfill()
+
+        self.assertEqual(self.called_windows(), self.WINDOWS)
+        self.assertEqual(BackfillCheckpoint.objects.count(), 2)
+
+        self.step.reset_mock(side_effect=True)
+        self.run_backfill()
+
+        self.assertEqual(self.called_windows(), self.WINDOWS[1:2])
+        self.assertFalse(Backfill.objects.exists())
+        self.assertFalse(BackfillCheckpoint.objects.exists())
+
+    def test_repeats_incomplete_windows(self):
+        self.step.side_effect = lambda **kwargs: backfill.mark_incomplete()
+        self.run_backfill()
+
+        self.assertFalse(BackfillCheckpoint.objects.exists())
+
+        self.step.reset_mock(side_effect=True)
+        self.run_backfill()
+
+        self.assertEqual(self.called_windows(), self.WINDOWS)
+        self.assertFalse(Backfill.objects.exists())
+
+
+class RetentionPolicyTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        (property,) = Property.objects.bulk_create(
+            [Property(name="Test", url="https://example.com/")]
+        )
+        cls.page = Page.objects.create(
+            property=property, url="https://example.com/test-100.html"
+        )
+
+    def setUp(self):
+        patcher = mock.patch.object(db_cleanup, "sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.today = db_cleanup.local_today()
+
+    def test_deletes_in_chunks_before_cutoff(self):
+        PageDataGSC.objects.bulk_create(
+            PageDataGSC(
+                page=self.page,
+                date=self.today - dt.timedelta(days=days),
+                device="MOBILE",
+                clicks=1,
+                impressions=10,
+                ctr=0.1,
+                position=1.0,
+            )
+            for days in range(10)
+        )
+        policy = db_cleanup.RetentionPolicy(PageDataGSC)
+
+        with mock.patch.object(
+            PageDataGSC.objects, "filter", wraps=PageDataGSC.objects.filter
+        ) as objects_filter:
+            deleted = policy.apply(dt.timedelta(days=5), chunk_size=3)
+
+        # Deleted by primary key in chunks of 3 and 1 rows
+        self.assertEqual(deleted, 4)
+        self.assertEqual(
+            [len(call.kwargs["pk__in"]) for call in objects_filter.call_args_list[1:]],
+            [3, 1],
+        )
+        self.assertEqual(self.sleep.call_count, 1)
+        self.assertEqual(
+            min(PageDataGSC.objects.values_list("date", flat=True)),
+            self.today - dt.timedelta(days=5),
+        )
+
+    def test_datetime_cutoff_is_start_of_day(self):
+        cutoff = db_cleanup.BERLIN.localize(
+            dt.datetime.combine(self.today - dt.timedelta(days=90), dt.time())
+        )
+        JobRun.objects.bulk_create(
+            JobRun(
+                job="test.scrape",
+                source=JobRun.Source.SCHEDULER,
+                started_at=started_at,
+                duration=dt.timedelta(),
+                db_queries=0,
+                db_time=dt.timedelta(),
+                http_requests=0,
+                http_time=dt.timedelta(),
+                rows_written=0,
+                success=True,
+            )
+            for started_at in [cutoff - dt.timedelta(minutes=1), cutoff]
+        )
+        policy = db_cleanup.RetentionPolicy(
+            JobRun, date_field="started_at", default=dt.timedelta(days=90)
+        )
+
+        self.assertEqual(policy.apply(policy.max_age()), 1)
+        self.assertEqual(
+            list(JobRun.objects.values_list("started_at", flat=True)), [cutoff]
+        )
+        self.sleep.assert_not_called()
+
+
+class WebtrekkCacheEvictTest(TestCase):
+    def create(self, method: str, last_used: dt.datetime, expires: dt.datetime):
+        CachedWebtrekkRequest.objects.create(
+            key=uuid.uuid4().hex,
+            method=method,
+            response=b"",
+            expires=expires,
+            last_used=last_used,
+        )
+
+    def test_evicts_expired_and_least_recently_used(self):
+        now = timezone.now()
+        expires = now + dt.timedelta(days=1)
+
+        for minutes in range(5):
+            self.create("getAnalysisData", now - dt.timedelta(minutes=minutes), expires)
+        self.create("getReportData", now, expires)
+        self.create("getReportData", now, now - dt.timedelta(seconds=1))
+
+        with (
+            mock.patch.dict(
+                webtrekk_cache.POLICIES,
+                getAnalysisData=webtrekk_cache.CachePolicy(
+                    ttl=dt.timedelta(days=1), max_entries=2
+                ),
+            ),
+            mock.patch.object(webtrekk_cache, "EVICT_CHUNK_SIZE", 2),
+        ):
+            self.assertEqual(webtrekk_cache.evict(), 4)
+
+        self.assertEqual(
+            list(
+                CachedWebtrekkRequest.objects.filter(method="getAnalysisData")
+                .order_by("-last_used")
+                .values_list("last_used", flat=True)
+            ),
+            [now, now - dt.timedelta(minutes=1)],
+        )
+        self.assertEqual(
+            CachedWebtrekkRequest.objects.filter(method="getReportData").count(), 1
+        )
+
+
+class ExportsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        (cls.property,) = Property.objects.bulk_create(
+            [Property(name="Test", url="https://example.com/")]
+        )
+        page = Page.objects.create(
+            property=cls.property, url="https://example.com/test-100.html"
+        )
+        PageDataGSC.objects.bulk_create(
+            PageDataGSC(
+                page=page,
+                date=DATE + dt.timedelta(days=days),
+                device="MOBILE",
+                clicks=days,
+                impressions=10,
+                ctr=0.1,
+                position=1.0,
+            )
+            for days in range(3)
+        )
+        cls.user = User.objects.create_superuser("test", password="test")
+        cls.token = ApiToken.objects.create(user=cls.user, name="Test")
+
+    def get(self, name: str = "page-data-gsc", key: Optional[str] = None, **params):
+        return self.client.get(
+            reverse("export", args=[name]),
+            {"start": DATE.isoformat(), "end": DATE.isoformat(), **params},
+            HTTP_AUTHORIZATION=f"Token {key or self.token.key}",
+        )
+
+    def content(self, response) -> str:
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response = self.get(end=(DATE + dt.timedelta(days=1)).isoformat())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["Content-Disposition"],
+            'attachment; filename="page-data-gsc_2021-01-04_2021-01-05.csv"',
+        )
+
+        rows = list(csv.DictReader(io.StringIO(self.content(response))))
+        self.assertEqual(
+            list(rows[0]),
+            [field.attname for field in PageDataGSC._meta.concrete_fields],
+        )
+        self.assertEqual([row["date"] for row in rows], ["2021-01-04", "2021-01-05"])
+        self.assertEqual([row["clicks"] for row in rows], ["0", "1"])
+
+    def test_ndjson(self):
+        response = self.get(format="ndjson")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("application/x-ndjson"))
+
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["date"], "2021-01-04")
+        self.assertEqual(rows[0]["ctr"], 0.1)
+
+    @skipUnless(pyarrow, "requires pyarrow")
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+
+        response = self.get(
+            format="parquet", end=(DATE + dt.timedelta(days=2)).isoformat()
+        )
+        table = pq.read_table(io.BytesIO(b"".join(response.streaming_content)))
+
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.column("clicks").to_pylist(), [0, 1, 2])
+
+    def test_filters_products(self):
+        response = self.get(product=self.property.pk)
+        self.assertEqual(len(self.content(response).splitlines()), 2)
+
+        response = self.get(product=self.property.pk + 1)
+        self.assertEqual(len(self.content(response).splitlines()), 1)
+
+    def test_requires_authentication(self):
+        response = self.get(key="invalid")
+        self.assertEqual(response.status_code, 401)
+
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("export", args=["page-data-gsc"]),
+            {"start": timezone.localdate().isoformat()},
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_invalid_ranges(self):
+        self.assertEqual(self.get(start="").status_code, 400)
+        self.assertEqual(
+            self.get(start=(DATE + dt.timedelta(days=1)).isoformat()).status_code, 400
+        )
+        self.assertEqual(
+            self.get(
+                "page-data-query-gsc",
+                start=(DATE - dt.timedelta(days=31)).isoformat(),
+            ).status_code,
+            400,
+        )
+        self.assertEqual(self.get(format="xlsx").status_code, 400)
@@ -1 +1,8 @@
-urlpatterns = []
+from django.urls import path
+
+from .views import exports, rollups
+
+urlpatterns = [
+    path("exports/<str:name>/", exports.export, name="export"),
+    path("rollups/<str:name>/", rollups.rollups, name="rollups"),
+]
@@ -0,0 +1,77 @@
+"""Authentication for the JSON views used by dashboards and bots.
+
+Scripts and BI tools, which can't log in, send the key of an
+:class:`~okr.models.auth.ApiToken` in the ``Authorization: Token <key>`` header
+instead. The request then has the permissions of the user of the token.
+"""
+
+import functools
+from typing import Callable, Optional, Type
+
+from django.contrib.auth.models import AbstractBaseUser
+from django.db.models import Model
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.utils import timezone
+
+from ..models import ApiToken
+
+TOKEN_PREFIX = "Token "
+
+
+def _token_user(request: HttpRequest) -> Optional[AbstractBaseUser]:
+    """The active user of the API token of the request, if any."""
+    header = request.headers.get("Authorization", "")
+
+    if not header.startswith(TOKEN_PREFIX):
+        return None
+
+    token = (
+        ApiToken.objects.filter(
+            key=header[len(TOKEN_PREFIX) :].strip(), user__is_active=True
+        )
+        .select_related("user")
+        .first()
+    )
+
+    if token is None:
+        return None
+
+    ApiToken.objects.filter(pk=token.pk).update(last_used=timezone.now())
+    return token.user
+
+
+def require_view_permission(model: Callable[..., Type[Model]]) -> Callable:
+    """Only allow logged in staff users that may view the model of the request.
+
+    Unlike ``login_required``, this responds with a JSON error instead of
+    redirecting to the login page, as the views are requested by scripts. Requests
+    with an API token are made by the user of the token.
+
+    Args:
+        model (Callable[..., Type[Model]]): Gets the model from the arguments of the
+            view.
+    """
+
+    def decorator(view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            token_user = _token_user(request)
+            if token_user is not None:
+                request.user = token_user
+
+            if not request.user.is_authenticated:
+                return JsonResponse({"error": "Authentication required"}, status=401)
+
+            target = model(*args, **kwargs)
+
+            if target is not None:
+                permission = f"{target._meta.app_label}.view_{target._meta.model_name}"
+
+                if not request.user.is_staff or not request.user.has_perm(permission):
+                    return JsonResponse({"error": "Permission denied"}, status=403)
+
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
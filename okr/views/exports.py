@@ -0,0 +1,277 @@
+"""Export the daily data of the largest tables for BI tools.
+
+``GET /okr/exports/<name>/`` streams all rows of one of :data:`EXPORTS`. The query
+parameters select the rows and the format:
+
+* ``start`` and ``end``: ISO dates, both inclusive. ``start`` is required, ``end``
+  defaults to today. The range may span at most ``max_days`` of the export.
+* ``product``: ID of the property, podcast, YouTube or Instagram account, can be
+  given multiple times
+* ``format``: ``csv`` (default), ``ndjson`` (one JSON object per line) or ``parquet``
+
+The rows are read with a server-side cursor in chunks of :data:`CHUNK_SIZE` and
+written to the response right away, so exporting a month of search queries doesn't
+load the whole month into the memory of the web worker.
+
+Requires a logged in staff user or an API token (see :mod:`okr.views.auth`) with
+permission to view the exported model.
+"""
+
+import csv
+import datetime as dt
+import io
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Field, Model, QuerySet
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from ..models import (
+    InstaInsight,
+    PageDataGSC,
+    PageDataQueryGSC,
+    PageDataWebtrekk,
+    PodcastDataSpotify,
+    PodcastEpisodeDataSpotify,
+    PropertyDataGSC,
+    PropertyDataQueryGSC,
+    YouTubeAnalytics,
+    YouTubeVideoAnalytics,
+)
+from .auth import require_view_permission
+
+# Rows fetched from the database and written to the response at once
+CHUNK_SIZE = 2000
+
+
+@dataclass(frozen=True)
+class Export:
+    """A model that can be exported."""
+
+    model: Type[Model]
+    # Lookup of the product ID, e.g. "page__property"
+    product: str
+    date_field: str = "date"
+    # Longest range of days that can be exported at once
+    max_days: int = 366
+
+    @property
+    def fields(self) -> List[Field]:
+        return list(self.model._meta.concrete_fields)
+
+    def queryset(
+        self,
+        start: Optional[dt.date] = None,
+        end: Optional[dt.date] = None,
+        products: Iterable[int] = (),
+    ) -> QuerySet:
+        """Rows between two dates, optionally only of some products."""
+        queryset = self.model.objects.all()
+
+        if start is not None:
+            queryset = queryset.filter(**{f"{self.date_field}__gte": start})
+        if end is not None:
+            queryset = queryset.filter(**{f"{self.date_field}__lte": end})
+        if products:
+            queryset = queryset.filter(**{f"{self.product}__in": list(products)})
+
+        return queryset.order_by(self.date_field, "pk")
+
+    def rows(self, queryset: QuerySet) -> Iterator[tuple]:
+        """Stream the values of all concrete fields, in chunks of ``CHUNK_SIZE``."""
+        return queryset.values_list(*(field.attname for field in self.fields)).iterator(
+            chunk_size=CHUNK_SIZE
+        )
+
+
+EXPORTS: Dict[str, Export] = {
+    # Pages
+    "property-data-gsc": Export(PropertyDataGSC, "property"),
+    "property-data-query-gsc": Export(PropertyDataQueryGSC, "property", max_days=31),
+    "page-data-gsc": Export(PageDataGSC, "page__property"),
+    "page-data-query-gsc": Export(PageDataQueryGSC, "page__property", max_days=31),
+    "page-data-webtrekk": Export(PageDataWebtrekk, "webtrekk_meta__page__property"),
+    # Podcasts
+    "podcast-data-spotify": Export(PodcastDataSpotify, "podcast"),
+    "podcast-episode-data-spotify": Export(
+        PodcastEpisodeDataSpotify, "episode__podcast"
+    ),
+    # YouTube
+    "youtube-analytics": Export(YouTubeAnalytics, "youtube"),
+    "youtube-video-analytics": Export(YouTubeVideoAnalytics, "youtube_video__youtube"),
+    # Instagram
+    "insta-insights": Export(InstaInsight, "insta"),
+}
+
+
+def _chunks(rows: Iterator[tuple]) -> Iterator[List[tuple]]:
+    while chunk := list(islice(rows, CHUNK_SIZE)):
+        yield chunk
+
+
+class _Buffer(io.RawIOBase):
+    """Collects written data until it is sent as part of the response."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class _Line:
+    """Returns lines written by ``csv.writer`` instead of storing them."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _csv(export: Export, rows: Iterator[tuple]) -> Iterator[str]:
+    writer = csv.writer(_Line())
+    yield writer.writerow([field.attname for field in export.fields])
+
+    for chunk in _chunks(rows):
+        yield "".join(writer.writerow(row) for row in chunk)
+
+
+def _ndjson(export: Export, rows: Iterator[tuple]) -> Iterator[str]:
+    names = [field.attname for field in export.fields]
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+    for chunk in _chunks(rows):
+        yield "".join(f"{encoder.encode(dict(zip(names, row)))}\n" for row in chunk)
+
+
+def _arrow_type(field: Field):
+    import pyarrow as pa
+
+    return {
+        "AutoField": pa.int64(),
+        "BigAutoField": pa.int64(),
+        "BigIntegerField": pa.int64(),
+        "BooleanField": pa.bool_(),
+        "DateField": pa.date32(),
+        "DateTimeField": pa.timestamp("us", tz="UTC"),
+        "DurationField": pa.duration("us"),
+        "FloatField": pa.float64(),
+        "ForeignKey": pa.int64(),
+        "IntegerField": pa.int64(),
+        "PositiveIntegerField": pa.int64(),
+        "PositiveSmallIntegerField": pa.int64(),
+        "SmallIntegerField": pa.int64(),
+    }.get(field.get_internal_type(), pa.string())
+
+
+def _parquet(export: Export, rows: Iterator[tuple]) -> Iterator[bytes]:
+    # Only needed for this format, keep it out of the startup of the web worker
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [pa.field(field.attname, _arrow_type(field)) for field in export.fields]
+    )
+    # Values of other fields (e.g. JSON) are written as strings
+    to_string = [pa.types.is_string(schema.field(i).type) for i in range(len(schema))]
+    buffer = _Buffer()
+
+    with pq.ParquetWriter(buffer, schema) as writer:
+        # Each chunk becomes a row group, which is written to the buffer completely
+        for chunk in _chunks(rows):
+            columns = [
+                pa.array(
+                    [str(v) if convert and v is not None else v for v in column],
+                    type=schema.field(i).type,
+                )
+                for i, (column, convert) in enumerate(zip(zip(*chunk), to_string))
+            ]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            yield buffer.pop()
+
+    yield buffer.pop()
+
+
+# Format (also the file extension) -> streaming function and content type
+FORMATS: Dict[str, Tuple[Callable[[Export, Iterator[tuple]], Iterator[Any]], str]] = {
+    "csv": (_csv, "text/csv; charset=utf-8"),
+    "ndjson": (_ndjson, "application/x-ndjson; charset=utf-8"),
+    "parquet": (_parquet, "application/vnd.apache.parquet"),
+}
+
+
+def _export_model(name: str) -> Optional[Type[Model]]:
+    return EXPORTS[name].model if name in EXPORTS else None
+
+
+def _error(message: str, status: int = 400) -> JsonResponse:
+    return JsonResponse({"error": message}, status=status)
+
+
+def _parse_date(value: Optional[str]) -> Optional[dt.date]:
+    return dt.date.fromisoformat(value) if value else None
+
+
+@require_GET
+@require_view_permission(_export_model)
+def export(request: HttpRequest, name: str) -> HttpResponse:
+    """Stream the rows of a model, filtered by the query parameters.
+
+    Args:
+        request (HttpRequest): The request.
+        name (str): Name of the export in :data:`EXPORTS`.
+
+    Returns:
+        HttpResponse: The rows as a file download.
+    """
+    if name not in EXPORTS:
+        return _error(f"Unknown export {name!r}", status=404)
+
+    export = EXPORTS[name]
+    file_format = request.GET.get("format", "csv")
+
+    if file_format not in FORMATS:
+        return _error(
+            f"Unknown format {file_format!r} (available: {', '.join(FORMATS)})"
+        )
+
+    try:
+        start = _parse_date(request.GET.get("start"))
+        end = _parse_date(request.GET.get("end")) or timezone.localdate()
+        products = [int(product) for product in request.GET.getlist("product")]
+    except ValueError as e:
+        return _error(str(e))
+
+    if start is None:
+        return _error("Missing start date")
+
+    if start > end:
+        return _error("The start date must not be after the end date")
+
+    if (end - start).days + 1 > export.max_days:
+        return _error(f"{name} can be exported for at most {export.max_days} days")
+
+    stream, content_type = FORMATS[file_format]
+    rows = export.rows(export.queryset(start, end, products))
+    filename = f"{name}_{start.isoformat()}_{end.isoformat()}"
+
+    response = StreamingHttpResponse(stream(export, rows), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{file_format}"'
+    return response
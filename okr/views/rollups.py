@@ -0,0 +1,108 @@
+"""Read the pre-aggregated data in :mod:`okr.models.rollups` as JSON.
+
+``GET /okr/rollups/<name>/`` returns the rollups of one of :data:`ROLLUPS`. The query
+parameters filter the results:
+
+* ``period``: ``day``, ``week`` (default) or ``month``
+* ``start`` and ``end``: ISO dates, only periods that start within them
+* ``product``: ID of the page, episode or Instagram account, can be given multiple
+  times
+* ``limit`` and ``offset``: Page through the results, at most :data:`MAX_LIMIT` rows
+  at once
+
+Requires a logged in staff user with permission to view the rollup model.
+"""
+
+import datetime as dt
+from typing import Dict, Optional, Tuple, Type
+
+from django.db.models import Model
+from django.http import HttpRequest, JsonResponse
+from django.views.decorators.http import require_GET
+
+from ..models import (
+    InstaRollup,
+    PageQueryRollupGSC,
+    PageRollupGSC,
+    Period,
+    PodcastEpisodeRollupSpotify,
+)
+from .auth import require_view_permission
+
+# Name in the URL -> rollup model and the field of its product
+ROLLUPS: Dict[str, Tuple[Type[Model], str]] = {
+    "pages-gsc": (PageRollupGSC, "page"),
+    "page-queries-gsc": (PageQueryRollupGSC, "page"),
+    "podcast-episodes-spotify": (PodcastEpisodeRollupSpotify, "episode"),
+    "insta": (InstaRollup, "insta"),
+}
+
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10000
+
+
+def _rollup_model(name: str) -> Optional[Type[Model]]:
+    return ROLLUPS[name][0] if name in ROLLUPS else None
+
+
+def _error(message: str, status: int = 400) -> JsonResponse:
+    return JsonResponse({"error": message}, status=status)
+
+
+def _parse_date(value: Optional[str]) -> Optional[dt.date]:
+    return dt.date.fromisoformat(value) if value else None
+
+
+@require_GET
+@require_view_permission(_rollup_model)
+def rollups(request: HttpRequest, name: str) -> JsonResponse:
+    """List rollups, filtered by the query parameters.
+
+    Args:
+        request (HttpRequest): The request.
+        name (str): Name of the rollup in :data:`ROLLUPS`.
+
+    Returns:
+        JsonResponse: The rollups as ``results``, with the ``count`` of all matching
+        rows for paging.
+    """
+    if name not in ROLLUPS:
+        return _error(f"Unknown rollup {name!r}", status=404)
+
+    model, product_field = ROLLUPS[name]
+    period = request.GET.get("period", Period.WEEK)
+
+    if period not in Period.values:
+        return _error(f"Unknown period {period!r}")
+
+    try:
+        start = _parse_date(request.GET.get("start"))
+        end = _parse_date(request.GET.get("end"))
+        products = [int(product) for product in request.GET.getlist("product")]
+        limit = min(max(int(request.GET.get("limit", DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        offset = max(int(request.GET.get("offset", 0)), 0)
+    except ValueError as e:
+        return _error(str(e))
+
+    queryset = model.objects.period(period).between(start, end)
+
+    if products:
+        queryset = queryset.filter(**{f"{product_field}__in": products})
+
+    fields = [
+        field.attname
+        for field in model._meta.concrete_fields
+        if field.name not in ("id", "last_updated")
+    ]
+    results = list(
+        queryset.order_by("start_date", "pk").values(*fields)[offset : offset + limit]
+    )
+
+    return JsonResponse(
+        {
+            "rollup": name,
+            "period": period,
+            "count": queryset.count(),
+            "results": results,
+        }
+    )
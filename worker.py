@@ -26,6 +26,10 @@ for scheduler_module in scheduler_modules:
     if not settings.DEBUG:
         scheduler_module.add_jobs()
 
+# Continue full scrapes that were interrupted by the last restart
+if not settings.DEBUG:
+    scheduler_okr.resume_backfills()
+
 # Start rq connection
 listen = ["high", "default", "low"]
 